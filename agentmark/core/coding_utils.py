@@ -3,22 +3,569 @@ Coding utilities module.
 Responsibilities: provide error-correcting encode/decode utilities with configurable
 watermark embedding strategies.
 
-Standard implementations:
-- parity: Python built-in operations
-- hamming: standard Hamming(7,4) extended algorithm
-- Reed-Solomon: reedsolo library (optional)
+ECC methods are Codec objects looked up in a registry by `ecc_method`:
+- none: identity
+- parity: one even-parity bit (detects odd numbers of bit errors)
+- hamming: Hamming(n, k) for any k, parity bits at power-of-two positions
+  (k=16 is the original Hamming(21,16) layout); corrects 1-bit errors
+- reed_solomon (alias rs): shortened Reed-Solomon over GF(2^8); corrects up to
+  rs_parity_symbols // 2 byte errors
+
+Linear codes are table-driven: generator, syndrome and data-extraction tables are
+built once per block size and applied a byte at a time to packed integers;
+decode_many runs the syndrome step for a whole batch with numpy.
+Set `ecc_block_bits` to split the payload into independently coded blocks
+(e.g. ecc_block_bits=4 with hamming gives Hamming(7,4) blocks).
 """
 
+import threading
+
+import numpy as np
+
+
+# =============================================================================
+# Codec Registry
+# =============================================================================
+
+# Default parity symbols (bytes) of the Reed-Solomon codec
+DEFAULT_RS_PARITY_SYMBOLS = 4
+
+
+class Codec:
+    """
+    Block error-correcting code: k data bits <-> n coded bits.
+
+    The base class is the identity code ("none"). Decoders return the same
+    dict as decode_message.
+    """
+
+    name = "none"
+
+    def __init__(self, k: int):
+        self.k = k
+        self.n = k
+
+    @classmethod
+    def from_config(cls, k: int, config: dict) -> "Codec":
+        return cls(k)
+
+    @classmethod
+    def data_length(cls, n: int, config: dict) -> int:
+        """Data bits of the codec whose coded length is n (used when payload_bit_length is absent)."""
+        return n
+
+    def encode(self, data_bits: str) -> str:
+        self._check_length(data_bits, self.k, "data")
+        return data_bits
+
+    def decode(self, message_bits: str) -> dict:
+        self._check_length(message_bits, self.n, "message")
+        return self._result(message_bits)
+
+    def decode_many(self, messages) -> list:
+        """Decode a batch of n-bit messages (one result dict each)."""
+        return [self.decode(m) for m in messages]
+
+    def _check_length(self, bits: str, expected: int, what: str):
+        if len(bits) != expected:
+            raise ValueError(f"{self.name} expects {expected}-bit {what}, got {len(bits)} bits")
+
+    def _result(self, payload: str, valid: bool = True, corrected: bool = False, error: str = None) -> dict:
+        return {
+            'decoded_payload': payload,
+            'valid': valid,
+            'corrected': corrected,
+            'ecc_method': self.name,
+            'error': error
+        }
+
+
+_CODEC_TYPES = {}
+_CODEC_CACHE = {}
+_CODEC_CACHE_LOCK = threading.Lock()
+
+
+def register_codec(name: str, codec_type):
+    """
+    Register a Codec subclass under an ecc_method name.
+
+    Args:
+        name (str): Value of config["ecc_method"]
+        codec_type (type): Codec subclass (from_config / data_length are used)
+    """
+    _CODEC_TYPES[name] = codec_type
+    with _CODEC_CACHE_LOCK:
+        _CODEC_CACHE.clear()
+
+
+def get_codec(config: dict, payload_bit_length: int = None) -> Codec:
+    """
+    Codec for a watermark config (built once per block layout, then cached).
+
+    Args:
+        config (dict): Watermark config (ecc_method, payload_bit_length, ecc_block_bits,
+            rs_parity_symbols)
+        payload_bit_length (int, optional): Overrides config["payload_bit_length"]
+
+    Returns:
+        Codec: The codec
+
+    Raises:
+        ValueError: Unknown ECC method
+    """
+    ecc_method = config.get("ecc_method", "none")
+    codec_type = _CODEC_TYPES.get(ecc_method)
+    if codec_type is None:
+        raise ValueError(f"Unknown ECC method: {ecc_method}")
+    k = payload_bit_length if payload_bit_length is not None else config.get("payload_bit_length", 8)
+    block_bits = config.get("ecc_block_bits") or k
+    key = (ecc_method, k, block_bits, config.get("rs_parity_symbols"))
+    codec = _CODEC_CACHE.get(key)
+    if codec is None:
+        if block_bits < k:
+            sizes = [block_bits] * (k // block_bits) + ([k % block_bits] if k % block_bits else [])
+            codec = BlockCodec([codec_type.from_config(size, config) for size in sizes])
+        else:
+            codec = codec_type.from_config(k, config)
+        with _CODEC_CACHE_LOCK:
+            codec = _CODEC_CACHE.setdefault(key, codec)
+    return codec
+
+
+def _codec_for_message(config: dict, n: int) -> Codec:
+    # Configured payload length first; otherwise (or if the lengths disagree) infer it from n
+    codec = get_codec(config) if "payload_bit_length" in config else None
+    if codec is None or (codec.n != n and not config.get("ecc_block_bits")):
+        codec_type = _CODEC_TYPES.get(config.get("ecc_method", "none"))
+        if codec_type is None:
+            raise ValueError(f"Unknown ECC method: {config.get('ecc_method', 'none')}")
+        k = codec_type.data_length(n, config)
+        if k < 0:
+            raise ValueError(f"{n}-bit message is too short for {config.get('ecc_method', 'none')}")
+        codec = get_codec(config, k)
+    return codec
+
+
+class BlockCodec(Codec):
+    """Concatenation of independently coded blocks (ecc_block_bits)."""
+
+    def __init__(self, blocks):
+        self.blocks = list(blocks)
+        self.name = self.blocks[0].name
+        self.k = sum(b.k for b in self.blocks)
+        self.n = sum(b.n for b in self.blocks)
+
+    def encode(self, data_bits: str) -> str:
+        self._check_length(data_bits, self.k, "data")
+        out, pos = [], 0
+        for block in self.blocks:
+            out.append(block.encode(data_bits[pos:pos + block.k]))
+            pos += block.k
+        return "".join(out)
+
+    def decode(self, message_bits: str) -> dict:
+        return self.decode_many([message_bits])[0]
+
+    def decode_many(self, messages) -> list:
+        messages = list(messages)
+        for m in messages:
+            self._check_length(m, self.n, "message")
+        per_block, pos = [], 0
+        for block in self.blocks:
+            per_block.append(block.decode_many([m[pos:pos + block.n] for m in messages]))
+            pos += block.n
+        results = []
+        for parts in zip(*per_block):
+            errors = [p['error'] for p in parts if p['error']]
+            results.append(self._result(
+                "".join(p['decoded_payload'] for p in parts),
+                valid=all(p['valid'] for p in parts),
+                corrected=any(p['corrected'] for p in parts),
+                error=errors[0] if errors else None,
+            ))
+        return results
+
+
+# =============================================================================
+# Table-Driven Linear Codes (parity, Hamming)
+# =============================================================================
+
+_NO_ERROR = -1
+_UNCORRECTABLE = -2
+
+
+def _byte_tables(contribs):
+    """
+    Lookup tables for XOR-ing per-bit contributions of a packed integer.
+
+    contribs[b] is the contribution of bit b (LSB = 0); table c maps byte c of
+    the integer to the XOR of the contributions of its set bits.
+    """
+    tables = []
+    for lo in range(0, len(contribs), 8):
+        chunk = contribs[lo:lo + 8]
+        table = [0] * (1 << len(chunk))
+        for v in range(1, len(table)):
+            low = v & -v
+            table[v] = table[v ^ low] ^ chunk[low.bit_length() - 1]
+        tables.append(table)
+    return tables
+
+
+def _apply_tables(tables, word: int) -> int:
+    out = 0
+    for table in tables:
+        out ^= table[word & 0xFF]
+        word >>= 8
+    return out
+
+
+class LinearBlockCodec(Codec):
+    """
+    Binary linear code with one parity bit per check (systematic per check).
+
+    Bits are addressed by string position q (0-based). In the packed integer
+    int(bits, 2), position q is bit n - 1 - q.
+
+    Args:
+        k (int): Data bits
+        data_positions (list[int]): Codeword position of each data bit, in order
+        checks (list[tuple[int, list[int]]]): (parity position, data positions it covers)
+        corrections (dict[int, int]): Syndrome -> position to flip; other nonzero
+            syndromes are reported as uncorrectable
+    """
+
+    def __init__(self, k, data_positions, checks, corrections):
+        self.k = k
+        self.n = len(data_positions) + len(checks)
+        n = self.n
+        self.data_positions = np.asarray(data_positions, dtype=np.intp)
+        self.r = len(checks)
+
+        gen = [0] * k  # data bit (LSB-indexed) -> codeword bits
+        synd = [0] * n  # codeword bit (LSB-indexed) -> syndrome bits
+        extract = [0] * n  # codeword bit -> data bits
+        slot_of = {q: j for j, q in enumerate(data_positions)}
+        for j, q in enumerate(data_positions):
+            gen[k - 1 - j] |= 1 << (n - 1 - q)
+            extract[n - 1 - q] = 1 << (k - 1 - j)
+        for i, (parity_pos, covered) in enumerate(checks):
+            synd[n - 1 - parity_pos] |= 1 << i
+            for q in covered:
+                gen[k - 1 - slot_of[q]] |= 1 << (n - 1 - parity_pos)
+                synd[n - 1 - q] |= 1 << i
+        self._gen_tables = _byte_tables(gen)
+        self._synd_tables = _byte_tables(synd)
+        self._data_tables = _byte_tables(extract)
+
+        self._fix = np.full(1 << self.r, _UNCORRECTABLE, dtype=np.intp)
+        self._fix[0] = _NO_ERROR
+        for syndrome, q in corrections.items():
+            self._fix[syndrome] = q
+        # Parity-check matrix (n x r) for the batch path
+        self._check_matrix = np.array(
+            [[(synd[n - 1 - q] >> i) & 1 for i in range(self.r)] for q in range(n)], dtype=np.int64
+        ).reshape(n, self.r)
+        self._syndrome_weights = (1 << np.arange(self.r, dtype=np.int64))
+
+    def encode_int(self, data: int) -> int:
+        """Packed k-bit data -> packed n-bit codeword."""
+        return _apply_tables(self._gen_tables, data)
+
+    def decode_int(self, word: int):
+        """
+        Packed n-bit codeword -> (packed data, flipped position or -1, correctable).
+        """
+        fix = int(self._fix[_apply_tables(self._synd_tables, word)])
+        if fix >= 0:
+            word ^= 1 << (self.n - 1 - fix)
+        return _apply_tables(self._data_tables, word), fix, fix != _UNCORRECTABLE
+
+    def encode(self, data_bits: str) -> str:
+        self._check_length(data_bits, self.k, "data")
+        if not self.k:
+            return "0" * self.n
+        return format(self.encode_int(int(data_bits, 2)), f"0{self.n}b")
+
+    def decode(self, message_bits: str) -> dict:
+        self._check_length(message_bits, self.n, "message")
+        data, fix, _ = self.decode_int(int(message_bits, 2) if message_bits else 0)
+        return self._status(format(data, f"0{self.k}b") if self.k else "", fix)
+
+    def decode_many(self, messages) -> list:
+        messages = list(messages)
+        if not messages:
+            return []
+        for m in messages:
+            self._check_length(m, self.n, "message")
+        bits = (np.frombuffer("".join(messages).encode("ascii"), dtype=np.uint8) - ord("0")).reshape(len(messages), self.n)
+        syndromes = ((bits @ self._check_matrix) & 1) @ self._syndrome_weights
+        fixes = self._fix[syndromes]
+        rows = np.flatnonzero(fixes >= 0)
+        bits[rows, fixes[rows]] ^= 1
+        payloads = (bits[:, self.data_positions] + ord("0")).tobytes().decode("ascii")
+        k = self.k
+        return [self._status(payloads[i * k:(i + 1) * k], int(fix)) for i, fix in enumerate(fixes)]
+
+    def _status(self, payload: str, fix: int) -> dict:
+        if fix == _UNCORRECTABLE:
+            return self._result(payload, valid=False, error=self._uncorrectable_error)
+        return self._result(payload, corrected=fix >= 0)
+
+    _uncorrectable_error = "Uncorrectable error"
+
+
+class ParityCodec(LinearBlockCodec):
+    """Even parity: k data bits followed by one parity bit."""
+
+    name = "parity"
+    _uncorrectable_error = "Parity check failed"
+
+    def __init__(self, k: int):
+        super().__init__(k, list(range(k)), [(k, list(range(k)))], corrections={})
+
+    @classmethod
+    def data_length(cls, n: int, config: dict) -> int:
+        return n - 1
+
+
+def _hamming_parity_bits(k: int) -> int:
+    r = 0
+    while (1 << r) < k + r + 1:
+        r += 1
+    return r
+
+
+class HammingCodec(LinearBlockCodec):
+    """
+    Hamming(n, k) for any k: n = k + r with 2^r >= n + 1, parity bits at
+    1-based positions 1, 2, 4, ...; a nonzero syndrome s <= n flips position s.
+    """
+
+    name = "hamming"
+    _uncorrectable_error = "Hamming detected multi-bit error (cannot correct)"
+
+    def __init__(self, k: int):
+        n = k + _hamming_parity_bits(k)
+        data_positions = [p - 1 for p in range(1, n + 1) if p & (p - 1)]
+        checks = []
+        for i in range(_hamming_parity_bits(k)):
+            p = 1 << i
+            checks.append((p - 1, [q - 1 for q in range(1, n + 1) if q & p and q != p]))
+        super().__init__(k, data_positions, checks, corrections={s: s - 1 for s in range(1, n + 1)})
+
+    @classmethod
+    def data_length(cls, n: int, config: dict) -> int:
+        r = 0
+        while (1 << r) < n + 1:
+            r += 1
+        return n - r
+
+
+# =============================================================================
+# Reed-Solomon over GF(2^8)
+# =============================================================================
+
+_GF_EXP = [0] * 512
+_GF_LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    _GF_EXP[_i] = _x
+    _GF_LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11D  # x^8 + x^4 + x^3 + x^2 + 1
+for _i in range(255, 512):
+    _GF_EXP[_i] = _GF_EXP[_i - 255]
+del _x, _i
+
+
+def _gf_mul(x: int, y: int) -> int:
+    if x == 0 or y == 0:
+        return 0
+    return _GF_EXP[_GF_LOG[x] + _GF_LOG[y]]
+
+
+def _gf_div(x: int, y: int) -> int:
+    if x == 0:
+        return 0
+    return _GF_EXP[(_GF_LOG[x] + 255 - _GF_LOG[y]) % 255]
+
+
+def _gf_pow(x: int, power: int) -> int:
+    return _GF_EXP[(_GF_LOG[x] * power) % 255]
+
+
+def _gf_inverse(x: int) -> int:
+    return _GF_EXP[255 - _GF_LOG[x]]
+
+
+def _gf_poly_scale(p, x):
+    return [_gf_mul(c, x) for c in p]
+
+
+def _gf_poly_add(p, q):
+    # Polynomials are highest degree first; align on the constant term
+    r = [0] * max(len(p), len(q))
+    for i, c in enumerate(p):
+        r[i + len(r) - len(p)] = c
+    for i, c in enumerate(q):
+        r[i + len(r) - len(q)] ^= c
+    return r
+
+
+def _gf_poly_mul(p, q):
+    r = [0] * (len(p) + len(q) - 1)
+    for j, qj in enumerate(q):
+        for i, pi in enumerate(p):
+            r[i + j] ^= _gf_mul(pi, qj)
+    return r
+
+
+def _gf_poly_eval(p, x):
+    y = p[0]
+    for c in p[1:]:
+        y = _gf_mul(y, x) ^ c
+    return y
+
+
+class ReedSolomonCodec(Codec):
+    """
+    Shortened Reed-Solomon over GF(2^8) (primitive 0x11D, generator 2).
+
+    The k data bits are zero-padded to whole bytes, followed by nsym parity
+    bytes; coded length is k + 8 * nsym bits. Up to nsym // 2 corrupted bytes
+    are corrected. Encoding uses a (256 x nsym) table of generator multiples.
+    """
+
+    name = "reed_solomon"
+
+    def __init__(self, k: int, nsym: int = DEFAULT_RS_PARITY_SYMBOLS):
+        self.k = k
+        self.nsym = nsym
+        self.data_bytes = (k + 7) // 8
+        self.n = k + 8 * nsym
+        if self.data_bytes + nsym > 255:
+            raise ValueError(f"Reed-Solomon codeword too long: {self.data_bytes} data + {nsym} parity bytes > 255")
+        gen = [1]
+        for i in range(nsym):
+            gen = _gf_poly_mul(gen, [1, _gf_pow(2, i)])
+        self._gen_rows = [_gf_poly_scale(gen[1:], c) for c in range(256)]
+
+    @classmethod
+    def from_config(cls, k: int, config: dict) -> "Codec":
+        return cls(k, int(config.get("rs_parity_symbols") or DEFAULT_RS_PARITY_SYMBOLS))
+
+    @classmethod
+    def data_length(cls, n: int, config: dict) -> int:
+        return n - 8 * int(config.get("rs_parity_symbols") or DEFAULT_RS_PARITY_SYMBOLS)
+
+    def _to_bytes(self, data_bits: str):
+        padded = data_bits + "0" * (8 * self.data_bytes - self.k)
+        return [int(padded[i:i + 8], 2) for i in range(0, len(padded), 8)]
+
+    def encode(self, data_bits: str) -> str:
+        self._check_length(data_bits, self.k, "data")
+        msg = self._to_bytes(data_bits)
+        remainder = [0] * self.nsym
+        for byte in msg:
+            row = self._gen_rows[byte ^ remainder[0]]
+            remainder = [a ^ b for a, b in zip(remainder[1:] + [0], row)]
+        return data_bits + "".join(format(b, "08b") for b in remainder)
+
+    def decode(self, message_bits: str) -> dict:
+        self._check_length(message_bits, self.n, "message")
+        data_bits = message_bits[:self.k]
+        parity_bits = message_bits[self.k:]
+        msg = self._to_bytes(data_bits) + [int(parity_bits[i:i + 8], 2) for i in range(0, len(parity_bits), 8)]
+        try:
+            corrected_msg, corrected = self._correct(msg)
+        except ValueError as e:
+            return self._result(data_bits, valid=False, error=str(e))
+        out = "".join(format(b, "08b") for b in corrected_msg[:self.data_bytes])
+        if out[self.k:].strip("0"):
+            # A "correction" landed in the zero padding: more errors than the code can fix
+            return self._result(data_bits, valid=False, error="Reed-Solomon miscorrection in padding")
+        return self._result(out[:self.k], corrected=corrected)
+
+    def _correct(self, msg):
+        nsym = self.nsym
+        synd = [0] + [_gf_poly_eval(msg, _gf_pow(2, i)) for i in range(nsym)]
+        if not any(synd):
+            return msg, False
+
+        # Berlekamp-Massey error locator
+        err_loc, old_loc = [1], [1]
+        for i in range(nsym):
+            K = i + 1
+            delta = synd[K]
+            for j in range(1, len(err_loc)):
+                delta ^= _gf_mul(err_loc[-(j + 1)], synd[K - j])
+            old_loc = old_loc + [0]
+            if delta != 0:
+                if len(old_loc) > len(err_loc):
+                    new_loc = _gf_poly_scale(old_loc, delta)
+                    old_loc = _gf_poly_scale(err_loc, _gf_inverse(delta))
+                    err_loc = new_loc
+                err_loc = _gf_poly_add(err_loc, _gf_poly_scale(old_loc, delta))
+        while err_loc and err_loc[0] == 0:
+            del err_loc[0]
+        errs = len(err_loc) - 1
+        if errs * 2 > nsym:
+            raise ValueError("Reed-Solomon: too many errors to correct")
+
+        # Chien search
+        rev_loc = err_loc[::-1]
+        nmess = len(msg)
+        err_pos = [nmess - 1 - i for i in range(nmess) if _gf_poly_eval(rev_loc, _gf_pow(2, i)) == 0]
+        if len(err_pos) != errs:
+            raise ValueError("Reed-Solomon: could not locate errors")
+
+        # Forney magnitudes
+        coef_pos = [nmess - 1 - p for p in err_pos]
+        e_loc = [1]
+        for p in coef_pos:
+            e_loc = _gf_poly_mul(e_loc, _gf_poly_add([1], [_gf_pow(2, p), 0]))
+        product = _gf_poly_mul(synd[::-1], e_loc)
+        err_eval = product[-(len(e_loc) - 1 + 1):][::-1]
+        X = [_gf_pow(2, p) for p in coef_pos]
+        out = list(msg)
+        for i, Xi in enumerate(X):
+            Xi_inv = _gf_inverse(Xi)
+            denom = 1
+            for j, Xj in enumerate(X):
+                if j != i:
+                    denom = _gf_mul(denom, 1 ^ _gf_mul(Xi_inv, Xj))
+            y = _gf_mul(Xi, _gf_poly_eval(err_eval[::-1], Xi_inv))
+            if denom == 0:
+                raise ValueError("Reed-Solomon: could not compute error magnitude")
+            out[err_pos[i]] ^= _gf_div(y, denom)
+
+        if any(_gf_poly_eval(out, _gf_pow(2, i)) for i in range(nsym)):
+            raise ValueError("Reed-Solomon: could not correct message")
+        return out, True
+
+
+register_codec("none", Codec)
+register_codec("parity", ParityCodec)
+register_codec("hamming", HammingCodec)
+register_codec("reed_solomon", ReedSolomonCodec)
+register_codec("rs", ReedSolomonCodec)
+
+
+# =============================================================================
+# Fixed-Layout Helpers
+# =============================================================================
 
 def add_parity_bit(data_bits: str) -> str:
     """
-    Add a parity bit to 8-bit data.
+    Add an even-parity bit to the data.
 
     Args:
-        data_bits (str): 8-bit binary string
+        data_bits (str): Binary string (originally 8 bits; any length works)
 
     Returns:
-        str: 9-bit binary string (original 8 bits + parity bit)
+        str: Data bits + parity bit
 
     Example:
         >>> add_parity_bit("11001100")
@@ -26,14 +573,9 @@ def add_parity_bit(data_bits: str) -> str:
         >>> add_parity_bit("11001101")
         "110011011"  # even parity, odd ones, parity bit 1
     """
-    if len(data_bits) != 8:
-        raise ValueError(f"Parity requires 8 bits, got {len(data_bits)} bits")
-    
-    # Count ones, use even parity
-    ones_count = data_bits.count('1')
-    parity_bit = '1' if ones_count % 2 == 1 else '0'
-    
-    return data_bits + parity_bit
+    if not data_bits:
+        raise ValueError("Parity requires at least 1 bit")
+    return get_codec({"ecc_method": "parity"}, len(data_bits)).encode(data_bits)
 
 
 def check_and_strip_parity_bit(message_bits: str) -> tuple:
@@ -41,11 +583,11 @@ def check_and_strip_parity_bit(message_bits: str) -> tuple:
     Check and strip a parity bit.
 
     Args:
-        message_bits (str): 9-bit binary string (8 bits + parity bit)
+        message_bits (str): Data bits + parity bit
 
     Returns:
         tuple: (data_bits, is_valid)
-            - data_bits (str): original 8-bit data
+            - data_bits (str): original data
             - is_valid (bool): whether parity check passes
 
     Example:
@@ -54,128 +596,72 @@ def check_and_strip_parity_bit(message_bits: str) -> tuple:
         >>> check_and_strip_parity_bit("110011001")  # bad parity bit
         ("11001100", False)
     """
-    if len(message_bits) != 9:
-        raise ValueError(f"Expected 9-bit message (8 data + parity), got {len(message_bits)} bits")
-    
-    data_bits = message_bits[:8]
-    received_parity = message_bits[8]
-    
-    # Recompute parity bit
-    ones_count = data_bits.count('1')
-    expected_parity = '1' if ones_count % 2 == 1 else '0'
-    
-    is_valid = (received_parity == expected_parity)
-    
-    return data_bits, is_valid
+    if len(message_bits) < 2:
+        raise ValueError(f"Expected data + parity bit, got {len(message_bits)} bits")
+    result = get_codec({"ecc_method": "parity"}, len(message_bits) - 1).decode(message_bits)
+    return result['decoded_payload'], result['valid']
 
 
 def add_hamming_code(data_bits: str) -> str:
     """
-    Add standard Hamming code for 16-bit data.
-    Uses extended Hamming code to correct 1-bit errors and detect 2-bit errors.
+    Add standard Hamming code to the data.
+    Corrects 1-bit errors.
 
     Args:
-        data_bits (str): 16-bit binary string
+        data_bits (str): Binary string (originally 16 bits; any length works)
 
     Returns:
         str: Encoded bit string (with parity bits)
 
     Note:
-        Uses standard Hamming(21,16) code:
+        For 16 data bits this is Hamming(21,16):
         - 16 data bits
         - 5 parity bits at positions 1, 2, 4, 8, 16
         - 21 bits total
     """
-    if len(data_bits) != 16:
-        raise ValueError(f"Hamming requires 16 bits, got {len(data_bits)} bits")
-    
-    # Convert data bits to list
-    data = [int(b) for b in data_bits]
-    
-    # Create encoding array (21 bits: index 0 unused, 1-21 valid)
-    # Parity bits at positions 1,2,4,8,16
-    encoded = [0] * 22  # index 0 unused, 1-21 valid
-    
-    # Data positions (skip powers of two)
-    data_positions = [i for i in range(1, 22) if i & (i-1) != 0]  # non-powers of two
-    
-    # Fill data bits
-    for i, pos in enumerate(data_positions[:16]):
-        encoded[pos] = data[i]
-    
-    # Compute parity bits
-    parity_positions = [1, 2, 4, 8, 16]
-    
-    for p in parity_positions:
-        # For parity position p, check all positions i where i & p != 0
-        parity = 0
-        for i in range(1, 22):
-            if i & p and i != p:  # check whether i is covered by parity p
-                parity ^= encoded[i]
-        encoded[p] = parity
-    
-    # Convert to string (skip index 0)
-    return ''.join(str(encoded[i]) for i in range(1, 22))
+    if not data_bits:
+        raise ValueError("Hamming requires at least 1 bit")
+    return get_codec({"ecc_method": "hamming"}, len(data_bits)).encode(data_bits)
 
 
 def decode_and_correct_hamming(message_bits: str) -> str:
     """
     Decode and correct standard Hamming code.
-    Corrects 1-bit errors and detects 2-bit errors.
+    Corrects 1-bit errors.
 
     Args:
-        message_bits (str): 21-bit encoded string
+        message_bits (str): Encoded string (21 bits for 16-bit data)
 
     Returns:
-        str: Corrected 16-bit original data
+        str: Corrected original data
 
     Note:
         Uses standard Hamming correction.
     """
-    if len(message_bits) != 21:
-        raise ValueError(f"Expected 21-bit message, got {len(message_bits)} bits")
-    
-    # Convert to array (index 0 unused, 1-21 valid)
-    received = [0] + [int(b) for b in message_bits]
-    
-    # Compute syndrome
-    syndrome = 0
-    parity_positions = [1, 2, 4, 8, 16]
-    
-    for p in parity_positions:
-        parity = 0
-        for i in range(1, 22):
-            if i & p:  # check whether i is covered by parity p
-                parity ^= received[i]
-        if parity != 0:
-            syndrome += p
-    
-    # If syndrome != 0, there is an error
-    if syndrome != 0:
-        if 1 <= syndrome <= 21:
-            print(f"Hamming detected error at position {syndrome}, corrected")
-            # Correct error
-            received[syndrome] ^= 1
-        else:
-            print("Hamming detected multi-bit error (cannot correct)")
-    
-    # Extract data bits (non-power-of-two positions)
-    data_positions = [i for i in range(1, 22) if i & (i-1) != 0]
-    data_bits = ''.join(str(received[pos]) for pos in data_positions[:16])
-    
-    return data_bits
+    k = HammingCodec.data_length(len(message_bits), {})
+    codec = get_codec({"ecc_method": "hamming"}, k) if k > 0 else None
+    if codec is None or codec.n != len(message_bits):
+        raise ValueError(f"{len(message_bits)} bits is not a Hamming codeword length")
+    data, fix, correctable = codec.decode_int(int(message_bits, 2))
+    if not correctable:
+        print("Hamming detected multi-bit error (cannot correct)")
+    elif fix >= 0:
+        print(f"Hamming detected error at position {fix + 1}, corrected")
+    return format(data, f"0{codec.k}b")
 
 
 def encode_payload(payload_bits: str, config: dict) -> str:
     """
     Encode the payload into a full message based on config.
-    Factory function dispatches to encoder based on config.
+    Factory function dispatches to the registered codec for ecc_method.
 
     Args:
         payload_bits (str): Raw payload bits
         config (dict): Watermark config, includes:
-            - payload_bit_length: Payload length (8 or 16)
-            - ecc_method: ECC method ("parity"/"hamming"/"none")
+            - payload_bit_length: Payload length
+            - ecc_method: ECC method ("parity"/"hamming"/"reed_solomon"/"none")
+            - ecc_block_bits: Optional data bits per independently coded block
+            - rs_parity_symbols: Parity bytes for reed_solomon (default 4)
             - embedding_strategy: Embedding strategy ("cyclic"/"once")
 
     Returns:
@@ -190,30 +676,15 @@ def encode_payload(payload_bits: str, config: dict) -> str:
         "110011000"
     """
     bit_length = config.get("payload_bit_length", 8)
-    ecc_method = config.get("ecc_method", "none")
-    
+
     # 1. Validate input length against config
     if len(payload_bits) != bit_length:
         raise ValueError(
             f"Data length {len(payload_bits)} does not match payload_bit_length {bit_length}"
         )
-    
-    # 2. Select ECC encoder based on ecc_method
-    if ecc_method == "parity":
-        if bit_length != 8:
-            raise ValueError("Parity currently supports only 8-bit data")
-        return add_parity_bit(payload_bits)
-        
-    elif ecc_method == "hamming":
-        if bit_length != 16:
-            raise ValueError("Hamming currently supports only 16-bit data")
-        return add_hamming_code(payload_bits)
-        
-    elif ecc_method == "none":
-        return payload_bits  # no ECC
-        
-    else:
-        raise ValueError(f"Unknown ECC method: {ecc_method}")
+
+    # 2. Encode with the codec registered for ecc_method
+    return get_codec(config).encode(payload_bits)
 
 
 def decode_message(message_bits: str, config: dict) -> dict:
@@ -243,43 +714,7 @@ def decode_message(message_bits: str, config: dict) -> dict:
         }
     """
     ecc_method = config.get("ecc_method", "none")
-    
-    if ecc_method == "parity":
-        data_bits, is_valid = check_and_strip_parity_bit(message_bits)
-        return {
-            'decoded_payload': data_bits,
-            'valid': is_valid,
-            'corrected': False,  # parity detects only, no correction
-            'ecc_method': 'parity',
-            'error': None if is_valid else 'Parity check failed'
-        }
-        
-    elif ecc_method == "hamming":
-        # Hamming decode corrects automatically; detect whether correction happened
-        corrected_data = decode_and_correct_hamming(message_bits)
-        
-        # Re-encode; difference implies correction
-        re_encoded = add_hamming_code(corrected_data)
-        was_corrected = (re_encoded != message_bits)
-        
-        return {
-            'decoded_payload': corrected_data,
-            'valid': True,  # Hamming corrects 1-bit errors
-            'corrected': was_corrected,
-            'ecc_method': 'hamming',
-            'error': None
-        }
-        
-    elif ecc_method == "none":
-        return {
-            'decoded_payload': message_bits,
-            'valid': True,
-            'corrected': False,
-            'ecc_method': 'none',
-            'error': None
-        }
-        
-    else:
+    if ecc_method not in _CODEC_TYPES:
         return {
             'decoded_payload': '',
             'valid': False,
@@ -287,6 +722,27 @@ def decode_message(message_bits: str, config: dict) -> dict:
             'ecc_method': ecc_method,
             'error': f"Unknown ECC method: {ecc_method}"
         }
+    return _codec_for_message(config, len(message_bits)).decode(message_bits)
+
+
+def decode_messages(messages, config: dict) -> list:
+    """
+    Decode many equal-length messages in one batch (Codec.decode_many).
+
+    Args:
+        messages (list[str]): Encoded messages, all the same length
+        config (dict): Watermark config dict
+
+    Returns:
+        list[dict]: One decode_message result per message
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    ecc_method = config.get("ecc_method", "none")
+    if ecc_method not in _CODEC_TYPES:
+        return [decode_message(m, config) for m in messages]
+    return _codec_for_message(config, len(messages[0])).decode_many(messages)
 
 
 def prepare_cyclic_embedding(payload_bits: str, config: dict, total_rounds: int) -> list:
@@ -307,7 +763,7 @@ def prepare_cyclic_embedding(payload_bits: str, config: dict, total_rounds: int)
     """
     message_to_embed = encode_payload(payload_bits, config)
     embedding_strategy = config.get("embedding_strategy", "once")
-    
+
     if embedding_strategy == "cyclic":
         # Cyclic embedding: same message each round
         return [message_to_embed] * total_rounds
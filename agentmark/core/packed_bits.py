@@ -0,0 +1,97 @@
+"""
+Bit-packed payload streams.
+
+PackedBits stores a '0'/'1' payload as bytes, 8 bits per byte, most
+significant bit first. It reads like the string it replaces:
+- len(bits) is the number of bits;
+- bits[i] returns '0' or '1';
+- bits[i:j] returns a '0'/'1' string.
+The samplers can therefore read a few bits at an index without copying
+the rest of the stream. An 8k-bit RLNC stream takes about 1 KB instead of
+an 8 KB string.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Union
+
+
+class PackedBits:
+    """Immutable bit string packed into bytes (MSB first)."""
+
+    __slots__ = ("_data", "_length", "_digest")
+
+    def __init__(self, data: bytes, length: int) -> None:
+        if length < 0 or length > len(data) * 8:
+            raise ValueError(f"length {length} does not fit in {len(data)} bytes")
+        self._data = bytes(data[: (length + 7) // 8])
+        self._length = int(length)
+        self._digest = None
+
+    @classmethod
+    def from_bits(cls, bits: str) -> "PackedBits":
+        """Pack a '0'/'1' string (any other character raises ValueError)."""
+        if isinstance(bits, PackedBits):
+            return bits
+        n = len(bits)
+        if n == 0:
+            return cls(b"", 0)
+        if bits.strip("01"):
+            raise ValueError("bits must contain only '0' and '1'")
+        pad = -n % 8
+        return cls(int(bits + "0" * pad, 2).to_bytes((n + pad) // 8, "big"), n)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def bit(self, index: int) -> int:
+        """Bit at `index` as 0/1."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("bit index out of range")
+        return (self._data[index >> 3] >> (7 - (index & 7))) & 1
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                return "".join("1" if self.bit(i) else "0" for i in range(start, stop, step))
+            return self._span(start, stop)
+        return "1" if self.bit(key) else "0"
+
+    def _span(self, start: int, stop: int) -> str:
+        if stop <= start:
+            return ""
+        first, last = start >> 3, (stop - 1) >> 3
+        chunk = int.from_bytes(self._data[first : last + 1], "big")
+        chunk >>= (last + 1) * 8 - stop
+        width = stop - start
+        return format(chunk & ((1 << width) - 1), f"0{width}b")
+
+    def to_bytes(self) -> bytes:
+        """Packed bytes; the last byte is zero-padded. Pair with len() to round-trip."""
+        return self._data
+
+    def digest(self) -> bytes:
+        """8-byte fingerprint of length and content (snapshots use it to check the payload)."""
+        if self._digest is None:
+            h = hashlib.blake2b(self._length.to_bytes(8, "little") + self._data, digest_size=8)
+            self._digest = h.digest()
+        return self._digest
+
+    def __str__(self) -> str:
+        return self._span(0, self._length)
+
+    def __repr__(self) -> str:
+        preview = self._span(0, min(self._length, 32))
+        return f"PackedBits({preview}{'...' if self._length > 32 else ''}, len={self._length})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PackedBits):
+            return NotImplemented
+        return self._length == other._length and self._data == other._data
+
+    def __hash__(self) -> int:
+        return hash((self._length, self._data))
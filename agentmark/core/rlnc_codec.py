@@ -1,44 +1,300 @@
 
+import hashlib
+import json
+import os
 import random
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
 import numpy as np
 
+# Coefficient generators:
+# - "mt":   Mersenne Twister seeded with f"{stream_key}_{index}" (original rows; old runs decode).
+# - "hash": BLAKE2b in counter mode over (index, block), 512 coefficient bits per call.
+RLNC_COEFF_MODES = ("mt", "hash")
+DEFAULT_RLNC_COEFF_MODE = "mt"
+
+# Rows held by the shared per-(n, mode) coefficient cache; 0 disables it.
+DEFAULT_ROW_CACHE_SIZE = 16384
+
+_WORD_BITS = 64
+_PARITY_SHIFTS = tuple(np.uint64(s) for s in (32, 16, 8, 4, 2, 1))
+
+
+def _n_words(n):
+    return (n + _WORD_BITS - 1) // _WORD_BITS
+
+
+def pack_gf2_rows(bits):
+    """
+    Pack a (rows x n) 0/1 matrix into (rows x ceil(n/64)) uint64 words.
+    Coefficient j lives in word j // 64, bit j % 64 (LSB first).
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    if bits.ndim == 1:
+        bits = bits.reshape(1, -1)
+    rows, n = bits.shape
+    padded = np.zeros((rows, _n_words(n) * _WORD_BITS), dtype=np.uint8)
+    padded[:, :n] = bits
+    return np.packbits(padded, axis=1, bitorder="little").view(np.dtype("<u8"))
+
+
+def unpack_gf2_rows(words, n):
+    """Inverse of pack_gf2_rows: (rows x words) uint64 -> (rows x n) uint8."""
+    words = np.ascontiguousarray(words, dtype=np.dtype("<u8"))
+    if words.ndim == 1:
+        words = words.reshape(1, -1)
+    return np.unpackbits(words.view(np.uint8), axis=1, bitorder="little")[:, :n]
+
+
+def gf2_parity(words):
+    """Parity of each packed row (XOR of all its bits), as uint8."""
+    words = np.asarray(words, dtype=np.uint64)
+    x = np.bitwise_xor.reduce(words, axis=-1) if words.shape[-1] else np.zeros(words.shape[:-1], dtype=np.uint64)
+    for shift in _PARITY_SHIFTS:
+        x = x ^ (x >> shift)
+    return (x & np.uint64(1)).astype(np.uint8)
+
+
+def solve_gf2_packed(rows, rhs, n):
+    """
+    Gauss-Jordan elimination over GF(2) on packed rows.
+
+    Pivot choice and row operations match DeterministicRLNC._solve_gf2 on the
+    unpacked matrix, so results are identical (including for inconsistent
+    systems, where only the pivot rows are read back).
+
+    Args:
+        rows (np.ndarray): (m x ceil(n/64)) uint64 coefficient rows.
+        rhs (array-like): m received bits.
+        n (int): Number of unknowns (payload length).
+
+    Returns:
+        str: Solution bits if the system has full column rank, None otherwise.
+    """
+    A = np.array(rows, dtype=np.uint64, copy=True)
+    b = np.array([int(v) for v in rhs], dtype=np.uint8)
+    m = A.shape[0]
+
+    pivot_row = 0
+    pivot_cols = []
+    for col in range(n):
+        if pivot_row >= m:
+            break
+        word = col >> 6
+        column = (A[:, word] & np.uint64(1 << (col & 63))) != 0
+        candidates = np.flatnonzero(column[pivot_row:])
+        if not len(candidates):
+            continue
+
+        curr = pivot_row + int(candidates[0])
+        if curr != pivot_row:
+            A[[pivot_row, curr]] = A[[curr, pivot_row]]
+            b[[pivot_row, curr]] = b[[curr, pivot_row]]
+            column[curr] = column[pivot_row]
+        column[pivot_row] = False
+
+        A[column] ^= A[pivot_row]
+        b[column] ^= b[pivot_row]
+
+        pivot_cols.append(col)
+        pivot_row += 1
+
+    if len(pivot_cols) != n:
+        return None
+    x = np.zeros(n, dtype=np.uint8)
+    x[pivot_cols] = b[:n]
+    return (x + ord("0")).tobytes().decode("ascii")
+
+
+def gf2_rank_batch(rows, n, rhs=None):
+    """
+    Forward elimination over GF(2) on a stack of packed systems at once.
+
+    Every system takes one column step per iteration (pivot search, row swap
+    and elimination are vectorized across the batch axis), so thousands of
+    keys or trials cost n numpy passes instead of thousands of solver calls.
+
+    Args:
+        rows (np.ndarray): (batch x m x ceil(n/64)) uint64 coefficient rows.
+        n (int): Number of unknowns (payload length).
+        rhs (array-like, optional): (batch x m) received bits.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Rank of each coefficient matrix, and
+        whether each system A x = rhs is consistent (rank(A|y) == rank(A)).
+    """
+    A = np.array(rows, dtype=np.uint64, copy=True)
+    batch, m = A.shape[:2]
+    b = np.zeros((batch, m), dtype=np.uint8) if rhs is None else (np.array(rhs, dtype=np.uint8) & 1)
+    rank = np.zeros(batch, dtype=np.intp)
+    positions = np.arange(m)
+    systems = np.arange(batch)
+
+    for col in range(n):
+        column = (A[:, :, col >> 6] & np.uint64(1 << (col & 63))) != 0
+        candidates = column & (positions >= rank[:, None])
+        has = candidates.any(axis=1)
+        if not has.any():
+            continue
+        # Systems without a pivot in this column just skip it; index all of them when possible
+        sel = slice(None) if has.all() else np.flatnonzero(has)
+        idx = systems[sel]
+        top = rank[sel]
+        piv = candidates[sel].argmax(axis=1)
+
+        pivot_rows = A[idx, piv]
+        pivot_bits = b[idx, piv]
+        A[idx, piv] = A[idx, top]
+        b[idx, piv] = b[idx, top]
+        column[idx, piv] = column[idx, top]
+        A[idx, top] = pivot_rows
+        b[idx, top] = pivot_bits
+
+        # Clear the column below each pivot (rows above the lowest pivot never change)
+        lo = int(top.min()) + 1
+        below = column[sel, lo:] & (positions[lo:] > top[:, None])
+        A[sel, lo:] ^= below[:, :, None] * pivot_rows[:, None, :]
+        b[sel, lo:] ^= below * pivot_bits[:, None]
+        rank[sel] += 1
+        if (rank == m).all():
+            break
+
+    # Rows past the rank are all-zero on the left; a 1 on the right is 0 = 1
+    consistent = ~(b.astype(bool) & (positions >= rank[:, None])).any(axis=1)
+    return rank, consistent
+
+
+def _mt_coeff_bits(stream_key, index, n):
+    # Same bits as [random.Random(f"{key}_{index}").randint(0, 1) for _ in range(n)].
+    # randint(0, 1) takes the top 2 bits of one 32-bit MT output and rejects values >= 2;
+    # getrandbits(32 * k) returns k consecutive outputs, so the rejection runs vectorized.
+    rd = random.Random(f"{stream_key}_{index}")
+    chunks = []
+    have = 0
+    while have < n:
+        need = n - have
+        draws = 2 * need + 32
+        outputs = np.frombuffer(rd.getrandbits(32 * draws).to_bytes(4 * draws, "little"), dtype="<u4")
+        top = outputs >> 30
+        accepted = top[top < 2][:need]
+        chunks.append(accepted)
+        have += len(accepted)
+    if not chunks:
+        return np.zeros(0, dtype=np.uint8)
+    return np.concatenate(chunks).astype(np.uint8)
+
+
+def _mt_coeff_rows(stream_key, indices, n):
+    # _mt_coeff_bits for many indices: one MT draw per index, then the randint rejection
+    # runs on the whole (rows x draws) block. Rows that run short of accepted draws
+    # (probability ~2^-32) are regenerated one by one.
+    if n == 0:
+        return np.zeros((len(indices), 0), dtype=np.uint64)
+    draws = 2 * n + 32
+    raw = b"".join(
+        random.Random(f"{stream_key}_{index}").getrandbits(32 * draws).to_bytes(4 * draws, "little")
+        for index in indices
+    )
+    top = (np.frombuffer(raw, dtype="<u4").reshape(len(indices), draws) >> 30).astype(np.uint8)
+    accepted = top < 2
+    taken = np.cumsum(accepted, axis=1)
+    complete = taken[:, -1] >= n
+    bits = np.zeros((len(indices), n), dtype=np.uint8)
+    keep = accepted & (taken <= n) & complete[:, None]
+    bits[complete] = top[keep].reshape(-1, n)
+    for row in np.flatnonzero(~complete):
+        bits[row] = _mt_coeff_bits(stream_key, indices[row], n)
+    return pack_gf2_rows(bits)
+
+
 class DeterministicRLNC:
     """
     Deterministic Random Linear Network Coding over GF(2).
     Generates an infinite stream of coded bits from a fixed payload key.
-    
+
     The i-th coded bit is a linear combination of the payload bits,
     where the coefficients are generated deterministically based on the
     stream ID (key) and the bit index (i).
+
+    Coefficient rows and the payload are kept as packed uint64 words; see
+    RLNC_COEFF_MODES for the available coefficient generators.
     """
-    def __init__(self, payload_bits_str, stream_key=42):
+    def __init__(self, payload_bits_str, stream_key=42, coeff_mode=DEFAULT_RLNC_COEFF_MODE, row_cache=None):
         """
         Args:
             payload_bits_str (str): The payload to encode, e.g., "10110011".
             stream_key (int/str): A seed/key to randomize the coefficients.
+            coeff_mode (str): "mt" (default, original rows) or "hash" (counter-mode BLAKE2b).
+                Encoder and decoder must use the same mode.
+            row_cache (CoefficientRowCache/bool, optional): Cache for generated rows. None uses
+                the process-wide cache for (n, coeff_mode); False disables caching.
         """
+        if coeff_mode not in RLNC_COEFF_MODES:
+            raise ValueError(f"Unknown coeff_mode '{coeff_mode}', expected one of {RLNC_COEFF_MODES}")
         self.payload = [int(b) for b in payload_bits_str]
         self.n = len(self.payload)
         self.stream_key = stream_key
-        # Cache for generated bits if needed, but simple generation is fast enough.
+        self.coeff_mode = coeff_mode
+        self.n_words = _n_words(self.n)
+        self.payload_words = pack_gf2_rows(self.payload)[0]
+        if coeff_mode == "hash":
+            key = hashlib.sha256(str(stream_key).encode("utf-8")).digest()
+            self._hash_state = hashlib.blake2b(key=key, digest_size=64)
+        if row_cache is None:
+            row_cache = shared_row_cache(self.n, coeff_mode)
+        self.row_cache = row_cache or None
 
     def get_bit(self, index):
         """
         Get the i-th coded bit.
         c_i = sum(coeff_j * p_j) mod 2, where coeff_j comes from PRG(stream_key, index).
         """
-        coeffs = self._generate_coeffs(index)
-        
-        coded_val = 0
-        for b_val, c_val in zip(self.payload, coeffs):
-            coded_val ^= (b_val & c_val)
-        return str(coded_val)
+        return str(int(gf2_parity(self.coeff_rows([index])[0] & self.payload_words)))
 
     def get_stream(self, start_index, length):
         """
         Get a sequence of coded bits.
         """
-        return "".join([self.get_bit(i) for i in range(start_index, start_index + length)])
+        rows = self.coeff_rows(range(start_index, start_index + length))
+        return (gf2_parity(rows & self.payload_words) + ord("0")).tobytes().decode("ascii")
+
+    def coeff_rows(self, indices):
+        """
+        Packed coefficient rows for the given coded-bit indices.
+
+        Returns:
+            np.ndarray: (len(indices) x ceil(n/64)) uint64.
+        """
+        indices = [int(i) for i in indices]
+        if self.row_cache is not None:
+            return self.row_cache.rows(self, indices)
+        return self._build_coeff_rows(indices)
+
+    def _build_coeff_rows(self, indices):
+        # Uncached generation; indices is a list of ints.
+        if self.coeff_mode == "hash":
+            return self._hash_coeff_rows(indices)
+        if not indices:
+            return np.zeros((0, self.n_words), dtype=np.uint64)
+        return _mt_coeff_rows(self.stream_key, indices, self.n)
+
+    def _hash_coeff_rows(self, indices):
+        # One 512-bit block per (index, block counter); rows wider than 512 bits take several blocks.
+        blocks = max(1, (self.n_words + 7) // 8)
+        digests = bytearray()
+        for index in indices:
+            prefix = index.to_bytes(8, "little", signed=True)
+            for block in range(blocks):
+                mac = self._hash_state.copy()
+                mac.update(prefix + block.to_bytes(4, "little"))
+                digests += mac.digest()
+        words = np.frombuffer(bytes(digests), dtype="<u8").reshape(len(indices), blocks * 8)
+        rows = words[:, :self.n_words].astype(np.uint64)
+        if self.n % _WORD_BITS and self.n_words:
+            rows[:, -1] &= np.uint64((1 << (self.n % _WORD_BITS)) - 1)
+        return rows
 
     def _generate_coeffs(self, index):
         """
@@ -47,84 +303,321 @@ class DeterministicRLNC:
         # Use a hash of (stream_key, index) to seed, or simple Random with fixed seed.
         # Python's random is Mersenne Twister, not safe for crypto but fine for coding distribution.
         # To ensure absolute seeking capability without rewinding, we need a hash-based PRG or re-seeding.
-        # Re-seeding is fast enough for small n.
-        
-        # Combine key and index into a unique seed
-        # efficient string seed
-        seed_val = f"{self.stream_key}_{index}"
-        rd = random.Random(seed_val)
-        
         # In GF(2), coefficients are 0 or 1.
         # We need a non-zero row ideally, but random is fine for RLNC (prob of 0 row is 1/2^n).
         # We can force non-zero if we want, but standard RLNC doesn't strictly require it per packet.
-        return [rd.randint(0, 1) for _ in range(self.n)]
+        return unpack_gf2_rows(self.coeff_rows([index]), self.n)[0].tolist()
 
     def decode(self, received_indices, received_bits):
         """
         Attempt to decode the payload from a set of received coded bits.
-        
+
         Args:
             received_indices (list[int]): Indices of the received coded bits.
             received_bits (list[int/str]): Values of the received coded bits.
-            
+
         Returns:
             str: Decoded payload bits if successful, None otherwise.
         """
         m = len(received_indices)
         if m < self.n:
             return None
-        
-        # Build the system Matrix * Payload = Received
-        matrix = []
-        vector = []
-        
-        for idx, val in zip(received_indices, received_bits):
-            coeffs = self._generate_coeffs(idx)
-            matrix.append(coeffs)
-            vector.append(int(val))
-            
-        matrix = np.array(matrix, dtype=int)
-        vector = np.array(vector, dtype=int)
-        
-        # Solve
-        # We can use the Gaussian elimination from previous analysis
-        # Or reuse self-contained solver here?
-        # Let's include the solver here for completeness
-        
-        return self._solve_gf2(matrix, vector)
+
+        # Build the system Matrix * Payload = Received (packed rows) and solve
+        return solve_gf2_packed(self.coeff_rows(received_indices), received_bits, self.n)
 
     def _solve_gf2(self, matrix, vector):
-        rows, cols = matrix.shape
-        augmented = np.hstack((matrix, vector.reshape(-1, 1)))
-        
-        pivot_row = 0
-        pivot_cols = []
-        
-        for col in range(cols):
-            if pivot_row >= rows:
-                break
-                
-            candidates = [r for r in range(pivot_row, rows) if augmented[r, col] == 1]
-            if not candidates:
-                continue
-            
-            curr = candidates[0]
-            augmented[[pivot_row, curr]] = augmented[[curr, pivot_row]]
-            
-            for r in range(rows):
-                if r != pivot_row and augmented[r, col] == 1:
-                    augmented[r] ^= augmented[pivot_row]
-            
-            pivot_cols.append(col)
-            pivot_row += 1
-            
-        if len(pivot_cols) == cols:
-            x = np.zeros(cols, dtype=int)
-            # Back sub is trivial because we diagonalized (mostly)
-            # Actually full Gauss-Jordan above makes pivots the only non-zeros in columns
-            for i, p_col in enumerate(pivot_cols):
-                # The pivot row 'i' corresponds to variable 'p_col'
-                x[p_col] = augmented[i, -1]
-            return "".join(map(str, x))
+        return solve_gf2_packed(pack_gf2_rows(matrix), np.asarray(vector).reshape(-1), np.asarray(matrix).shape[1])
+
+
+class CoefficientRowCache:
+    """
+    Bounded LRU cache of packed coefficient rows keyed by (stream_key, index).
+
+    Rows live in one preallocated (capacity x ceil(n/64)) uint64 array; evicted
+    slots are reused. Index ranges precomputed with precompute_coeff_table can
+    be attached as read-only memory-mapped tables, which several processes
+    share through the page cache.
+
+    A cache is bound to one (n, coeff_mode); it can serve many stream keys.
+    """
+    def __init__(self, n, coeff_mode=DEFAULT_RLNC_COEFF_MODE, capacity=DEFAULT_ROW_CACHE_SIZE):
+        self.n = n
+        self.coeff_mode = coeff_mode
+        self.capacity = max(1, int(capacity))
+        self.n_words = _n_words(n)
+        self.hits = 0
+        self.misses = 0
+        self.table_hits = 0
+        self._rows = np.zeros((self.capacity, self.n_words), dtype=np.uint64)
+        self._slots = OrderedDict()  # (stream_key, index) -> slot in self._rows
+        self._tables = {}  # stream_key -> [(start, stop, memmap), ...]
+        self._lock = threading.Lock()
+
+    def rows(self, codec, indices):
+        """
+        Packed rows for `indices` of `codec` (which must match this cache's n/mode).
+
+        Returns:
+            np.ndarray: (len(indices) x ceil(n/64)) uint64, owned by the caller.
+        """
+        if codec.n != self.n or codec.coeff_mode != self.coeff_mode:
+            raise ValueError(f"Codec n={codec.n} mode={codec.coeff_mode} does not match cache n={self.n} mode={self.coeff_mode}")
+        key = codec.stream_key
+        out = np.empty((len(indices), self.n_words), dtype=np.uint64)
+        pending = np.ones(len(indices), dtype=bool)
+
+        table_hits = 0
+        with self._lock:
+            tables = list(self._tables.get(key, ()))  # attach_table may run concurrently
+        if tables and indices:
+            idx = np.asarray(indices, dtype=np.int64)
+            for start, stop, table in tables:
+                in_table = pending & (idx >= start) & (idx < stop)
+                if in_table.any():
+                    out[in_table] = table[idx[in_table] - start]
+                    pending &= ~in_table
+                    table_hits += int(in_table.sum())
+
+        missing = {}  # index -> positions in out
+        with self._lock:
+            self.table_hits += table_hits
+            for pos in np.flatnonzero(pending):
+                index = indices[pos]
+                slot = self._slots.get((key, index))
+                if slot is None:
+                    missing.setdefault(index, []).append(pos)
+                    continue
+                self._slots.move_to_end((key, index))
+                out[pos] = self._rows[slot]
+                self.hits += 1
+            self.misses += sum(len(positions) for positions in missing.values())
+
+        if missing:
+            generated = codec._build_coeff_rows(list(missing))
+            with self._lock:
+                for (index, positions), row in zip(missing.items(), generated):
+                    out[positions] = row
+                    self._store(key, index, row)
+        return out
+
+    def _store(self, key, index, row):
+        if (key, index) in self._slots:
+            return
+        if len(self._slots) < self.capacity:
+            slot = len(self._slots)
         else:
+            _, slot = self._slots.popitem(last=False)
+        self._rows[slot] = row
+        self._slots[(key, index)] = slot
+
+    def attach_table(self, path):
+        """
+        Serve an index range from a table written by precompute_coeff_table.
+
+        Returns:
+            dict: The table's metadata.
+        """
+        path = Path(path)
+        meta = json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))
+        if meta["n"] != self.n or meta["coeff_mode"] != self.coeff_mode:
+            raise ValueError(
+                f"Table {path} is for n={meta['n']} mode={meta['coeff_mode']}, "
+                f"cache is n={self.n} mode={self.coeff_mode}"
+            )
+        table = np.load(path, mmap_mode="r")
+        with self._lock:
+            self._tables.setdefault(meta["stream_key"], []).append((meta["start"], meta["stop"], table))
+        return meta
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self.hits = self.misses = self.table_hits = 0
+
+    def stats(self):
+        with self._lock:
+            hits, misses, table_hits, size = self.hits, self.misses, self.table_hits, len(self._slots)
+        lookups = hits + misses + table_hits
+        return {
+            "n": self.n,
+            "coeff_mode": self.coeff_mode,
+            "capacity": self.capacity,
+            "size": size,
+            "hits": hits,
+            "misses": misses,
+            "table_hits": table_hits,
+            "hit_rate": (hits + table_hits) / lookups if lookups else 0.0,
+        }
+
+
+_SHARED_ROW_CACHES = {}
+_SHARED_ROW_CACHES_LOCK = threading.Lock()
+
+
+def shared_row_cache(n, coeff_mode=DEFAULT_RLNC_COEFF_MODE):
+    """
+    Process-wide CoefficientRowCache for (n, coeff_mode), or None when
+    AGENTMARK_RLNC_ROW_CACHE_SIZE is 0. Default capacity: DEFAULT_ROW_CACHE_SIZE rows.
+    """
+    try:
+        capacity = int(os.getenv("AGENTMARK_RLNC_ROW_CACHE_SIZE", DEFAULT_ROW_CACHE_SIZE))
+    except ValueError:
+        capacity = DEFAULT_ROW_CACHE_SIZE
+    if capacity <= 0:
+        return None
+    with _SHARED_ROW_CACHES_LOCK:
+        cache = _SHARED_ROW_CACHES.get((n, coeff_mode))
+        if cache is None:
+            cache = CoefficientRowCache(n, coeff_mode, capacity)
+            _SHARED_ROW_CACHES[(n, coeff_mode)] = cache
+        return cache
+
+
+def precompute_coeff_table(codec, start, stop, path, chunk_rows=4096):
+    """
+    Write rows [start, stop) of `codec` to a .npy file (plus a .json sidecar)
+    that CoefficientRowCache.attach_table can memory-map.
+
+    Returns:
+        Path: The .npy path.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint64, shape=(stop - start, codec.n_words))
+    for lo in range(start, stop, chunk_rows):
+        hi = min(stop, lo + chunk_rows)
+        table[lo - start:hi - start] = codec._build_coeff_rows(list(range(lo, hi)))
+    table.flush()
+    del table
+    meta = {
+        "stream_key": codec.stream_key,
+        "coeff_mode": codec.coeff_mode,
+        "n": codec.n,
+        "start": start,
+        "stop": stop,
+    }
+    path.with_suffix(".json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return path
+
+
+def coeff_rows_for_keys(stream_keys, indices, n, coeff_mode=DEFAULT_RLNC_COEFF_MODE):
+    """
+    Coefficient rows of the same packet indices under many stream keys.
+
+    Rows bypass the shared row cache (a key sweep would only evict useful rows).
+
+    Returns:
+        np.ndarray: (len(stream_keys) x len(indices) x ceil(n/64)) uint64, ready for gf2_rank_batch.
+    """
+    indices = [int(i) for i in indices]
+    out = np.zeros((len(stream_keys), len(indices), _n_words(n)), dtype=np.uint64)
+    for slot, key in enumerate(stream_keys):
+        if indices:
+            codec = DeterministicRLNC("0" * n, stream_key=key, coeff_mode=coeff_mode, row_cache=False)
+            out[slot] = codec._build_coeff_rows(indices)
+    return out
+
+
+class StreamingRLNCDecoder:
+    """
+    Online GF(2) decoder that updates rank as packets arrive.
+
+    Keeps an echelon basis keyed by pivot (lowest set coefficient). Each packet is
+    reduced against at most `rank` basis rows, so a packet costs O(n) row XORs
+    instead of a fresh elimination over everything received so far.
+
+    Typical usage:
+        decoder = StreamingRLNCDecoder(DeterministicRLNC("0" * n, stream_key=key))
+        for index, bit in packets:
+            decoder.add_packet(index, bit)
+            if decoder.is_complete:
+                payload = decoder.payload()
+    """
+    def __init__(self, codec):
+        """
+        Args:
+            codec (DeterministicRLNC): Supplies n and the coefficient rows (its payload is unused).
+        """
+        self.codec = codec
+        self.n = codec.n
+        self.packets = 0
+        self.inconsistent_packets = 0
+        self.recovered_at = None  # Packet count at which rank reached n
+        self._basis = {}  # pivot column -> (row bits as int, rhs bit)
+        self._payload = None
+
+    @property
+    def rank(self):
+        return len(self._basis)
+
+    @property
+    def consistent(self):
+        """False once a packet contradicted the basis (rank(A|y) > rank(A))."""
+        return self.inconsistent_packets == 0
+
+    @property
+    def is_complete(self):
+        return len(self._basis) == self.n
+
+    def add_packet(self, index, bit):
+        """
+        Add coded bit `index`.
+
+        Returns:
+            bool: True if the packet increased the rank.
+        """
+        return self.add_row(self.codec.coeff_rows([index])[0], bit)
+
+    def add_packets(self, indices, bits):
+        """Add several packets (rows generated in one block). Returns the rank gained."""
+        indices = list(indices)
+        if not indices:
+            return 0
+        rows = self.codec.coeff_rows(indices)
+        return sum(self.add_row(row, bit) for row, bit in zip(rows, bits))
+
+    def add_row(self, row, bit):
+        """Add a packed coefficient row (uint64 words) with its coded bit."""
+        self.packets += 1
+        value = int.from_bytes(np.ascontiguousarray(row, dtype=np.dtype("<u8")).tobytes(), "little")
+        bit = int(bit) & 1
+        while value:
+            pivot = (value & -value).bit_length() - 1
+            basis = self._basis.get(pivot)
+            if basis is None:
+                self._basis[pivot] = (value, bit)
+                if self.recovered_at is None and len(self._basis) == self.n:
+                    self.recovered_at = self.packets
+                return True
+            value ^= basis[0]
+            bit ^= basis[1]
+        if bit:
+            self.inconsistent_packets += 1
+        return False
+
+    def payload(self):
+        """
+        Returns:
+            str: Payload bits once rank reaches n, None before that.
+        """
+        if not self.is_complete:
             return None
+        if self._payload is None:
+            # Back substitution from the highest pivot; bits above a pivot are already solved.
+            x = 0
+            for pivot in sorted(self._basis, reverse=True):
+                value, bit = self._basis[pivot]
+                x |= (bit ^ (bin(value & x).count("1") & 1)) << pivot
+            self._payload = format(x, f"0{self.n}b")[::-1] if self.n else ""
+        return self._payload
+
+    def status(self):
+        """Snapshot for logs/UIs."""
+        return {
+            "rank": self.rank,
+            "n": self.n,
+            "packets": self.packets,
+            "consistent": self.consistent,
+            "recovered_at": self.recovered_at,
+        }
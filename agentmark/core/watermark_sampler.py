@@ -3,16 +3,20 @@ Watermark Sampler Module
 Responsibility: Contains all algorithms related to behavior sampling
 """
 
+import functools
 import random
 import json
 import math
-import torch
 import hmac
 import hashlib
 import numpy as np
 import os
-import json
+import threading
+from collections import OrderedDict
 
+# torch is only needed by the "torch" differential backend and the red-green
+# baseline; it is imported inside those functions so that importing the SDK
+# (and the proxy) stays torch-free.
 
 # ==============================================================================
 # ================ Contextual Key Generation ================
@@ -53,39 +57,75 @@ def generate_contextual_key(history_responses, num_bytes=32):
 # ================ Differential Scheme Watermark Engine ================
 # ==============================================================================
 
+@functools.lru_cache(maxsize=4096)
+def _hmac_sha512_state(key):
+    # Keyed HMAC-SHA512 with the inner/outer pads already absorbed. Callers copy() it per
+    # message; encoder, target list and decoder for one context share the same key.
+    return hmac.new(key, digestmod=hashlib.sha512)
+
+
 # Pseudo-Random Generator (PRG/DRBG), ensuring sender and receiver can synchronize random processes
 class DRBG:
+    DIGEST_BITS = 512
+
     def __init__(self, key, nonce):
         self.key = key
         self.nonce = nonce
         self.counter = 0
+        self._hmac = _hmac_sha512_state(bytes(key))
 
-    def generate_random_bits(self, n):
-        message = self.nonce + self.counter.to_bytes(4, 'big')
-        hmac_sha512 = hmac.new(self.key, message, hashlib.sha512).digest()
+    def _next_digest(self):
+        mac = self._hmac.copy()
+        mac.update(self.nonce + self.counter.to_bytes(4, 'big'))
         self.counter += 1
-        
-        bits = ''.join(format(byte, '08b') for byte in hmac_sha512)
+        return mac.digest()
+
+    @classmethod
+    def _digest_to_float(cls, digest, n):
+        # Leading n bits of the digest as an integer, scaled into [0,1)
+        random_int = int.from_bytes(digest, 'big')
+        if n < cls.DIGEST_BITS:
+            random_int >>= cls.DIGEST_BITS - n
+        return random_int / (2**n)
+
+    def generate_random_bits(self, n):
+        bits = format(int.from_bytes(self._next_digest(), 'big'), f'0{self.DIGEST_BITS}b')
         return bits[:n]
 
     def generate_random(self, n):
-        # Generate a floating point number in (0,1) from bit string
-        random_bits = self.generate_random_bits(n)
-        random_int = int(random_bits, 2)
-        random_float = random_int / (2**n)
-        return random_float
+        # Generate a floating point number in [0,1) from the leading n bits of the next digest
+        return self._digest_to_float(self._next_digest(), n)
+
+    def generate_block(self, count, n=52):
+        """
+        Generate `count` consecutive uniforms in one pass.
+
+        Equivalent to calling generate_random(n) `count` times (same counters,
+        same values), so logs written with single draws still line up.
+        """
+        base = self._hmac
+        prefix = self.nonce
+        start = self.counter
+        out = []
+        for counter in range(start, start + count):
+            mac = base.copy()
+            mac.update(prefix + counter.to_bytes(4, 'big'))
+            out.append(self._digest_to_float(mac.digest(), n))
+        self.counter = start + count
+        return out
 
 # Uniform cyclic shift encoder (selects an item within the selected "bin" based on secret info)
 # Standard version - Consistent with Artifacts implementation
-def uni_cyclic_shift_enc(bit_stream, n, PRG, precision=52):
+def uni_cyclic_shift_enc(bit_stream, n, PRG, precision=52, bit_index=0):
     """
     Cyclic shift uniform steganography encoder (Artifacts standard version)
     
     Args:
-        bit_stream (str): Bit stream to embed
+        bit_stream (str): Bit stream to embed (str or PackedBits)
         n (int): Bin size
         PRG: Pseudo-random generator
         precision (int): Precision parameter
+        bit_index (int): Position in bit_stream to read from (no slicing copy)
         
     Returns:
         tuple: (selected index, embedded bit string)
@@ -95,23 +135,32 @@ def uni_cyclic_shift_enc(bit_stream, n, PRG, precision=52):
         return 0, ''
     
     ptr = PRG.generate_random(n=precision)
+    return _cyclic_shift_enc(bit_stream, bit_index, n, ptr)
+
+
+def _cyclic_shift_enc(bit_stream, bit_index, n, ptr):
+    """uni_cyclic_shift_enc body for an already drawn pointer, reading bit_stream from bit_index."""
+    if n == 1:
+        return 0, ''
+
     R = math.floor(ptr * n)
     
     k = math.floor(math.log2(n))
     t = n - 2**k
+    available = len(bit_stream) - bit_index
     
     # Check if bit stream is sufficient
-    if len(bit_stream) < k:
+    if available < k:
         # Insufficient bit stream, select randomly but consume PRG to maintain synchronization
         return R, ''
     
-    bits = bit_stream[:k]
+    bits = bit_stream[bit_index:bit_index + k]
     
     # Check if an extra bit is needed
-    if len(bit_stream) < k + 1:
+    if available < k + 1:
         bits_res = '0'  # Default value
     else:
-        bits_res = bit_stream[k]
+        bits_res = bit_stream[bit_index + k]
     
     idx_sort = lsb_bits2int([int(b) for b in bits])
     
@@ -123,6 +172,8 @@ def uni_cyclic_shift_enc(bit_stream, n, PRG, precision=52):
 # Differential recombination module (Core innovation: horizontal slicing)
 # V2: Use stable sort to handle equal probabilities
 def differential_based_recombination(prob, indices):
+    import torch
+
     bins = []
     
     # ========================== Use Stable Sort ==========================
@@ -155,6 +206,8 @@ def differential_based_recombination(prob, indices):
 
 # Differential Encoder (Engine Assembly)
 def differential_based_encoder(prob, indices, bit_stream, bit_index, PRG, precision = 52, **kwargs):
+    import torch
+
     indices_nonzero, bins, prob_new = differential_based_recombination(prob, indices)
     if prob_new.sum() == 0: # Avoid division by zero
         # If all probabilities are equal, select one randomly
@@ -170,7 +223,7 @@ def differential_based_encoder(prob, indices, bit_stream, bit_index, PRG, precis
     selected_bin_start_index = bins[bin_indice_idx]
     bin_content = indices_nonzero[selected_bin_start_index:]
 
-    idx, bits = uni_cyclic_shift_enc(bit_stream=bit_stream[bit_index:], n = len(bin_content), PRG = PRG, precision=precision)
+    idx, bits = uni_cyclic_shift_enc(bit_stream=bit_stream, n = len(bin_content), PRG = PRG, precision=precision, bit_index=bit_index)
     
     num = len(bits)
     if os.getenv("AGENTMARK_DEBUG_SAMPLER"):
@@ -180,6 +233,370 @@ def differential_based_encoder(prob, indices, bit_stream, bit_index, PRG, precis
     return prev, num
 
 
+# ==============================================================================
+# ================ NumPy Differential Engine (torch-free) ================
+# ==============================================================================
+# Mirrors differential_based_recombination / differential_based_encoder on numpy
+# float32 arrays. Every step reproduces torch's CPU numerics so the two backends
+# choose the same bin and the same action for identical inputs:
+# - stable argsort on probabilities rounded to 1e-8 in float32
+# - float32 sum in torch's reduction order (see _torch_float32_sum)
+# - cumsum accumulated in float64 and stored as float32 (torch's CPU acc_type)
+# - searchsorted with the pointer cast to float32 first (torch's scalar wrapping)
+
+SAMPLER_BACKENDS = ("torch", "numpy")
+DEFAULT_SAMPLER_BACKEND = "numpy"
+
+# torch's sum kernel reduces contiguous float32 data with 256-bit vectors
+# (8 lanes), 4 interleaved row accumulators and a 4-level cascade.
+_TORCH_SUM_VEC_LANES = 8
+_TORCH_SUM_ILP = 4
+_TORCH_SUM_LEVELS = 4
+
+
+def resolve_sampler_backend(backend=None):
+    """
+    Resolve the differential engine backend.
+
+    Args:
+        backend (str, optional): "torch" or "numpy". Falls back to the
+            AGENTMARK_SAMPLER_BACKEND environment variable, then to "numpy"
+            (bit-identical to "torch", without importing it).
+
+    Returns:
+        str: Normalized backend name.
+    """
+    name = (backend or os.getenv("AGENTMARK_SAMPLER_BACKEND") or DEFAULT_SAMPLER_BACKEND).strip().lower()
+    if name not in SAMPLER_BACKENDS:
+        raise ValueError(f"Unknown sampler backend '{name}', expected one of {SAMPLER_BACKENDS}")
+    return name
+
+
+def _torch_cascade_multi_row_sum(rows):
+    # rows: (size, ILP, *lanes) float32; returns the ILP partial sums.
+    size = rows.shape[0]
+    ceil_log2 = (size - 1).bit_length() if size > 2 else 1
+    level_power = max(4, ceil_log2 // _TORCH_SUM_LEVELS)
+    level_step = 1 << level_power
+    level_mask = level_step - 1
+
+    acc = np.zeros((_TORCH_SUM_LEVELS,) + rows.shape[1:], dtype=np.float32)
+    i = 0
+    while i + level_step <= size:
+        for _ in range(level_step):
+            acc[0] += rows[i]
+            i += 1
+        for j in range(1, _TORCH_SUM_LEVELS):
+            acc[j] += acc[j - 1]
+            acc[j - 1] = 0
+            if i & (level_mask << (j * level_power)):
+                break
+    while i < size:
+        acc[0] += rows[i]
+        i += 1
+    for j in range(1, _TORCH_SUM_LEVELS):
+        acc[0] += acc[j]
+    return acc[0]
+
+
+def _torch_cascade_row_sum(items):
+    # items: (size, *lanes) float32; returns one value per lane.
+    size_ilp = items.shape[0] // _TORCH_SUM_ILP
+    rows = items[: size_ilp * _TORCH_SUM_ILP].reshape((size_ilp, _TORCH_SUM_ILP) + items.shape[1:])
+    partial = _torch_cascade_multi_row_sum(rows)
+    total = partial[0]
+    for item in items[size_ilp * _TORCH_SUM_ILP:]:
+        total = total + item
+    for k in range(1, _TORCH_SUM_ILP):
+        total = total + partial[k]
+    return total
+
+
+def _torch_float32_sum(values):
+    """
+    Sum a float32 array along axis 0 in the same order as torch's CPU sum kernel.
+
+    numpy's pairwise summation can differ from torch in the last ulp, which
+    shifts the normalized CDF and, rarely, the selected bin. Trailing axes are
+    independent columns, which lets the batch API sum many equal-length rows
+    at once.
+    """
+    n = values.shape[0]
+    lanes = _TORCH_SUM_VEC_LANES
+    if n < lanes:
+        return _torch_cascade_row_sum(values)
+
+    n_vec = n // lanes
+    vec_acc = _torch_cascade_row_sum(values[: n_vec * lanes].reshape((n_vec, lanes) + values.shape[1:]))
+    total = np.zeros(values.shape[1:], dtype=np.float32)
+    for value in values[n_vec * lanes:]:
+        total = total + value
+    for value in vec_acc:
+        total = total + value
+    return total
+
+
+def differential_based_recombination_np(prob, indices):
+    """NumPy counterpart of differential_based_recombination (float32, same ordering)."""
+    prob = np.asarray(prob, dtype=np.float32)
+    indices = np.asarray(indices)
+
+    # Same stable order as the torch engine: sort on the 1e-8-rounded values only.
+    prob_rounded = np.round(prob * np.float32(1e8)) / np.float32(1e8)
+    sorted_order_indices = np.argsort(prob_rounded, kind="stable")
+    prob = prob[sorted_order_indices]
+    indices = indices[sorted_order_indices]
+
+    mask = prob > 0
+    prob_nonzero = prob[mask]
+    indices_nonzero = indices[mask]
+
+    diff = np.concatenate((prob_nonzero[:1], np.diff(prob_nonzero)))
+    n = len(prob_nonzero)
+
+    weights = np.arange(n, 0, -1, dtype=np.float32)
+    diff_positive = diff > 0
+
+    prob_new = diff[diff_positive] * weights[diff_positive]
+    bins = np.arange(n)[diff_positive]
+
+    return indices_nonzero, bins, prob_new
+
+
+def _differential_cdf_np(prob_new, total):
+    prob_new = prob_new / total
+    return np.cumsum(prob_new, axis=-1, dtype=np.float64).astype(np.float32)
+
+
+def _select_bin_np(indices_nonzero, bins, prob_new, total, PRG, precision=52):
+    """
+    Draw the bin pointer from PRG and locate the selected bin.
+
+    Returns:
+        tuple: (bin content indices, random_p, cdf, bin_indice_idx, selected_bin_start_index)
+    """
+    random_p = PRG.generate_random(n=precision)
+    cdf = _differential_cdf_np(prob_new, total)
+    bin_indice_idx = int(np.searchsorted(cdf, np.float32(random_p), side="left"))
+
+    selected_bin_start_index = int(bins[bin_indice_idx])
+    bin_content = indices_nonzero[selected_bin_start_index:]
+    return bin_content, random_p, cdf, bin_indice_idx, selected_bin_start_index
+
+
+def differential_based_encoder_np(prob, indices, bit_stream, bit_index, PRG, precision=52, **kwargs):
+    """
+    NumPy counterpart of differential_based_encoder.
+
+    Returns:
+        tuple: (selected index as int, number of bits embedded)
+    """
+    indices = np.asarray(indices)
+    indices_nonzero, bins, prob_new = differential_based_recombination_np(prob, indices)
+    total = _torch_float32_sum(prob_new)
+    if total == 0:
+        random_idx = int(PRG.generate_random(precision) * len(indices))
+        return int(indices[random_idx]), 0
+
+    bin_content = _select_bin_np(indices_nonzero, bins, prob_new, total, PRG, precision)[0]
+
+    idx, bits = uni_cyclic_shift_enc(bit_stream=bit_stream, n=len(bin_content), PRG=PRG, precision=precision, bit_index=bit_index)
+
+    num = len(bits)
+    if os.getenv("AGENTMARK_DEBUG_SAMPLER"):
+        print(f"[agentmark:encoder] bin_size={len(bin_content)}, k={math.floor(math.log2(len(bin_content))) if len(bin_content) > 1 else 0}, bits_embedded='{bits}', num={num}")
+
+    return int(bin_content[idx]), num
+
+
+# ==============================================================================
+# ================ Differential Step Plan ================
+# ==============================================================================
+# Everything about one differential step that does not depend on the payload:
+# recombination, CDF, selected bin and both PRG draws. It is a pure function of
+# (backend, context, round, float32 probabilities), so the encoder, the target
+# list, the SDK's distribution diff and an immediate decode of the same step all
+# share one plan through a small LRU cache.
+
+DEFAULT_STEP_PLAN_CACHE_SIZE = 256
+
+_STEP_PLAN_CACHE = OrderedDict()
+_STEP_PLAN_CACHE_LOCK = threading.Lock()
+
+
+class DifferentialStepPlan:
+    """
+    Precomputed bin selection for one differential step.
+
+    Attributes:
+        behaviors (list): Sorted behavior names; engine indices refer to this order.
+        indices_nonzero (np.ndarray): Recombined candidate order (behavior indices).
+        bins (np.ndarray): Start offset of each bin inside indices_nonzero.
+        prob_new (np.ndarray): Normalized float32 bin masses (unnormalized if degenerate).
+        cdf (np.ndarray): float32 CDF over prob_new (None if degenerate).
+        random_p (float): First PRG draw (bin pointer, or random pick if degenerate).
+        ptr (float): Second PRG draw (cyclic-shift pointer).
+        bin_indice_idx (int): Raw searchsorted result; may equal len(bins).
+        degenerate (bool): True when recombination leaves no mass.
+    """
+
+    __slots__ = (
+        "behaviors", "indices_nonzero", "bins", "prob_new", "cdf",
+        "random_p", "ptr", "bin_indice_idx", "degenerate",
+    )
+
+    def __init__(self, behaviors, indices_nonzero, bins, prob_new, cdf, random_p, ptr, bin_indice_idx, degenerate):
+        self.behaviors = behaviors
+        self.indices_nonzero = indices_nonzero
+        self.bins = bins
+        self.prob_new = prob_new
+        self.cdf = cdf
+        self.random_p = random_p
+        self.ptr = ptr
+        self.bin_indice_idx = bin_indice_idx
+        self.degenerate = degenerate
+
+    @property
+    def selected_bin_start_index(self):
+        # IndexError when the pointer lands past the CDF, like the engines.
+        return int(self.bins[self.bin_indice_idx])
+
+    @property
+    def bin_content(self):
+        """Behavior indices of the selected bin."""
+        return self.indices_nonzero[self.selected_bin_start_index:]
+
+    @property
+    def target_behaviors(self):
+        """Behaviors of the selected bin ("green list" for detection)."""
+        if self.degenerate:
+            return list(self.behaviors)
+        return [self.behaviors[int(i)] for i in self.bin_content]
+
+    def encode(self, bit_stream, bit_index):
+        """
+        Embed bits from bit_stream[bit_index:] into this step.
+
+        Returns:
+            tuple: (selected behavior, number of bits embedded)
+        """
+        if self.degenerate:
+            # If all probabilities are equal, select one randomly
+            return self.behaviors[int(self.random_p * len(self.behaviors))], 0
+
+        bin_content = self.bin_content
+        idx, bits = _cyclic_shift_enc(bit_stream, bit_index, len(bin_content), self.ptr)
+
+        num = len(bits)
+        if os.getenv("AGENTMARK_DEBUG_SAMPLER"):
+            print(f"[agentmark:encoder] bin_size={len(bin_content)}, k={math.floor(math.log2(len(bin_content))) if len(bin_content) > 1 else 0}, bits_embedded='{bits}', num={num}")
+        return self.behaviors[int(bin_content[idx])], num
+
+    def decode(self, selected_idx):
+        """
+        Extract the bits carried by behavior index selected_idx.
+
+        Returns:
+            str: Extracted bit string ('' if the step cannot carry it).
+        """
+        if self.degenerate:
+            return ''
+
+        bin_content = self.bin_content
+        matches = np.flatnonzero(bin_content == selected_idx)
+        if len(matches) != 1:
+            # If selected behavior not in bin, something went wrong
+            print(f"Warning: Selected behavior not in expected bin, cannot decode")
+            return ''
+        return _cyclic_shift_dec(int(matches[0]), len(bin_content), self.ptr)
+
+
+def _step_plan_cache_size():
+    try:
+        return max(0, int(os.getenv("AGENTMARK_STEP_PLAN_CACHE_SIZE", DEFAULT_STEP_PLAN_CACHE_SIZE)))
+    except ValueError:
+        return DEFAULT_STEP_PLAN_CACHE_SIZE
+
+
+def _build_step_plan(behaviors, probs_array, context_used, round_num, backend, precision=52):
+    PRG = DRBG(generate_contextual_key([context_used]), str(round_num).encode('utf-8'))
+    random_p, ptr = PRG.generate_block(2, n=precision)
+
+    if backend == "numpy":
+        indices_nonzero, bins, prob_new = differential_based_recombination_np(
+            probs_array, np.arange(len(behaviors))
+        )
+        total = _torch_float32_sum(prob_new)
+        if total == 0:
+            return DifferentialStepPlan(behaviors, indices_nonzero, bins, prob_new, None, random_p, ptr, 0, True)
+        cdf = _differential_cdf_np(prob_new, total)
+        prob_new = prob_new / total
+        bin_indice_idx = int(np.searchsorted(cdf, np.float32(random_p), side="left"))
+        return DifferentialStepPlan(behaviors, indices_nonzero, bins, prob_new, cdf, random_p, ptr, bin_indice_idx, False)
+
+    import torch
+
+    # Force CPU to avoid CUDA initialization overhead in massive parallel runs
+    probs_tensor = torch.from_numpy(probs_array)
+    indices_nonzero, bins, prob_new = differential_based_recombination(
+        probs_tensor, torch.arange(len(behaviors))
+    )
+    total = prob_new.sum()
+    if total == 0:
+        return DifferentialStepPlan(
+            behaviors, indices_nonzero.numpy(), bins.numpy(), prob_new.numpy(), None, random_p, ptr, 0, True
+        )
+    prob_new = prob_new / total
+    cdf = torch.cumsum(prob_new, dim=0)
+    bin_indice_idx = torch.searchsorted(cdf, random_p).item()
+    return DifferentialStepPlan(
+        behaviors, indices_nonzero.numpy(), bins.numpy(), prob_new.numpy(), cdf.numpy(), random_p, ptr, bin_indice_idx, False
+    )
+
+
+def plan_differential_step(probabilities, context_used, round_num=0, backend=None):
+    """
+    Get the (cached) DifferentialStepPlan for one step.
+
+    Args:
+        probabilities (dict): Behavior -> probability.
+        context_used (str): Context string the key is derived from.
+        round_num (int): Round number (nonce).
+        backend (str, optional): "torch" or "numpy" (see resolve_sampler_backend).
+
+    Returns:
+        DifferentialStepPlan: Shared, read-only plan. The cache holds
+        AGENTMARK_STEP_PLAN_CACHE_SIZE entries (default 256, 0 disables it).
+    """
+    backend = resolve_sampler_backend(backend)
+    behaviors = sorted(probabilities.keys())
+    probs_array = np.asarray([probabilities[b] for b in behaviors], dtype=np.float32)
+    # Both engines only ever see the float32 values, so they are the cache key.
+    cache_key = (backend, context_used, round_num, tuple(behaviors), probs_array.tobytes())
+
+    with _STEP_PLAN_CACHE_LOCK:
+        plan = _STEP_PLAN_CACHE.get(cache_key)
+        if plan is not None:
+            _STEP_PLAN_CACHE.move_to_end(cache_key)
+            return plan
+
+    plan = _build_step_plan(behaviors, probs_array, context_used, round_num, backend)
+
+    max_size = _step_plan_cache_size()
+    if max_size:
+        with _STEP_PLAN_CACHE_LOCK:
+            _STEP_PLAN_CACHE[cache_key] = plan
+            while len(_STEP_PLAN_CACHE) > max_size:
+                _STEP_PLAN_CACHE.popitem(last=False)
+    return plan
+
+
+def clear_step_plan_cache():
+    """Drop all cached step plans."""
+    with _STEP_PLAN_CACHE_LOCK:
+        _STEP_PLAN_CACHE.clear()
+
+
 # ==============================================================================
 # ================ Basic Sampling Algorithms ================
 # ==============================================================================
@@ -410,19 +827,20 @@ def sample_behavior_watermark_uncertainty(probabilities, seed=None, round_num=0,
 # ================ Differential Watermark Sampling ================
 # ==============================================================================
 
-def sample_behavior_differential(probabilities, bit_stream, bit_index, context_for_key=None, history_responses=None, seed=None, round_num=0):
+def sample_behavior_differential(probabilities, bit_stream, bit_index, context_for_key=None, history_responses=None, seed=None, round_num=0, backend=None):
     """
     Select behavior using the Differential Scheme Engine and embed secret information (New Differential Watermark Scheme)
     Adapter function for the new engine, supports dynamic key generation based on context.
 
     Args:
         probabilities (dict): Dictionary of behaviors and their corresponding probabilities.
-        bit_stream (str): Secret information bit stream to embed.
+        bit_stream (str): Secret information bit stream to embed ('0'/'1' str or PackedBits).
         bit_index (int): Starting index in the bit stream.
         context_for_key (str, optional): Explicit context string for key generation (Recommended).
         history_responses (list, optional): [Deprecated] List of history responses, used only when context_for_key is None.
         seed (int, optional): Random seed (Fallback, current implementation uses context key).
         round_num (int, optional): Current round number.
+        backend (str, optional): Differential engine, "torch" or "numpy" (see resolve_sampler_backend).
 
     Returns:
         tuple: (Selected behavior, Target behavior list for detection, Number of bits embedded, Actual context used for key)
@@ -433,19 +851,8 @@ def sample_behavior_differential(probabilities, bit_stream, bit_index, context_f
         >>> behavior, targets, bits, ctx = sample_behavior_differential(probs, "10110", 0, context_for_key=context, round_num=1)
         >>> print(f"Selected: {behavior}, Targets: {targets}, Bits: {bits}")
     """
-    # --- 1. Data Format Conversion (Adapt input for new engine) ---
-    # Ensure fixed behavior order for consistent indexing
-    behaviors = sorted(probabilities.keys())
-    probs_list = [probabilities[b] for b in behaviors]
-    
-    # Convert to PyTorch Tensors
-    # Force CPU to avoid CUDA initialization overhead in massive parallel runs
-    device = 'cpu'
-    probs_tensor = torch.tensor(probs_list, dtype=torch.float32, device=device)
-    indices_tensor = torch.arange(len(behaviors), device=device)
-    
-    # --- 2. Initialize PRG (Dynamic Key Gen based on Context) ---
-    # Decide context: Prefer context_for_key, else build from history_responses
+    # --- 1. Decide Context for Dynamic Key Gen ---
+    # Prefer context_for_key, else build from history_responses
     if context_for_key is not None:
         # Use explicit context string
         context_used = context_for_key
@@ -459,9 +866,8 @@ def sample_behavior_differential(probabilities, bit_stream, bit_index, context_f
         context_used = "||".join(recent_responses) if recent_responses else ""
     
     # === New Method: Key based on Explicit Context String ===
-    key = generate_contextual_key([context_used])  # Pass as list for compatibility
-    # nonce uses round number to ensure different random sequence per round
-    nonce = str(round_num).encode('utf-8') 
+    # key = generate_contextual_key([context_used]); nonce = str(round_num), so each
+    # round gets a different random sequence (derived inside plan_differential_step).
     
     # === Old Method: Static Key based on Pre-shared Seed (Kept as comment) ===
     # If fallback to static key needed, uncomment below:
@@ -472,39 +878,25 @@ def sample_behavior_differential(probabilities, bit_stream, bit_index, context_f
     # key = combined_seed_str.encode('utf-8')
     # nonce = round_num_str.encode('utf-8')
     
-    PRG = DRBG(key, nonce)
+    # --- 2. Call New Engine Core ---
+    # Recombination, bin choice and PRG draws are computed once and shared with the
+    # target list below (and with distribution diff / decode of the same step).
+    plan = plan_differential_step(probabilities, context_used, round_num, backend)
+    selected_behavior, num_bits_embedded = plan.encode(bit_stream, bit_index)
 
-    # --- 3. Call New Engine Core ---
-    selected_idx_tensor, num_bits_embedded = differential_based_encoder(
-        prob=probs_tensor,
-        indices=indices_tensor,
-        bit_stream=bit_stream,
-        bit_index=bit_index,
-        PRG=PRG
-    )
-    selected_idx = selected_idx_tensor.item()
-    
-    # --- 4. Convert Output and Generate "Target List" for Detection ---
-    # Convert selected index ID back to behavior string
-    selected_behavior = behaviors[selected_idx]
-    
-    # For detector (detect_watermark.py) to work, we need to recalculate which "bin" was selected.
-    # Detector needs to know what the "target range" is.
-    PRG_for_detection = DRBG(key, nonce)  # Recreate PRG with same params
-    
-    indices_nonzero, bins, prob_new = differential_based_recombination(probs_tensor, indices_tensor)
-    prob_new = prob_new / prob_new.sum()
-    
-    random_p = PRG_for_detection.generate_random(n=52)
-    cdf = torch.cumsum(prob_new, dim=0)
-    bin_indice_idx = torch.searchsorted(cdf, random_p).item()
-
-    selected_bin_start_index = bins[bin_indice_idx]
-    bin_content_indices = indices_nonzero[selected_bin_start_index:]
-    
+    # --- 3. "Target List" for Detection ---
+    # Detector needs to know which "bin" was selected, i.e. the "target range".
     # This is equivalent to "Green List" in old engine
-    target_behavior_list = [behaviors[i] for i in bin_content_indices]
+    target_behavior_list = plan.target_behaviors
+    if not plan.degenerate:
+        _debug_bin_select(
+            plan.random_p, plan.cdf, plan.bin_indice_idx, plan.selected_bin_start_index, target_behavior_list
+        )
+
+    return selected_behavior, target_behavior_list, num_bits_embedded, context_used
+
 
+def _debug_bin_select(random_p, cdf, bin_indice_idx, selected_bin_start_index, target_behavior_list):
     if os.getenv("AGENTMARK_DEBUG_SAMPLER"):
         debug_payload = {
             "stage": "bin_select",
@@ -515,8 +907,6 @@ def sample_behavior_differential(probabilities, bit_stream, bit_index, context_f
             "bin_content": target_behavior_list,
         }
         print(f"[agentmark:sampler] {json.dumps(debug_payload, ensure_ascii=True)}")
-    
-    return selected_behavior, target_behavior_list, num_bits_embedded, context_used
 
 
 # ==============================================================================
@@ -587,6 +977,14 @@ def uni_cyclic_shift_dec(idx, n, PRG, precision=52):
     
     # Must be same as encoder, generate R first
     ptr = PRG.generate_random(n=precision)
+    return _cyclic_shift_dec(idx, n, ptr)
+
+
+def _cyclic_shift_dec(idx, n, ptr):
+    """uni_cyclic_shift_dec body for an already drawn pointer."""
+    if n == 1:
+        return ''
+
     R = math.floor(ptr * n)
     
     k = math.floor(math.log2(n))
@@ -612,7 +1010,7 @@ def uni_cyclic_shift_dec(idx, n, PRG, precision=52):
             return bits + '1'
 
 
-def differential_based_decoder(probabilities, selected_behavior, context_for_key=None, history_responses=None, round_num=0):
+def differential_based_decoder(probabilities, selected_behavior, context_for_key=None, history_responses=None, round_num=0, backend=None):
     """
     Differential Watermark Decoder - Extract embedded secret bits from selected behavior
     
@@ -622,6 +1020,7 @@ def differential_based_decoder(probabilities, selected_behavior, context_for_key
         context_for_key (str, optional): Explicit context string used for key generation (Recommended to read from log)
         history_responses (list, optional): [Deprecated] List of history responses, used only when context_for_key is None
         round_num (int): Current round number (Must be same as encoding)
+        backend (str, optional): Differential engine, "torch" or "numpy" (see resolve_sampler_backend).
         
     Returns:
         str: Extracted bit string
@@ -634,13 +1033,6 @@ def differential_based_decoder(probabilities, selected_behavior, context_for_key
     """
     # --- 1. Data Format Conversion ---
     behaviors = sorted(probabilities.keys())
-    probs_list = [probabilities[b] for b in behaviors]
-    
-    # Convert to PyTorch Tensors
-    # Force CPU to avoid CUDA initialization overhead in massive parallel runs
-    device = 'cpu'
-    probs_tensor = torch.tensor(probs_list, dtype=torch.float32, device=device)
-    indices_tensor = torch.arange(len(behaviors), device=device)
     
     # Find index of selected behavior
     try:
@@ -649,9 +1041,7 @@ def differential_based_decoder(probabilities, selected_behavior, context_for_key
         print(f"Warning: Selected behavior '{selected_behavior}' not in behavior list")
         return ''
     
-    prev_tensor = torch.tensor([selected_idx], device=device)
-    
-    # --- 2. Initialize PRG (Must be exactly same as encoding) ---
+    # --- 2. Decide Context for the PRG (Must be exactly same as encoding) ---
     # Decide context: Prefer context_for_key
     if context_for_key is not None:
         context_used = context_for_key
@@ -663,39 +1053,209 @@ def differential_based_decoder(probabilities, selected_behavior, context_for_key
         recent_responses = history_responses[-window_size:] if len(history_responses) > 0 else []
         context_used = "||".join(recent_responses) if recent_responses else ""
     
-    key = generate_contextual_key([context_used])
-    nonce = str(round_num).encode('utf-8')
-    PRG = DRBG(key, nonce)
-    
-    # --- 3. Probability Recombination (Same as encoder) ---
-    indices_nonzero, bins, prob_new = differential_based_recombination(probs_tensor, indices_tensor)
-    
-    if prob_new.sum() == 0:
-        return ''
-    
-    prob_new = prob_new / prob_new.sum()
-    
-    # --- 4. Bin Sampling (Same as encoder) ---
-    random_p = PRG.generate_random(n=52)
-    cdf = torch.cumsum(prob_new, dim=0)
-    bin_indice_idx = torch.searchsorted(cdf, random_p).item()
-    
-    selected_bin_start_index = bins[bin_indice_idx]
-    bin_content = indices_nonzero[selected_bin_start_index:]
-    
-    # --- 5. Uniform Steganography Decoding ---
-    # Find position of selected index in the bin
-    try:
-        idx_in_bin = (bin_content == prev_tensor.item()).nonzero().item()
-    except (RuntimeError, ValueError):
-        # If selected behavior not in bin, something went wrong
-        print(f"Warning: Selected behavior not in expected bin, cannot decode")
-        return ''
-    
-    # Use cyclic shift decoder to extract bits
-    bits = uni_cyclic_shift_dec(idx=idx_in_bin, n=len(bin_content), PRG=PRG, precision=52)
-    
-    return bits
+    # --- 3. Recombination + Bin Sampling (shared plan, same as encoder) ---
+    plan = plan_differential_step(probabilities, context_used, round_num, backend)
+
+    # --- 4. Uniform Steganography Decoding ---
+    return plan.decode(selected_idx)
+
+
+# ==============================================================================
+# ================ Batched Differential Encoder/Decoder ================
+# ==============================================================================
+# Many independent steps (any mix of trajectories, sessions and rounds) are padded
+# into one (records x actions) float32 matrix. Recombination, normalization and
+# the CDF search run as whole-matrix numpy operations; only key derivation and
+# the final bit strings stay per record. Results match the scalar functions
+# above record for record.
+
+def _batch_probability_matrix(prob_dicts):
+    behaviors_list = [sorted(probs.keys()) for probs in prob_dicts]
+    width = max(len(behaviors) for behaviors in behaviors_list)
+    matrix = np.zeros((len(prob_dicts), width), dtype=np.float32)
+    for row, (probs, behaviors) in enumerate(zip(prob_dicts, behaviors_list)):
+        matrix[row, :len(behaviors)] = [probs[b] for b in behaviors]
+    return behaviors_list, matrix
+
+
+def _batch_draws(contexts, round_nums, precision=52):
+    # Per record: first draw selects the bin, second drives the cyclic shift.
+    draws = np.empty((len(contexts), 2), dtype=np.float64)
+    for row, (context, round_num) in enumerate(zip(contexts, round_nums)):
+        prg = DRBG(generate_contextual_key([context or ""]), str(round_num).encode('utf-8'))
+        draws[row] = prg.generate_block(2, n=precision)
+    return draws
+
+
+def _batch_select_bins(matrix, random_ps):
+    """
+    Vectorized recombination and bin search over a zero-padded probability matrix.
+
+    Returns:
+        tuple: (indices_nonzero, nonzero_count, bin_start, bin_ok)
+            indices_nonzero holds each row's positive-probability indices in
+            recombination order, left-aligned. bin_ok is False where the record
+            has no positive mass or the pointer lies past the last CDF entry
+            (the scalar engines raise in that case).
+    """
+    num, width = matrix.shape
+    cols = np.arange(width)
+
+    prob_rounded = np.round(matrix * np.float32(1e8)) / np.float32(1e8)
+    order = np.argsort(prob_rounded, axis=1, kind="stable")
+    prob = np.take_along_axis(matrix, order, axis=1)
+
+    # Compact positive entries to the front of each row, keeping their order (prob[mask]).
+    positive = prob > 0
+    compact = np.argsort(~positive, axis=1, kind="stable")
+    indices_nonzero = np.take_along_axis(order, compact, axis=1)
+    prob_nonzero = np.where(
+        np.take_along_axis(positive, compact, axis=1),
+        np.take_along_axis(prob, compact, axis=1),
+        np.float32(0),
+    )
+    nonzero_count = positive.sum(axis=1)
+
+    previous = np.concatenate((np.zeros((num, 1), dtype=np.float32), prob_nonzero[:, :-1]), axis=1)
+    diff = prob_nonzero - previous
+    diff_positive = (diff > 0) & (cols < nonzero_count[:, None])
+    weights = (nonzero_count[:, None] - cols).astype(np.float32)
+
+    # Compact positive differences the same way; the permutation doubles as `bins`.
+    bins = np.argsort(~diff_positive, axis=1, kind="stable")
+    bin_count = diff_positive.sum(axis=1)
+    prob_new = np.where(
+        np.take_along_axis(diff_positive, bins, axis=1),
+        np.take_along_axis(diff * weights, bins, axis=1),
+        np.float32(0),
+    )
+
+    # torch's reduction order depends on the vector length, so sum equal-length rows together.
+    totals = np.zeros(num, dtype=np.float32)
+    for count in np.unique(bin_count):
+        if count == 0:
+            continue
+        rows = np.flatnonzero(bin_count == count)
+        totals[rows] = _torch_float32_sum(np.ascontiguousarray(prob_new[rows, :count].T))
+
+    has_mass = totals != 0
+    cdf = _differential_cdf_np(prob_new, np.where(has_mass, totals, np.float32(1))[:, None])
+    pointer = np.asarray(random_ps, dtype=np.float64).astype(np.float32)
+    bin_indice_idx = ((cdf < pointer[:, None]) & (cols < bin_count[:, None])).sum(axis=1)
+
+    bin_ok = has_mass & (bin_indice_idx < bin_count)
+    bin_start = np.take_along_axis(bins, np.minimum(bin_indice_idx, width - 1)[:, None], axis=1)[:, 0]
+    return indices_nonzero, nonzero_count, bin_start, bin_ok
+
+
+def _lsb_bits_str(value, length):
+    return bin(value)[2:].zfill(length)[::-1][:length]
+
+
+def encode_batch(records):
+    """
+    Batched counterpart of sample_behavior_differential for independent steps.
+
+    Args:
+        records (iterable): (probabilities, bit_stream, bit_index, context_for_key, round_num)
+            tuples. Each record is encoded on its own, so steps of one trajectory
+            can only be batched once their bit_index values are known.
+
+    Returns:
+        list[tuple]: (Selected behavior, Target behavior list, Number of bits embedded, Context used)
+            per record, in input order.
+
+    Example:
+        >>> probs = {"Like": 0.3, "Collect": 0.2, "Repost": 0.5}
+        >>> encode_batch([(probs, "10110", 0, "ctx||a", 1), (probs, "0111", 2, "ctx||b", 4)])
+    """
+    records = list(records)
+    if not records:
+        return []
+
+    behaviors_list, matrix = _batch_probability_matrix([r[0] for r in records])
+    contexts = [r[3] or "" for r in records]
+    draws = _batch_draws(contexts, [r[4] for r in records])
+    indices_nonzero, nonzero_count, bin_start, bin_ok = _batch_select_bins(matrix, draws[:, 0])
+
+    results = []
+    for row, (_, bit_stream, bit_index, _, _) in enumerate(records):
+        if not bin_ok[row]:
+            if nonzero_count[row] == 0:
+                raise ValueError(f"Record {row} has no positive probability mass")
+            raise IndexError(f"Record {row}: bin pointer beyond the cumulative distribution")
+        behaviors = behaviors_list[row]
+        bin_content = indices_nonzero[row, bin_start[row]:nonzero_count[row]]
+        idx, bits = _cyclic_shift_enc(bit_stream, bit_index, len(bin_content), draws[row, 1])
+        results.append((
+            behaviors[bin_content[idx]],
+            [behaviors[i] for i in bin_content],
+            len(bits),
+            contexts[row],
+        ))
+    return results
+
+
+def decode_batch(records):
+    """
+    Batched counterpart of differential_based_decoder.
+
+    Args:
+        records (iterable): (probabilities, selected_behavior, context_for_key, round_num) tuples,
+            e.g. every logged step of many trajectories.
+
+    Returns:
+        list[str | None]: Extracted bit string per record, in input order ('' when
+            the selected bin holds a single behavior and carries no bits). Records
+            that cannot be decoded (unknown action, action outside the selected bin,
+            no positive mass, pointer past the CDF) yield None; run the scalar
+            decoder on them to get its warning or exception.
+
+    Example:
+        >>> probs = {"Like": 0.3, "Collect": 0.2, "Repost": 0.5}
+        >>> decode_batch([(probs, "Repost", "ctx||a", 1), (probs, "Like", "ctx||b", 4)])
+    """
+    records = list(records)
+    if not records:
+        return []
+
+    behaviors_list, matrix = _batch_probability_matrix([r[0] for r in records])
+    draws = _batch_draws([r[2] for r in records], [r[3] for r in records])
+    indices_nonzero, nonzero_count, bin_start, bin_ok = _batch_select_bins(matrix, draws[:, 0])
+
+    selected = np.array([
+        behaviors.index(r[1]) if r[1] in behaviors else -1
+        for r, behaviors in zip(records, behaviors_list)
+    ])
+    cols = np.arange(matrix.shape[1])
+    hits = (indices_nonzero == selected[:, None]) & (cols < nonzero_count[:, None])
+    idx_in_bin = hits.argmax(axis=1) - bin_start
+    ok = bin_ok & hits.any(axis=1) & (idx_in_bin >= 0)
+
+    # Vectorized uni_cyclic_shift_dec.
+    n = np.where(ok, nonzero_count - bin_start, 1)
+    R = np.floor(draws[:, 1] * n).astype(np.int64)
+    k = np.frexp(n.astype(np.float64))[1] - 1
+    threshold = (1 << k) - (n - (1 << k))
+    idx_sort = np.mod(idx_in_bin - R, n)
+    extra = idx_sort >= threshold
+    s1 = idx_sort - threshold
+    s_last = s1 % 2
+    value = np.where(extra, (s1 - s_last) // 2 + threshold, idx_sort)
+
+    out = []
+    for row in range(len(records)):
+        if not ok[row]:
+            out.append(None)
+            continue
+        if n[row] == 1:
+            out.append('')
+            continue
+        bits = _lsb_bits_str(int(value[row]), int(k[row]))
+        if extra[row]:
+            bits += '1' if s_last[row] else '0'
+        out.append(bits)
+    return out
 # ==============================================================================
 # ================ Red-Green List Sampling Algorithms ================
 # ==============================================================================
@@ -716,6 +1276,8 @@ def sample_behavior_red_green(probabilities, context_for_key=None, history_respo
     Returns:
         tuple: (Selected behavior, Green list, 0 bits, context_used)
     """
+    import torch
+
     # 1. Prepare Data
     behaviors = sorted(probabilities.keys())
     probs_list = [probabilities[b] for b in behaviors]
@@ -752,7 +1314,7 @@ def sample_behavior_red_green(probabilities, context_for_key=None, history_respo
     green_list = []
     
     # Generate len(behaviors) random numbers
-    random_vals = [PRG.generate_random(32) for _ in range(len(behaviors))]
+    random_vals = PRG.generate_block(len(behaviors), n=32)
     
     mask = torch.zeros_like(logits, device=device)
     
@@ -1,13 +1,14 @@
 """ToolBench adapter.
 Responsibilities: wrap ToolBench/StableToolBench data into AgentMark's unified interface."""
 
+import asyncio
 import json
 import re
 import hashlib
 import os
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Any
-from .fake_response import generate_fake_response
+from typing import Dict, List, Optional, Set, Any, Tuple
+from .fake_response import agenerate_fake_response, generate_fake_response
 
 
 def _standardize_tool_name(name: str) -> str:
@@ -42,11 +43,14 @@ class ToolBenchAdapter:
         model: str = "deepseek-chat",
         temperature: float = 0.0,
         fake_cache_root: Optional[Path] = None,
+        async_client: Any = None,
     ) -> None:
         self.toolenv_root = Path(toolenv_root)
         self.use_cache = use_cache
         self.cache_root = Path(cache_root) if cache_root else None
         self.client = client
+        # AsyncOpenAI-style client used by astep(); step() only uses `client`
+        self.async_client = async_client
         self.model = model
         self.temperature = temperature
         
@@ -109,6 +113,57 @@ class ToolBenchAdapter:
         state: Optional[dict] = None,
     ) -> Dict:
         """Execute one step; uses cache/mock execution and returns observable text."""
+        result, call = self._begin_step(action, tool_summaries)
+        if result is not None:
+            return result
+
+        cache_obs = self._lookup_cache(**call["cache_args"])
+        if cache_obs or not self.client:
+            return self._end_step(call, cache_obs=cache_obs)
+
+        # Third line of defense: Fake response generation
+        api_examples = self._get_cache_examples(**call["cache_args_no_input"])
+        fake_resp = generate_fake_response(client=self.client, **self._fake_request(call, api_examples))
+        # Save to cache (Regenerate/Overwrite)
+        self._save_to_fake_cache(call["fake_cache_key"], fake_resp, *call["fake_cache_dirs"])
+        return self._end_step(call, fake_resp=fake_resp)
+
+    async def astep(
+        self,
+        action: Dict,
+        tool_summaries: List[Dict],
+        state: Optional[dict] = None,
+    ) -> Dict:
+        """
+        step() for async callers: the fake-response LLM call goes through
+        `async_client` (or `client` in a worker thread), and cache reads and
+        writes run in worker threads, so the event loop is never blocked.
+        Returns exactly what step() returns for the same responses.
+        """
+        result, call = self._begin_step(action, tool_summaries)
+        if result is not None:
+            return result
+
+        cache_obs = None
+        if self.use_cache and self.cache_root:
+            cache_obs = await asyncio.to_thread(self._lookup_cache, **call["cache_args"])
+        if cache_obs or not (self.async_client or self.client):
+            return self._end_step(call, cache_obs=cache_obs)
+
+        api_examples = []
+        if self.cache_root:
+            api_examples = await asyncio.to_thread(self._get_cache_examples, **call["cache_args_no_input"])
+        request = self._fake_request(call, api_examples)
+        if self.async_client:
+            fake_resp = await agenerate_fake_response(client=self.async_client, **request)
+        else:
+            fake_resp = await asyncio.to_thread(generate_fake_response, self.client, **request)
+        if self.fake_cache_root:
+            await asyncio.to_thread(self._save_to_fake_cache, call["fake_cache_key"], fake_resp, *call["fake_cache_dirs"])
+        return self._end_step(call, fake_resp=fake_resp)
+
+    def _begin_step(self, action: Dict, tool_summaries: List[Dict]) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """I/O-free part of a step: (final result, None) for Finish / unknown tools, else (None, call context)."""
         tool = action.get("tool") or action.get("action")
         arguments = action.get("arguments") or action.get("action_input") or {}
         info = {"tool": tool, "arguments": arguments}
@@ -120,78 +175,74 @@ class ToolBenchAdapter:
                 "done": True,
                 "reward": 1.0 if final_answer else 0.0,
                 "info": info,
-            }
+            }, None
 
         matched = next((t for t in tool_summaries if t["name"] == tool), None)
-        if matched:
-            desc = matched["description"]
-            cat = matched.get("category", "")
-            api_name = matched.get("api_name", "")
-            raw_tool_name = matched.get("raw_tool_name", "")
-            cache_obs = self._lookup_cache(
-                api_name=api_name, 
-                args=arguments, 
-                category=cat, 
-                tool_name=raw_tool_name
+        if not matched:
+            return {"observation": f"Unknown tool {tool}, args={arguments}", "done": False, "reward": 0.0, "info": info}, None
+
+        cat = matched.get("category", "")
+        api_name = matched.get("api_name", "")
+        raw_tool_name = matched.get("raw_tool_name", "")
+        # Query stored by prepare_episode() gives fake responses their context
+        query = getattr(self, "current_query", "")
+        # Sanitize names for directory structure
+        s_cat = re.sub(r"[^A-Za-z0-9_]+", "_", cat or "Default").strip("_")
+        s_tool = re.sub(r"[^A-Za-z0-9_]+", "_", raw_tool_name or tool or "Tool").strip("_")
+        s_api = re.sub(r"[^A-Za-z0-9_]+", "_", api_name or "API").strip("_")
+        return None, {
+            "tool": tool,
+            "arguments": arguments,
+            "info": info,
+            "matched": matched,
+            "query": query,
+            "cache_args": {"api_name": api_name, "args": arguments, "category": cat, "tool_name": raw_tool_name},
+            "cache_args_no_input": {"api_name": api_name, "category": cat, "tool_name": raw_tool_name},
+            # User requested to NOT use fake cache (always regenerate); responses are still saved
+            "fake_cache_key": self._get_fake_cache_key(f"{cat}/{tool}", arguments, query),
+            "fake_cache_dirs": (s_cat, s_tool, s_api),
+        }
+
+    def _fake_request(self, call: Dict, api_examples: List[Any]) -> Dict:
+        """Keyword arguments for (a)generate_fake_response, minus the client."""
+        matched = call["matched"]
+        cat = matched.get("category", "")
+        return {
+            "model": self.model,
+            "api_doc": {
+                "name": f"{cat}/{call['tool']}",
+                "description": matched["description"],
+                "required_parameters": matched.get("required_parameters", []),
+                "optional_parameters": matched.get("optional_parameters", []),
+            },
+            "tool_input": call["arguments"],
+            "api_examples": api_examples,
+            "temperature": self.temperature,
+            "query": call["query"],
+        }
+
+    def _end_step(self, call: Dict, cache_obs: Optional[str] = None, fake_resp: Optional[Dict] = None) -> Dict:
+        """Observation text for a tool call from its cache hit, generated response, or description."""
+        tool, arguments, matched = call["tool"], call["arguments"], call["matched"]
+        cat = matched.get("category", "")
+        api_name = matched.get("api_name", "")
+        if cache_obs:
+            obs = (
+                f"[Cache] tool={tool} category={cat} api={api_name} "
+                f"args={arguments} | response={cache_obs}"
+            )
+        elif fake_resp is not None:
+            obs = (
+                f"[Gen] tool={tool} category={cat} api={api_name} "
+                f"args={arguments} | response={json.dumps(fake_resp, ensure_ascii=False)}"
             )
-            if cache_obs:
-                obs = (
-                    f"[Cache] tool={tool} category={cat} api={api_name} "
-                    f"args={arguments} | response={cache_obs}"
-                )
-            elif self.client:
-                # Third line of defense: Fake response generation
-                api_doc = {
-                    "name": f"{cat}/{tool}",
-                    "description": desc,
-                    "required_parameters": matched.get("required_parameters", []),
-                    "optional_parameters": matched.get("optional_parameters", []),
-                }
-                api_examples = self._get_cache_examples(api_name, cat, raw_tool_name)
-                
-                # Check local fake cache first
-                query = getattr(self, "current_query", "")
-                cache_key = self._get_fake_cache_key(f"{cat}/{tool}", arguments, query)
-                
-                # Sanitize names for directory structure
-                s_cat = re.sub(r"[^A-Za-z0-9_]+", "_", cat or "Default").strip("_")
-                s_tool = re.sub(r"[^A-Za-z0-9_]+", "_", raw_tool_name or tool or "Tool").strip("_")
-                s_api = re.sub(r"[^A-Za-z0-9_]+", "_", api_name or "API").strip("_")
-                
-                # User requested to NOT use fake cache (always regenerate)
-                # fake_resp = self._load_from_fake_cache(cache_key, s_cat, s_tool, s_api)
-                fake_resp = None 
-                
-                if fake_resp is None:
-                    fake_resp = generate_fake_response(
-                        client=self.client,
-                        model=self.model,
-                        api_doc=api_doc,
-                        tool_input=arguments,
-                        api_examples=api_examples,
-                        temperature=self.temperature,
-                        query=query
-                    )
-                    # Save to cache (Regenerate/Overwrite)
-                    self._save_to_fake_cache(cache_key, fake_resp, s_cat, s_tool, s_api)
-                    obs_prefix = "[Gen]" # Generated fresh
-                else:
-                    obs_prefix = "[CacheGen]"
-
-                obs = (
-                    f"{obs_prefix} tool={tool} category={cat} api={api_name} "
-                    f"args={arguments} | response={json.dumps(fake_resp, ensure_ascii=False)}"
-                )
-            else:
-                obs = (
-                    f"tool={tool} category={cat} api={api_name} "
-                    f"args={arguments} | desc={desc[:200]}"
-                )
         else:
-            obs = f"Unknown tool {tool}, args={arguments}"
-
+            obs = (
+                f"tool={tool} category={cat} api={api_name} "
+                f"args={arguments} | desc={matched['description'][:200]}"
+            )
         # Reserved: future lookup to return real responses from StableToolBench cache
-        return {"observation": obs, "done": False, "reward": 0.0, "info": info}
+        return {"observation": obs, "done": False, "reward": 0.0, "info": call["info"]}
 
     def _lookup_cache(
         self, 
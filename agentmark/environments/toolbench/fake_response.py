@@ -3,6 +3,7 @@ Fake Response Generator for ToolBench
 Mimics the logic in StableToolBench/server/main.py to generate fake responses when cache/real API fails.
 """
 
+import asyncio
 import json
 import time
 from typing import List, Dict, Any, Optional
@@ -14,33 +15,13 @@ def is_valid_json(result: str) -> bool:
     except Exception:
         return False
 
-def generate_fake_response(
-    client: Any,
-    model: str,
+def build_fake_response_messages(
     api_doc: Dict,
     tool_input: Dict,
     api_examples: List[Any],
-    temperature: float = 0.0,
     query: str = ""
-) -> Dict:
-    """
-    Generates a fake response using the LLM based on API docs and examples.
-    
-    Args:
-        client: OpenAI client instance
-        model: Model name to use
-        api_doc: API documentation dictionary
-        tool_input: The input arguments for the tool
-        api_examples: List of (input, output) tuples from cache
-        temperature: Sampling temperature
-        query: The original user query/goal
-        
-    Returns:
-        Dict: The generated fake response
-    """
-    if not client:
-        return {"error": "No LLM client provided for fake response generation", "response": ""}
-
+) -> List[Dict]:
+    """Chat messages asking the LLM to mock the API response (shared by the sync and async generators)."""
     # Check for missing required parameters
     required_params_raw = api_doc.get("required_parameters", [])
     required_names = []
@@ -112,6 +93,56 @@ Output:
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt_content}
     ]
+    return messages
+
+
+def _parse_fake_result(result: str, attempt: int, query: str) -> Optional[Dict]:
+    # DEBUG PRINT
+    print(f"[DEBUG] Fake Response Attempt {attempt+1} (Query: {query[:50]}...): {result}")
+    
+    if "```json" in result:
+        result = result.replace("```json", "").replace("```", "").strip()
+    
+    if is_valid_json(result):
+        return json.loads(result)
+    print(f"[WARN] Invalid JSON response from fake generator on attempt {attempt+1}. Retrying...")
+    return None
+
+
+_FAILED_FAKE_RESPONSE = {
+    "error": "Failed to generate fake response",
+    "response": "",
+}
+
+
+def generate_fake_response(
+    client: Any,
+    model: str,
+    api_doc: Dict,
+    tool_input: Dict,
+    api_examples: List[Any],
+    temperature: float = 0.0,
+    query: str = ""
+) -> Dict:
+    """
+    Generates a fake response using the LLM based on API docs and examples.
+    
+    Args:
+        client: OpenAI client instance
+        model: Model name to use
+        api_doc: API documentation dictionary
+        tool_input: The input arguments for the tool
+        api_examples: List of (input, output) tuples from cache
+        temperature: Sampling temperature
+        query: The original user query/goal
+        
+    Returns:
+        Dict: The generated fake response
+    """
+    if not client:
+        return {"error": "No LLM client provided for fake response generation", "response": ""}
+
+    messages = build_fake_response_messages(api_doc, tool_input, api_examples, query)
 
     max_retries = 3
     for attempt in range(max_retries):
@@ -123,17 +154,9 @@ Output:
                 temperature=temperature,
                 response_format={"type": "json_object"},
             )
-            result = response.choices[0].message.content
-            # DEBUG PRINT
-            print(f"[DEBUG] Fake Response Attempt {attempt+1} (Query: {query[:50]}...): {result}")
-            
-            if "```json" in result:
-                result = result.replace("```json", "").replace("```", "").strip()
-            
-            if is_valid_json(result):
-                return json.loads(result)
-            else:
-                print(f"[WARN] Invalid JSON response from fake generator on attempt {attempt+1}. Retrying...")
+            parsed = _parse_fake_result(response.choices[0].message.content, attempt, query)
+            if parsed is not None:
+                return parsed
             time.sleep(1) # Add a small delay before retrying
         except Exception as e:
             import traceback
@@ -141,7 +164,45 @@ Output:
             print(f"[ERROR] Fake generation failed on attempt {attempt+1}: {e}")
             time.sleep(1)
 
-    return {
-        "error": "Failed to generate fake response",
-        "response": "",
-    }
+    return dict(_FAILED_FAKE_RESPONSE)
+
+
+async def agenerate_fake_response(
+    client: Any,
+    model: str,
+    api_doc: Dict,
+    tool_input: Dict,
+    api_examples: List[Any],
+    temperature: float = 0.0,
+    query: str = ""
+) -> Dict:
+    """
+    generate_fake_response() on an async OpenAI client (AsyncOpenAI): same
+    prompt, retries and result, without blocking the event loop.
+    """
+    if not client:
+        return {"error": "No LLM client provided for fake response generation", "response": ""}
+
+    messages = build_fake_response_messages(api_doc, tool_input, api_examples, query)
+
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=4096,
+                temperature=temperature,
+                response_format={"type": "json_object"},
+            )
+            parsed = _parse_fake_result(response.choices[0].message.content, attempt, query)
+            if parsed is not None:
+                return parsed
+            await asyncio.sleep(1) # Add a small delay before retrying
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"[ERROR] Fake generation failed on attempt {attempt+1}: {e}")
+            await asyncio.sleep(1)
+
+    return dict(_FAILED_FAKE_RESPONSE)
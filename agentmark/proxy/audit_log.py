@@ -0,0 +1,164 @@
+"""
+Append-only audit log of proxy watermark decisions.
+
+Each step's full trace (probabilities, context, round, decoded bits, prompt
+trace, raw LLM output) is one JSON line. Records are queued by the request
+handler and serialized/written by a background thread in batches, so the
+request path pays neither JSON encoding nor file I/O. The log is the
+canonical input for offline decoding: every record carries what
+AgentWatermarker.decode needs (probabilities_used, action, context_used,
+round_num).
+
+Compression: with zstd (path ending in .zst, or compression="zstd"; needs
+the optional `zstandard` package) each batch is one zstd frame appended to the
+file; concatenated frames form a valid zstd stream (`zstd -dc log.jsonl.zst`).
+
+With several workers, put "{pid}" in the path to give each process its own file.
+
+Enable with AGENTMARK_AUDIT_LOG=/path/audit.jsonl[.zst]; tune with
+AGENTMARK_AUDIT_LOG_BATCH, AGENTMARK_AUDIT_LOG_FLUSH_S and AGENTMARK_AUDIT_LOG_QUEUE.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_AUDIT_BATCH = 256
+DEFAULT_AUDIT_FLUSH_S = 1.0
+DEFAULT_AUDIT_QUEUE = 65536
+
+logger = logging.getLogger("agentmark.proxy.audit")
+
+_STOP = object()
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd audit logs require the 'zstandard' package (pip install zstandard)") from e
+    return zstandard
+
+
+class AuditLog:
+    """
+    Background, batched JSONL writer.
+
+    write() never blocks: when the queue is full the record is dropped and
+    counted (stats()["dropped"]) rather than stalling a request.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        compression: Optional[str] = None,
+        batch_size: int = DEFAULT_AUDIT_BATCH,
+        flush_interval: float = DEFAULT_AUDIT_FLUSH_S,
+        max_queue: int = DEFAULT_AUDIT_QUEUE,
+    ) -> None:
+        self.path = Path(path)
+        if compression is None and self.path.suffix == ".zst":
+            compression = "zstd"
+        if compression not in (None, "zstd"):
+            raise ValueError(f"Unknown audit log compression: {compression!r}")
+        self.compression = compression
+        self._compressor = _zstd().ZstdCompressor() if compression == "zstd" else None
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._stats = {"written": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="agentmark-audit-log", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        """Queue a record; returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self._stats["dropped"] += 1
+            return False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            data = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch).encode("utf-8")
+            if self._compressor is not None:
+                data = self._compressor.compress(data)
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+        except Exception:
+            self._stats["errors"] += 1
+            logger.exception("audit log write failed (%d records lost)", len(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats, queued=self._queue.qsize(), path=str(self.path), compression=self.compression)
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Flush queued records and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+
+def read_audit_log(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records from a (possibly zstd-compressed) audit log; skips a torn last line."""
+    path = Path(path)
+    if path.suffix == ".zst":
+        with open(path, "rb") as raw:
+            reader = _zstd().ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            text = io.TextIOWrapper(reader, encoding="utf-8")
+            lines = text.read().splitlines()
+    else:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+def audit_log_from_env() -> Optional[AuditLog]:
+    path = os.getenv("AGENTMARK_AUDIT_LOG")
+    if not path:
+        return None
+    return AuditLog(
+        path.replace("{pid}", str(os.getpid())),
+        compression=os.getenv("AGENTMARK_AUDIT_LOG_COMPRESSION") or None,
+        batch_size=int(os.getenv("AGENTMARK_AUDIT_LOG_BATCH", str(DEFAULT_AUDIT_BATCH))),
+        flush_interval=float(os.getenv("AGENTMARK_AUDIT_LOG_FLUSH_S", str(DEFAULT_AUDIT_FLUSH_S))),
+        max_queue=int(os.getenv("AGENTMARK_AUDIT_LOG_QUEUE", str(DEFAULT_AUDIT_QUEUE))),
+    )
@@ -0,0 +1,185 @@
+"""
+Cache for the proxy's scoring call.
+
+Agent frameworks retry and re-send identical prefixes; each repeat would be a
+new paid scoring call. Entries are keyed by a canonical hash of (model,
+rewritten messages, candidates, tool schema) and hold the parsed scoring
+payload plus the upstream response, so a hit skips the LLM entirely. Replaying
+a cached distribution is safe for decoding: the watermark PRG is keyed by
+context and round, not by the response.
+
+Tiers:
+- memory: LRU with max_entries and a TTL
+- disk (optional): SQLite file shared across workers/restarts, same TTL
+
+Enable with AGENTMARK_SCORING_CACHE=1; tune with AGENTMARK_SCORING_CACHE_SIZE,
+AGENTMARK_SCORING_CACHE_TTL (seconds) and AGENTMARK_SCORING_CACHE_PATH (disk tier).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_SCORING_CACHE_SIZE = 1024
+DEFAULT_SCORING_CACHE_TTL = 600.0
+
+
+def scoring_cache_key(
+    model: str,
+    messages: List[Dict[str, Any]],
+    candidates: List[str],
+    tools: Optional[List[Any]] = None,
+) -> str:
+    """Canonical SHA-256 over the inputs that determine the scoring response."""
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "candidates": candidates, "tools": tools or []},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ScoringCache:
+    """
+    Two-tier (memory LRU + optional SQLite) cache of scoring results.
+
+    Values are JSON-serializable dicts. Thread-safe; the disk tier is safe
+    across processes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_SCORING_CACHE_SIZE,
+        ttl: float = DEFAULT_SCORING_CACHE_TTL,
+        path: Optional[str] = None,
+        max_disk_entries: Optional[int] = None,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self.path = str(path) if path else None
+        self.max_disk_entries = max_disk_entries if max_disk_entries is not None else 16 * self.max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+        if self.path:
+            self._disk()
+
+    def _disk(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agentmark_scoring_cache ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats["expired"] += 1
+        if self.path:
+            row = self._disk().execute(
+                "SELECT expires_at, value FROM agentmark_scoring_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] > now:
+                value = json.loads(row[1])
+                self._remember(key, row[0], value)
+                self._count("disk_hits")
+                return value
+            if row is not None:
+                self._disk().execute("DELETE FROM agentmark_scoring_cache WHERE key = ?", (key,))
+                self._count("expired")
+        self._count("misses")
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, value)
+        self._count("stores")
+        if self.path:
+            conn = self._disk()
+            conn.execute(
+                "INSERT OR REPLACE INTO agentmark_scoring_cache (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, expires_at, json.dumps(value, ensure_ascii=False, default=str)),
+            )
+            if self._stats["stores"] % 256 == 0:
+                self._trim_disk(conn)
+
+    def _remember(self, key: str, expires_at: float, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _trim_disk(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM agentmark_scoring_cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM agentmark_scoring_cache WHERE key IN ("
+            "SELECT key FROM agentmark_scoring_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            self._disk().execute("DELETE FROM agentmark_scoring_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats.update(max_entries=self.max_entries, ttl=self.ttl, path=self.path)
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def scoring_cache_from_env() -> Optional[ScoringCache]:
+    """ScoringCache configured from AGENTMARK_SCORING_CACHE*, or None when disabled."""
+    enabled = (os.getenv("AGENTMARK_SCORING_CACHE") or "").strip().lower()
+    if enabled not in {"1", "true", "yes", "on"}:
+        return None
+    return ScoringCache(
+        max_entries=int(os.getenv("AGENTMARK_SCORING_CACHE_SIZE", str(DEFAULT_SCORING_CACHE_SIZE))),
+        ttl=float(os.getenv("AGENTMARK_SCORING_CACHE_TTL", str(DEFAULT_SCORING_CACHE_TTL))),
+        path=os.getenv("AGENTMARK_SCORING_CACHE_PATH") or None,
+    )
@@ -8,6 +8,18 @@ Usage:
     export DEEPSEEK_API_KEY=sk-xxx
     # optional: TARGET_LLM_BASE=https://api.deepseek.com
     # optional: HOST/PORT for this proxy
+    # optional upstream pool: AGENTMARK_UPSTREAM_MAX_CONNECTIONS / AGENTMARK_UPSTREAM_MAX_KEEPALIVE /
+    #   AGENTMARK_UPSTREAM_TIMEOUT / AGENTMARK_UPSTREAM_CONNECT_TIMEOUT / AGENTMARK_UPSTREAM_HTTP2
+    # optional sampling executor: AGENTMARK_SAMPLING_WORKERS / AGENTMARK_SAMPLING_QUEUE
+    # optional shared session state (needed for --workers > 1 or replicas):
+    #   AGENTMARK_SESSION_STORE=memory | sqlite:///path/sessions.db | redis://host:6379/0
+    #   (+ AGENTMARK_SESSION_TTL seconds idle, default 7 days, 0 = keep; AGENTMARK_SESSION_MAX)
+    # optional scoring-call cache: AGENTMARK_SCORING_CACHE=1 (+ _SIZE / _TTL / _PATH)
+    # optional response size / audit trail: AGENTMARK_RESPONSE_MODE=full|compact,
+    #   AGENTMARK_AUDIT_LOG=/path/audit.jsonl[.zst] (full per-step trace, written in the background)
+    # optional two_pass speculation: AGENTMARK_SPECULATIVE=1 (execution call starts alongside scoring)
+    # metrics: GET /metrics (Prometheus text); send "x-agentmark-trace: 1" to get per-stage
+    #   timings back in the response ("agentmark_trace")
     uvicorn agentmark.proxy.server:app --host 0.0.0.0 --port 8000
 
 Client side (minimal change):
@@ -27,24 +39,41 @@ POST /v1/chat/completions compatible with OpenAI style requests:
 Response:
     Original LLM response fields + watermark field (contains action/action_args/probabilities_used/frontend_data/decoded_bits).
     Original content is not modified for backward compatibility; consumers can read the watermark section.
+    In compact mode (AGENTMARK_RESPONSE_MODE=compact or extra_body.agentmark.response_mode="compact")
+    the watermark field is only {action, decoded_bits, round_num}; the full trace goes to the audit log.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
+import threading
 import time
 import uuid
 from collections import OrderedDict
-from typing import Optional, List, Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple
 
+import httpx
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
 
+if TYPE_CHECKING:
+    # openai is imported on first use (_Upstream.llm_client, scoring cache hits) to keep startup light.
+    from openai import AsyncOpenAI
+
+from agentmark.core.packed_bits import PackedBits
 from agentmark.sdk import AgentWatermarker, PromptWatermarkWrapper, get_prompt_instruction
 from agentmark.sdk.prompt_adapter import extract_json_payload
+from agentmark.proxy.session_store import SessionStore, session_store_from_env
+from agentmark.proxy.scoring_cache import ScoringCache, scoring_cache_from_env, scoring_cache_key
+from agentmark.proxy.audit_log import AuditLog, audit_log_from_env
+from agentmark.proxy.metrics import Registry, RequestTrace
 
 DEFAULT_CONTEXT = "proxy||step1"
 
@@ -57,7 +86,14 @@ DEFAULT_MODEL_MAP = {
     "gpt-3.5-turbo": "deepseek-chat",
 }
 DEFAULT_SESSION_KEY = "default"
-DEFAULT_MAX_SESSIONS = 128
+DEFAULT_SESSION_CAS_RETRIES = 8
+RESPONSE_MODES = ("full", "compact")
+SPECULATION_HINTS_MAX = 4096
+DEFAULT_UPSTREAM_MAX_CONNECTIONS = 100
+DEFAULT_UPSTREAM_MAX_KEEPALIVE = 20
+DEFAULT_UPSTREAM_TIMEOUT = 60.0
+DEFAULT_UPSTREAM_CONNECT_TIMEOUT = 10.0
+DEFAULT_SAMPLING_WORKERS = 4
 
 
 class Message(BaseModel):
@@ -80,11 +116,19 @@ class CompletionRequest(BaseModel):
     tools: Optional[List[Any]] = None       # OpenAI style tools/functions
     extra_body: Optional[Dict[str, Any]] = None  # misc custom fields
     context: Optional[str] = DEFAULT_CONTEXT
+    stream: Optional[bool] = False  # SSE: early watermark decision, then relayed chunks
 
 
-app = FastAPI()
 logger = logging.getLogger("agentmark.proxy")
-_SESSION_CACHE: "OrderedDict[str, AgentWatermarker]" = OrderedDict()
+_SESSION_STORE: Optional[SessionStore] = None
+# _session_store() runs on the sampling threads; one store per process, or advances are lost
+_SESSION_STORE_LOCK = threading.Lock()
+_SCORING_CACHE: Optional[ScoringCache] = None
+_SCORING_CACHE_LOADED = False
+_AUDIT_LOG: Optional[AuditLog] = None
+_AUDIT_LOG_LOADED = False
+# session -> top-weighted candidate of its last scoring distribution (speculation guess)
+_SPECULATION_HINTS: "OrderedDict[str, str]" = OrderedDict()
 
 
 def _debug_enabled() -> bool:
@@ -229,22 +273,104 @@ def _get_session_key(
     return os.getenv("AGENTMARK_SESSION_DEFAULT", DEFAULT_SESSION_KEY)
 
 
-def _get_watermarker(session_key: str) -> AgentWatermarker:
-    if session_key in _SESSION_CACHE:
-        _SESSION_CACHE.move_to_end(session_key)
-        return _SESSION_CACHE[session_key]
+def _session_store() -> SessionStore:
+    global _SESSION_STORE
+    store = _SESSION_STORE
+    if store is None:
+        with _SESSION_STORE_LOCK:
+            if _SESSION_STORE is None:
+                _SESSION_STORE = session_store_from_env()
+            store = _SESSION_STORE
+    return store
+
+
+def _scoring_cache() -> Optional[ScoringCache]:
+    global _SCORING_CACHE, _SCORING_CACHE_LOADED
+    if not _SCORING_CACHE_LOADED:
+        _SCORING_CACHE = scoring_cache_from_env()
+        _SCORING_CACHE_LOADED = True
+    return _SCORING_CACHE
+
+
+def _scoring_cache_for(req: "CompletionRequest", system_agentmark: Dict[str, Any]) -> Optional[ScoringCache]:
+    # Per-request opt-out: extra_body.agentmark.scoring_cache=false (or in the system agentmark block)
+    eb = req.extra_body or {}
+    agentmark_cfg = eb.get("agentmark") or {}
+    for candidate in (agentmark_cfg.get("scoring_cache"), system_agentmark.get("scoring_cache")):
+        if _coerce_bool(candidate) is False:
+            return None
+    return _scoring_cache()
+
+
+def _speculative_enabled(req: "CompletionRequest", system_agentmark: Dict[str, Any]) -> bool:
+    eb = req.extra_body or {}
+    agentmark_cfg = eb.get("agentmark") or {}
+    for candidate in (agentmark_cfg.get("speculative"), system_agentmark.get("speculative")):
+        coerced = _coerce_bool(candidate)
+        if coerced is not None:
+            return coerced
+    return _env_flag("AGENTMARK_SPECULATIVE")
+
+
+def _speculation_guess(req: "CompletionRequest", session_key: str, candidates: List[str]) -> str:
+    """Candidate to execute speculatively: explicit hint, else the session's last top candidate, else the first."""
+    agentmark_cfg = (req.extra_body or {}).get("agentmark") or {}
+    for guess in (agentmark_cfg.get("speculate_action"), _SPECULATION_HINTS.get(session_key)):
+        if guess in candidates:
+            return guess
+    return candidates[0]
+
+
+def _remember_top_candidate(session_key: str, probabilities: Dict[str, float]) -> None:
+    if not probabilities:
+        return
+    _SPECULATION_HINTS[session_key] = max(probabilities, key=probabilities.get)
+    _SPECULATION_HINTS.move_to_end(session_key)
+    while len(_SPECULATION_HINTS) > SPECULATION_HINTS_MAX:
+        _SPECULATION_HINTS.popitem(last=False)
+
+
+def _audit_log() -> Optional[AuditLog]:
+    global _AUDIT_LOG, _AUDIT_LOG_LOADED
+    if not _AUDIT_LOG_LOADED:
+        _AUDIT_LOG = audit_log_from_env()
+        _AUDIT_LOG_LOADED = True
+    return _AUDIT_LOG
+
+
+def _response_mode(req: "CompletionRequest", system_agentmark: Dict[str, Any]) -> str:
+    eb = req.extra_body or {}
+    agentmark_cfg = eb.get("agentmark") or {}
+    for candidate in (
+        agentmark_cfg.get("response_mode"),
+        system_agentmark.get("response_mode"),
+        os.getenv("AGENTMARK_RESPONSE_MODE"),
+    ):
+        if isinstance(candidate, str) and candidate.strip().lower() in RESPONSE_MODES:
+            return candidate.strip().lower()
+    return "full"
+
 
+def _cacheable_payload(payload: Any) -> bool:
+    if not isinstance(payload, dict):
+        return False
+    weights = payload.get("action_weights") or payload.get("action_probs") or payload.get("scores")
+    return isinstance(weights, dict) and bool(weights)
+
+
+@lru_cache(maxsize=8)
+def _packed_payload(payload_bits: Optional[str], payload_text: Optional[str]) -> PackedBits:
+    return AgentWatermarker(payload_bits=payload_bits, payload_text=payload_text).payload
+
+
+def _new_watermarker() -> AgentWatermarker:
+    # Watermarkers are per request; the session's position lives in the session store.
+    # The bit-packed payload is built once per configuration and shared (it is immutable).
     payload_bits = os.getenv("AGENTMARK_PAYLOAD_BITS")
     payload_text = os.getenv("AGENTMARK_PAYLOAD_TEXT")
     if payload_bits and payload_text:
         payload_text = None
-    wm = AgentWatermarker(payload_bits=payload_bits, payload_text=payload_text)
-    _SESSION_CACHE[session_key] = wm
-
-    max_sessions = int(os.getenv("AGENTMARK_MAX_SESSIONS", str(DEFAULT_MAX_SESSIONS)))
-    while len(_SESSION_CACHE) > max_sessions:
-        _SESSION_CACHE.popitem(last=False)
-    return wm
+    return AgentWatermarker(payload_bits=_packed_payload(payload_bits, payload_text))
 
 
 def _inject_prompt(
@@ -298,12 +424,177 @@ def _inject_prompt(
     return msgs
 
 
-def _llm_client():
-    api_key = os.getenv("DEEPSEEK_API_KEY")
-    if not api_key:
-        raise RuntimeError("DEEPSEEK_API_KEY not set.")
-    base_url = os.getenv("TARGET_LLM_BASE", DEFAULT_TARGET_BASE)
-    return OpenAI(api_key=api_key, base_url=base_url)
+class _Upstream:
+    """
+    Process-wide upstream clients, created on first use and closed on shutdown.
+
+    One AsyncOpenAI client shares a pooled httpx.AsyncClient, so concurrent
+    requests reuse keep-alive connections instead of paying a TLS handshake each.
+    Watermark sampling (CPU-bound) runs on a bounded thread pool; a semaphore caps
+    the number of queued sampling jobs so bursts wait on the event loop instead of
+    piling up in the executor.
+    """
+
+    def __init__(self) -> None:
+        self.client: Optional[AsyncOpenAI] = None
+        self.http: Optional[httpx.AsyncClient] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.sampling_slots: Optional[asyncio.Semaphore] = None
+        self._client_key: Optional[Tuple[str, str]] = None
+
+    def llm_client(self) -> AsyncOpenAI:
+        api_key = os.getenv("DEEPSEEK_API_KEY")
+        if not api_key:
+            raise RuntimeError("DEEPSEEK_API_KEY not set.")
+        base_url = os.getenv("TARGET_LLM_BASE", DEFAULT_TARGET_BASE)
+        if self.client is None or self._client_key != (api_key, base_url):
+            from openai import AsyncOpenAI
+
+            if self.http is None:
+                self.http = _build_http_client()
+            self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self.http)
+            self._client_key = (api_key, base_url)
+        return self.client
+
+    async def run_sampling(self, fn, *args):
+        if self.executor is None:
+            workers = _env_int("AGENTMARK_SAMPLING_WORKERS", min(DEFAULT_SAMPLING_WORKERS, os.cpu_count() or 1))
+            self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="agentmark-sampling")
+            self.sampling_slots = asyncio.Semaphore(max(1, _env_int("AGENTMARK_SAMPLING_QUEUE", 4 * workers)))
+        async with self.sampling_slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def aclose(self) -> None:
+        if self.http is not None:
+            await self.http.aclose()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.__init__()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=_env_int("AGENTMARK_UPSTREAM_MAX_CONNECTIONS", DEFAULT_UPSTREAM_MAX_CONNECTIONS),
+        max_keepalive_connections=_env_int("AGENTMARK_UPSTREAM_MAX_KEEPALIVE", DEFAULT_UPSTREAM_MAX_KEEPALIVE),
+    )
+    timeout = httpx.Timeout(
+        _env_float("AGENTMARK_UPSTREAM_TIMEOUT", DEFAULT_UPSTREAM_TIMEOUT),
+        connect=_env_float("AGENTMARK_UPSTREAM_CONNECT_TIMEOUT", DEFAULT_UPSTREAM_CONNECT_TIMEOUT),
+    )
+    http2 = _env_flag("AGENTMARK_UPSTREAM_HTTP2")
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("AGENTMARK_UPSTREAM_HTTP2 set but the 'h2' package is missing; using HTTP/1.1")
+            http2 = False
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+_UPSTREAM = _Upstream()
+
+_METRICS = Registry()
+_STAGE_SECONDS = _METRICS.histogram(
+    "agentmark_proxy_stage_seconds", "Time spent in each proxy stage.", ["stage"]
+)
+_REQUEST_SECONDS = _METRICS.histogram(
+    "agentmark_proxy_request_seconds", "End-to-end request time (streams: until [DONE]).", ["stream"]
+)
+_REQUESTS = _METRICS.counter("agentmark_proxy_requests_total", "Completed requests by status.", ["status"])
+_UPSTREAM_ERRORS = _METRICS.counter(
+    "agentmark_proxy_upstream_errors_total", "Failed upstream LLM calls.", ["call", "error"]
+)
+_PARSE_FALLBACKS = _METRICS.counter(
+    "agentmark_proxy_parse_fallbacks_total",
+    "Steps sampled from a fallback distribution instead of parsed weights.",
+    ["kind"],
+)
+_BITS_EMBEDDED = _METRICS.histogram(
+    "agentmark_proxy_bits_embedded", "Payload bits embedded per request.", buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16)
+)
+_SPECULATION = _METRICS.counter(
+    "agentmark_proxy_speculation_total",
+    "Speculative two_pass execution calls by outcome (hit, miss, finish, error).",
+    ["outcome"],
+)
+_SPECULATION_SAVED = _METRICS.histogram(
+    "agentmark_proxy_speculation_saved_seconds", "Execution-call latency hidden behind scoring on a hit."
+)
+_SESSION_CONFLICTS = _METRICS.counter(
+    "agentmark_proxy_session_conflicts_total", "Re-samples after another worker advanced the session."
+)
+
+
+def _cache_gauges() -> Dict[Tuple[Tuple[str, str], ...], float]:
+    if _SCORING_CACHE is None:
+        return {}
+    stats = _SCORING_CACHE.stats()
+    return {
+        (("event", name),): stats[name]
+        for name in ("memory_hits", "disk_hits", "misses", "stores", "evictions", "expired", "size")
+    }
+
+
+def _audit_gauges() -> Dict[Tuple[Tuple[str, str], ...], float]:
+    if _AUDIT_LOG is None:
+        return {}
+    stats = _AUDIT_LOG.stats()
+    return {(("event", name),): stats[name] for name in ("written", "dropped", "errors", "queued")}
+
+
+def _session_gauges() -> Dict[Tuple[Tuple[str, str], ...], float]:
+    # Only the in-process store can count its sessions cheaply; shared stores expire via their TTL.
+    if _SESSION_STORE is None or not hasattr(_SESSION_STORE, "__len__"):
+        return {}
+    return {(): len(_SESSION_STORE)}
+
+
+_METRICS.gauge_callback("agentmark_proxy_scoring_cache", "Scoring cache counters and size.", _cache_gauges)
+_METRICS.gauge_callback("agentmark_proxy_audit_log", "Audit log records by outcome.", _audit_gauges)
+_METRICS.gauge_callback("agentmark_proxy_sessions", "Sessions held by the in-memory store.", _session_gauges)
+
+
+def _new_trace(request: Request) -> RequestTrace:
+    return RequestTrace(_STAGE_SECONDS, enabled=bool(_coerce_bool(request.headers.get("x-agentmark-trace"))))
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    global _SESSION_STORE, _SCORING_CACHE, _SCORING_CACHE_LOADED, _AUDIT_LOG, _AUDIT_LOG_LOADED
+    _session_store()  # before the first request, so configuration errors surface at startup
+    yield
+    await _UPSTREAM.aclose()
+    with _SESSION_STORE_LOCK:
+        if _SESSION_STORE is not None:
+            _SESSION_STORE.close()
+            _SESSION_STORE = None
+    if _SCORING_CACHE is not None:
+        _SCORING_CACHE.close()
+    _SCORING_CACHE, _SCORING_CACHE_LOADED = None, False
+    if _AUDIT_LOG is not None:
+        _AUDIT_LOG.close()
+    _AUDIT_LOG, _AUDIT_LOG_LOADED = None, False
+
+
+app = FastAPI(lifespan=_lifespan)
+
+
+def _llm_client() -> AsyncOpenAI:
+    return _UPSTREAM.llm_client()
 
 
 def _resolve_model(requested_model: str) -> str:
@@ -507,23 +798,94 @@ def _extract_context(
     return f"{session_key}||step{round_num}"
 
 
-@app.post("/v1/chat/completions")
-def proxy_completion(req: CompletionRequest, request: Request):
-    try:
-        instr = get_prompt_instruction()
-        # Append ToolBench specific instructions for Finish
-        instr += (
-             "\nIMPORTANT: If the user's query is a greeting, chat, or general knowledge question "
-             "that does not require the available tools, you MUST explicitly choose 'finish' "
-             "with a polite and helpful response in 'final_answer'."
-        )
-        system_agentmark = _extract_agentmark_from_system(req.messages)
-        candidates, mode = _extract_candidates(req, system_agentmark)
-        session_key = _get_session_key(req, system_agentmark, request)
-        wm = _get_watermarker(session_key)
-        round_used = wm.current_round
-        context_used = _extract_context(req, system_agentmark, session_key, round_used)
-        use_scoring_tool = _score_tool_enabled(req, system_agentmark)
+def _sample_and_decode(
+    session_key: str,
+    context_for: Any,
+    raw_text: str,
+    candidates: List[str],
+    history: List[Optional[str]],
+    payload: Optional[Dict[str, Any]] = None,
+    trace: Optional[RequestTrace] = None,
+) -> Tuple[Dict[str, Any], Any, int]:
+    """
+    Watermark sampling + bit decoding for one step (runs on the sampling executor).
+
+    Samples at the session's stored position, then compare-and-advances the store;
+    if another worker advanced the session meanwhile, re-samples at the new position.
+    Returns (result, decoded_bits, round_used).
+    """
+    trace = trace or RequestTrace(_STAGE_SECONDS)
+    store = _session_store()
+    wm = _new_watermarker()
+    wrapper = PromptWatermarkWrapper(wm)
+    retries = max(1, int(os.getenv("AGENTMARK_SESSION_CAS_RETRIES", str(DEFAULT_SESSION_CAS_RETRIES))))
+
+    for _ in range(retries):
+        state = store.load(session_key)
+        wm.restore({"bit_index": state.bit_index, "round_num": state.round_num})
+        round_used = state.round_num
+        context_used = context_for(round_used)
+        try:
+            with trace.stage("process"):
+                result = wrapper.process(
+                    raw_output=raw_text,
+                    fallback_actions=candidates if candidates else None,
+                    context=context_used,
+                    history=history,
+                    round_num=round_used,
+                    payload=payload,
+                )
+        except Exception as e:
+            logger.exception("watermark processing failed")
+            raise HTTPException(status_code=500, detail=f"watermark processing failed: {e}")
+        bits = result["frontend_data"]["watermark_meta"]["bits_embedded"]
+        if store.advance(session_key, state, bits) is not None:
+            break
+        _SESSION_CONFLICTS.inc()
+        _debug_print("session_conflict", {"session_id": session_key, "round_num": round_used})
+    else:
+        raise HTTPException(status_code=409, detail=f"session {session_key!r} is being advanced concurrently; retry")
+
+    _debug_print("session_state", {"session_id": session_key, "context_used": context_used, "round_num": round_used})
+    _BITS_EMBEDDED.observe(bits)
+    if result.get("probability_source", "parsed") != "parsed":
+        _PARSE_FALLBACKS.inc(kind=result["probability_source"])
+    with trace.stage("decode"):
+        if result["action"] == "finish":
+            decoded_bits = wm.decode(
+                result["probabilities_used"],
+                "finish",
+                context=context_used,
+                round_num=round_used
+            )
+        else:
+            decoded_bits = wm.decode(
+                probabilities=result["probabilities_used"],
+                selected_action=result["action"],
+                context=context_used,
+                round_num=result["frontend_data"]["watermark_meta"]["round_num"],
+            )
+    return result, decoded_bits, round_used
+
+
+async def _score_and_sample(req: CompletionRequest, request: Request, trace: RequestTrace) -> Dict[str, Any]:
+    """
+    Scoring call + watermark sampling for one request.
+
+    Returns the per-request state shared by the JSON and streaming responses.
+    """
+    instr = get_prompt_instruction()
+    # Append ToolBench specific instructions for Finish
+    instr += (
+         "\nIMPORTANT: If the user's query is a greeting, chat, or general knowledge question "
+         "that does not require the available tools, you MUST explicitly choose 'finish' "
+         "with a polite and helpful response in 'final_answer'."
+    )
+    system_agentmark = _extract_agentmark_from_system(req.messages)
+    candidates, mode = _extract_candidates(req, system_agentmark)
+    session_key = _get_session_key(req, system_agentmark, request)
+    use_scoring_tool = _score_tool_enabled(req, system_agentmark)
+    with trace.stage("inject_prompt"):
         rewritten = _inject_prompt(
             req.messages,
             instr,
@@ -532,220 +894,573 @@ def proxy_completion(req: CompletionRequest, request: Request):
             tools=req.tools,
         )
         rewritten = _sanitize_messages(rewritten)
-        _debug_print(
-            "inbound_request",
-            {
-                "model": req.model,
-                "messages": [_message_to_dict(m) for m in req.messages],
-                "tools": req.tools,
-                "extra_body": req.extra_body,
-                "context": req.context,
-                "candidates": req.candidates,
-                "use_scoring_tool": use_scoring_tool,
-            },
-        )
-        _debug_print("system_prompt", {"content": _extract_system_prompt_text(req.messages)})
-        _debug_print(
-            "scoring_request",
-            {
-                "model": req.model,
-                "messages": rewritten,
-                "mode": mode,
-                "candidates": candidates,
-                "context_used": context_used,
-                "round_num": round_used,
-            },
-        )
-
-        client = _llm_client()
-        target_model = _resolve_model(req.model)
-        score_tools = None
-        score_tool_choice = None
-        if use_scoring_tool:
-            score_tool = _score_tool_schema()
-            score_tools = [score_tool]
-            score_tool_choice = {"type": "function", "function": {"name": score_tool["function"]["name"]}}
-
-        scoring_kwargs: Dict[str, Any] = {
-            "model": target_model,
+    _debug_print(
+        "inbound_request",
+        {
+            "model": req.model,
+            "messages": [_message_to_dict(m) for m in req.messages],
+            "tools": req.tools,
+            "extra_body": req.extra_body,
+            "context": req.context,
+            "candidates": req.candidates,
+            "use_scoring_tool": use_scoring_tool,
+            "stream": req.stream,
+        },
+    )
+    _debug_print("system_prompt", {"content": _extract_system_prompt_text(req.messages)})
+    _debug_print(
+        "scoring_request",
+        {
+            "model": req.model,
             "messages": rewritten,
-            "temperature": req.temperature,
-            "max_tokens": req.max_tokens,
-        }
-        if use_scoring_tool:
-            scoring_kwargs["tools"] = score_tools
-            scoring_kwargs["tool_choice"] = score_tool_choice
-
-        scoring_resp = client.chat.completions.create(**scoring_kwargs)
-        message = scoring_resp.choices[0].message
-        raw_text = message.content or ""
-        score_call = _extract_tool_call_arguments(message)
-        if score_call:
-            arguments = score_call.get("arguments")
-            if isinstance(arguments, str):
-                raw_text = arguments
-            elif arguments is not None:
-                raw_text = json.dumps(arguments, ensure_ascii=False)
-            _debug_print(
-                "score_tool_call",
-                {
-                    "name": score_call.get("name"),
-                    "arguments": raw_text,
-                },
-            )
-        _debug_print("llm_raw_output", {"raw_text": raw_text})
+            "mode": mode,
+            "candidates": candidates,
+            "session_id": session_key,
+        },
+    )
 
-        wrapper = PromptWatermarkWrapper(wm)
+    client = _llm_client()
+    target_model = _resolve_model(req.model)
+    score_tools = None
+    score_tool_choice = None
+    if use_scoring_tool:
+        score_tool = _score_tool_schema()
+        score_tools = [score_tool]
+        score_tool_choice = {"type": "function", "function": {"name": score_tool["function"]["name"]}}
+
+    scoring_kwargs: Dict[str, Any] = {
+        "model": target_model,
+        "messages": rewritten,
+        "temperature": req.temperature,
+        "max_tokens": req.max_tokens,
+    }
+    if use_scoring_tool:
+        scoring_kwargs["tools"] = score_tools
+        scoring_kwargs["tool_choice"] = score_tool_choice
+
+    cache = _scoring_cache_for(req, system_agentmark)
+    cache_key = None
+    cached = None
+    if cache is not None:
+        cache_key = scoring_cache_key(target_model, rewritten, candidates, (req.tools or []) + (score_tools or []))
+        cached = cache.get(cache_key)
+
+    tool_mode = _tool_mode(req)
+    speculation = None
+    if (
+        cached is None
+        and tool_mode == "two_pass"
+        and req.tools
+        and candidates
+        and _speculative_enabled(req, system_agentmark)
+    ):
+        guess = _speculation_guess(req, session_key, candidates)
+        spec_kwargs = _execution_kwargs(req, target_model, guess, candidates)
+        if req.stream:
+            spec_kwargs["stream"] = True
+        speculation = _Speculation(client, guess, spec_kwargs)
+    try:
+        if cached is not None:
+            from openai.types.chat import ChatCompletion
 
-        try:
-            result = wrapper.process(
-                raw_output=raw_text,
-                fallback_actions=candidates if candidates else None,
-                context=context_used,
-                history=[m.content for m in req.messages if m.role == "user"],
-                round_num=round_used,
+            scoring_resp = ChatCompletion.model_validate(cached["response"])
+            raw_text = cached["raw_text"]
+            payload = cached["payload"]
+            _debug_print("scoring_cache_hit", {"key": cache_key, "raw_text": raw_text})
+        else:
+            scoring_resp = await _upstream_call("scoring", trace, client, scoring_kwargs)
+            message = scoring_resp.choices[0].message
+            raw_text = message.content or ""
+            score_call = _extract_tool_call_arguments(message)
+            if score_call:
+                arguments = score_call.get("arguments")
+                if isinstance(arguments, str):
+                    raw_text = arguments
+                elif arguments is not None:
+                    raw_text = json.dumps(arguments, ensure_ascii=False)
+                _debug_print(
+                    "score_tool_call",
+                    {
+                        "name": score_call.get("name"),
+                        "arguments": raw_text,
+                    },
+                )
+            _debug_print("llm_raw_output", {"raw_text": raw_text})
+            with trace.stage("extract_json"):
+                payload = extract_json_payload(raw_text)
+            # Unparseable replies are not cached, so a retry can get a usable one
+            if cache is not None and _cacheable_payload(payload):
+                cache.put(cache_key, {"response": scoring_resp.model_dump(), "raw_text": raw_text, "payload": payload})
+
+        with trace.stage("sampling"):
+            result, decoded_bits, round_used = await _UPSTREAM.run_sampling(
+                _sample_and_decode,
+                session_key,
+                partial(_extract_context, req, system_agentmark, session_key),
+                raw_text,
+                candidates,
+                [m.content for m in req.messages if m.role == "user"],
+                payload,
+                trace,
             )
-        except Exception as e:
-            logger.exception("watermark processing failed")
-            raise HTTPException(status_code=500, detail=f"watermark processing failed: {e}")
+    except BaseException:
+        if speculation is not None:
+            speculation.discard()
+        raise
+    _remember_top_candidate(session_key, result["probabilities_used"])
 
-        if result["action"] == "finish":
-             _debug_print("action_decision", "Selected finish. Using generated response args.")
-             
-             # Extract response content from the args generated by the scoring model
-             finish_args = result.get("action_args") or {}
-             # ToolBench uses 'final_answer', Swarm might simpler 'content' or 'response'
-             final_content = (
-                 finish_args.get("response") 
-                 or finish_args.get("content") 
-                 or finish_args.get("final_answer") 
-                 or "Task completed."
-             )
-             
-             # Construct a standard assistant message with content (terminates Swarm loop)
-             resp_dict = {
-                 "id": f"chatcmpl-{uuid.uuid4()}",
-                 "object": "chat.completion",
-                 "created": int(time.time()),
-                 "model": target_model,
-                 "choices": [{
-                     "index": 0,
-                     "message": {
-                         "role": "assistant",
-                         "content": str(final_content),
-                     },
-                     "finish_reason": "stop"
-                 }],
-                 "usage": scoring_resp.usage.model_dump() if scoring_resp.usage else None
-             }
-             
-             resp_dict["watermark"] = {
-                  "action": "finish",
-                  "decoded_bits": wm.decode(
-                      result["probabilities_used"], 
-                      "finish", 
-                      context=context_used, 
-                      round_num=round_used
-                  ),
-                  "mode": "explicit_finish",
-                  "round_num": round_used
-             }
-             return resp_dict
-
-        action_args_map = _build_action_args_map(
-            result.get("raw_payload") or {},
-            candidates,
-            req.tools,
-        )
+    action_args_map: Dict[str, Any] = {}
+    if result["action"] != "finish":
+        with trace.stage("action_args"):
+            action_args_map = _build_action_args_map(
+                result.get("raw_payload") or {},
+                candidates,
+                req.tools,
+            )
         if action_args_map:
             if not isinstance(result.get("action_args"), dict):
                 result["action_args"] = action_args_map.get(result["action"], {})
 
-        round_used = result["frontend_data"]["watermark_meta"]["round_num"]
-        decoded_bits = wm.decode(
-            probabilities=result["probabilities_used"],
-            selected_action=result["action"],
-            context=context_used,
-            round_num=round_used,
-        )
+    return {
+        "client": client,
+        "target_model": target_model,
+        "candidates": candidates,
+        "mode": mode,
+        "session_key": session_key,
+        "round_used": round_used,
+        "rewritten": rewritten,
+        "scoring_resp": scoring_resp,
+        "raw_text": raw_text,
+        "scoring_cache": None if cache is None else ("hit" if cached is not None else "miss"),
+        "result": result,
+        "decoded_bits": decoded_bits,
+        "action_args_map": action_args_map,
+        "tool_mode": tool_mode,
+        "response_mode": _response_mode(req, system_agentmark),
+        "trace": trace,
+        "speculation": speculation,
+    }
 
-        final_resp = scoring_resp
-        tool_mode = _tool_mode(req)
-        execution_messages: Optional[List[Dict[str, Any]]] = None
-        if tool_mode == "two_pass":
-            base_messages = _sanitize_messages([_message_to_dict(m) for m in req.messages])
-            tool_choice = None
-            if req.tools and result["action"] in candidates:
-                tool_choice = {"type": "function", "function": {"name": result["action"]}}
-            _debug_print(
-                "tool_request",
-                {
-                    "model": target_model,
-                    "messages": base_messages,
-                    "tools": req.tools,
-                    "tool_choice": tool_choice,
-                    "round_num": round_used,
-                    "session_id": session_key,
-                },
-            )
-            execution_messages = base_messages
-            final_resp = client.chat.completions.create(
-                model=target_model,
-                messages=base_messages,
-                tools=req.tools,
-                tool_choice=tool_choice,
-                temperature=req.temperature,
-                max_tokens=req.max_tokens,
-            )
 
-        # Build response: keep original structure, append watermark info
-        resp_dict = final_resp.model_dump()
-        if tool_mode == "proxy" and req.tools:
-            tool_calls = _build_tool_calls(result["action"], result["action_args"])
-            if resp_dict.get("choices"):
-                resp_dict["choices"][0]["message"]["tool_calls"] = tool_calls
-                resp_dict["choices"][0]["finish_reason"] = "tool_calls"
-                resp_dict["choices"][0]["message"]["content"] = None
-            _debug_print(
-                "tool_calls_proxy",
-                {
-                    "tool_calls": tool_calls,
-                    "arguments_obj": result["action_args"],
-                    "selected_probability": result["probabilities_used"].get(result["action"]),
+async def _upstream_call(call: str, trace: RequestTrace, client: AsyncOpenAI, kwargs: Dict[str, Any]):
+    """client.chat.completions.create, timed as stage `<call>_call`; failures are counted."""
+    try:
+        with trace.stage(f"{call}_call"):
+            return await client.chat.completions.create(**kwargs)
+    except Exception as e:
+        _UPSTREAM_ERRORS.inc(call=call, error=type(e).__name__)
+        raise
+
+
+def _finish_content(result: Dict[str, Any]) -> str:
+    # Extract response content from the args generated by the scoring model
+    finish_args = result.get("action_args") or {}
+    # ToolBench uses 'final_answer', Swarm might simpler 'content' or 'response'
+    final_content = (
+        finish_args.get("response")
+        or finish_args.get("content")
+        or finish_args.get("final_answer")
+        or "Task completed."
+    )
+    return str(final_content)
+
+
+def _finish_watermark(step: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "action": "finish",
+        "decoded_bits": step["decoded_bits"],
+        "mode": "explicit_finish",
+        "round_num": step["round_used"],
+    }
+
+
+def _execution_kwargs(
+    req: CompletionRequest,
+    target_model: str,
+    action: str,
+    candidates: List[str],
+) -> Dict[str, Any]:
+    tool_choice = None
+    if req.tools and action in candidates:
+        tool_choice = {"type": "function", "function": {"name": action}}
+    return {
+        "model": target_model,
+        "messages": _sanitize_messages([_message_to_dict(m) for m in req.messages]),
+        "tools": req.tools,
+        "tool_choice": tool_choice,
+        "temperature": req.temperature,
+        "max_tokens": req.max_tokens,
+    }
+
+
+def _two_pass_request(req: CompletionRequest, step: Dict[str, Any]) -> Dict[str, Any]:
+    kwargs = _execution_kwargs(req, step["target_model"], step["result"]["action"], step["candidates"])
+    _debug_print(
+        "tool_request",
+        {
+            "model": kwargs["model"],
+            "messages": kwargs["messages"],
+            "tools": kwargs["tools"],
+            "tool_choice": kwargs["tool_choice"],
+            "round_num": step["round_used"],
+            "session_id": step["session_key"],
+        },
+    )
+    return kwargs
+
+
+class _Speculation:
+    """
+    two_pass execution call started together with the scoring call, for a guessed action.
+
+    The execution request differs between actions only in tool_choice, so the
+    speculative result is usable exactly when the request built for the sampled
+    action equals the speculative one; otherwise it is cancelled.
+    """
+
+    def __init__(self, client: AsyncOpenAI, action: str, kwargs: Dict[str, Any]) -> None:
+        self.action = action
+        self.kwargs = kwargs
+        self.outcome: Optional[str] = None
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.task = asyncio.create_task(self._run(client))
+
+    async def _run(self, client: AsyncOpenAI):
+        try:
+            return await client.chat.completions.create(**self.kwargs)
+        finally:
+            self.finished = time.perf_counter()
+
+    async def take(self, kwargs: Dict[str, Any], trace: RequestTrace):
+        """The speculative response if it matches `kwargs` (None on a miss or upstream error)."""
+        if kwargs != self.kwargs:
+            self.discard("miss")
+            return None
+        decided = time.perf_counter()
+        try:
+            resp = await self.task
+        except Exception as e:
+            _UPSTREAM_ERRORS.inc(call="speculative", error=type(e).__name__)
+            self.outcome = "error"
+            _SPECULATION.inc(outcome="error")
+            return None
+        now = time.perf_counter()
+        trace.record("two_pass_call", now - decided)
+        self.outcome = "hit"
+        _SPECULATION.inc(outcome="hit")
+        _SPECULATION_SAVED.observe(min(self.finished or now, decided) - self.started)
+        return resp
+
+    def discard(self, outcome: Optional[str] = None) -> None:
+        if self.outcome is not None:
+            return
+        self.outcome = outcome or "cancelled"
+        if outcome:
+            _SPECULATION.inc(outcome=outcome)
+        self.task.add_done_callback(_close_discarded)
+        self.task.cancel()
+
+
+def _close_discarded(task: "asyncio.Task") -> None:
+    if task.cancelled() or task.exception() is not None:
+        return
+    close = getattr(task.result(), "close", None)  # an opened stream holds a connection
+    if close is not None and asyncio.iscoroutinefunction(close):
+        asyncio.ensure_future(close())
+
+
+async def _execution_call(step: Dict[str, Any], kwargs: Dict[str, Any]):
+    speculation: Optional[_Speculation] = step["speculation"]
+    if speculation is not None:
+        resp = await speculation.take(kwargs, step["trace"])
+        if resp is not None:
+            return resp
+    return await _upstream_call("two_pass", step["trace"], step["client"], kwargs)
+
+
+def _watermark_payload(
+    step: Dict[str, Any],
+    execution_messages: Optional[List[Dict[str, Any]]],
+) -> Dict[str, Any]:
+    result = step["result"]
+    rewritten = step["rewritten"]
+    return {
+        "action": result["action"],
+        "action_args": result["action_args"],
+        "action_args_full": step["action_args_map"],
+        "probabilities_used": result["probabilities_used"],
+        "selected_probability": result["probabilities_used"].get(result["action"]),
+        "frontend_data": result["frontend_data"],
+        "decoded_bits": step["decoded_bits"],
+        "candidates_used": step["candidates"],
+        "session_id": step["session_key"],
+        "context_used": result["frontend_data"]["watermark_meta"].get("context"),
+        "round_num": step["round_used"],
+        "mode": (step["mode"] if step["candidates"] else "bootstrap") + f"_{step['tool_mode']}",
+        "raw_llm_output": step["raw_text"],
+        "scoring_cache": step["scoring_cache"],
+        "speculation": step["speculation"].outcome if step["speculation"] is not None else None,
+        "prompt_trace": {
+            "scoring_messages": rewritten,
+            "scoring_prompt_text": _render_messages(rewritten),
+            "execution_messages": execution_messages,
+            "execution_prompt_text": _render_messages(execution_messages)
+            if execution_messages
+            else None,
+        },
+    }
+
+
+def _log_watermark(watermark: Dict[str, Any]) -> None:
+    logger.info("watermark=%s", watermark)
+    print(f"[watermark] {json.dumps(watermark, ensure_ascii=False, default=str)}")
+
+
+def _emit_watermark(
+    step: Dict[str, Any],
+    response_id: str,
+    execution_messages: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Watermark field for the response, plus the audit record for this step.
+
+    With an audit log the full trace is queued there (serialized off the
+    request path) instead of printed; compact mode returns only action,
+    decoded bits and round, and skips building the trace when nothing needs it.
+    """
+    audit = _audit_log()
+    finish = step["result"]["action"] == "finish"
+    compact = step["response_mode"] == "compact"
+    full = None
+    if audit is not None or not (compact or finish):
+        full = _watermark_payload(step, execution_messages)
+    if audit is not None:
+        record = dict(full, ts=time.time(), response_id=response_id, model=step["target_model"])
+        if finish:
+            record["mode"] = "explicit_finish"
+        audit.write(record)
+    if compact:
+        return {
+            "action": step["result"]["action"],
+            "decoded_bits": step["decoded_bits"],
+            "round_num": step["round_used"],
+        }
+    if finish:
+        return _finish_watermark(step)
+    if audit is None:
+        _log_watermark(full)
+    return full
+
+
+async def _complete(req: CompletionRequest, step: Dict[str, Any]) -> Dict[str, Any]:
+    result = step["result"]
+    scoring_resp = step["scoring_resp"]
+    if result["action"] == "finish":
+        _debug_print("action_decision", "Selected finish. Using generated response args.")
+        if step["speculation"] is not None:
+            step["speculation"].discard("finish")
+
+        # Construct a standard assistant message with content (terminates Swarm loop)
+        resp_dict = {
+            "id": f"chatcmpl-{uuid.uuid4()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": step["target_model"],
+            "choices": [{
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": _finish_content(result),
                 },
-            )
-        resp_dict["watermark"] = {
-            "action": result["action"],
-            "action_args": result["action_args"],
-            "action_args_full": action_args_map,
-            "probabilities_used": result["probabilities_used"],
-            "selected_probability": result["probabilities_used"].get(result["action"]),
-            "frontend_data": result["frontend_data"],
-            "decoded_bits": decoded_bits,
-            "candidates_used": candidates,
-            "session_id": session_key,
-            "context_used": result["frontend_data"]["watermark_meta"].get("context"),
-            "round_num": round_used,
-            "mode": (mode if candidates else "bootstrap") + f"_{tool_mode}",
-            "raw_llm_output": raw_text,
-            "prompt_trace": {
-                "scoring_messages": rewritten,
-                "scoring_prompt_text": _render_messages(rewritten),
-                "execution_messages": execution_messages,
-                "execution_prompt_text": _render_messages(execution_messages)
-                if execution_messages
-                else None,
-            },
+                "finish_reason": "stop"
+            }],
+            "usage": scoring_resp.usage.model_dump() if scoring_resp.usage else None
         }
-        logger.info("watermark=%s", resp_dict["watermark"])
-        print(f"[watermark] {json.dumps(resp_dict['watermark'], ensure_ascii=False, default=str)}")
-        return resp_dict
-    except HTTPException:
+        resp_dict["watermark"] = _emit_watermark(step, resp_dict["id"])
+        return _with_trace(resp_dict, step)
+
+    final_resp = scoring_resp
+    tool_mode = step["tool_mode"]
+    execution_messages: Optional[List[Dict[str, Any]]] = None
+    if tool_mode == "two_pass":
+        execution_kwargs = _two_pass_request(req, step)
+        execution_messages = execution_kwargs["messages"]
+        final_resp = await _execution_call(step, execution_kwargs)
+
+    # Build response: keep original structure, append watermark info
+    build_started = time.perf_counter()
+    resp_dict = final_resp.model_dump()
+    if tool_mode == "proxy" and req.tools:
+        tool_calls = _build_tool_calls(result["action"], result["action_args"])
+        if resp_dict.get("choices"):
+            resp_dict["choices"][0]["message"]["tool_calls"] = tool_calls
+            resp_dict["choices"][0]["finish_reason"] = "tool_calls"
+            resp_dict["choices"][0]["message"]["content"] = None
+        _debug_print(
+            "tool_calls_proxy",
+            {
+                "tool_calls": tool_calls,
+                "arguments_obj": result["action_args"],
+                "selected_probability": result["probabilities_used"].get(result["action"]),
+            },
+        )
+    resp_dict["watermark"] = _emit_watermark(step, resp_dict.get("id"), execution_messages)
+    step["trace"].record("build_response", time.perf_counter() - build_started)
+    return _with_trace(resp_dict, step)
+
+
+def _with_trace(resp: Dict[str, Any], step: Dict[str, Any]) -> Dict[str, Any]:
+    if step["trace"].enabled:
+        resp["agentmark_trace"] = step["trace"].summary()
+    return resp
+
+
+def _sse(data: Any) -> str:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False, default=str)
+    return f"data: {payload}\n\n"
+
+
+def _chunk(
+    chunk_id: str,
+    model: str,
+    delta: Dict[str, Any],
+    finish_reason: Optional[str] = None,
+    **extra: Any,
+) -> Dict[str, Any]:
+    chunk = {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    chunk.update(extra)
+    return chunk
+
+
+def _decision_event(step: Dict[str, Any]) -> Dict[str, Any]:
+    """Early watermark decision: what was sampled, before any execution output."""
+    result = step["result"]
+    return {
+        "event": "decision",
+        "action": result["action"],
+        "action_args": result["action_args"],
+        "probabilities_used": result["probabilities_used"],
+        "selected_probability": result["probabilities_used"].get(result["action"]),
+        "decoded_bits": step["decoded_bits"],
+        "session_id": step["session_key"],
+        "round_num": step["round_used"],
+        "mode": "explicit_finish" if result["action"] == "finish"
+        else (step["mode"] if step["candidates"] else "bootstrap") + f"_{step['tool_mode']}",
+    }
+
+
+async def _stream_completion(req: CompletionRequest, step: Dict[str, Any]):
+    """
+    SSE stream in OpenAI chat.completion.chunk format.
+
+    The first chunk carries the watermark decision (empty assistant delta plus a
+    `watermark` field with event="decision"); two_pass relays the execution
+    call's chunks as they arrive; the final chunk carries the full `watermark`
+    metadata (and `agentmark_trace` when tracing), followed by `data: [DONE]`.
+    """
+    result = step["result"]
+    trace = step["trace"]
+    model = step["target_model"]
+    chunk_id = f"chatcmpl-{uuid.uuid4()}"
+
+    # every yield sits inside the try, so a disconnect at any chunk still discards the speculation
+    try:
+        yield _sse(_chunk(chunk_id, model, {"role": "assistant", "content": ""}, watermark=_decision_event(step)))
+        if result["action"] == "finish":
+            _debug_print("action_decision", "Selected finish. Using generated response args.")
+            if step["speculation"] is not None:
+                step["speculation"].discard("finish")
+            yield _sse(_chunk(chunk_id, model, {"content": _finish_content(result)}))
+            final = _chunk(chunk_id, model, {}, "stop", watermark=_emit_watermark(step, chunk_id))
+            yield _sse(_with_trace(final, step))
+        elif step["tool_mode"] == "two_pass":
+            execution_kwargs = dict(_two_pass_request(req, step), stream=True)
+            upstream = await _execution_call(step, execution_kwargs)
+            last: Optional[Dict[str, Any]] = None
+            try:
+                async for upstream_chunk in upstream:
+                    if last is not None:
+                        yield _sse(last)
+                    last = upstream_chunk.model_dump(exclude_unset=True)
+            finally:
+                # release the upstream connection on client disconnect or error, too
+                await upstream.close()
+            if last is None:
+                last = _chunk(chunk_id, model, {}, "stop")
+            last["watermark"] = _emit_watermark(step, last.get("id", chunk_id), execution_kwargs["messages"])
+            yield _sse(_with_trace(last, step))
+        else:
+            finish_reason = step["scoring_resp"].choices[0].finish_reason or "stop"
+            if step["tool_mode"] == "proxy" and req.tools:
+                tool_calls = _build_tool_calls(result["action"], result["action_args"])
+                deltas = [{"tool_calls": [dict(call, index=i) for i, call in enumerate(tool_calls)]}]
+                finish_reason = "tool_calls"
+            else:
+                deltas = [{"content": step["scoring_resp"].choices[0].message.content or ""}]
+            for delta in deltas:
+                yield _sse(_chunk(chunk_id, model, delta))
+            final = _chunk(chunk_id, model, {}, finish_reason, watermark=_emit_watermark(step, chunk_id))
+            yield _sse(_with_trace(final, step))
+        _REQUESTS.inc(status="200")
+    except Exception as e:
+        # Headers are already sent: report the failure in-band (OpenAI clients raise on "error")
+        logger.exception("proxy stream failed")
+        _REQUESTS.inc(status="stream_error")
+        yield _sse({"error": {"message": str(e), "type": "agentmark_proxy_error"}})
+    finally:
+        if step["speculation"] is not None:
+            step["speculation"].discard()
+    _REQUEST_SECONDS.observe(time.perf_counter() - trace.started, stream="true")
+    yield _sse("[DONE]")
+
+
+@app.get("/v1/agentmark/scoring_cache")
+async def scoring_cache_stats():
+    cache = _scoring_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(_METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/v1/chat/completions")
+async def proxy_completion(req: CompletionRequest, request: Request):
+    trace = _new_trace(request)
+    try:
+        step = await _score_and_sample(req, request, trace)
+        if req.stream:
+            return StreamingResponse(
+                _stream_completion(req, step),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        try:
+            resp = await _complete(req, step)
+        finally:
+            if step["speculation"] is not None:
+                step["speculation"].discard()
+        _REQUESTS.inc(status="200")
+        _REQUEST_SECONDS.observe(time.perf_counter() - trace.started, stream="false")
+        return resp
+    except HTTPException as e:
+        _REQUESTS.inc(status=str(e.status_code))
         raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         logger.exception("proxy_completion failed")
+        _REQUESTS.inc(status="500")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
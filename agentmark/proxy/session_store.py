@@ -0,0 +1,339 @@
+"""
+Session stores for the proxy's per-session watermark state.
+
+The proxy keeps one (round_num, bit_index) pair per session. Storing it
+outside the worker process lets several uvicorn workers or replicas share a
+session without splitting its counters.
+
+Backends:
+- MemorySessionStore: in-process dict (single worker; the default).
+- SQLiteSessionStore: one SQLite file in WAL mode, shared by the workers of a host.
+- RedisSessionStore: any Redis-protocol server (redis-py client, or a
+  stand-in such as fakeredis.FakeRedis()) shared by replicas.
+
+Every write is a compare-and-advance: advance() applies only if the stored
+state still equals the state the caller sampled with, so two workers racing
+on one session cannot both embed at the same bit index.
+
+Select a backend with AGENTMARK_SESSION_STORE:
+    memory (default) | sqlite:///path/to/sessions.db | redis://host:6379/0
+
+Sessions not advanced for AGENTMARK_SESSION_TTL seconds (default 7 days; 0
+keeps them forever) expire in every backend. The memory and SQLite stores also
+keep at most AGENTMARK_SESSION_MAX sessions, dropping the least recently
+advanced. An expired or dropped session starts again from round 0.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+DEFAULT_REDIS_PREFIX = "agentmark:session:"
+DEFAULT_SESSION_TTL = 7 * 24 * 3600.0
+DEFAULT_SESSION_MAX = 100_000
+# SQLite prunes expired and surplus rows once per this many advances (per store)
+SQLITE_PRUNE_EVERY = 256
+
+
+@dataclass(frozen=True)
+class SessionState:
+    """Watermark position of a session: next round and next payload bit."""
+
+    round_num: int = 0
+    bit_index: int = 0
+
+    def advanced(self, bits: int, rounds: int = 1) -> "SessionState":
+        return SessionState(self.round_num + rounds, self.bit_index + bits)
+
+
+class SessionStore(ABC):
+    """Interface: load / compare-and-advance / reset of per-session state."""
+
+    @abstractmethod
+    def load(self, key: str) -> SessionState:
+        """Current state of a session (zero state if unknown or expired)."""
+
+    @abstractmethod
+    def advance(self, key: str, expected: SessionState, bits: int, rounds: int = 1) -> Optional[SessionState]:
+        """
+        Atomically move a session from `expected` by `rounds` rounds and `bits` bits.
+
+        Returns the new state, or None if the stored state no longer equals
+        `expected` (another worker advanced the session first).
+        """
+
+    @abstractmethod
+    def reset(self, key: str) -> None:
+        """Forget a session."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process dict ordered by last advance (single worker).
+
+    Sessions idle for more than `ttl` seconds (0: never) expire, and beyond
+    `max_sessions` the least recently advanced one is dropped.
+    """
+
+    def __init__(self, max_sessions: int = DEFAULT_SESSION_MAX, ttl: float = DEFAULT_SESSION_TTL) -> None:
+        self.max_sessions = max(1, int(max_sessions))
+        self.ttl = float(ttl or 0)
+        self._states: "OrderedDict[str, Tuple[float, SessionState]]" = OrderedDict()  # key -> (updated_at, state)
+        self._lock = threading.Lock()
+
+    def _expired(self, updated_at: float, now: float) -> bool:
+        return self.ttl > 0 and now - updated_at > self.ttl
+
+    def _current(self, key: str, now: float) -> SessionState:
+        entry = self._states.get(key)
+        if entry is None:
+            return SessionState()
+        if self._expired(entry[0], now):
+            del self._states[key]
+            return SessionState()
+        return entry[1]
+
+    def load(self, key: str) -> SessionState:
+        with self._lock:
+            return self._current(key, time.time())
+
+    def advance(self, key: str, expected: SessionState, bits: int, rounds: int = 1) -> Optional[SessionState]:
+        now = time.time()
+        with self._lock:
+            if self._current(key, now) != expected:
+                return None
+            state = expected.advanced(bits, rounds)
+            self._states[key] = (now, state)
+            self._states.move_to_end(key)
+            # oldest first: drop the surplus, then whatever has expired
+            while len(self._states) > self.max_sessions:
+                self._states.popitem(last=False)
+            while self._states and self._expired(next(iter(self._states.values()))[0], now):
+                self._states.popitem(last=False)
+            return state
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._states.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite table (key, round_num, bit_index, updated_at) in WAL mode.
+
+    Each thread gets its own connection; the compare-and-advance is a single
+    conditional UPDATE (or upsert for a new session), so it is atomic across
+    threads and processes. Rows older than `ttl` seconds (0: never) read as
+    new sessions; every SQLITE_PRUNE_EVERY advances, expired rows and those
+    beyond `max_sessions` (least recently advanced first) are deleted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        timeout: float = 30.0,
+        max_sessions: int = DEFAULT_SESSION_MAX,
+        ttl: float = DEFAULT_SESSION_TTL,
+    ) -> None:
+        self.path = str(path)
+        self.timeout = timeout
+        self.max_sessions = max(1, int(max_sessions))
+        self.ttl = float(ttl or 0)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._advances = 0
+        self._conn()  # create the schema eagerly so configuration errors surface at startup
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agentmark_sessions ("
+                "key TEXT PRIMARY KEY, round_num INTEGER NOT NULL, bit_index INTEGER NOT NULL, updated_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS agentmark_sessions_updated ON agentmark_sessions (updated_at)")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _cutoff(self, now: float) -> float:
+        """Rows last advanced before this are expired (0.0 keeps every row)."""
+        return now - self.ttl if self.ttl > 0 else 0.0
+
+    def load(self, key: str) -> SessionState:
+        row = self._conn().execute(
+            "SELECT round_num, bit_index FROM agentmark_sessions WHERE key = ? AND updated_at >= ?",
+            (key, self._cutoff(time.time())),
+        ).fetchone()
+        return SessionState(*row) if row else SessionState()
+
+    def advance(self, key: str, expected: SessionState, bits: int, rounds: int = 1) -> Optional[SessionState]:
+        conn = self._conn()
+        state = expected.advanced(bits, rounds)
+        now = time.time()
+        cutoff = self._cutoff(now)
+        if expected == SessionState():
+            # a new session, or one whose row has expired
+            cur = conn.execute(
+                "INSERT INTO agentmark_sessions (key, round_num, bit_index, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET round_num = excluded.round_num, bit_index = excluded.bit_index, "
+                "updated_at = excluded.updated_at WHERE agentmark_sessions.updated_at < ?",
+                (key, state.round_num, state.bit_index, now, cutoff),
+            )
+            if cur.rowcount == 1:
+                self._after_advance(now)
+                return state
+        cur = conn.execute(
+            "UPDATE agentmark_sessions SET round_num = ?, bit_index = ?, updated_at = ? "
+            "WHERE key = ? AND round_num = ? AND bit_index = ? AND updated_at >= ?",
+            (state.round_num, state.bit_index, now, key, expected.round_num, expected.bit_index, cutoff),
+        )
+        if cur.rowcount != 1:
+            return None
+        self._after_advance(now)
+        return state
+
+    def _after_advance(self, now: float) -> None:
+        with self._lock:
+            self._advances += 1
+            due = self._advances % SQLITE_PRUNE_EVERY == 0
+        if due:
+            self.prune(now)
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Delete expired rows and those beyond max_sessions (least recently advanced first)."""
+        conn = self._conn()
+        if self.ttl > 0:
+            conn.execute("DELETE FROM agentmark_sessions WHERE updated_at < ?", (self._cutoff(now or time.time()),))
+        conn.execute(
+            "DELETE FROM agentmark_sessions WHERE key IN ("
+            "SELECT key FROM agentmark_sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+
+    def reset(self, key: str) -> None:
+        self._conn().execute("DELETE FROM agentmark_sessions WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    One Redis hash per session (fields "round", "bit") under `prefix`.
+
+    advance() is an optimistic WATCH/MULTI/EXEC transaction, which needs no
+    server-side scripting and therefore also runs against fakeredis.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        url: Optional[str] = None,
+        prefix: str = DEFAULT_REDIS_PREFIX,
+        ttl: Optional[float] = DEFAULT_SESSION_TTL,
+    ) -> None:
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("RedisSessionStore requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    @staticmethod
+    def _parse(values) -> SessionState:
+        round_num, bit_index = values
+        return SessionState(int(round_num or 0), int(bit_index or 0))
+
+    def load(self, key: str) -> SessionState:
+        return self._parse(self.client.hmget(self._key(key), "round", "bit"))
+
+    def advance(self, key: str, expected: SessionState, bits: int, rounds: int = 1) -> Optional[SessionState]:
+        from redis.exceptions import WatchError
+
+        name = self._key(key)
+        state = expected.advanced(bits, rounds)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(name)
+                if self._parse(pipe.hmget(name, "round", "bit")) != expected:
+                    pipe.unwatch()
+                    return None
+                pipe.multi()
+                pipe.hset(name, mapping={"round": state.round_num, "bit": state.bit_index})
+                if self.ttl:
+                    pipe.expire(name, max(1, int(self.ttl)))
+                pipe.execute()
+            except WatchError:
+                return None
+        return state
+
+    def reset(self, key: str) -> None:
+        self.client.delete(self._key(key))
+
+    def close(self) -> None:
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+
+def session_store_from_url(url: Optional[str]) -> SessionStore:
+    """
+    Build a store from a URL: "memory", "sqlite:///abs/path.db" / "sqlite:rel.db",
+    or "redis://..." / "rediss://..." / "unix://...".
+
+    AGENTMARK_SESSION_TTL and AGENTMARK_SESSION_MAX bound the sessions kept.
+    """
+    url = (url or "memory").strip()
+    ttl = float(os.getenv("AGENTMARK_SESSION_TTL", str(DEFAULT_SESSION_TTL)))
+    max_sessions = int(os.getenv("AGENTMARK_SESSION_MAX", str(DEFAULT_SESSION_MAX)))
+    if url == "memory":
+        return MemorySessionStore(max_sessions=max_sessions, ttl=ttl)
+    if url.startswith("sqlite:"):
+        path = url[len("sqlite:"):]
+        if path.startswith("///"):
+            path = path[2:]
+        elif path.startswith("//"):
+            path = path[2:]
+        if not path:
+            raise ValueError("sqlite session store needs a path, e.g. sqlite:///tmp/agentmark_sessions.db")
+        return SQLiteSessionStore(path, max_sessions=max_sessions, ttl=ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(
+            url=url,
+            prefix=os.getenv("AGENTMARK_SESSION_PREFIX", DEFAULT_REDIS_PREFIX),
+            ttl=ttl or None,
+        )
+    raise ValueError(f"Unknown session store: {url!r}")
+
+
+def session_store_from_env() -> SessionStore:
+    return session_store_from_url(os.getenv("AGENTMARK_SESSION_STORE"))
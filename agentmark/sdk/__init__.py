@@ -2,7 +2,7 @@
 SDK entrypoints for exposing AgentMark watermark algorithms to external agents.
 """
 
-from .watermarker import AgentWatermarker
+from .watermarker import AgentWatermarker, CompactSampleResult, WatermarkerState
 from .prompt_adapter import (
     PromptWatermarkWrapper,
     choose_action_from_prompt_output,
@@ -11,6 +11,8 @@ from .prompt_adapter import (
 
 __all__ = [
     "AgentWatermarker",
+    "CompactSampleResult",
+    "WatermarkerState",
     "PromptWatermarkWrapper",
     "choose_action_from_prompt_output",
     "get_prompt_instruction",
@@ -258,17 +258,24 @@ class PromptWatermarkWrapper:
         context: str = "",
         history: Optional[List[str]] = None,
         round_num: Optional[int] = None,
+        payload: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         Parse LLM output -> normalize probs -> watermark sampling.
 
-        Returns a dict with action, action_args (if provided), probabilities_used, frontend_data, raw_payload.
+        payload: Already-parsed JSON of raw_output (e.g. from a scoring cache); skips parsing.
+
+        Returns a dict with action, action_args (if provided), probabilities_used, frontend_data, raw_payload,
+        probability_source.
         """
-        payload = extract_json_payload(raw_output)
+        if payload is None:
+            payload = extract_json_payload(raw_output)
         weights = {}
         if isinstance(payload, dict):
             weights = payload.get("action_weights") or payload.get("action_probs") or payload.get("scores") or {}
 
+        # How the distribution was obtained: parsed | uniform_fallback | biased_uniform
+        source = "parsed" if isinstance(weights, dict) and weights else "uniform_fallback"
         probs: Dict[str, float] = {}
         if fallback_actions:
             try:
@@ -315,7 +322,10 @@ class PromptWatermarkWrapper:
                 probs = apply_temperature(probs, float(temp_env))
             except ValueError:
                 pass
-        probs = _maybe_bias_uniform(probs, fallback_actions)
+        biased = _maybe_bias_uniform(probs, fallback_actions)
+        if biased is not probs and source == "parsed":
+            source = "biased_uniform"
+        probs = biased
 
         res = self.wm.sample(probabilities=probs, context=context, history=history, round_num=round_num)
 
@@ -354,4 +364,5 @@ class PromptWatermarkWrapper:
             "probabilities_used": probs,
             "frontend_data": frontend_data,
             "raw_payload": payload,
+            "probability_source": source,
         }
@@ -11,21 +11,22 @@ Design goals:
 from __future__ import annotations
 
 import random
+import struct
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 import os
-import torch
 
+from agentmark.core.packed_bits import PackedBits
 from agentmark.core.watermark_sampler import (
     sample_behavior_differential,
     differential_based_decoder,
-    differential_based_recombination,
-    generate_contextual_key,
-    DRBG,
+    plan_differential_step,
+    resolve_sampler_backend,
 )
 
 
 DEFAULT_PAYLOAD_BITS = "11001101" * 8  # 64 bits fallback
+_DEFAULT_PAYLOAD = PackedBits.from_bits(DEFAULT_PAYLOAD_BITS)
 
 
 @dataclass
@@ -42,6 +43,87 @@ class WatermarkSampleResult:
     distribution_diff: List[Dict[str, Any]]
     is_mock: bool
 
+    def compact(self) -> "CompactSampleResult":
+        return CompactSampleResult(
+            self.action, self.bits_embedded, self.bit_index, self.payload_length,
+            self.context_used, self.round_num, self.is_mock,
+        )
+
+
+class CompactSampleResult:
+    """
+    Slotted sample() result without the visualization fields
+    (target_behaviors, distribution_diff); see sample(compact=True).
+    """
+
+    __slots__ = ("action", "bits_embedded", "bit_index", "payload_length", "context_used", "round_num", "is_mock")
+
+    def __init__(self, action, bits_embedded, bit_index, payload_length, context_used, round_num, is_mock):
+        self.action = action
+        self.bits_embedded = bits_embedded
+        self.bit_index = bit_index
+        self.payload_length = payload_length
+        self.context_used = context_used
+        self.round_num = round_num
+        self.is_mock = is_mock
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactSampleResult):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.__slots__)
+        return f"CompactSampleResult({fields})"
+
+
+class WatermarkerState:
+    """
+    Slotted watermarker state: bit-packed payload plus position (bit index, round).
+
+    to_bytes() is a fixed-size (SNAPSHOT_SIZE bytes) binary snapshot of the
+    position and a fingerprint of the payload; from_bytes()/load_bytes()
+    restore it and refuse a snapshot taken with a different payload. The
+    payload itself is configuration shared by every session, so it is not
+    copied into each snapshot.
+    """
+
+    __slots__ = ("payload", "bit_index", "round_num")
+
+    # magic, version, reserved, payload length (bits), bit_index, round_num, payload digest
+    _SNAPSHOT = struct.Struct("<4sB3xQQQ8s")
+    SNAPSHOT_SIZE = _SNAPSHOT.size
+    _MAGIC = b"AMWS"
+    _VERSION = 1
+
+    def __init__(self, payload: PackedBits, bit_index: int = 0, round_num: int = 0) -> None:
+        self.payload = payload
+        self.bit_index = bit_index
+        self.round_num = round_num
+
+    def to_bytes(self) -> bytes:
+        return self._SNAPSHOT.pack(
+            self._MAGIC, self._VERSION, len(self.payload), self.bit_index, self.round_num, self.payload.digest()
+        )
+
+    def load_bytes(self, data: bytes) -> None:
+        """Restore bit_index/round_num from to_bytes() output (payload must match)."""
+        if len(data) != self.SNAPSHOT_SIZE:
+            raise ValueError(f"watermarker snapshot must be {self.SNAPSHOT_SIZE} bytes, got {len(data)}")
+        magic, version, length, bit_index, round_num, digest = self._SNAPSHOT.unpack(data)
+        if magic != self._MAGIC or version != self._VERSION:
+            raise ValueError("not a watermarker snapshot (bad magic or version)")
+        if length != len(self.payload) or digest != self.payload.digest():
+            raise ValueError("watermarker snapshot was taken with a different payload")
+        self.bit_index = bit_index
+        self.round_num = round_num
+
+    @classmethod
+    def from_bytes(cls, data: bytes, payload: PackedBits) -> "WatermarkerState":
+        state = cls(payload)
+        state.load_bytes(data)
+        return state
+
 
 class AgentWatermarker:
     """
@@ -53,28 +135,34 @@ class AgentWatermarker:
         decoded_bits = wm.decode(probabilities, action, context="task||step")
     """
 
+    __slots__ = ("_state", "mock", "algorithm", "backend")
+
     def __init__(
         self,
-        payload_bits: Optional[str] = None,
+        payload_bits: Optional[Union[str, PackedBits]] = None,
         payload_text: Optional[str] = None,
         *,
         mock: bool = False,
         algorithm: str = "differential",
+        backend: Optional[str] = None,
     ) -> None:
         if payload_bits and payload_text:
             raise ValueError("Specify either payload_bits or payload_text, not both.")
 
-        if payload_bits:
-            self._bit_stream = self._validate_bits(payload_bits)
+        if isinstance(payload_bits, PackedBits) and len(payload_bits):
+            payload = payload_bits
+        elif payload_bits:
+            payload = PackedBits.from_bits(self._validate_bits(payload_bits))
         elif payload_text:
-            self._bit_stream = self._text_to_bits(payload_text)
+            payload = PackedBits.from_bits(self._text_to_bits(payload_text))
         else:
-            self._bit_stream = DEFAULT_PAYLOAD_BITS
+            payload = _DEFAULT_PAYLOAD
 
-        self._bit_index = 0
-        self._round_num = 0
+        self._state = WatermarkerState(payload)
         self.mock = mock
         self.algorithm = algorithm
+        # "torch" or "numpy" differential engine; None defers to AGENTMARK_SAMPLER_BACKEND.
+        self.backend = resolve_sampler_backend(backend)
 
     # ------------------------------------------------------------------ #
     # Public API
@@ -86,7 +174,8 @@ class AgentWatermarker:
         context: str = "",
         history: Optional[List[str]] = None,
         round_num: Optional[int] = None,
-    ) -> WatermarkSampleResult:
+        compact: bool = False,
+    ) -> Union[WatermarkSampleResult, CompactSampleResult]:
         """
         Watermarked sampling.
 
@@ -95,22 +184,26 @@ class AgentWatermarker:
             context: Explicit context string for key generation.
             history: Optional history fallback if context is empty.
             round_num: Override internal round counter.
+            compact: Return a CompactSampleResult and skip building distribution_diff.
 
         Returns:
-            WatermarkSampleResult
+            WatermarkSampleResult (CompactSampleResult if compact)
         """
         probs_norm = self._normalize_probabilities(probabilities)
         actions = list(probs_norm.keys())
-        round_used = self._round_num if round_num is None else round_num
+        state = self._state
+        round_used = state.round_num if round_num is None else round_num
 
         if self.mock:
             chosen = random.choices(actions, weights=list(probs_norm.values()))[0]
+            if compact:
+                return CompactSampleResult(chosen, 0, state.bit_index, len(state.payload), context, round_used, True)
             distribution_diff = self._mock_distribution_diff(probs_norm, chosen)
             return WatermarkSampleResult(
                 action=chosen,
                 bits_embedded=0,
-                bit_index=self._bit_index,
-                payload_length=len(self._bit_stream),
+                bit_index=state.bit_index,
+                payload_length=len(state.payload),
                 context_used=context,
                 round_num=round_used,
                 target_behaviors=[chosen],
@@ -121,15 +214,21 @@ class AgentWatermarker:
         # --- Real sampling via core algorithm ---
         selected_action, target_list, bits_cnt, context_used = sample_behavior_differential(
             probabilities=probs_norm,
-            bit_stream=self._bit_stream,
-            bit_index=self._bit_index,
+            bit_stream=state.payload,
+            bit_index=state.bit_index,
             context_for_key=context or None,
             history_responses=history,
             round_num=round_used,
+            backend=self.backend,
         )
 
-        self._bit_index += bits_cnt
-        self._round_num = round_used + 1
+        state.bit_index += bits_cnt
+        state.round_num = round_used + 1
+
+        if compact:
+            return CompactSampleResult(
+                selected_action, bits_cnt, state.bit_index, len(state.payload), context_used, round_used, False
+            )
 
         distribution_diff = self._build_distribution_diff(
             probs_norm, context_used, round_used, target_list, selected_action
@@ -138,8 +237,8 @@ class AgentWatermarker:
         return WatermarkSampleResult(
             action=selected_action,
             bits_embedded=bits_cnt,
-            bit_index=self._bit_index,
-            payload_length=len(self._bit_stream),
+            bit_index=state.bit_index,
+            payload_length=len(state.payload),
             context_used=context_used,
             round_num=round_used,
             target_behaviors=target_list,
@@ -160,7 +259,7 @@ class AgentWatermarker:
         Decode bits from a selected action given the same probabilities and context.
         """
         probs_norm = self._normalize_probabilities(probabilities)
-        round_used = self._round_num if round_num is None else round_num
+        round_used = self._state.round_num if round_num is None else round_num
 
         return differential_based_decoder(
             probabilities=probs_norm,
@@ -168,20 +267,46 @@ class AgentWatermarker:
             context_for_key=context or None,
             history_responses=history,
             round_num=round_used,
+            backend=self.backend,
         )
 
     def reset(self) -> None:
         """Reset internal bit index and round counter."""
-        self._bit_index = 0
-        self._round_num = 0
+        self._state.bit_index = 0
+        self._state.round_num = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        """Position in the payload stream, for persisting state outside the process."""
+        return {"bit_index": self._state.bit_index, "round_num": self._state.round_num}
+
+    def restore(self, state: Dict[str, int]) -> None:
+        """Resume from a snapshot() (e.g. loaded from a session store)."""
+        self._state.bit_index = int(state.get("bit_index", 0))
+        self._state.round_num = int(state.get("round_num", 0))
+
+    def snapshot_bytes(self) -> bytes:
+        """Fixed-size binary snapshot (WatermarkerState.SNAPSHOT_SIZE bytes)."""
+        return self._state.to_bytes()
+
+    def restore_bytes(self, data: bytes) -> None:
+        """Resume from snapshot_bytes(); raises ValueError if the payload differs."""
+        self._state.load_bytes(data)
+
+    @property
+    def state(self) -> WatermarkerState:
+        return self._state
+
+    @property
+    def payload(self) -> PackedBits:
+        return self._state.payload
 
     @property
     def current_round(self) -> int:
-        return self._round_num
+        return self._state.round_num
 
     @property
     def current_bit_index(self) -> int:
-        return self._bit_index
+        return self._state.bit_index
 
     # ------------------------------------------------------------------ #
     # Internal helpers
@@ -234,20 +359,13 @@ class AgentWatermarker:
         Reconstruct the bin selection and approximate watermarked distribution
         for visualization/logging. This mirrors the encoder's bin selection:
         - Uses the same context -> key/nonce
-        - Recomputes recombination and bin choice
+        - Reuses the step plan (recombination and bin choice) cached by the encoder
         - Distributes the bin mass uniformly across its members for display
         """
-        behaviors = sorted(probs_norm.keys())
-        probs_list = [probs_norm[b] for b in behaviors]
-        device = "cpu"
-        probs_tensor = torch.tensor(probs_list, dtype=torch.float32, device=device)
-        indices_tensor = torch.arange(len(behaviors), device=device)
-
-        indices_nonzero, bins, prob_new = differential_based_recombination(
-            probs_tensor, indices_tensor
-        )
+        plan = plan_differential_step(probs_norm, context_used, round_used, self.backend)
+        behaviors = plan.behaviors
 
-        if prob_new.sum() == 0:
+        if plan.degenerate:
             # Degenerate case: return original distribution
             return [
                 {
@@ -260,24 +378,15 @@ class AgentWatermarker:
                 for b in behaviors
             ]
 
-        prob_new = prob_new / prob_new.sum()
-
-        key = generate_contextual_key([context_used])
-        nonce = str(round_used).encode("utf-8")
-        prg = DRBG(key, nonce)
-
-        random_p = prg.generate_random(n=52)
-        cdf = torch.cumsum(prob_new, dim=0)
-        bin_indice_idx = torch.searchsorted(cdf, random_p).item()
-        bin_indice_idx = min(bin_indice_idx, len(bins) - 1)
+        bin_indice_idx = min(plan.bin_indice_idx, len(plan.bins) - 1)
 
-        selected_bin_start_index = bins[bin_indice_idx]
-        bin_content_indices = indices_nonzero[selected_bin_start_index:]
+        selected_bin_start_index = plan.bins[bin_indice_idx]
+        bin_content_indices = plan.indices_nonzero[selected_bin_start_index:]
 
         # Watermarked per-action mass for the selected bin only.
         # This reflects the conditional distribution after bin selection.
         watermarked = {b: 0.0 for b in behaviors}
-        bin_mass = float(prob_new[bin_indice_idx].item())
+        bin_mass = float(plan.prob_new[bin_indice_idx])
         share = bin_mass / len(bin_content_indices) if len(bin_content_indices) > 0 else 0.0
         for idx in bin_content_indices:
             watermarked[behaviors[int(idx)]] = share
@@ -0,0 +1,82 @@
+"""
+Chat prompt assembly for dashboard agents.
+
+Each AgentState keeps a PromptBuffer: the chat messages of its trajectory,
+built append-only, with the token count of every message computed once when
+it is added. A step converts only the trajectory turns added since the
+previous step. The system prompt is rebuilt only when the task query or the
+episode's tools change (/api/continue swaps them). A trajectory that is
+replaced or shrinks (session restore) is rebuilt in full.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from dashboard.server.utils.tokens import REPLY_PRIMING_TOKENS, count_message_tokens
+
+
+def build_messages(query: str, tool_summaries: List[str], admissible_commands: List[str]) -> List[Dict]:
+    # Construct System Prompt compatible with ToolBench
+    sys_prompt = f"""You are an Auto-GPT agent. Result of your previous step is passed to you.
+You have access to the following tools:
+{json.dumps(tool_summaries, indent=2)}
+
+You must respond in JSON format with 'thought', 'action', 'action_args', and 'action_weights'.
+'action_weights' must be a JSON object mapping EVERY valid action to a STRICTLY POSITIVE number (> 0, not necessarily normalized; the server will normalize them to sum to 1).
+IMPORTANT: Do NOT output zeros. Every valid action must have weight > 0 (use small values like 1e-3 if needed).
+Valid actions are: {json.dumps(admissible_commands)}
+If you have enough information, use "Finish" and provide the final answer in "action_args" as {{"final_answer": "your answer"}}.
+"""
+    return [
+        {"role": "system", "content": sys_prompt},
+        {"role": "user", "content": f"Task: {query}\nBegin!"}
+    ]
+
+
+def turn_message(turn: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """The chat message for one trajectory turn (None for roles the prompt skips)."""
+    if turn["role"] == "assistant":
+        return {"role": "assistant", "content": turn["message"]}
+    if turn["role"] == "tool":
+        return {"role": "user", "content": f"Observation:\n{turn['message']}\nContinue Thought/Action/Action Input."}
+    if turn["role"] == "user":
+        return {"role": "user", "content": turn["message"]}
+    return None
+
+
+class PromptBuffer:
+    """Append-only chat messages of one agent, with running token counts."""
+
+    def __init__(self) -> None:
+        self._header: List[Dict[str, str]] = []
+        self._header_tokens = 0.0
+        self._header_key: Optional[tuple] = None
+        self._body: List[Dict[str, str]] = []
+        self._body_tokens = 0.0
+        self._trajectory: Optional[List[Dict[str, Any]]] = None
+        self._consumed = 0  # trajectory turns already in _body
+
+    @property
+    def prompt_tokens(self) -> float:
+        """Tokens of the messages from the last sync(), including reply priming."""
+        return self._header_tokens + self._body_tokens + REPLY_PRIMING_TOKENS
+
+    def sync(self, query: str, episode: Dict[str, Any], trajectory: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Bring the buffer up to date and return the messages for the next LLM call."""
+        tool_summaries, admissible_commands = episode["tool_summaries"], episode["admissible_commands"]
+        key = self._header_key
+        # identity, not equality: the episode's lists are replaced, not edited, when tools change
+        if key is None or key[0] != query or key[1] is not tool_summaries or key[2] is not admissible_commands:
+            self._header = build_messages(query, tool_summaries, admissible_commands)
+            self._header_tokens = sum(count_message_tokens(m) for m in self._header)
+            self._header_key = (query, tool_summaries, admissible_commands)
+
+        if trajectory is not self._trajectory or len(trajectory) < self._consumed:
+            self._body, self._body_tokens = [], 0.0
+            self._trajectory, self._consumed = trajectory, 0
+        for turn in trajectory[self._consumed:]:
+            message = turn_message(turn)
+            if message is not None:
+                self._body.append(message)
+                self._body_tokens += count_message_tokens(message)
+        self._consumed = len(trajectory)
+        return self._header + self._body
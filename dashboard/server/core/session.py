@@ -5,7 +5,8 @@ from openai import OpenAI, AsyncOpenAI
 import sys
 
 from dashboard.server.utils.config import SWARM_ROOT, TOOL_DATA_ROOT
-from agentmark.core.rlnc_codec import DeterministicRLNC
+from dashboard.server.core.prompt import PromptBuffer
+from agentmark.core.rlnc_codec import DeterministicRLNC, StreamingRLNCDecoder
 from agentmark.environments.toolbench.adapter import ToolBenchAdapter
 
 # --- AgentState ---
@@ -22,6 +23,7 @@ class AgentState:
         
         # Execution History
         self.trajectory = [] # List of {role, message}
+        self.prompt = PromptBuffer() # Chat messages of the trajectory, built incrementally
         self.swarm_history: List[Dict[str, Any]] = []
         self.step_count = 0
         self.last_observation = ""
@@ -46,6 +48,9 @@ class Session:
         # Initialize RLNC
         self.rlnc = DeterministicRLNC(self.bit_stream_str_raw)
         self.bit_index = 0
+        # Receiver-side view of the embedded packets (live rank / recovery step)
+        self.rlnc_decoder = StreamingRLNCDecoder(self.rlnc)
+        self.payload_recovered_step: Optional[int] = None
         
         # LLM Client
         self.client = OpenAI(
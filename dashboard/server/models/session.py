@@ -11,7 +11,7 @@ from dashboard.server.utils.config import PROJECT_ROOT, TOOL_DATA_ROOT, get_base
 # Import RLNC for watermark encoding
 import sys
 sys.path.append(str(PROJECT_ROOT))
-from agentmark.core.rlnc_codec import DeterministicRLNC
+from agentmark.core.rlnc_codec import DeterministicRLNC, StreamingRLNCDecoder
 from agentmark.environments.toolbench.adapter import ToolBenchAdapter
 
 
@@ -51,6 +51,9 @@ class Session:
         # Initialize RLNC
         self.rlnc = DeterministicRLNC(self.bit_stream_str_raw)
         self.bit_index = 0
+        # Receiver-side view of the embedded packets (live rank / recovery step)
+        self.rlnc_decoder = StreamingRLNCDecoder(self.rlnc)
+        self.payload_recovered_step: Optional[int] = None
         
         # LLM Client
         base_url = get_base_llm_base()
@@ -1,26 +1,82 @@
-import json
 import os
+import threading
 import time
+import unicodedata
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+from dashboard.server.tool_corpus import (
+    COMPACT_RATIO,
+    CorpusManifest,
+    parse_tool_files,
+    scan_tool_files,
+)
+from dashboard.server.vector_index import (
+    DocumentTable,
+    VectorIndex,
+    build_index,
+    index_meta,
+    index_settings_from_env,
+    load_index,
+    save_index,
+)
 
 try:
-    from sentence_transformers import SentenceTransformer, util
-    import torch
+    from sentence_transformers import SentenceTransformer
 except ImportError:
     print("[WARN] sentence-transformers not found. Retrieval will fail.")
     SentenceTransformer = None
 
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# On-disk index (memory-mapped embeddings + document table) inside data_root;
+# the legacy single-file torch cache is migrated to it on first load.
+INDEX_DIR_NAME = "retriever_index"
+LEGACY_CACHE_NAME = "retriever_cache.pt"
+# texts per model.encode() call while (re)indexing; bounds memory and paces progress logs
+ENCODE_CHUNK_SIZE = 4096
+# query embeddings kept in the LRU cache (AGENTMARK_RETRIEVER_QUERY_CACHE, 0 disables it)
+DEFAULT_QUERY_CACHE_SIZE = 1024
+
+
+def normalize_query(query: str) -> str:
+    """Cache key and encoder input: NFKC, whitespace runs collapsed, trimmed."""
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
 class ToolBenchRetriever:
     """
     Retriever for ToolBench APIs using SentenceTransformers.
     Indexes tool descriptions from the file system and performs semantic search.
+
+    Corpus embeddings live in a pluggable VectorIndex (exact or IVF, float32 /
+    float16 / int8 storage; see dashboard/server/vector_index.py), selected by
+    the index_kind/dtype/nprobe arguments or AGENTMARK_RETRIEVER_INDEX / _DTYPE / _NPROBE.
+    Re-indexing is incremental: only new or changed tool files are parsed and
+    encoded (see dashboard/server/tool_corpus.py).
+
+    Query embeddings are cached (LRU, keyed by normalize_query(), and
+    lowercased too when the model's tokenizer lowercases). retrieve_many()
+    encodes all cache misses in one batch and searches with one matrix top-k.
+    Retrieval is thread-safe, so async handlers can run it in a worker thread.
     """
     def __init__(
         self, 
         data_root: str, 
         model_path: str = "ToolBench/ToolBench_IR_bert_based_uncased",
-        device: str = None
+        device: str = None,
+        index_kind: Optional[str] = None,
+        dtype: Optional[str] = None,
+        nprobe: Optional[int] = None,
+        workers: Optional[int] = None,
+        encode_batch_size: int = 64,
+        query_cache_size: Optional[int] = None,
     ):
         self.data_root = Path(data_root)
         self.model_path = model_path
@@ -28,11 +84,27 @@ class ToolBenchRetriever:
         if device:
             self.device = device
         else:
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.device = "cuda" if torch is not None and torch.cuda.is_available() else "cpu"
             print(f"[INFO] Using device: {self.device}")
         self.model = None
-        self.corpus_embeddings = None
-        self.documents: List[Dict] = []
+        env_kind, env_dtype, env_nprobe = index_settings_from_env()
+        self.index_kind = index_kind or env_kind
+        self.dtype = dtype or env_dtype
+        self.nprobe = nprobe or env_nprobe
+        self.workers = workers
+        self.encode_batch_size = encode_batch_size
+        if query_cache_size is None:
+            query_cache_size = int(os.getenv("AGENTMARK_RETRIEVER_QUERY_CACHE") or DEFAULT_QUERY_CACHE_SIZE)
+        self.query_cache_size = max(0, query_cache_size)
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+        self.index: Optional[VectorIndex] = None
+        # list of dicts while indexing; a memory-mapped DocumentTable once saved/loaded
+        self.documents = []
+        # per-file state of the saved index; None until one is loaded or written
+        self.manifest: Optional[CorpusManifest] = None
         
         print(f"[INFO] Initializing ToolBenchRetriever with data_root={self.data_root}")
         
@@ -51,163 +123,348 @@ class ToolBenchRetriever:
                 except Exception as e2:
                     print(f"[ERROR] Fallback failed: {e2}")
 
-    def index_tools(self):
-        """Walk the data_root and index all tool APIs."""
+    def index_tools(self, refresh: bool = True):
+        """
+        Load the saved index and bring it up to date with the tool files under
+        data_root. With refresh=False a loaded index is used as it is.
+        """
         if not self.data_root.exists():
             print(f"[ERROR] Data root {self.data_root} does not exist.")
             return
 
-        # Try loading from cache first
-        # Cache file relative to data root or project root? 
-        # Let's verify if data root is writable or put it in a known cache dir.
-        # For simple usage, put it alongside the script or in data dir.
-        cache_file = self.data_root / "retriever_cache.pt"
-        if self.load_cache(str(cache_file)):
+        # The index directory lives inside data_root (alongside the category folders);
+        # a downloaded legacy retriever_cache.pt is migrated on the first run.
+        loaded = self.load_cache(str(self.data_root / INDEX_DIR_NAME))
+        if not loaded:
+            legacy_cache = self.data_root / LEGACY_CACHE_NAME
+            loaded = legacy_cache.exists() and self.load_cache(str(legacy_cache))
+        if loaded and not refresh:
             return
+        self.update_index()
 
-        print("[INFO] Indexing tools... this may take a moment.")
+    def update_index(self) -> Dict[str, int]:
+        """
+        Re-index only what changed on disk since the manifest was written, then
+        save. Returns counts of files and rows touched by this refresh.
+        """
         start_time = time.time()
-        
+        index_dir = self.data_root / INDEX_DIR_NAME
+        manifest = self.manifest
+        if manifest is None or manifest.count != len(self.documents):
+            # no usable manifest (first build, legacy cache): every file is new, and
+            # vectors of loaded rows are still reused by text below
+            manifest = CorpusManifest(self.model_path)
+
+        scanned = scan_tool_files(self.data_root, skip={INDEX_DIR_NAME}, workers=self.workers)
+        candidates, removed = manifest.diff(scanned)
+        stats = {"files": len(scanned), "parsed": len(candidates), "touched": 0, "changed": 0,
+                 "removed": len(removed), "encoded": 0, "reused": 0, "tombstoned": 0}
+
+        changed = []
+        for tool_file, parsed in zip(candidates, parse_tool_files(self.data_root, candidates, self.workers)):
+            if parsed.error:
+                print(f"[WARN] Failed to parse {tool_file.path}: {parsed.error}")
+                if not parsed.digest:
+                    continue  # unreadable: keep its old rows, retry next refresh
+            entry = manifest.files.get(tool_file.path)
+            if entry is not None and entry["hash"] == parsed.digest:
+                entry.update(mtime_ns=tool_file.mtime_ns, size=tool_file.size)
+                stats["touched"] += 1
+            else:
+                changed.append((tool_file, parsed))
+
+        # vectors for the new rows: reuse a live row with the same text, encode the rest
+        texts = {doc["text"] for _, parsed in changed for doc in parsed.documents}
+        reuse = self._rows_by_text(texts) if texts else {}
+        missing = sorted(texts - reuse.keys())
+        encoded = self._encode(missing) if missing else {}
+        if encoded is None:
+            # no model: files with unseen texts stay as they were and are retried next refresh
+            changed = [(f, p) for f, p in changed if all(d["text"] in reuse for d in p.documents)]
+            encoded = {}
+
+        n_old = len(self.documents)
+        added_docs: List[Dict] = []
+        for tool_file, parsed in changed:
+            rows = list(range(n_old + len(added_docs), n_old + len(added_docs) + len(parsed.documents)))
+            manifest.files[tool_file.path] = {
+                "mtime_ns": tool_file.mtime_ns, "size": tool_file.size, "hash": parsed.digest, "rows": rows,
+            }
+            added_docs.extend(parsed.documents)
+        for path in removed:
+            del manifest.files[path]
+        stats["changed"] = len(changed)
+        stats["encoded"] = len(encoded)
+        stats["reused"] = sum(1 for d in added_docs if d["text"] not in encoded)
+
+        # every old live row no file claims any more (changed, deleted, or never in the manifest)
+        referenced = np.zeros(n_old, dtype=bool)
+        claimed = np.asarray([r for r in manifest.referenced_rows() if r < n_old], dtype=np.int64)
+        referenced[claimed] = True
+        live = self.index.live_rows() if self.index is not None else np.zeros(0, dtype=np.int64)
+        orphans = live[~referenced[live]]
+        stats["tombstoned"] = len(orphans)
+
+        if not (added_docs or len(orphans) or stats["touched"] or removed) and self.manifest is not None:
+            print(f"[INFO] Retriever index up to date ({len(scanned)} tool files, {time.time() - start_time:.2f}s)")
+            return stats
+
+        if added_docs:
+            vectors = np.stack(self._vectors_for(added_docs, reuse, encoded))
+            self.index = self.index.append(vectors) if self.index is not None else self._build_index(vectors)
+        if self.index is None:
+            print("[WARN] No tool APIs indexed.")
+            return stats
+        self.index.tombstone(orphans)
+        self._save_incremental(index_dir, manifest, added_docs)
+        print(
+            f"[INFO] Retriever index refreshed in {time.time() - start_time:.2f}s: {stats['changed']} files changed, "
+            f"{stats['removed']} removed, {stats['encoded']} texts encoded, {stats['reused']} reused, "
+            f"{stats['tombstoned']} rows tombstoned; {len(self.documents)} documents"
+        )
+        return stats
+
+    def _rows_by_text(self, texts) -> Dict[str, int]:
+        """Live corpus rows whose document text is in `texts` (text -> row)."""
+        found: Dict[str, int] = {}
+        if self.index is None:
+            return found
+        for row in self.index.live_rows():
+            text = self.documents[int(row)]["text"]
+            if text in texts:
+                found.setdefault(text, int(row))
+        return found
+
+    def _vectors_for(self, documents, reuse: Dict[str, int], encoded: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        reused_rows = sorted({reuse[d["text"]] for d in documents if d["text"] not in encoded})
+        reused = dict(zip(reused_rows, self.index.rows(reused_rows))) if reused_rows else {}
+        return [encoded[d["text"]] if d["text"] in encoded else reused[reuse[d["text"]]] for d in documents]
+
+    def _encode(self, texts: List[str]) -> Optional[Dict[str, np.ndarray]]:
+        """Unit-norm embeddings of texts, batched; None when no model is available."""
+        if not self.model:
+            self.load_model()
+        if not self.model:
+            print(f"[WARN] No embedding model: {len(texts)} new API texts left unindexed.")
+            return None
+        print(f"[INFO] Encoding {len(texts)} API texts...")
+        out: Dict[str, np.ndarray] = {}
+        for start in range(0, len(texts), ENCODE_CHUNK_SIZE):
+            chunk = texts[start : start + ENCODE_CHUNK_SIZE]
+            vectors = self.model.encode(
+                chunk, batch_size=self.encode_batch_size, convert_to_numpy=True,
+                normalize_embeddings=True, show_progress_bar=len(texts) > ENCODE_CHUNK_SIZE,
+            )
+            if self.index is not None and vectors.shape[1] != self.index.dim:
+                print(f"[ERROR] Model {self.model_path} gives {vectors.shape[1]}-d embeddings, index has {self.index.dim}-d.")
+                return None
+            out.update(zip(chunk, np.asarray(vectors, dtype=np.float32)))
+        print("[INFO] Encoding complete.")
+        return out
+
+    def _save_incremental(self, index_dir: Path, manifest: CorpusManifest, added_docs: List[Dict]) -> None:
+        """Persist an update: append to the saved table, or compact when tombstones pile up."""
+        n_old = len(self.documents)
+
+        def document(row: int) -> Dict:
+            return self.documents[row] if row < n_old else added_docs[row - n_old]
+
+        if self.index.deleted_count > COMPACT_RATIO * len(self.index):
+            live = self.index.live_rows()
+            print(f"[INFO] Compacting retriever index: {len(self.index)} -> {len(live)} rows")
+            new_ids = np.full(len(self.index), -1, dtype=np.int64)
+            new_ids[live] = np.arange(len(live))
+            manifest.remap(new_ids)
+            documents = [document(int(row)) for row in live]
+            self.index = self._build_index(self.index.rows(live))
+            self._close_documents()
+            DocumentTable.write(index_dir, documents)
+        elif isinstance(self.documents, DocumentTable) and self.documents.directory == index_dir:
+            DocumentTable.append(index_dir, added_docs)
+        else:
+            documents = [document(row) for row in range(n_old + len(added_docs))]
+            self._close_documents()
+            DocumentTable.write(index_dir, documents)
+        save_index(self.index, index_dir, {"model_path": self.model_path})
+        manifest.count = len(self.index)
+        manifest.save(index_dir)
+        # reopen memory-mapped
+        self._close_documents()
+        self.index = load_index(index_dir, nprobe=self.nprobe)
+        self.documents = DocumentTable(index_dir)
+        self.manifest = manifest
+
+    def _close_documents(self) -> None:
+        if isinstance(self.documents, DocumentTable):
+            self.documents.close()
         self.documents = []
-        
-        # Traverse categories
-        for category_dir in self.data_root.iterdir():
-            if not category_dir.is_dir():
-                continue
-            
-            category_name = category_dir.name
-            
-            # Traverse tool files (json)
-            for tool_file in category_dir.glob("*.json"):
-                try:
-                    content = tool_file.read_text(encoding='utf-8')
-                    data = json.loads(content)
-                    
-                    # ToolBench JSON could be a dict (single tool info) or list (multiple apis)
-                    # Based on observation, it seems to be an object with tool_name and api_list, 
-                    # OR a list of API objects directly? 
-                    # Let's inspect the vortex.json output we saw: 
-                    # { "tool_name": "...", "api_list": [ ... ] }
-                    # Wait, the `cat` output showed:
-                    # { "tool_name": "vortex", ... "api_list": [ { "name": "get...", "description": "..." } ] }
-                    
-                    tool_name = data.get("tool_name", tool_file.stem)
-                    apis = data.get("api_list", [])
-                    
-                    if not apis and isinstance(data, list):
-                         # Some files might be just a list of endpoints? 
-                         # Usually standard format is object with api_list.
-                         apis = data 
-
-                    for api in apis:
-                        api_name = api.get("name", "unknown")
-                        description = api.get("description", "").strip()
-                        
-                        # Construct a "document" for retrieval
-                        # Format commonly used: "Category: ... Tool: ... API: ... Description: ..."
-                        doc_text = f"Category: {category_name}, Tool: {tool_name}, API: {api_name}, Description: {description}"
-                        
-                        self.documents.append({
-                            "text": doc_text,
-                            "category_name": category_name,
-                            "tool_name": tool_name,
-                            "api_name": api_name,
-                            "api_description": description,
-                            "raw_data": api # Keep raw data to return
-                        })
-                        
-                except Exception as e:
-                    print(f"[WARN] Failed to parse {tool_file}: {e}")
-                    continue
-                    
-        print(f"[INFO] Indexed {len(self.documents)} APIs in {time.time() - start_time:.2f}s")
-        
-        # Pre-compute embeddings
-        if self.model and self.documents:
-            print("[INFO] Encoding corpus...")
-            sentences = [d["text"] for d in self.documents]
-            self.corpus_embeddings = self.model.encode(sentences, convert_to_tensor=True, show_progress_bar=True)
-            print("[INFO] Encoding complete.")
-            
-            # Save to cache
-            cache_file = self.data_root / "retriever_cache.pt"
-            self.save_cache(str(cache_file))
 
     def retrieve(self, query: str, top_k: int = 5) -> List[Dict]:
         """
         Retrieve top_k APIs semanticallly relevant to the query.
         Returns a list of API definition dicts (compatible with ToolBench task format).
         """
+        return self.retrieve_many([query], top_k=top_k)[0]
+
+    def retrieve_many(self, queries: Sequence[str], top_k: int = 5) -> List[List[Dict]]:
+        """
+        retrieve() for several queries at once: cache misses are encoded in one
+        batch and all queries are searched with one matrix top-k.
+        """
         if not self.model:
             self.load_model()
             
-        if self.corpus_embeddings is None and self.model:
+        if self.index is None and self.model:
             self.index_tools()
             
-        if not self.model or self.corpus_embeddings is None:
-            return []
+        if not queries or not self.model or self.index is None or len(self.index) == 0:
+            return [[] for _ in queries]
             
-        # Encode query
-        query_embedding = self.model.encode(query, convert_to_tensor=True)
+        # Query embeddings (unit norm: inner product == cosine similarity)
+        query_embeddings = self.encode_queries(queries)
+        scores, ids = self.index.search(query_embeddings, top_k)
         
-        # Cosine similarity
-        cos_scores = util.cos_sim(query_embedding, self.corpus_embeddings)[0]
-        top_results = torch.topk(cos_scores, k=min(top_k, len(self.documents)))
-        
-        retrieved_apis = []
-        
-        print(f"[INFO] Retrieval results for '{query}':")
-        for score, idx in zip(top_results.values, top_results.indices):
-            doc = self.documents[idx]
-            print(f"  - [{score:.4f}] {doc['tool_name']}/{doc['api_name']}")
-            
-            # Format as expected by ToolBenchAdapter/Task
-            # The task needs 'api_list' containing objects with:
-            # category_name, tool_name, api_name, api_description, etc.
-            
-            api_obj = doc["raw_data"].copy()
-            api_obj["category_name"] = doc["category_name"]
-            api_obj["tool_name"] = doc["tool_name"]
-            api_obj["api_name"] = doc["api_name"]
-            api_obj["api_description"] = doc["api_description"]
-            # api_obj might already have 'name' which is the api name. 
-            # Adapter expects 'api_name' key specifically sometimes, or uses 'name'.
-            # Adapter logic: 
-            # raw_tool_name = api.get("tool_name", "UnknownTool")
-            # api_name = api.get("api_name", f"api_{idx}")
-            
-            retrieved_apis.append(api_obj)
-            
-        return retrieved_apis
+        results = []
+        for query, row_scores, row_ids in zip(queries, scores, ids):
+            retrieved_apis = []
+            print(f"[INFO] Retrieval results for '{query}':")
+            for score, idx in zip(row_scores, row_ids):
+                if idx < 0:
+                    continue
+                doc = self.documents[int(idx)]
+                print(f"  - [{score:.4f}] {doc['tool_name']}/{doc['api_name']}")
+                retrieved_apis.append(self._api_object(doc))
+            results.append(retrieved_apis)
+        return results
+
+    def encode_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Unit-norm float32 embeddings (len(queries), dim), served from the LRU cache where possible."""
+        keys = [self._query_key(q) for q in queries]
+        found: Dict[str, np.ndarray] = {}
+        with self._query_cache_lock:
+            for key in keys:
+                vector = self._query_cache.get(key)
+                if vector is not None:
+                    self._query_cache.move_to_end(key)
+                    found[key] = vector
+            self.query_cache_hits += sum(1 for key in keys if key in found)
+        misses = list(dict.fromkeys(key for key in keys if key not in found))
+        if misses:
+            vectors = self.model.encode(
+                misses, batch_size=self.encode_batch_size, convert_to_numpy=True, normalize_embeddings=True
+            )
+            found.update(zip(misses, np.asarray(vectors, dtype=np.float32)))
+            with self._query_cache_lock:
+                self.query_cache_misses += len(misses)
+                if self.query_cache_size:
+                    for key in misses:
+                        self._query_cache[key] = found[key]
+                        self._query_cache.move_to_end(key)
+                    while len(self._query_cache) > self.query_cache_size:
+                        self._query_cache.popitem(last=False)
+        return np.stack([found[key] for key in keys])
 
-    def save_cache(self, cache_path: str = "toolbench_retriever_cache.pt"):
-        """Save the current index and embeddings to disk."""
-        if not self.documents or self.corpus_embeddings is None:
+    def _query_key(self, query: str) -> str:
+        key = normalize_query(query)
+        # an uncased model (the default ToolBench one) embeds "Weather" and "weather" alike
+        if getattr(getattr(self.model, "tokenizer", None), "do_lower_case", False):
+            key = key.lower()
+        return key
+
+    @staticmethod
+    def _api_object(doc: Dict) -> Dict:
+        # Format as expected by ToolBenchAdapter/Task
+        # The task needs 'api_list' containing objects with:
+        # category_name, tool_name, api_name, api_description, etc.
+        api_obj = doc["raw_data"].copy()
+        api_obj["category_name"] = doc["category_name"]
+        api_obj["tool_name"] = doc["tool_name"]
+        api_obj["api_name"] = doc["api_name"]
+        api_obj["api_description"] = doc["api_description"]
+        # api_obj might already have 'name' which is the api name. 
+        # Adapter expects 'api_name' key specifically sometimes, or uses 'name'.
+        # Adapter logic: 
+        # raw_tool_name = api.get("tool_name", "UnknownTool")
+        # api_name = api.get("api_name", f"api_{idx}")
+        return api_obj
+
+    def _build_index(self, embeddings) -> VectorIndex:
+        start_time = time.time()
+        index = build_index(embeddings, self.index_kind, self.dtype, **(
+            {"nprobe": self.nprobe} if self.index_kind == "ivf" else {}
+        ))
+        print(
+            f"[INFO] Built {index.kind}/{index.dtype} index over {len(index)} rows "
+            f"({index.nbytes / 1e6:.1f} MB) in {time.time() - start_time:.2f}s"
+        )
+        return index
+
+    def save_cache(self, cache_path: str = INDEX_DIR_NAME):
+        """Save the index (memory-mappable .npy files) and document table to a directory."""
+        if not len(self.documents) or self.index is None:
             print("[WARN] Nothing to save.")
             return
             
         print(f"[INFO] Saving cache to {cache_path}...")
-        cache_data = {
-            "documents": self.documents,
-            "embeddings": self.corpus_embeddings
-        }
         try:
-            torch.save(cache_data, cache_path)
+            directory = Path(cache_path)
+            DocumentTable.write(directory, list(self.documents))
+            save_index(self.index, directory, {"model_path": self.model_path})
+            if self.manifest is not None:
+                self.manifest.count = len(self.index)
+                self.manifest.save(directory)
+            # reopen memory-mapped, so the in-RAM copies built while indexing can be freed
+            self.load_cache(cache_path)
             print("[INFO] Cache saved successfully.")
         except Exception as e:
             print(f"[ERROR] Failed to save cache: {e}")
 
-    def load_cache(self, cache_path: str = "toolbench_retriever_cache.pt") -> bool:
-        """Load index and embeddings from disk."""
+    def load_cache(self, cache_path: str = INDEX_DIR_NAME) -> bool:
+        """
+        Load the index and document table from disk.
+
+        A directory written by save_cache() is memory-mapped; a legacy
+        retriever_cache.pt file (documents + embeddings tensor) is read with
+        torch and indexed in memory. An index stored with a different kind or
+        dtype than requested is rebuilt from its vectors; one encoded by
+        another model is ignored.
+        """
         path = Path(cache_path)
         if not path.exists():
             return False
             
         print(f"[INFO] Loading cache from {path}...")
         try:
-            cache_data = torch.load(path, map_location=self.device)
-            self.documents = cache_data["documents"]
-            self.corpus_embeddings = cache_data["embeddings"]
+            if path.is_dir():
+                meta = index_meta(path)
+                if not meta:
+                    return False
+                if meta.get("model_path", self.model_path) != self.model_path:
+                    print(f"[INFO] Cached index was encoded with {meta['model_path']}; re-indexing")
+                    return False
+                index = load_index(path, nprobe=self.nprobe)
+                documents = DocumentTable(path)
+                self.manifest = CorpusManifest.load(path)
+                if (index.kind, index.dtype) != (self.index_kind, self.dtype):
+                    print(f"[INFO] Cached index is {index.kind}/{index.dtype}; rebuilding as {self.index_kind}/{self.dtype}")
+                    rebuilt = self._build_index(index.vectors())
+                    rebuilt.deleted = None if index.deleted is None else np.array(index.deleted)
+                    self.documents, self.index = list(documents), rebuilt
+                    documents.close()
+                    self.save_cache(str(path))
+                    return True
+            else:
+                if torch is None:
+                    print("[ERROR] Loading a legacy .pt cache requires torch.")
+                    return False
+                cache_data = torch.load(path, map_location="cpu")
+                documents = cache_data["documents"]
+                embeddings = cache_data["embeddings"]
+                if hasattr(embeddings, "detach"):
+                    embeddings = embeddings.detach().float().cpu().numpy()
+                index = self._build_index(embeddings)
+                self.manifest = None
+            self.documents, self.index = documents, index
             print(f"[INFO] Cache loaded. {len(self.documents)} documents ready.")
             return True
         except Exception as e:
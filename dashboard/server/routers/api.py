@@ -3,7 +3,6 @@ import json
 import asyncio
 import os
 import re
-import tiktoken
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Optional, Any
@@ -22,36 +21,24 @@ from dashboard.server.utils.extraction import (
 from dashboard.server.agents.swarm_agent import build_toolbench_tools
 from dashboard.server.database import ConversationDB
 from dashboard.server.utils.config import PROJECT_ROOT
+from dashboard.server.utils.debug_log import get_file_logger
+from dashboard.server.utils.tokens import count_tokens
 
 # Import retriever (will be injected/mocked or we use global access)
 # For now, we rely on app.py injecting it or we access it directly through the service module
 # We can import it from the service module directly
-from dashboard.server.services.retriever_service import get_retriever, is_retriever_loading
+from dashboard.server.services.retriever_service import is_retriever_loading, retrieve_tools
 
 # Import watermark sampler
+from agentmark.core.rlnc_codec import unpack_gf2_rows
 from agentmark.core.watermark_sampler import sample_behavior_differential
 
 db = ConversationDB(db_path=str(PROJECT_ROOT / "dashboard/data/conversations.db"))
 
 router = APIRouter()
 
-# --- Helpers ---
-def build_messages(query: str, tool_summaries: List[str], admissible_commands: List[str]) -> List[Dict]:
-    # Construct System Prompt compatible with ToolBench
-    sys_prompt = f"""You are an Auto-GPT agent. Result of your previous step is passed to you.
-You have access to the following tools:
-{json.dumps(tool_summaries, indent=2)}
-
-You must respond in JSON format with 'thought', 'action', 'action_args', and 'action_weights'.
-'action_weights' must be a JSON object mapping EVERY valid action to a STRICTLY POSITIVE number (> 0, not necessarily normalized; the server will normalize them to sum to 1).
-IMPORTANT: Do NOT output zeros. Every valid action must have weight > 0 (use small values like 1e-3 if needed).
-Valid actions are: {json.dumps(admissible_commands)}
-If you have enough information, use "Finish" and provide the final answer in "action_args" as {{"final_answer": "your answer"}}.
-"""
-    return [
-        {"role": "system", "content": sys_prompt},
-        {"role": "user", "content": f"Task: {query}\nBegin!"}
-    ]
+# Per-step token accounting; lines are buffered and written in batches
+token_debug_log = get_file_logger("agentmark.dashboard.token_debug", PROJECT_ROOT / "dashboard/server/token_debug.log")
 
 
 @router.post("/api/init_custom")
@@ -60,12 +47,11 @@ async def init_custom_session(req: CustomInitRequest):
     
     print(f"\n[INFO] >>> RECEIVED CUSTOM PROMPT: '{req.query}' <<<")
     
-    retriever = get_retriever()
     api_list = []
     if is_retriever_loading():
         print("[WARN] Retriever is still loading...")
-    elif retriever:
-        api_list = retriever.retrieve(req.query, top_k=5)
+    else:
+        api_list = await retrieve_tools(req.query, top_k=5)
     
     if not api_list:
         print("[WARN] Retriever found no tools or retrieval failed (or loading).")
@@ -249,34 +235,32 @@ async def continue_session(req: ContinueRequest):
         raise HTTPException(status_code=404, detail="Session not found")
     
     sess = sessions[req.sessionId]
-    retriever = get_retriever()
 
     print(f"\n[INFO] >>> RECEIVED CONTINUE PROMPT: '{req.prompt}' <<<\n")
-    if retriever:
-        new_tools = retriever.retrieve(req.prompt, top_k=5)
-        if new_tools:
-            print(f"[INFO] Retrieved {len(new_tools)} new tools for continuation.")
+    new_tools = await retrieve_tools(req.prompt, top_k=5)
+    if new_tools:
+        print(f"[INFO] Retrieved {len(new_tools)} new tools for continuation.")
+        
+        def update_agent_tools(agent_state: AgentState):
+            current_tools = agent_state.task.get("api_list", [])
+            existing_names = {t.get("func_name") or t.get("api_name") for t in current_tools}
             
-            def update_agent_tools(agent_state: AgentState):
-                current_tools = agent_state.task.get("api_list", [])
-                existing_names = {t.get("func_name") or t.get("api_name") for t in current_tools}
-                
-                for tool in new_tools:
-                    t_name = tool.get("func_name") or tool.get("api_name")
-                    if t_name not in existing_names:
-                        current_tools.append(tool)
-                        existing_names.add(t_name)
-                
-                agent_state.task["api_list"] = current_tools
-                try:
-                    updated_episode = agent_state.adapter.prepare_episode(agent_state.task)
-                    agent_state.episode["tool_summaries"] = updated_episode["tool_summaries"]
-                    agent_state.episode["admissible_commands"] = updated_episode["admissible_commands"]
-                except Exception as e:
-                    print(f"[ERROR] Failed to refresh episode context: {e}")
+            for tool in new_tools:
+                t_name = tool.get("func_name") or tool.get("api_name")
+                if t_name not in existing_names:
+                    current_tools.append(tool)
+                    existing_names.add(t_name)
+            
+            agent_state.task["api_list"] = current_tools
+            try:
+                updated_episode = agent_state.adapter.prepare_episode(agent_state.task)
+                agent_state.episode["tool_summaries"] = updated_episode["tool_summaries"]
+                agent_state.episode["admissible_commands"] = updated_episode["admissible_commands"]
+            except Exception as e:
+                print(f"[ERROR] Failed to refresh episode context: {e}")
 
-            update_agent_tools(sess.watermarked_state)
-            update_agent_tools(sess.baseline_state)
+        update_agent_tools(sess.watermarked_state)
+        update_agent_tools(sess.baseline_state)
 
     sess.watermarked_state.trajectory.append({"role": "user", "message": req.prompt})
     sess.baseline_state.trajectory.append({"role": "user", "message": req.prompt})
@@ -327,12 +311,6 @@ async def step_session(req: StepRequest):
     ):
         step_start_time = time.time()
         
-        # Initialize tokenizer (cl100k_base is used by gpt-4, gpt-3.5, and deepseek)
-        try:
-            encoding = tiktoken.get_encoding("cl100k_base")
-        except Exception:
-            encoding = None
-        
         if agent_state.done:
              # Return empty/done state
              return {
@@ -340,19 +318,11 @@ async def step_session(req: StepRequest):
                   "final_answer": "", "distribution": [], "metrics": {"latency": 0.0, "tokens": 0.0}
              }, ({"bits":"", "matrixRows":[], "rankContribution":0} if is_watermarked else None), 0, None
 
-        # Build messages
-        messages = build_messages(
-            query=agent_state.task.get("query", ""),
-            tool_summaries=agent_state.episode["tool_summaries"],
-            admissible_commands=agent_state.episode["admissible_commands"]
+        # Build messages (only turns added since the last step are converted and counted)
+        messages = agent_state.prompt.sync(
+            agent_state.task.get("query", ""), agent_state.episode, agent_state.trajectory
         )
-        for turn in agent_state.trajectory:
-            if turn["role"] == "assistant":
-                 messages.append({"role": "assistant", "content": turn["message"]})
-            elif turn["role"] == "tool":
-                 messages.append({"role": "user", "content": f"Observation:\n{turn['message']}\nContinue Thought/Action/Action Input."})
-            elif turn["role"] == "user":
-                 messages.append({"role": "user", "content": turn["message"]})
+        prompt_tokens = agent_state.prompt.prompt_tokens
 
         model_output = ""
         try:
@@ -413,18 +383,25 @@ async def step_session(req: StepRequest):
              
              # Build matrix rows for RLNC visualization
              matrix_rows = []
+             rank_gain = 0
              if consumed_bits > 0:
                  # Generate the coefficient vector for this packet
                  # Each received bit corresponds to an RLNC equation
-                 for i in range(consumed_bits):
-                     bit_global_idx = sess.bit_index + i
-                     coeffs = sess.rlnc._generate_coeffs(bit_global_idx)
-                     matrix_rows.append(coeffs)
+                 packet_indices = range(sess.bit_index, sess.bit_index + consumed_bits)
+                 packet_rows = sess.rlnc.coeff_rows(packet_indices)
+                 matrix_rows = unpack_gf2_rows(packet_rows, sess.rlnc.n).tolist()
+                 for row, bit in zip(packet_rows, rlnc_chunk[:consumed_bits]):
+                     rank_gain += int(sess.rlnc_decoder.add_row(row, bit))
+                 if sess.rlnc_decoder.is_complete and sess.payload_recovered_step is None:
+                     sess.payload_recovered_step = agent_state.step_count
              
              watermark_info = {
                  "bits": rlnc_chunk[:consumed_bits] if consumed_bits > 0 else "",
                  "matrixRows": matrix_rows,
-                 "rankContribution": 1 if consumed_bits > 0 else 0
+                 "rankContribution": rank_gain,
+                 "rank": sess.rlnc_decoder.rank,
+                 "payloadLength": sess.rlnc.n,
+                 "payloadRecoveredStep": sess.payload_recovered_step,
              }
         else:
              if probs:
@@ -481,7 +458,9 @@ async def step_session(req: StepRequest):
                  # We need to construct action object
                  action_obj = {"tool": chosen, "arguments": action_args}
                  try:
-                     obs_result = agent_state.adapter.step(
+                     # astep keeps the event loop free while tool execution waits on
+                     # LLM/cache I/O, so both agents' tools run concurrently
+                     obs_result = await agent_state.adapter.astep(
                          action_obj,
                          agent_state.episode["tool_summaries"],
                          state=agent_state.task
@@ -503,27 +482,12 @@ async def step_session(req: StepRequest):
         
         step_latency = time.time() - step_start_time
         
-        # Token Calculation (Local precise counting if API doesn't provide)
+        # Token Calculation (Local counting if API doesn't provide)
         tokens_used = getattr(agent_state, "last_tokens", 0.0)
-        if tokens_used <= 0 and encoding:
-            # Calculate input tokens
-            input_text = json.dumps(messages, ensure_ascii=False)
-            input_tokens = len(encoding.encode(input_text))
-            # Calculate output tokens
-            output_tokens = len(encoding.encode(model_output))
-            tokens_used = float(input_tokens + output_tokens)
-        elif tokens_used <= 0:
-            # Very unlikely fallback if tiktoken fails
-            prompt_chars = len(json.dumps(messages))
-            output_chars = len(model_output)
-            tokens_used = (prompt_chars + output_chars) / 4.0
+        if tokens_used <= 0:
+            tokens_used = prompt_tokens + count_tokens(model_output)
         
-        # DEBUG: Write to file
-        try:
-            with open(str(PROJECT_ROOT / "dashboard/server/token_debug.log"), "a") as f:
-                f.write(f"Agent: {agent_state.role}, Step: {agent_state.step_count}, Tokens: {tokens_used}, LastAPI: {getattr(agent_state, 'last_tokens', 'N/A')}\n")
-        except:
-            pass
+        token_debug_log.debug(f"Agent: {agent_state.role}, Step: {agent_state.step_count}, Tokens: {tokens_used}, LastAPI: {getattr(agent_state, 'last_tokens', 'N/A')}")
 
         final_data = {
             "agent": agent_state.role,
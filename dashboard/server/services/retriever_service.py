@@ -2,7 +2,7 @@
 Retriever service for ToolBench tool retrieval.
 """
 import asyncio
-from typing import Optional
+from typing import Dict, List, Optional
 
 from dashboard.server.utils.config import TOOL_DATA_ROOT
 from dashboard.server.retriever import ToolBenchRetriever
@@ -39,3 +39,21 @@ def get_retriever() -> Optional[ToolBenchRetriever]:
 def is_retriever_loading() -> bool:
     """Check if retriever is still loading."""
     return retriever_loading
+
+
+async def retrieve_tools(query: str, top_k: int = 5) -> List[Dict]:
+    """
+    Retrieve tools for a query without blocking the event loop: encoding and
+    search run in a worker thread. Returns [] while the retriever is loading
+    or unavailable.
+    """
+    if retriever is None or retriever_loading:
+        return []
+    return await asyncio.to_thread(retriever.retrieve, query, top_k)
+
+
+async def retrieve_tools_many(queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+    """Batched retrieve_tools(): one encoder call and one top-k for all queries."""
+    if retriever is None or retriever_loading:
+        return [[] for _ in queries]
+    return await asyncio.to_thread(retriever.retrieve_many, queries, top_k)
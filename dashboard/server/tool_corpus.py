@@ -0,0 +1,184 @@
+"""
+Incremental indexing of the ToolBench tool corpus.
+
+The tool tree is data_root/<category>/<tool>.json. A manifest next to the
+retriever index (manifest.json) records, per tool file, its mtime, size,
+content hash and the corpus rows it produced. A refresh then does only the
+work the change calls for:
+- Unchanged files (same mtime and size) are not opened.
+- Touched files with the same content hash only get their mtime updated.
+- Changed and new files are parsed. Only API texts that no live row
+  already has are encoded; the others reuse that row's vector.
+- Rows of changed and deleted files are tombstoned. Once tombstones pass
+  COMPACT_RATIO of the corpus, the index is compacted.
+
+Directory walking (a thread per category) and hashing/parsing (a process
+pool for large batches) run in parallel. AGENTMARK_RETRIEVER_WORKERS caps
+the pool size.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from dashboard.server.vector_index import write_text_atomic
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# compact once this fraction of corpus rows is tombstoned
+COMPACT_RATIO = 0.2
+# below this many files, parsing in-process beats starting a pool
+PARALLEL_MIN_FILES = 256
+PARSE_CHUNK_FILES = 64
+
+
+class ToolFile(NamedTuple):
+    """A tool JSON file found by scan_tool_files()."""
+
+    path: str  # relative to data_root, '/'-separated (manifest key)
+    category: str
+    mtime_ns: int
+    size: int
+
+
+class ParsedToolFile(NamedTuple):
+    path: str
+    digest: str
+    documents: List[Dict[str, Any]]
+    error: Optional[str]
+
+
+def tool_documents(data: Any, category_name: str, default_tool_name: str) -> List[Dict[str, Any]]:
+    """Retrieval documents for the APIs of one parsed ToolBench tool file."""
+    # Usual layout: { "tool_name": "...", "api_list": [ { "name": ..., "description": ... } ] };
+    # some files are just a list of API objects.
+    if isinstance(data, list):
+        tool_name, apis = default_tool_name, data
+    else:
+        tool_name = data.get("tool_name", default_tool_name)
+        apis = data.get("api_list", [])
+
+    documents = []
+    for api in apis:
+        api_name = api.get("name", "unknown")
+        description = (api.get("description") or "").strip()
+        # Format commonly used: "Category: ... Tool: ... API: ... Description: ..."
+        documents.append({
+            "text": f"Category: {category_name}, Tool: {tool_name}, API: {api_name}, Description: {description}",
+            "category_name": category_name,
+            "tool_name": tool_name,
+            "api_name": api_name,
+            "api_description": description,
+            "raw_data": api,  # Keep raw data to return
+        })
+    return documents
+
+
+def parse_tool_file(data_root: str, path: str, category: str) -> ParsedToolFile:
+    """Hash and parse one tool file (a module-level function, so process pools can run it)."""
+    full = Path(data_root) / path
+    try:
+        raw = full.read_bytes()
+    except OSError as e:
+        return ParsedToolFile(path, "", [], str(e))
+    digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    try:
+        return ParsedToolFile(path, digest, tool_documents(json.loads(raw), category, full.stem), None)
+    except Exception as e:
+        return ParsedToolFile(path, digest, [], str(e))
+
+
+def _parse_chunk(data_root: str, files: Sequence[Tuple[str, str]]) -> List[ParsedToolFile]:
+    return [parse_tool_file(data_root, path, category) for path, category in files]
+
+
+def _scan_category(category_dir: Path) -> List[ToolFile]:
+    found = []
+    with os.scandir(category_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            st = entry.stat()
+            path = f"{category_dir.name}/{entry.name}"
+            found.append(ToolFile(path, category_dir.name, st.st_mtime_ns, st.st_size))
+    return found
+
+
+def default_workers() -> int:
+    env = os.getenv("AGENTMARK_RETRIEVER_WORKERS")
+    return max(1, int(env)) if env else (os.cpu_count() or 1)
+
+
+def scan_tool_files(data_root: Path, skip: Iterable[str] = (), workers: Optional[int] = None) -> Dict[str, ToolFile]:
+    """All data_root/<category>/*.json files, stat'ed but not opened."""
+    data_root = Path(data_root)
+    skip = set(skip)
+    categories = [p for p in data_root.iterdir() if p.is_dir() and p.name not in skip]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers or default_workers(), 16, len(categories) or 1))) as pool:
+        batches = pool.map(_scan_category, categories)
+        return {f.path: f for batch in batches for f in batch}
+
+
+def parse_tool_files(data_root: Path, files: Sequence[ToolFile], workers: Optional[int] = None) -> List[ParsedToolFile]:
+    """Hash and parse files, over a process pool when there are many of them."""
+    items = [(f.path, f.category) for f in files]
+    workers = workers or default_workers()
+    if workers == 1 or len(items) < PARALLEL_MIN_FILES:
+        return _parse_chunk(str(data_root), items)
+    chunks = [items[i : i + PARSE_CHUNK_FILES] for i in range(0, len(items), PARSE_CHUNK_FILES)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_parse_chunk, [str(data_root)] * len(chunks), chunks)
+        return [parsed for chunk in results for parsed in chunk]
+
+
+class CorpusManifest:
+    """
+    Per-file state of an indexed corpus: {path: {"mtime_ns", "size", "hash",
+    "rows"}}. `rows` are corpus row ids of the file's APIs, in file order.
+    """
+
+    def __init__(self, model_path: str, files: Optional[Dict[str, Dict[str, Any]]] = None, count: int = 0) -> None:
+        self.model_path = model_path
+        self.files: Dict[str, Dict[str, Any]] = files or {}
+        self.count = count  # corpus rows (live + tombstoned) the manifest was written against
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["CorpusManifest"]:
+        path = Path(directory) / MANIFEST_NAME
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable manifest {path}: {e}")
+            return None
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(data.get("model_path", ""), data.get("files", {}), int(data.get("count", 0)))
+
+    def save(self, directory: Path) -> None:
+        data = {"version": MANIFEST_VERSION, "model_path": self.model_path, "count": self.count, "files": self.files}
+        write_text_atomic(Path(directory) / MANIFEST_NAME, json.dumps(data, separators=(",", ":")))
+
+    def referenced_rows(self) -> List[int]:
+        return [row for entry in self.files.values() for row in entry["rows"]]
+
+    def diff(self, scanned: Dict[str, ToolFile]) -> Tuple[List[ToolFile], List[str]]:
+        """(files to (re)parse: new or with a different mtime/size, manifest paths no longer on disk)."""
+        candidates = []
+        for path, f in scanned.items():
+            entry = self.files.get(path)
+            if entry is None or entry["mtime_ns"] != f.mtime_ns or entry["size"] != f.size:
+                candidates.append(f)
+        removed = [path for path in self.files if path not in scanned]
+        return candidates, removed
+
+    def remap(self, new_ids: Sequence[int]) -> None:
+        """Renumber rows after compaction (new_ids[old] = new id)."""
+        for entry in self.files.values():
+            entry["rows"] = [int(new_ids[row]) for row in entry["rows"]]
@@ -0,0 +1,57 @@
+"""
+Buffered file loggers for per-step debug output.
+
+Records are kept in memory and written in batches: when `capacity` records
+are pending, when `flush_interval` seconds have passed since the last write,
+on ERROR records, and at interpreter exit (logging.shutdown). The file is
+only opened when the first batch is written.
+"""
+import logging
+import logging.handlers
+import time
+from pathlib import Path
+from typing import Dict
+
+DEFAULT_CAPACITY = 256
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+_loggers: Dict[str, logging.Logger] = {}
+
+
+class BufferedFileHandler(logging.handlers.MemoryHandler):
+    """MemoryHandler over a lazily opened FileHandler, also flushed on a timer."""
+
+    def __init__(self, path: Path, capacity: int = DEFAULT_CAPACITY, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        target = logging.FileHandler(str(path), mode="a", encoding="utf-8", delay=True)
+        target.setFormatter(logging.Formatter("%(message)s"))
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return super().shouldFlush(record) or time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush(self) -> None:
+        super().flush()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        target = self.target  # MemoryHandler.close() flushes into it, then drops it
+        try:
+            super().close()
+        finally:
+            if target is not None:
+                target.close()
+
+
+def get_file_logger(name: str, path: Path, capacity: int = DEFAULT_CAPACITY,
+                    flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> logging.Logger:
+    """A logger that appends plain lines to `path` through a BufferedFileHandler (one per name)."""
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(BufferedFileHandler(path, capacity, flush_interval))
+        _loggers[name] = logger
+    return logger
@@ -0,0 +1,51 @@
+"""
+Token counting for the dashboard's local usage metrics.
+
+Used when the LLM API does not report usage. The tiktoken encoder is loaded
+once per process. Without it, counts fall back to chars / 4.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# cl100k_base is used by gpt-4, gpt-3.5 and deepseek
+ENCODING_NAME = "cl100k_base"
+# per-message framing of the chat format (role and separators), as in OpenAI's counting recipe
+MESSAGE_OVERHEAD_TOKENS = 3
+# every reply is primed with <|start|>assistant<|message|>
+REPLY_PRIMING_TOKENS = 3
+
+_encoding: Any = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def get_encoding() -> Optional[Any]:
+    """The process-wide tiktoken encoding, or None if tiktoken is unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    _encoding = tiktoken.get_encoding(ENCODING_NAME) if tiktoken else None
+                except Exception as e:
+                    print(f"[WARN] tiktoken encoding unavailable, counting chars / 4: {e}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> float:
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) / 4.0
+    return float(len(encoding.encode(text, disallowed_special=())))
+
+
+def count_message_tokens(message: Dict[str, str]) -> float:
+    """Tokens one chat message adds to a prompt."""
+    return count_tokens(message["role"]) + count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,510 @@
+"""
+Vector indexes and on-disk corpus storage for ToolBenchRetriever.
+
+Corpus embeddings are L2-normalized once, so cosine similarity is a plain
+inner product. They are stored as .npy files that are memory-mapped on
+load, next to a compact document table (documents.jsonl plus row offsets).
+Startup reads only small headers, and a query touches only the pages it
+scores and the documents it returns.
+
+Index kinds (AGENTMARK_RETRIEVER_INDEX):
+- exact: brute-force inner product over every row, scanned in blocks.
+- ivf:   inverted-file index. Spherical k-means centroids split the rows into
+         `nlist` lists stored contiguously. A query scans the
+         `nprobe` closest lists (AGENTMARK_RETRIEVER_NPROBE) and rescores
+         those rows exactly.
+
+Rows can be tombstoned (hidden from search until the index is compacted)
+and appended, so the corpus can be updated without re-encoding it.
+
+Storage dtype (AGENTMARK_RETRIEVER_DTYPE) is float32 (default), float16, or
+int8 (symmetric per-row scale; about 4x smaller than float32). Rows are
+widened to float32 block by block for scoring. On CPUs where numpy has no
+fast half-precision conversion, float16 halves memory but scans slower than
+float32; int8 is both smaller and faster to widen.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+INDEX_KINDS = ("exact", "ivf")
+STORAGE_DTYPES = ("float32", "float16", "int8")
+INDEX_FORMAT_VERSION = 1
+DEFAULT_NPROBE = 16
+SCAN_BLOCK_ROWS = 4096
+
+
+def normalize_rows(x: np.ndarray) -> np.ndarray:
+    """Float32 copy of x with unit-norm rows (zero rows stay zero)."""
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 1:
+        x = x[None, :]
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def quantize(x: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Rows of x in the storage dtype, plus per-row scales for int8."""
+    if dtype == "float32":
+        return np.ascontiguousarray(x, dtype=np.float32), None
+    if dtype == "float16":
+        return np.ascontiguousarray(x, dtype=np.float16), None
+    if dtype == "int8":
+        scales = np.abs(x).max(axis=1) / 127.0 if len(x) else np.zeros(0, dtype=np.float32)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        q = np.clip(np.rint(x / scales[:, None]), -127, 127).astype(np.int8)
+        return q, scales
+    raise ValueError(f"Unknown storage dtype {dtype!r}, expected one of {STORAGE_DTYPES}")
+
+
+def save_array(path: Path, array: np.ndarray) -> None:
+    """
+    np.save through a temporary file and a rename, so readers that still
+    memory-map the old file keep a consistent view of it. An array that is
+    already memory-mapped from `path` is left as it is.
+    """
+    if isinstance(array, np.memmap) and array.filename and Path(array.filename).resolve() == path.resolve():
+        return
+    tmp = path.with_name(path.stem + ".tmp.npy")
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def _topk(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row top-k of scores (m, n) with matching ids (m, n), sorted descending."""
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        ids = np.take_along_axis(ids, part, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+class VectorIndex:
+    """
+    Inner-product top-k over stored (quantized) unit vectors.
+
+    search() takes unit-norm float32 queries (m, dim) and returns
+    (scores, row_ids), each (m, k), best first. Row ids are corpus positions;
+    tombstoned rows are never returned, and missing results have id -1.
+    """
+
+    kind = ""
+
+    def __init__(self, data: np.ndarray, scales: Optional[np.ndarray], dtype: str) -> None:
+        self.data = data
+        self.scales = scales
+        self.dtype = dtype
+        # bool per corpus row, True = tombstoned; None while nothing is deleted
+        self.deleted: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return int(self.data.shape[0])
+
+    @property
+    def deleted_count(self) -> int:
+        return int(self.deleted.sum()) if self.deleted is not None else 0
+
+    def live_rows(self) -> np.ndarray:
+        """Corpus row ids that are not tombstoned."""
+        if self.deleted is None:
+            return np.arange(len(self), dtype=np.int64)
+        return np.flatnonzero(~self.deleted)
+
+    def tombstone(self, rows: Sequence[int]) -> None:
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        if self.deleted is None:
+            self.deleted = np.zeros(len(self), dtype=bool)
+        elif not self.deleted.flags.writeable:
+            self.deleted = np.array(self.deleted)
+        self.deleted[rows] = True
+
+    def _positions(self, rows: np.ndarray) -> np.ndarray:
+        """Storage positions of corpus rows."""
+        return rows
+
+    def _mask_deleted(self, scores: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        if self.deleted is not None:
+            scores[..., self.deleted[rows]] = -np.inf
+        return scores
+
+    @property
+    def dim(self) -> int:
+        return int(self.data.shape[1]) if self.data.ndim == 2 else 0
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def _score_rows(self, start: int, stop: int, queries: np.ndarray) -> np.ndarray:
+        """Scores (m, stop - start) of stored rows [start, stop) against queries."""
+        block = np.asarray(self.data[start:stop], dtype=np.float32)
+        scores = queries @ block.T
+        if self.scales is not None:
+            scores *= np.asarray(self.scales[start:stop])[None, :]
+        return scores
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def append(self, embeddings: np.ndarray) -> "VectorIndex":
+        """A new index with rows appended (corpus ids len(self), len(self)+1, ...)."""
+        raise NotImplementedError
+
+    def _appended(
+        self, data: np.ndarray, scales: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Storage arrays with quantized rows `data`/`scales` concatenated (shared by append())."""
+        if not len(self):
+            return data, scales
+        out_scales = np.concatenate([np.asarray(self.scales), scales]) if scales is not None else None
+        return np.concatenate([np.asarray(self.data), data]), out_scales
+
+    def _carry_deleted(self, index: "VectorIndex", added: int) -> "VectorIndex":
+        if self.deleted is not None:
+            index.deleted = np.concatenate([self.deleted, np.zeros(added, dtype=bool)])
+        return index
+
+    def rows(self, ids: Sequence[int]) -> np.ndarray:
+        """Dequantized float32 vectors of the given corpus rows."""
+        positions = self._positions(np.asarray(ids, dtype=np.int64))
+        x = np.asarray(self.data[positions], dtype=np.float32)
+        if self.scales is not None:
+            x = x * np.asarray(self.scales[positions])[:, None]
+        return x
+
+    def vectors(self) -> np.ndarray:
+        """Dequantized float32 rows in corpus order (for rebuilding with other settings)."""
+        x = np.asarray(self.data, dtype=np.float32)
+        if self.scales is not None:
+            x = x * np.asarray(self.scales)[:, None]
+        return x
+
+    def save(self, directory: Path) -> Dict[str, Any]:
+        """Write arrays into directory; returns the metadata for index.json."""
+        save_array(directory / "embeddings.npy", self.data)
+        if self.scales is not None:
+            save_array(directory / "scales.npy", self.scales)
+        if self.deleted is not None:
+            save_array(directory / "tombstones.npy", self.deleted)
+        elif (directory / "tombstones.npy").exists():
+            (directory / "tombstones.npy").unlink()
+        return {
+            "kind": self.kind, "dtype": self.dtype, "count": len(self), "dim": self.dim,
+            "deleted": self.deleted_count,
+        }
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force scan in blocks of SCAN_BLOCK_ROWS rows (bounded float32 working set)."""
+
+    kind = "exact"
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, dtype: str = "float32") -> "ExactIndex":
+        data, scales = quantize(normalize_rows(embeddings), dtype)
+        return cls(data, scales, dtype)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        m, n = queries.shape[0], len(self)
+        k = min(k, n)
+        best_scores = np.empty((m, 0), dtype=np.float32)
+        best_ids = np.empty((m, 0), dtype=np.int64)
+        for start in range(0, n, SCAN_BLOCK_ROWS):
+            stop = min(n, start + SCAN_BLOCK_ROWS)
+            scores = self._mask_deleted(self._score_rows(start, stop, queries), np.arange(start, stop))
+            ids = np.broadcast_to(np.arange(start, stop, dtype=np.int64), scores.shape)
+            best_scores, best_ids = _topk(
+                np.concatenate([best_scores, scores], axis=1), np.concatenate([best_ids, ids], axis=1), k
+            )
+        best_ids = np.where(np.isneginf(best_scores), -1, best_ids)
+        return best_scores, best_ids
+
+    def append(self, embeddings: np.ndarray) -> "ExactIndex":
+        data, scales = quantize(normalize_rows(embeddings), self.dtype)
+        data, scales = self._appended(data, scales)
+        return self._carry_deleted(ExactIndex(data, scales, self.dtype), len(embeddings))
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: rows are grouped by nearest centroid and stored list
+    by list, so probing a list is one contiguous slice of the (mmapped) array.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        scales: Optional[np.ndarray],
+        dtype: str,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        row_ids: np.ndarray,
+        nprobe: int = DEFAULT_NPROBE,
+    ) -> None:
+        super().__init__(data, scales, dtype)
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.row_ids = row_ids
+        self.nprobe = nprobe
+        self._row_positions: Optional[np.ndarray] = None
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        dtype: str = "float32",
+        nlist: Optional[int] = None,
+        iterations: int = 10,
+        seed: int = 0,
+        nprobe: int = DEFAULT_NPROBE,
+    ) -> "IVFIndex":
+        x = normalize_rows(embeddings)
+        n = len(x)
+        nlist = max(1, min(n, nlist or int(round(4 * np.sqrt(max(n, 1))))))
+        centroids = _spherical_kmeans(x, nlist, iterations, np.random.default_rng(seed))
+        assign = _nearest(x, centroids)
+        order = np.argsort(assign, kind="stable")
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=nlist), out=list_offsets[1:])
+        data, scales = quantize(x[order], dtype)
+        return cls(data, scales, dtype, centroids, list_offsets, order.astype(np.int64), nprobe)
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = max(1, min(self.nlist, nprobe or self.nprobe))
+        k = min(k, len(self))
+        probes = _topk(queries @ self.centroids.T, np.broadcast_to(
+            np.arange(self.nlist), (len(queries), self.nlist)), nprobe)[1]
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for qi, lists in enumerate(probes):
+            spans = [(int(self.list_offsets[l]), int(self.list_offsets[l + 1])) for l in np.sort(lists)]
+            scores = [self._score_rows(a, b, queries[qi : qi + 1])[0] for a, b in spans if b > a]
+            if not scores:
+                continue
+            positions = np.concatenate([np.arange(a, b) for a, b in spans if b > a])
+            scores = self._mask_deleted(np.concatenate(scores), np.asarray(self.row_ids[positions]))
+            s, p = _topk(scores[None, :], positions[None, :], min(k, len(positions)))
+            found = np.asarray(self.row_ids[p[0]])
+            out_scores[qi, : s.shape[1]] = s[0]
+            out_ids[qi, : s.shape[1]] = np.where(np.isneginf(s[0]), -1, found)
+        return out_scores, out_ids
+
+    def _positions(self, rows: np.ndarray) -> np.ndarray:
+        if self._row_positions is None:
+            self._row_positions = np.empty(len(self), dtype=np.int64)
+            self._row_positions[np.asarray(self.row_ids)] = np.arange(len(self), dtype=np.int64)
+        return self._row_positions[rows]
+
+    def append(self, embeddings: np.ndarray) -> "IVFIndex":
+        """Appended rows join their nearest existing list; centroids are not retrained."""
+        x = normalize_rows(embeddings)
+        n = len(self)
+        old_lists = np.repeat(np.arange(self.nlist), np.diff(np.asarray(self.list_offsets)))
+        lists = np.concatenate([old_lists, _nearest(x, self.centroids)])
+        order = np.argsort(lists, kind="stable")
+        list_offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists, minlength=self.nlist), out=list_offsets[1:])
+        data, scales = quantize(x, self.dtype)
+        data, scales = self._appended(data, scales)
+        row_ids = np.concatenate([np.asarray(self.row_ids), np.arange(n, n + len(x), dtype=np.int64)])
+        index = IVFIndex(
+            data[order], scales[order] if scales is not None else None, self.dtype, self.centroids,
+            list_offsets, row_ids[order], self.nprobe,
+        )
+        return self._carry_deleted(index, len(x))
+
+    def vectors(self) -> np.ndarray:
+        x = np.empty(self.data.shape, dtype=np.float32)
+        x[np.asarray(self.row_ids)] = super().vectors()
+        return x
+
+    def save(self, directory: Path) -> Dict[str, Any]:
+        meta = super().save(directory)
+        save_array(directory / "centroids.npy", self.centroids)
+        save_array(directory / "list_offsets.npy", self.list_offsets)
+        save_array(directory / "row_ids.npy", self.row_ids)
+        meta.update(nlist=self.nlist)
+        return meta
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assign = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), SCAN_BLOCK_ROWS):
+        assign[start : start + SCAN_BLOCK_ROWS] = np.argmax(x[start : start + SCAN_BLOCK_ROWS] @ centroids.T, axis=1)
+    return assign
+
+
+def _spherical_kmeans(x: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    # Train on a sample (32 rows per list is plenty for coarse partitioning).
+    sample = x[rng.choice(len(x), size=min(len(x), k * 32), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        present = counts > 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[present]
+        sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+        sums[~present] = sample[rng.choice(len(sample), size=int((~present).sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def build_index(
+    embeddings: np.ndarray,
+    kind: str = "exact",
+    dtype: str = "float32",
+    **kwargs: Any,
+) -> VectorIndex:
+    if kind == "exact":
+        return ExactIndex.build(embeddings, dtype)
+    if kind == "ivf":
+        return IVFIndex.build(embeddings, dtype, **kwargs)
+    raise ValueError(f"Unknown index kind {kind!r}, expected one of {INDEX_KINDS}")
+
+
+def load_index(directory: Path, mmap_mode: Optional[str] = "r", nprobe: Optional[int] = None) -> VectorIndex:
+    """Open an index written by save_index(); arrays are memory-mapped by default."""
+    directory = Path(directory)
+    meta = json.loads((directory / "index.json").read_text(encoding="utf-8"))
+    if meta.get("version") != INDEX_FORMAT_VERSION:
+        raise ValueError(f"Unsupported retriever index version {meta.get('version')!r} in {directory}")
+
+    def arr(name: str, mode: Optional[str] = mmap_mode) -> np.ndarray:
+        return np.load(directory / name, mmap_mode=mode)
+
+    data = arr("embeddings.npy")
+    scales = arr("scales.npy") if (directory / "scales.npy").exists() else None
+    if meta["kind"] == "exact":
+        index: VectorIndex = ExactIndex(data, scales, meta["dtype"])
+    elif meta["kind"] == "ivf":
+        # centroids and offsets are small and read on every query: keep them in RAM
+        index = IVFIndex(
+            data, scales, meta["dtype"], arr("centroids.npy", None), arr("list_offsets.npy", None),
+            arr("row_ids.npy"), nprobe or DEFAULT_NPROBE,
+        )
+    else:
+        raise ValueError(f"Unknown index kind {meta['kind']!r} in {directory}")
+    if (directory / "tombstones.npy").exists():
+        index.deleted = arr("tombstones.npy", None)
+    return index
+
+
+def index_meta(directory: Path) -> Dict[str, Any]:
+    """Contents of index.json ({} when there is none)."""
+    path = Path(directory) / "index.json"
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+def save_index(index: VectorIndex, directory: Path, extra: Optional[Dict[str, Any]] = None) -> None:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    meta = index.save(directory)
+    meta.update(extra or {}, version=INDEX_FORMAT_VERSION)
+    write_text_atomic(directory / "index.json", json.dumps(meta, indent=2))
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class DocumentTable:
+    """
+    Read-only table of JSON documents, one per line, with an int64 offset
+    index; rows are parsed on access from a memory-mapped file.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        directory = Path(directory)
+        self.directory = directory
+        self.offsets = np.load(directory / "documents.idx.npy")
+        self._file = open(directory / "documents.jsonl", "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @staticmethod
+    def write(directory: Path, documents: Sequence[Dict[str, Any]]) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+        tmp = directory / "documents.jsonl.tmp"
+        with open(tmp, "wb") as f:
+            for i, doc in enumerate(documents):
+                line = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                f.write(line)
+                offsets[i + 1] = offsets[i] + len(line)
+        os.replace(tmp, directory / "documents.jsonl")
+        save_array(directory / "documents.idx.npy", offsets)
+
+    @staticmethod
+    def append(directory: Path, documents: Sequence[Dict[str, Any]]) -> None:
+        """Append rows to a table written by write(); existing rows keep their ids."""
+        directory = Path(directory)
+        offsets = np.load(directory / "documents.idx.npy")
+        added = np.zeros(len(documents), dtype=np.int64)
+        with open(directory / "documents.jsonl", "r+b") as f:
+            end = int(offsets[-1])
+            # drop bytes of an interrupted earlier append, past the last indexed row
+            if os.fstat(f.fileno()).st_size > end:
+                f.truncate(end)
+            f.seek(end)
+            for i, doc in enumerate(documents):
+                line = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                f.write(line)
+                end += len(line)
+                added[i] = end
+        save_array(directory / "documents.idx.npy", np.concatenate([offsets, added]))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        return json.loads(self._buf[int(self.offsets[i]) : int(self.offsets[i + 1])])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self) -> None:
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+
+
+def index_settings_from_env() -> Tuple[str, str, int]:
+    """(kind, dtype, nprobe) from AGENTMARK_RETRIEVER_INDEX / _DTYPE / _NPROBE."""
+    kind = (os.getenv("AGENTMARK_RETRIEVER_INDEX") or "exact").strip().lower()
+    dtype = (os.getenv("AGENTMARK_RETRIEVER_DTYPE") or "float32").strip().lower()
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"AGENTMARK_RETRIEVER_INDEX must be one of {INDEX_KINDS}, got {kind!r}")
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"AGENTMARK_RETRIEVER_DTYPE must be one of {STORAGE_DTYPES}, got {dtype!r}")
+    nprobe = int(os.getenv("AGENTMARK_RETRIEVER_NPROBE") or DEFAULT_NPROBE)
+    return kind, dtype, nprobe
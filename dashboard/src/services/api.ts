@@ -17,6 +17,9 @@ export interface StepResponse {
         bits: string;
         matrixRows: number[][];
         rankContribution: number;
+        rank?: number;
+        payloadLength?: number;
+        payloadRecoveredStep?: number | null;
     };
     distribution?: {
         name: string;
@@ -8,6 +8,9 @@ export type StepWatermark = {
     bits: string;
     matrixRows: number[][]; // Changed to support multiple rows per step
     rankContribution: number;
+    rank?: number; // Receiver rank after this step
+    payloadLength?: number;
+    payloadRecoveredStep?: number | null; // Step at which rank reached payloadLength
 };
 
 export type Step = {
@@ -9,7 +9,7 @@ import json
 from pathlib import Path
 from typing import Dict, Any, List
 
-from agentmark.core.watermark_sampler import differential_based_decoder
+from agentmark.core.watermark_sampler import decode_batch, differential_based_decoder
 
 
 def decode_task_bits(task_result: Dict[str, Any]) -> Dict[str, Any]:
@@ -19,6 +19,7 @@ def decode_task_bits(task_result: Dict[str, Any]) -> Dict[str, Any]:
 
     decoded_bits_segments = []
     errors = []
+    steps = []  # (entry, decoder record)
 
     for entry in trace:
         probs = entry.get('probabilities')
@@ -38,16 +39,27 @@ def decode_task_bits(task_result: Dict[str, Any]) -> Dict[str, Any]:
         if round_num is None:
             round_num = max(entry.get('step_num', 1) - 1, 0)
 
-        try:
-            bits = differential_based_decoder(
-                probabilities=probs,
-                selected_behavior=action,
-                context_for_key=context,
-                round_num=round_num
-            )
-        except Exception as exc:
-            errors.append(f"Step {entry.get('step_num')} decode failed: {exc}")
-            continue
+        steps.append((entry, (probs, action, context, round_num)))
+
+    try:
+        batch = decode_batch([record for _, record in steps])
+    except Exception:
+        # The batch rejects malformed input as a whole; decode step by step so such a step only fails itself.
+        batch = [None] * len(steps)
+
+    for (entry, (probs, action, context, round_num)), bits in zip(steps, batch):
+        if bits is None:
+            # Not decodable in the batch: the scalar decoder reports why (warning or exception)
+            try:
+                bits = differential_based_decoder(
+                    probabilities=probs,
+                    selected_behavior=action,
+                    context_for_key=context,
+                    round_num=round_num
+                )
+            except Exception as exc:
+                errors.append(f"Step {entry.get('step_num')} decode failed: {exc}")
+                continue
 
         decoded_bits_segments.append(bits)
 
@@ -40,9 +40,10 @@ try:
     from agentmark.core.watermark_sampler import (
         sample_behavior_differential,
         differential_based_decoder,
+        decode_batch,
         generate_contextual_key
     )
-    from agentmark.core.coding_utils import encode_payload, decode_message
+    from agentmark.core.coding_utils import encode_payload, decode_message, decode_messages, get_codec
     from agentmark.core.rlnc_codec import DeterministicRLNC
     
     AGENTMARK_AVAILABLE = True
@@ -496,18 +497,43 @@ class WatermarkManager:
                 else:
                     i += 1
             
-            # Extract bits from each round
-            for round_data in round_data_list:
-                # Only extract from rounds that actually embedded bits
-                bits_embedded = round_data.get('bits_embedded', 0)
-                if bits_embedded > 0:
-                    bits = differential_based_decoder(
-                        probabilities=round_data['probabilities_watermark'],
-                        selected_behavior=round_data['selected_behavior_watermark'],
-                        context_for_key=round_data['context_for_key'],
-                        round_num=round_data['round_num']
+            # Extract bits from each round (only rounds that actually embedded bits),
+            # decoding all of them in a single batch
+            embedded_rounds = [
+                round_data for round_data in round_data_list
+                if round_data.get('bits_embedded', 0) > 0
+            ]
+            try:
+                batch = decode_batch([
+                    (
+                        round_data['probabilities_watermark'],
+                        round_data['selected_behavior_watermark'],
+                        round_data['context_for_key'],
+                        round_data['round_num'],
                     )
-                    extracted_bits.append(bits)
+                    for round_data in embedded_rounds
+                ])
+            except Exception:
+                # Malformed input rejects the whole batch; decode round by round so it only fails itself
+                batch = [None] * len(embedded_rounds)
+
+            decoded_rounds, extracted_bits = [], []
+            for round_data, bits in zip(embedded_rounds, batch):
+                if bits is None:
+                    # Not decodable in the batch: the scalar decoder reports why
+                    try:
+                        bits = differential_based_decoder(
+                            probabilities=round_data['probabilities_watermark'],
+                            selected_behavior=round_data['selected_behavior_watermark'],
+                            context_for_key=round_data['context_for_key'],
+                            round_num=round_data['round_num']
+                        )
+                    except Exception as e:
+                        self.logger.warning(f"Failed to decode round {round_data.get('round_num')}: {e}")
+                        continue
+                decoded_rounds.append(round_data)
+                extracted_bits.append(bits)
+            embedded_rounds = decoded_rounds
             
             extracted_bit_stream = "".join(extracted_bits)
             
@@ -527,22 +553,13 @@ class WatermarkManager:
                 # But we actually need to match bits to their global indices.
                 # The log stores 'bit_index' which is the start index for that round.
                 
-                for round_data in round_data_list:
-                    bits_embedded = round_data.get('bits_embedded', 0)
-                    if bits_embedded > 0:
-                        start_idx = round_data.get('bit_index', 0)
-                        # Extract bits for this round
-                        bits = differential_based_decoder(
-                            probabilities=round_data['probabilities_watermark'],
-                            selected_behavior=round_data['selected_behavior_watermark'],
-                            context_for_key=round_data['context_for_key'],
-                            round_num=round_data['round_num']
-                        )
-                        
-                        # Add to list
-                        for i, bit_val in enumerate(bits):
-                            received_indices.append(start_idx + i)
-                            received_bits.append(bit_val)
+                for round_data, bits in zip(embedded_rounds, extracted_bits):
+                    start_idx = round_data.get('bit_index', 0)
+                    
+                    # Add to list
+                    for i, bit_val in enumerate(bits):
+                        received_indices.append(start_idx + i)
+                        received_bits.append(bit_val)
                 
                 # Perform RLNC Decoding
                 rlnc_key = self.config.get("rlnc_key", 42)
@@ -571,12 +588,11 @@ class WatermarkManager:
                 
                 return decoded_payload if is_valid else "", stats
             
-            if ecc_method == 'parity':
-                expected_length = payload_length + 1  # 8 + 1 = 9
-            elif ecc_method == 'hamming':
-                expected_length = 21  # Hamming(21,16)
-            else:
-                expected_length = payload_length
+            # Coded block length of the configured ECC (e.g. 8 + 1 for parity, 21 for Hamming(21,16))
+            try:
+                expected_length = get_codec(self.config, payload_length).n
+            except ValueError:
+                expected_length = payload_length  # unknown method: decode_message reports it per block
             
             # Decode sequentially by block size (cyclic validation)
             num_messages = len(extracted_bit_stream) // expected_length
@@ -602,13 +618,12 @@ class WatermarkManager:
                 total_corrections = 0
                 failed_validations = 0
                 
-                # Decode all complete blocks
-                for i in range(num_messages):
-                    start_idx = i * expected_length
-                    end_idx = start_idx + expected_length
-                    encoded_message = extracted_bit_stream[start_idx:end_idx]
-                    
-                    result = decode_message(encoded_message, self.config)
+                # Decode all complete blocks in one batch
+                encoded_messages = [
+                    extracted_bit_stream[i * expected_length:(i + 1) * expected_length]
+                    for i in range(num_messages)
+                ]
+                for result in decode_messages(encoded_messages, self.config):
                     decoded_payloads.append(result.get('decoded_payload', ''))
                     validation_results.append(result)
                     
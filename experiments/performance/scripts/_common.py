@@ -0,0 +1,25 @@
+"""
+Shared preamble of the performance scripts.
+
+Importing it puts the repository root on sys.path, so a script run as
+`python experiments/performance/scripts/<name>.py` can import agentmark and
+dashboard. Import it before those packages:
+
+    from _common import ROOT, expect
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def expect(ok: bool, label: str) -> int:
+    """1 (and a [FAIL] line) if the check failed, else 0; sum them into a failure count."""
+    if not ok:
+        print(f"[FAIL] {label}")
+    return 0 if ok else 1
@@ -0,0 +1,133 @@
+"""
+Startup (import-time) benchmark with a regression budget.
+
+Each module is imported in fresh interpreters under `python -X importtime`.
+The script reports the median cumulative import time, the slowest
+dependencies and the wall time of the whole process. It fails when:
+- a module exceeds its budget;
+- a forbidden heavy dependency (torch, transformers by default) ends up in
+  sys.modules after the import.
+
+The SDK and proxy only import torch when a torch backend is actually used
+(AGENTMARK_SAMPLER_BACKEND=torch, or the red-green baseline). The default
+numpy backend is bit-identical and torch-free.
+
+Usage:
+    python experiments/performance/scripts/benchmark_import_time.py
+    python experiments/performance/scripts/benchmark_import_time.py --repeats 9 --budget_ms agentmark.sdk=300
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from _common import ROOT, expect
+
+# Generous enough for slow CI hosts; importing torch alone takes seconds.
+DEFAULT_BUDGETS_MS = {
+    "agentmark.sdk": 500.0,
+    "agentmark.proxy.server": 1500.0,
+}
+DEFAULT_FORBIDDEN = ("torch", "transformers")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, float, float]]:
+    """(name, depth, self_ms, cumulative_ms) per `-X importtime` row."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us) / 1000.0, int(cumulative_us) / 1000.0))
+    return rows
+
+
+def direct_children(rows: List[Tuple[str, int, float, float]], module: str) -> List[Tuple[str, int, float, float]]:
+    """Depth-1 rows imported by `module` (importtime lists children before their parent)."""
+    pending: List[Tuple[str, int, float, float]] = []
+    for row in rows:
+        if row[1] == 0:
+            if row[0] == module:
+                return pending
+            pending = []
+        elif row[1] == 1:
+            pending.append(row)
+    return []
+
+
+def import_once(module: str, forbidden: Tuple[str, ...]) -> Dict[str, object]:
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps([m for m in {list(forbidden)!r} if m in sys.modules]))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.getenv("PYTHONPATH")])))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env, cwd=str(ROOT)
+    )
+    wall_ms = (time.perf_counter() - start) * 1000.0
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    rows = parse_importtime(proc.stderr)
+    top = [r for r in rows if r[0] == module and r[1] == 0]
+    return {
+        "cumulative_ms": top[-1][3] if top else sum(r[2] for r in rows),
+        "wall_ms": wall_ms,
+        "loaded_forbidden": json.loads(proc.stdout.strip().splitlines()[-1]),
+        "rows": rows,
+    }
+
+
+def parse_budgets(items: List[str]) -> Dict[str, float]:
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for item in items:
+        module, _, ms = item.partition("=")
+        budgets[module] = float(ms)
+    return budgets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=list(DEFAULT_BUDGETS_MS))
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module (median reported)")
+    parser.add_argument("--budget_ms", nargs="*", default=[], help="Per-module budget overrides, module=ms")
+    parser.add_argument("--forbid", nargs="*", default=list(DEFAULT_FORBIDDEN))
+    parser.add_argument("--top", type=int, default=8, help="Slowest dependencies to list per module")
+    args = parser.parse_args()
+
+    budgets = parse_budgets(args.budget_ms)
+    forbidden = tuple(args.forbid)
+    failures = 0
+    for module in args.modules:
+        runs = [import_once(module, forbidden) for _ in range(max(1, args.repeats))]
+        cumulative = statistics.median(r["cumulative_ms"] for r in runs)
+        wall = statistics.median(r["wall_ms"] for r in runs)
+        budget = budgets.get(module)
+        print(
+            f"[INFO] {module}: import {cumulative:.1f} ms (median of {len(runs)}), "
+            f"process {wall:.1f} ms, budget {budget if budget is not None else '-'} ms"
+        )
+        rows = sorted(runs, key=lambda r: r["cumulative_ms"])[len(runs) // 2]["rows"]
+        children = sorted(direct_children(rows, module), key=lambda r: r[3], reverse=True)
+        for name, _, _, cum in children[: args.top]:
+            print(f"         {cum:8.1f} ms  {name}")
+        loaded = sorted({m for r in runs for m in r["loaded_forbidden"]})
+        failures += expect(not loaded, f"{module} imports {', '.join(loaded)}")
+        if budget is not None:
+            failures += expect(cumulative <= budget, f"{module} import {cumulative:.1f} ms exceeds budget {budget:.0f} ms")
+
+    print(f"[INFO] import time checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Per-step prompt assembly and token accounting of dashboard agents: the
+incremental PromptBuffer against rebuilding the whole conversation every step.
+
+Conversations are synthetic ToolBench-style trajectories: an assistant JSON
+action and a tool observation per step, --steps steps long. Timings cover
+only what step_single_agent does around the LLM call:
+- rebuild: build_messages plus every trajectory turn, tiktoken.get_encoding,
+  json.dumps + encode of the whole prompt, and opening token_debug.log for
+  append. This is the previous code path.
+- incremental: PromptBuffer.sync(), counting the model output, and a
+  buffered logger line.
+Without tiktoken both paths count chars / 4, as the dashboard does.
+
+Checks:
+- At every step the buffer's messages equal the rebuilt ones.
+- Its token count equals a recount of those messages, and each step counts
+  only the turns added since the previous step.
+- Changing the episode's tools rebuilds the system prompt. A replaced or
+  shortened trajectory (session restore) is rebuilt in full.
+- The buffered logger writes nothing until a batch is due, then every line
+  in order.
+
+Usage:
+    python experiments/performance/scripts/benchmark_prompt_assembly.py
+    python experiments/performance/scripts/benchmark_prompt_assembly.py --steps 100 --observation_chars 4000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _common import expect
+
+from dashboard.server.core.prompt import PromptBuffer, build_messages
+from dashboard.server.utils import tokens
+from dashboard.server.utils.debug_log import get_file_logger
+
+WORDS = "the weather parcel status forecast delivered route api response error city temperature".split()
+
+
+def make_episode(n_tools: int) -> dict:
+    summaries = [
+        {"name": f"tool_{i}_for_demo", "description": f"Demo API number {i}",
+         "parameters": {"type": "object", "properties": {"q": {"type": "string"}}}}
+        for i in range(n_tools)
+    ]
+    return {"tool_summaries": summaries, "admissible_commands": [s["name"] for s in summaries] + ["Finish"]}
+
+
+def make_turns(step: int, observation_chars: int, rng: random.Random) -> list:
+    thought = " ".join(rng.choice(WORDS) for _ in range(30))
+    action = {"action": f"tool_{step % 5}_for_demo", "thought": thought, "action_args": {"q": f"query {step}"}}
+    observation = ""
+    while len(observation) < observation_chars:
+        observation += json.dumps({"step": step, "text": " ".join(rng.choice(WORDS) for _ in range(12))})
+    return [{"role": "assistant", "message": json.dumps(action, ensure_ascii=False)},
+            {"role": "tool", "message": observation}]
+
+
+def rebuild_messages(query: str, episode: dict, trajectory: list) -> list:
+    """The previous per-step assembly in step_single_agent."""
+    messages = build_messages(query, episode["tool_summaries"], episode["admissible_commands"])
+    for turn in trajectory:
+        if turn["role"] == "assistant":
+            messages.append({"role": "assistant", "content": turn["message"]})
+        elif turn["role"] == "tool":
+            messages.append({"role": "user", "content": f"Observation:\n{turn['message']}\nContinue Thought/Action/Action Input."})
+        elif turn["role"] == "user":
+            messages.append({"role": "user", "content": turn["message"]})
+    return messages
+
+
+def rebuild_step(query: str, episode: dict, trajectory: list, model_output: str, log_path: Path) -> float:
+    messages = rebuild_messages(query, episode, trajectory)
+    try:
+        encoding = tokens.tiktoken.get_encoding(tokens.ENCODING_NAME)
+    except Exception:
+        encoding = None
+    if encoding:
+        used = float(len(encoding.encode(json.dumps(messages, ensure_ascii=False))) + len(encoding.encode(model_output)))
+    else:
+        used = (len(json.dumps(messages)) + len(model_output)) / 4.0
+    with open(str(log_path), "a") as f:
+        f.write(f"Agent: bench, Step: {len(trajectory)}, Tokens: {used}, LastAPI: 0.0\n")
+    return used
+
+
+def incremental_step(buffer: PromptBuffer, query: str, episode: dict, trajectory: list, model_output: str, logger) -> float:
+    buffer.sync(query, episode, trajectory)
+    used = buffer.prompt_tokens + tokens.count_tokens(model_output)
+    logger.debug(f"Agent: bench, Step: {len(trajectory)}, Tokens: {used}, LastAPI: 0.0")
+    return used
+
+
+def recount(messages: list) -> float:
+    return sum(tokens.count_message_tokens(m) for m in messages) + tokens.REPLY_PRIMING_TOKENS
+
+
+class CountingTokens:
+    """Wraps tokens.count_tokens to count the texts it is asked to encode."""
+
+    def __init__(self) -> None:
+        self.texts = 0
+        self._count = tokens.count_tokens
+
+    def __enter__(self):
+        def counting(text):
+            self.texts += 1
+            return self._count(text)
+
+        tokens.count_tokens = counting
+        return self
+
+    def __exit__(self, *exc) -> None:
+        tokens.count_tokens = self._count
+
+
+def check_buffer(args, rng: random.Random) -> int:
+    failures = 0
+    query, episode = "Where is my parcel?", make_episode(args.tools)
+    buffer, trajectory = PromptBuffer(), []
+    with CountingTokens() as counter:
+        buffer.sync(query, episode, trajectory)
+        for step in range(args.steps):
+            trajectory.extend(make_turns(step, args.observation_chars, rng))
+            before = counter.texts
+            messages = buffer.sync(query, episode, trajectory)
+            # role + content of each of the 2 new messages
+            failures += expect(counter.texts - before == 4, f"step {step}: counted {counter.texts - before} texts")
+            if messages != rebuild_messages(query, episode, trajectory):
+                failures += expect(False, f"step {step}: messages differ from a rebuild")
+    failures += expect(buffer.prompt_tokens == recount(messages), "running token count != recount")
+
+    # /api/continue: new tool lists and a user turn
+    new_episode = make_episode(args.tools + 2)
+    episode["tool_summaries"], episode["admissible_commands"] = new_episode["tool_summaries"], new_episode["admissible_commands"]
+    trajectory.append({"role": "user", "message": "And the weather there?"})
+    messages = buffer.sync(query, episode, trajectory)
+    failures += expect(messages == rebuild_messages(query, episode, trajectory), "tool change not reflected")
+    failures += expect(buffer.prompt_tokens == recount(messages), "token count after tool change")
+
+    # /api/restore_session assigns a new list; a shorter one also resets
+    restored = [dict(t) for t in trajectory[:6]]
+    for label in ("replaced", "shortened"):
+        if label == "shortened":
+            del restored[2:]
+        messages = buffer.sync(query, episode, restored)
+        failures += expect(messages == rebuild_messages(query, episode, restored), f"{label} trajectory not rebuilt")
+        failures += expect(buffer.prompt_tokens == recount(messages), f"token count after {label} trajectory")
+    return failures
+
+
+def check_logger(tmp: Path) -> int:
+    path = tmp / "buffered.log"
+    logger = get_file_logger("agentmark.bench.buffered", path, capacity=16, flush_interval=3600.0)
+    for i in range(15):
+        logger.debug(f"line {i}")
+    failures = expect(not path.exists() or path.read_text() == "", "logger wrote before its batch was due")
+    logger.debug("line 15")
+    lines = path.read_text(encoding="utf-8").splitlines() if path.exists() else []
+    failures += expect(lines == [f"line {i}" for i in range(16)], f"logger wrote {len(lines)} lines")
+    for handler in logger.handlers:
+        handler.close()
+    return failures
+
+
+def benchmark(args, tmp: Path) -> None:
+    rng = random.Random(args.seed)
+    query, episode = "Where is my parcel?", make_episode(args.tools)
+    conversations = [[turn for step in range(args.steps) for turn in make_turns(step, args.observation_chars, rng)]
+                     for _ in range(args.conversations)]
+    model_output = json.dumps({"thought": "check the parcel", "action": "tool_0_for_demo", "action_args": {"q": "x"}})
+    logger = get_file_logger("agentmark.bench.token_debug", tmp / "incremental.log")
+
+    rebuild_s = [0.0] * args.steps
+    incremental_s = [0.0] * args.steps
+    for turns in conversations:
+        trajectory, buffer = [], PromptBuffer()
+        for step in range(args.steps):
+            start = time.perf_counter()
+            old = rebuild_step(query, episode, trajectory, model_output, tmp / "rebuild.log")
+            rebuild_s[step] += time.perf_counter() - start
+            start = time.perf_counter()
+            new = incremental_step(buffer, query, episode, trajectory, model_output, logger)
+            incremental_s[step] += time.perf_counter() - start
+            trajectory.extend(turns[2 * step : 2 * step + 2])
+
+    n = args.conversations
+    counter = "tiktoken " + tokens.ENCODING_NAME if tokens.get_encoding() is not None else "chars / 4 (tiktoken unavailable)"
+    print(f"[INFO] {n} conversations x {args.steps} steps, ~{args.observation_chars} chars per observation, "
+          f"{args.tools} tools; counting with {counter}")
+    print(f"{'path':>12} {'first_ms':>9} {'last_ms':>9} {'conv_ms':>9}")
+    for label, times in (("rebuild", rebuild_s), ("incremental", incremental_s)):
+        print(f"{label:>12} {times[0] / n * 1e3:9.3f} {times[-1] / n * 1e3:9.3f} {sum(times) / n * 1e3:9.2f}")
+    print(f"[INFO] last step speedup {rebuild_s[-1] / incremental_s[-1]:.1f}x, "
+          f"whole conversation {sum(rebuild_s) / sum(incremental_s):.1f}x")
+    for handler in logger.handlers:
+        handler.close()
+    # the rebuild counted the JSON-escaped message list; the buffer counts message contents plus chat framing
+    print(f"[INFO] tokens at step {args.steps}: rebuild {old:.0f}, incremental {new:.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--observation_chars", type=int, default=1500)
+    parser.add_argument("--tools", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=25)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = check_buffer(args, rng)
+        failures += check_logger(Path(tmp))
+        benchmark(args, Path(tmp))
+    print(f"[INFO] prompt assembly checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Recall@k and latency of the dashboard retriever's vector indexes against the
+current exact path (torch cos_sim + topk over a float32 tensor).
+
+Corpus embeddings are synthetic by default: clustered unit vectors shaped
+like the full ToolBench API set (~50k x 768). Queries are perturbed corpus
+rows. Pass --embeddings to use real ones (a .npy of corpus embeddings, e.g.
+saved from ToolBenchRetriever). For each index configuration it reports:
+- build time;
+- resident index size;
+- single-query latency (p50 / p95);
+- recall@k against the exact path.
+
+It also compares loading the on-disk layout (memory-mapped .npy plus document
+table) with torch.load of the legacy single-file cache.
+
+Exact float32, and IVF probing every list, must reproduce the reference
+top-k (recall@k >= 0.999). The script fails otherwise.
+
+Usage:
+    python experiments/performance/scripts/benchmark_retriever_index.py
+    python experiments/performance/scripts/benchmark_retriever_index.py --corpus 16000 --queries 500 --k 5
+    python experiments/performance/scripts/benchmark_retriever_index.py --embeddings corpus.npy
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _common import expect
+
+import numpy as np
+
+from dashboard.server.vector_index import DocumentTable, build_index, load_index, normalize_rows, save_index
+
+CONFIGS = (
+    ("exact", "float32", None),
+    ("exact", "float16", None),
+    ("exact", "int8", None),
+    ("ivf", "float32", 8),
+    ("ivf", "float32", 16),
+    ("ivf", "float32", 32),
+    ("ivf", "int8", 16),
+)
+
+
+def synthetic_corpus(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = normalize_rows(rng.standard_normal((clusters, dim)))
+    assign = rng.integers(0, clusters, size=n)
+    # noise norm ~0.7 of a cluster center: tight topical groups, like tool descriptions of one category
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * (0.7 / np.sqrt(dim))
+    return normalize_rows(centers[assign] + noise)
+
+
+def reference_search(corpus: np.ndarray, queries: np.ndarray, k: int):
+    """The current retriever path: util.cos_sim + torch.topk, one query at a time."""
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    ids, latencies = [], []
+    if torch is not None:
+        corpus_t = torch.from_numpy(corpus)
+        for q in queries:
+            start = time.perf_counter()
+            q_t = torch.from_numpy(q)[None, :]
+            scores = torch.nn.functional.normalize(q_t, dim=1) @ torch.nn.functional.normalize(corpus_t, dim=1).T
+            top = torch.topk(scores[0], k=k)
+            latencies.append(time.perf_counter() - start)
+            ids.append(top.indices.numpy())
+    else:
+        for q in queries:
+            start = time.perf_counter()
+            scores = corpus @ q
+            top = np.argpartition(-scores, k - 1)[:k]
+            latencies.append(time.perf_counter() - start)
+            ids.append(top[np.argsort(-scores[top])])
+    return np.array(ids), latencies
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def compare_load(corpus: np.ndarray) -> None:
+    documents = [
+        {"text": f"Category: c{i % 49}, Tool: t{i // 3}, API: a{i}, Description: does thing {i}",
+         "category_name": f"c{i % 49}", "tool_name": f"t{i // 3}", "api_name": f"a{i}",
+         "api_description": f"does thing {i}", "raw_data": {"name": f"a{i}", "method": "GET", "required_parameters": []}}
+        for i in range(len(corpus))
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp) / "retriever_index"
+        DocumentTable.write(directory, documents)
+        save_index(build_index(corpus, "exact", "float32"), directory)
+        start = time.perf_counter()
+        index, table = load_index(directory), DocumentTable(directory)
+        _ = table[len(table) // 2], index.data[len(index) // 2].sum()
+        mmap_s = time.perf_counter() - start
+        table.close()
+        legacy = ""
+        try:
+            import torch
+
+            path = Path(tmp) / "retriever_cache.pt"
+            torch.save({"documents": documents, "embeddings": torch.from_numpy(corpus)}, path)
+            start = time.perf_counter()
+            torch.load(path, map_location="cpu")
+            legacy = f", legacy torch.load {time.perf_counter() - start:.3f}s"
+        except ImportError:
+            pass
+    print(f"[INFO] load: mmap index + document table {mmap_s:.3f}s{legacy}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=int, default=50000, help="Synthetic corpus rows")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--embeddings", type=str, default=None, help="Real corpus embeddings (.npy) instead of synthetic")
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.embeddings:
+        corpus = normalize_rows(np.load(args.embeddings))
+    else:
+        corpus = synthetic_corpus(args.corpus, args.dim, args.clusters, rng)
+    picks = rng.integers(0, len(corpus), size=args.queries)
+    noise = rng.standard_normal((args.queries, corpus.shape[1])).astype(np.float32) * (0.5 / np.sqrt(corpus.shape[1]))
+    queries = normalize_rows(corpus[picks] + noise)
+
+    truth, ref_lat = reference_search(corpus, queries, args.k)
+    print(f"[INFO] corpus {corpus.shape[0]} x {corpus.shape[1]}, {args.queries} queries, k={args.k}")
+    print(f"{'index':>18} {'build_s':>8} {'size_MB':>8} {'p50_ms':>8} {'p95_ms':>8} {'recall':>7}")
+    print(f"{'reference(torch)':>18} {'-':>8} {corpus.nbytes / 1e6:8.1f} "
+          f"{percentile(ref_lat, 0.5) * 1e3:8.2f} {percentile(ref_lat, 0.95) * 1e3:8.2f} {1.0:7.3f}")
+
+    failures = 0
+    for kind, dtype, nprobe in CONFIGS:
+        start = time.perf_counter()
+        index = build_index(corpus, kind, dtype, **({"nprobe": nprobe} if nprobe else {}))
+        build_s = time.perf_counter() - start
+        found, latencies = [], []
+        for q in queries:
+            start = time.perf_counter()
+            found.append(index.search(q, args.k)[1][0])
+            latencies.append(time.perf_counter() - start)
+        recall = recall_at_k(np.array(found), truth)
+        label = f"{kind}/{dtype}" + (f"/p{nprobe}" if nprobe else "")
+        print(f"{label:>18} {build_s:8.2f} {index.nbytes / 1e6:8.1f} {percentile(latencies, 0.5) * 1e3:8.2f} "
+              f"{percentile(latencies, 0.95) * 1e3:8.2f} {recall:7.3f}")
+        if (kind, dtype) == ("exact", "float32"):
+            failures += expect(recall >= 0.999, f"exact float32 recall {recall:.4f} < 0.999")
+        if (kind, dtype, nprobe) == ("ivf", "float32", 16):
+            # probing every list degenerates to the exact scan
+            full = [index.search(q, args.k, nprobe=index.nlist)[1][0] for q in queries[:20]]
+            failures += expect(recall_at_k(np.array(full), truth[:20]) >= 0.999, "ivf with nprobe=nlist is not exact")
+
+    compare_load(corpus)
+    print(f"[INFO] retriever index checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Per-step latency of the differential encoder/decoder for each sampler backend.
+
+"sdk" is the proxy's per-request path: AgentWatermarker.sample (encode, target
+list, distribution diff) followed by an immediate decode of the same step.
+
+Usage:
+    python experiments/performance/scripts/benchmark_sampler.py --sizes 3 10 50 --steps 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agentmark.core.watermark_sampler import (
+    SAMPLER_BACKENDS,
+    clear_step_plan_cache,
+    differential_based_decoder,
+    sample_behavior_differential,
+)
+from agentmark.sdk.watermarker import AgentWatermarker
+
+
+def make_steps(n_actions: int, steps: int, seed: int):
+    rng = random.Random(seed)
+    out = []
+    for i in range(steps):
+        weights = [rng.random() ** 2 + 1e-3 for _ in range(n_actions)]
+        total = sum(weights)
+        probs = {f"tool_{j}": w / total for j, w in enumerate(weights)}
+        out.append((probs, f"bench||step{i}", i))
+    return out
+
+
+def time_per_call(fn, items) -> tuple:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(*item)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 10, 50])
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--backends", nargs="+", default=list(SAMPLER_BACKENDS))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    payload = "10110011" * 1024
+    print(f"{'backend':<8} {'n':>4} {'op':<7} {'mean_us':>9} {'p50_us':>9} {'p99_us':>9}")
+    for n_actions in args.sizes:
+        steps = make_steps(n_actions, args.steps, args.seed)
+        for backend in args.backends:
+            encoded = []
+
+            def encode(probs, context, round_num):
+                res = sample_behavior_differential(
+                    probs, payload, round_num, context_for_key=context, round_num=round_num, backend=backend
+                )
+                encoded.append((probs, res[0], context, round_num))
+
+            def decode(probs, action, context, round_num):
+                differential_based_decoder(
+                    probs, action, context_for_key=context, round_num=round_num, backend=backend
+                )
+
+            wm = AgentWatermarker(payload_bits=payload, backend=backend)
+
+            def sdk_step(probs, context, round_num):
+                result = wm.sample(probs, context=context, round_num=round_num)
+                wm.decode(probs, result.action, context=context, round_num=round_num)
+
+            # Warm up imports/allocators before timing.
+            for item in steps[:20]:
+                encode(*item)
+            encoded.clear()
+            clear_step_plan_cache()
+
+            enc = time_per_call(encode, steps)
+            # Standalone decode (e.g. offline log analysis) does not reuse the encoder's plans.
+            clear_step_plan_cache()
+            dec = time_per_call(decode, encoded)
+            clear_step_plan_cache()
+            sdk = time_per_call(sdk_step, steps)
+            for op, stats in (("encode", enc), ("decode", dec), ("sdk", sdk)):
+                print(f"{backend:<8} {n_actions:>4} {op:<7} {stats[0]:>9.1f} {stats[1]:>9.1f} {stats[2]:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
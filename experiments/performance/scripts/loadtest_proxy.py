@@ -0,0 +1,291 @@
+"""
+Load test for the AgentMark proxy against a local stub LLM.
+
+Starts a stub OpenAI-compatible server (fixed JSON scoring reply after
+--stub_latency_ms; streamed as --stub_tokens chunks --stub_token_ms apart when
+stream=true) and the proxy (uvicorn agentmark.proxy.server:app) pointed at it,
+then sends --requests chat completions with --concurrency in flight and
+reports p50/p95/p99 latency, time to first byte and requests per second,
+followed by the mean time per proxy stage from the proxy's /metrics.
+
+Pass --target to load-test an already running proxy instead (the stub and
+proxy are not started).
+
+Usage:
+    python experiments/performance/scripts/loadtest_proxy.py --requests 500 --concurrency 32
+    python experiments/performance/scripts/loadtest_proxy.py --tool_mode two_pass --stream
+    python experiments/performance/scripts/loadtest_proxy.py --tool_mode two_pass --proxy_env AGENTMARK_SPECULATIVE=1
+    python experiments/performance/scripts/loadtest_proxy.py --target http://127.0.0.1:8001 --requests 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+TOOLS = [
+    {"type": "function", "function": {"name": name, "parameters": {"type": "object", "properties": {"query": {"type": "string"}}}}}
+    for name in ("search", "lookup", "calculator")
+]
+
+
+def stub_app(latency_ms: float, tokens: int = 1, token_ms: float = 0.0):
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+    content = json.dumps({
+        "action_weights": {"search": 0.5, "lookup": 0.3, "calculator": 0.15, "finish": 0.05},
+        "action_args": {"search": {"query": "agentmark"}, "lookup": {"query": "agentmark"}},
+        "thought": "stub",
+    })
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def completions(body: dict):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if body.get("stream"):
+            return StreamingResponse(stream(body.get("model", "stub")), media_type="text/event-stream")
+        if token_ms and tokens > 1:
+            await asyncio.sleep((tokens - 1) * token_ms / 1000)  # whole reply generated before returning
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 40, "total_tokens": 140},
+        }
+
+    async def stream(model: str):
+        step = max(1, -(-len(content) // max(1, tokens)))
+        for i in range(0, len(content), step):
+            if i and token_ms:
+                await asyncio.sleep(token_ms / 1000)
+            delta = {"role": "assistant", "content": content[i:i + step]} if i == 0 else {"content": content[i:i + step]}
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start within {timeout:.0f}s")
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+async def run_load(target: str, total: int, concurrency: int, sessions: int, warmup: int, stream: bool = False) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=120.0, trust_env=False) as client:
+        async def one(i: int):
+            body = {
+                "model": "gpt-4o",
+                "messages": [{"role": "user", "content": f"Find information about item {i}."}],
+                "tools": TOOLS,
+                "stream": stream,
+            }
+            start = time.perf_counter()
+            first = None
+            async with client.stream(
+                "POST", "/v1/chat/completions", json=body, headers={"x-agentmark-session": f"load-{i % sessions}"}
+            ) as resp:
+                async for _ in resp.aiter_bytes():
+                    if first is None:
+                        first = time.perf_counter() - start
+            return time.perf_counter() - start, resp.status_code, first
+
+        for i in range(warmup):
+            await one(i)
+
+        slots = asyncio.Semaphore(concurrency)
+
+        async def bounded(i: int):
+            async with slots:
+                return await one(i)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(bounded(i) for i in range(total)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if not isinstance(r, BaseException) and r[1] == 200]
+    latencies = sorted(r[0] for r in ok)
+    first_bytes = sorted(r[2] for r in ok if r[2] is not None)
+    errors = total - len(latencies)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p95_ms": percentile(latencies, 95) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+        "ttfb_p50_ms": percentile(first_bytes, 50) * 1e3,
+        "ttfb_p99_ms": percentile(first_bytes, 99) * 1e3,
+    }
+
+
+def scrape_metrics(target: str) -> dict:
+    """{"name{labels}": value} from the proxy's /metrics (empty if unavailable)."""
+    try:
+        text = httpx.get(f"{target}/metrics", timeout=10.0, trust_env=False).text
+    except httpx.HTTPError:
+        return {}
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+def labelled(samples: dict, name: str, label: str) -> dict:
+    prefix = f'{name}{{{label}="'
+    return {key[len(prefix):-2]: value for key, value in samples.items() if key.startswith(prefix)}
+
+
+def stage_breakdown(samples: dict) -> dict:
+    """Mean milliseconds per stage from agentmark_proxy_stage_seconds."""
+    sums = labelled(samples, "agentmark_proxy_stage_seconds_sum", "stage")
+    counts = labelled(samples, "agentmark_proxy_stage_seconds_count", "stage")
+    return {stage: 1000.0 * sums[stage] / counts[stage] for stage in sums if counts.get(stage)}
+
+
+def speculation_summary(samples: dict) -> dict:
+    """Outcome counts, hit rate and mean saved ms of speculative two_pass calls (AGENTMARK_SPECULATIVE=1)."""
+    outcomes = labelled(samples, "agentmark_proxy_speculation_total", "outcome")
+    if not outcomes:
+        return {}
+    hits = samples.get("agentmark_proxy_speculation_saved_seconds_count", 0.0)
+    saved = samples.get("agentmark_proxy_speculation_saved_seconds_sum", 0.0)
+    return dict(
+        outcomes,
+        hit_rate=outcomes.get("hit", 0.0) / sum(outcomes.values()),
+        saved_ms_per_hit=1000.0 * saved / hits if hits else 0.0,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sessions", type=int, default=16, help="Distinct x-agentmark-session values")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--stub_latency_ms", type=float, default=50.0, help="Simulated upstream latency")
+    parser.add_argument("--stub_tokens", type=int, default=20, help="Chunks per streamed stub reply")
+    parser.add_argument("--stub_token_ms", type=float, default=5.0, help="Delay between streamed stub chunks")
+    parser.add_argument("--tool_mode", default="proxy", choices=["proxy", "two_pass", "none"])
+    parser.add_argument("--stream", action="store_true", help="Request stream=true (SSE)")
+    parser.add_argument("--target", default=None, help="Existing proxy base URL (skip starting stub/proxy)")
+    parser.add_argument("--proxy_workers", type=int, default=1, help="uvicorn --workers for the proxy "
+                        "(set AGENTMARK_SESSION_STORE via --proxy_env when > 1)")
+    parser.add_argument("--proxy_env", nargs="*", default=[], help="Extra KEY=VALUE env for the proxy process")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the summary")
+    parser.add_argument("--serve_stub", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_stub is not None:
+        import uvicorn
+
+        uvicorn.run(stub_app(args.stub_latency_ms, args.stub_tokens, args.stub_token_ms), host="127.0.0.1", port=args.serve_stub, log_level="warning")
+        return
+
+    procs = []
+    target = args.target
+    try:
+        if target is None:
+            stub_port, proxy_port = free_port(), free_port()
+            procs.append(subprocess.Popen(
+                [sys.executable, __file__, "--serve_stub", str(stub_port), "--stub_latency_ms", str(args.stub_latency_ms),
+                 "--stub_tokens", str(args.stub_tokens), "--stub_token_ms", str(args.stub_token_ms)],
+            ))
+            env = dict(os.environ)
+            env.update({
+                "DEEPSEEK_API_KEY": "stub",
+                "TARGET_LLM_BASE": f"http://127.0.0.1:{stub_port}",
+                "AGENTMARK_TOOL_MODE": args.tool_mode,
+                "NO_PROXY": "127.0.0.1,localhost",
+                "no_proxy": "127.0.0.1,localhost",
+                "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")])),
+            })
+            env.update(dict(item.split("=", 1) for item in args.proxy_env))
+            procs.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "agentmark.proxy.server:app",
+                 "--host", "127.0.0.1", "--port", str(proxy_port), "--log-level", "warning",
+                 "--workers", str(args.proxy_workers)],
+                env=env, cwd=str(ROOT), stdout=subprocess.DEVNULL,
+            ))
+            wait_for_port(stub_port)
+            wait_for_port(proxy_port)
+            target = f"http://127.0.0.1:{proxy_port}"
+
+        summary = asyncio.run(run_load(target, args.requests, args.concurrency, max(1, args.sessions), args.warmup, args.stream))
+        samples = scrape_metrics(target)
+        summary["stage_mean_ms"] = stage_breakdown(samples)
+        summary["speculation"] = speculation_summary(samples)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    summary["stub_latency_ms"] = args.stub_latency_ms if args.target is None else None
+    summary["stream"] = args.stream
+    print(f"{'requests':>8} {'conc':>5} {'errors':>6} {'rps':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} "
+          f"{'ttfb_p50':>8} {'ttfb_p99':>8}")
+    print(f"{summary['requests']:>8} {summary['concurrency']:>5} {summary['errors']:>6} {summary['rps']:>8.1f} "
+          f"{summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f} "
+          f"{summary['ttfb_p50_ms']:>8.1f} {summary['ttfb_p99_ms']:>8.1f}")
+    if summary["stage_mean_ms"]:
+        print("stage mean ms: " + "  ".join(f"{k}={v:.2f}" for k, v in summary["stage_mean_ms"].items()))
+    if summary["speculation"]:
+        print("speculation: " + "  ".join(f"{k}={v:.2f}" for k, v in summary["speculation"].items()))
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    if summary["errors"]:
+        print(f"[FAIL] {summary['errors']} requests failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Check ToolBenchAdapter.astep() against step(), and that it does not block
+the event loop.
+
+The LLM is replaced by scripted chat-completions clients (sync and async)
+that answer after --llm_delay seconds; the StableToolBench cache is a temp
+directory. Checks:
+- astep() returns exactly what step() returns: Finish, unknown tool, cache
+  hit (exact and case-insensitive args), description fallback without a
+  client, and generated fake responses (async client, or the sync client
+  run in a worker thread). Generated responses are written to the fake
+  cache in both paths.
+- Retries on invalid JSON behave the same in both generators.
+- Two agents' tool calls awaited together take about one LLM delay, not
+  two, and the event loop keeps ticking meanwhile. A sync step() run
+  inline stalls it for the whole delay.
+
+Usage:
+    python experiments/performance/scripts/verify_adapter_astep.py
+    python experiments/performance/scripts/verify_adapter_astep.py --llm_delay 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from _common import expect
+
+from agentmark.environments.toolbench.adapter import ToolBenchAdapter
+from agentmark.environments.toolbench import fake_response
+
+TASK = {
+    "query": "Where is my parcel?",
+    "api_list": [
+        {"category_name": "Logistics", "tool_name": "suivi-colis", "api_name": "Latest",
+         "api_description": "Latest status of a parcel", "required_parameters": [{"name": "colisId"}]},
+        {"category_name": "Weather", "tool_name": "meteo", "api_name": "Forecast",
+         "api_description": "Weather forecast", "required_parameters": []},
+    ],
+}
+
+
+def completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class ScriptedClient:
+    """chat.completions.create() returning scripted contents (the last one repeats)."""
+
+    def __init__(self, contents, delay: float, is_async: bool) -> None:
+        self.contents = list(contents)
+        self.calls = 0
+        self.delay = delay
+
+        def create(**kwargs):
+            self.calls += 1
+            time.sleep(self.delay)
+            return completion(self.contents[min(self.calls, len(self.contents)) - 1])
+
+        async def acreate(**kwargs):
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            return completion(self.contents[min(self.calls, len(self.contents)) - 1])
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=acreate if is_async else create))
+
+
+def make_adapter(tmp: Path, **kwargs) -> ToolBenchAdapter:
+    cache_dir = tmp / "cache" / "Logistics" / "suivi_colis_for_Logistics"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    (cache_dir / "latest.json").write_text(json.dumps({
+        "{'colisid': 'CA107308006SI'}": {"error": "", "response": {"status": "delivered"}},
+    }), encoding="utf-8")
+    adapter = ToolBenchAdapter(tmp / "tools", cache_root=tmp / "cache", fake_cache_root=tmp / "fake", **kwargs)
+    return adapter
+
+
+def check_equivalence(tmp: Path) -> int:
+    failures = 0
+    generated = json.dumps({"error": "", "response": "{\"forecast\": \"sunny\"}"})
+    adapter = make_adapter(tmp)
+    episode = adapter.prepare_episode(TASK)
+    summaries = episode["tool_summaries"]
+    logistics, weather = summaries[0]["name"], summaries[1]["name"]
+    actions = [
+        {"tool": "Finish", "arguments": {"final_answer": "done"}},
+        {"tool": "NoSuchTool", "arguments": {"x": 1}},
+        {"tool": logistics, "arguments": {"colisId": "CA107308006SI"}},
+        {"tool": weather, "arguments": {"city": "Paris"}},
+    ]
+    for action in actions:
+        failures += expect(adapter.step(action, summaries) == asyncio.run(adapter.astep(action, summaries)),
+                           f"no client: step != astep for {action['tool']}")
+
+    sync_adapter = make_adapter(tmp, client=ScriptedClient([generated], 0.0, False))
+    async_adapter = make_adapter(tmp, async_client=ScriptedClient([generated], 0.0, True))
+    thread_adapter = make_adapter(tmp, client=ScriptedClient([generated], 0.0, False))
+    for a in (sync_adapter, async_adapter, thread_adapter):
+        a.prepare_episode(TASK)
+    for action in actions:
+        want = sync_adapter.step(action, summaries)
+        for label, a in (("async client", async_adapter), ("sync client in thread", thread_adapter)):
+            got = asyncio.run(a.astep(action, summaries))
+            failures += expect(got == want, f"{label}: astep != step for {action['tool']}: {got['observation'][:80]}")
+    failures += expect(want["observation"].startswith("[Gen]"), "weather call was not generated")
+    saved = list((tmp / "fake").rglob("*.json"))
+    failures += expect(len(saved) == 1 and json.loads(saved[0].read_text()) == json.loads(generated),
+                       f"fake cache files {saved}")
+
+    # invalid JSON, then valid: both generators retry once (after their 1 s pause) and agree
+    sync_client = ScriptedClient(["not json", generated], 0.0, False)
+    async_client = ScriptedClient(["not json", generated], 0.0, True)
+    args = dict(model="m", api_doc={"name": "x"}, tool_input={}, api_examples=[], query="q")
+    a = fake_response.generate_fake_response(sync_client, **args)
+    b = asyncio.run(fake_response.agenerate_fake_response(async_client, **args))
+    failures += expect(a == b == json.loads(generated) and sync_client.calls == async_client.calls == 2,
+                       "retry behaviour differs")
+    return failures
+
+
+async def timed_with_ticker(work, tick: float = 0.005):
+    """(elapsed seconds of `work`, largest gap between ticks of a ticker coroutine)."""
+    gaps, last = [], time.perf_counter()
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal last
+        while not done.is_set():
+            await asyncio.sleep(tick)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(tick)
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await task
+    return elapsed, max(gaps)
+
+
+def check_concurrency(tmp: Path, delay: float) -> int:
+    failures = 0
+    generated = json.dumps({"error": "", "response": "{}"})
+    agents = []
+    for _ in range(2):  # watermarked + baseline
+        adapter = make_adapter(tmp, client=ScriptedClient([generated], delay, False),
+                               async_client=ScriptedClient([generated], delay, True))
+        agents.append((adapter, adapter.prepare_episode(TASK)["tool_summaries"]))
+    action = lambda summaries: {"tool": summaries[1]["name"], "arguments": {"city": "Paris"}}
+
+    async def sequential_sync():
+        for adapter, summaries in agents:
+            adapter.step(action(summaries), summaries)
+
+    async def concurrent_async():
+        await asyncio.gather(*(adapter.astep(action(summaries), summaries) for adapter, summaries in agents))
+
+    async def concurrent_thread():
+        for adapter, _ in agents:
+            adapter.async_client = None
+        await asyncio.gather(*(adapter.astep(action(summaries), summaries) for adapter, summaries in agents))
+
+    for label, work in (("inline step()", sequential_sync), ("astep, async client", concurrent_async),
+                        ("astep, sync client in thread", concurrent_thread)):
+        elapsed, gap = asyncio.run(timed_with_ticker(work))
+        print(f"[INFO] two tool calls with a {delay * 1e3:.0f} ms LLM: {label}: {elapsed * 1e3:.0f} ms total, "
+              f"event loop max stall {gap * 1e3:.0f} ms")
+        if label != "inline step()":
+            failures += expect(elapsed < 1.5 * delay, f"{label}: tool calls did not overlap ({elapsed:.3f}s)")
+            failures += expect(gap < delay / 2, f"{label}: event loop stalled {gap:.3f}s")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm_delay", type=float, default=0.3, help="Seconds per scripted LLM call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = check_equivalence(Path(tmp) / "equivalence")
+        failures += check_concurrency(Path(tmp) / "concurrency", args.llm_delay)
+    print(f"[INFO] adapter astep checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
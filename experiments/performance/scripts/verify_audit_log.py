@@ -0,0 +1,145 @@
+"""
+Check for the proxy audit log.
+
+- Concurrent writers lose nothing: every queued record is on disk after
+  close(), in batches, plain and (if `zstandard` is installed) zstd.
+- write() does not block when the queue is full; overflow is counted.
+- Offline replay: decoding each record's (probabilities_used, action,
+  context_used, round_num) with a fresh AgentWatermarker gives the
+  record's decoded_bits, so the log alone is enough for detection.
+
+Usage:
+    python experiments/performance/scripts/verify_audit_log.py
+    python experiments/performance/scripts/verify_audit_log.py --audit_log /tmp/agentmark-audit.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+from _common import expect
+
+from agentmark.proxy.audit_log import AuditLog, read_audit_log
+from agentmark.sdk import AgentWatermarker, PromptWatermarkWrapper
+
+
+def check_writers(path: Path, writers: int, per_writer: int, compression=None) -> int:
+    log = AuditLog(str(path), compression=compression, batch_size=64, flush_interval=0.05)
+
+    def work(w: int) -> None:
+        for i in range(per_writer):
+            log.write({"writer": w, "i": i, "text": "步骤" * (i % 5)})
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    log.close()
+    stats = log.stats()
+    records = list(read_audit_log(str(path)))
+    seen = sorted((r["writer"], r["i"]) for r in records)
+    expected = [(w, i) for w in range(writers) for i in range(per_writer)]
+    label = log.compression or "plain"
+    failures = expect(seen == expected, f"{label}: {len(records)}/{len(expected)} records after close")
+    failures += expect(stats["written"] == len(expected) and stats["dropped"] == 0, f"{label}: stats {stats}")
+    failures += expect(stats["batches"] < len(expected), f"{label}: records were not batched")
+    print(f"[INFO] {label}: {len(records)} records in {stats['batches']} batches, {path.stat().st_size} bytes")
+    return failures
+
+
+def check_overflow(path: Path) -> int:
+    log = AuditLog(str(path), max_queue=4, flush_interval=0.05)
+    blocker = threading.Event()
+    original = log._write_batch
+    log._write_batch = lambda batch: (blocker.wait(5), original(batch))  # stall the writer thread
+    accepted = sum(log.write({"i": i}) for i in range(64))
+    blocker.set()
+    log.close()
+    stats = log.stats()
+    failures = expect(stats["dropped"] == 64 - accepted and stats["dropped"] > 0, f"overflow: {stats}")
+    failures += expect(stats["written"] == accepted, f"overflow: accepted records lost: {stats}")
+    return failures
+
+
+def proxy_like_records(rng: random.Random, steps: int):
+    """Records shaped like the proxy's full watermark payload, from real sampling."""
+    wm = AgentWatermarker(payload_bits="1011001110001111" * 4)
+    wrapper = PromptWatermarkWrapper(wm)
+    for step in range(steps):
+        actions = [f"tool_{i}" for i in range(rng.randrange(2, 7))]
+        raw = json.dumps({"action_weights": {a: rng.random() + 0.01 for a in actions}})
+        result = wrapper.process(raw, fallback_actions=actions, context=f"session||step{step}", round_num=step)
+        yield {
+            "action": result["action"],
+            "probabilities_used": result["probabilities_used"],
+            "decoded_bits": wm.decode(
+                result["probabilities_used"], result["action"], context=f"session||step{step}", round_num=step
+            ),
+            "context_used": result["frontend_data"]["watermark_meta"].get("context"),
+            "round_num": step,
+        }
+
+
+def check_replay(path: Path) -> int:
+    failures = 0
+    replayed = 0
+    decoder = AgentWatermarker()
+    for record in read_audit_log(str(path)):
+        if record.get("mode") == "explicit_finish" or "probabilities_used" not in record:
+            continue
+        decoded = decoder.decode(
+            record["probabilities_used"],
+            record["action"],
+            context=record.get("context_used") or "",
+            round_num=record["round_num"],
+        )
+        failures += expect(decoded == record["decoded_bits"], f"replay round={record['round_num']}: {decoded}")
+        replayed += 1
+    print(f"[INFO] replayed {replayed} records from {path.name}, {failures} mismatches")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--records", type=int, default=500, help="Records per writer")
+    parser.add_argument("--steps", type=int, default=60, help="Sampled steps for the replay check")
+    parser.add_argument("--seed", type=int, default=19)
+    parser.add_argument("--audit_log", default=None, help="Also replay an existing proxy audit log")
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        failures += check_writers(tmp / "plain.jsonl", args.writers, args.records)
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("[INFO] zstandard not installed; skipping the zstd log")
+        else:
+            failures += check_writers(tmp / "audit.jsonl.zst", args.writers, args.records)
+        failures += check_overflow(tmp / "overflow.jsonl")
+
+        log = AuditLog(str(tmp / "replay.jsonl"))
+        for record in proxy_like_records(random.Random(args.seed), args.steps):
+            log.write(record)
+        log.close()
+        failures += check_replay(tmp / "replay.jsonl")
+
+    if args.audit_log:
+        failures += check_replay(Path(args.audit_log))
+
+    print(f"[INFO] audit log checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
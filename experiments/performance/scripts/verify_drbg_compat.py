@@ -0,0 +1,147 @@
+"""
+Compatibility check: fast DRBG vs. the original string-based DRBG.
+
+1. Raw output: generate_random_bits / generate_random / generate_block must
+   reproduce the legacy sequence for random keys, nonces and precisions.
+2. Logs: traces are written with the legacy DRBG patched into the sampler,
+   then decoded with the current DRBG (scalar decoder and decode_batch); the
+   decoded bits must equal the bits recorded at embedding time.
+
+Usage:
+    python experiments/performance/scripts/verify_drbg_compat.py --trials 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import os
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agentmark.core import watermark_sampler
+from agentmark.core.watermark_sampler import (
+    DRBG,
+    decode_batch,
+    differential_based_decoder,
+    sample_behavior_differential,
+    sample_behavior_red_green,
+)
+
+
+class LegacyDRBG:
+    """The DRBG as originally shipped (bit strings + int(bits, 2))."""
+
+    def __init__(self, key, nonce):
+        self.key = key
+        self.nonce = nonce
+        self.counter = 0
+
+    def generate_random_bits(self, n):
+        message = self.nonce + self.counter.to_bytes(4, 'big')
+        hmac_sha512 = hmac.new(self.key, message, hashlib.sha512).digest()
+        self.counter += 1
+
+        bits = ''.join(format(byte, '08b') for byte in hmac_sha512)
+        return bits[:n]
+
+    def generate_random(self, n):
+        random_bits = self.generate_random_bits(n)
+        random_int = int(random_bits, 2)
+        random_float = random_int / (2**n)
+        return random_float
+
+    def generate_block(self, count, n=52):
+        # Definition of a block: successive single draws.
+        return [self.generate_random(n) for _ in range(count)]
+
+
+def check_raw(rng: random.Random, trials: int) -> int:
+    failures = 0
+    precisions = [1, 7, 8, 31, 32, 52, 53, 64, 255, 511, 512, 600]
+    for trial in range(trials):
+        key = os.urandom(rng.choice([16, 32, 64, 200]))
+        nonce = str(rng.randrange(10**6)).encode("utf-8")
+        n = rng.choice(precisions)
+        legacy, fast, block = LegacyDRBG(key, nonce), DRBG(key, nonce), DRBG(key, nonce)
+
+        expected = [legacy.generate_random(n) for _ in range(6)]
+        got = [fast.generate_random(n) for _ in range(3)] + fast.generate_block(3, n=n)
+        got_block = block.generate_block(6, n=n)
+        bits_ok = LegacyDRBG(key, nonce).generate_random_bits(n) == DRBG(key, nonce).generate_random_bits(n)
+        if got != expected or got_block != expected or not bits_ok or fast.counter != legacy.counter:
+            failures += 1
+            print(f"[FAIL] raw trial={trial} n={n}")
+    return failures
+
+
+def write_legacy_log(rng: random.Random, steps: int):
+    """Embed a payload with the legacy DRBG and record what each step carried."""
+    payload = "".join(rng.choice("01") for _ in range(steps * 8))
+    log = []
+    bit_index = 0
+    watermark_sampler.DRBG = LegacyDRBG
+    try:
+        for step in range(steps):
+            n_actions = rng.choice([2, 3, 5, 8, 13, 40])
+            weights = [rng.random() + 1e-3 for _ in range(n_actions)]
+            total = sum(weights)
+            probs = {f"act_{i}": w / total for i, w in enumerate(weights)}
+            context = f"legacy||task{step // 10}||step{step}"
+            chosen, _, num, _ = sample_behavior_differential(
+                probs, payload, bit_index, context_for_key=context, round_num=step
+            )
+            red_green = sample_behavior_red_green(probs, context_for_key=context, round_num=step)
+            log.append({
+                "probs": probs,
+                "chosen": chosen,
+                "context": context,
+                "round_num": step,
+                "bits": payload[bit_index:bit_index + num],
+                "red_green": red_green,
+            })
+            bit_index += num
+    finally:
+        watermark_sampler.DRBG = DRBG
+    return log
+
+
+def check_logs(rng: random.Random, steps: int) -> int:
+    failures = 0
+    log = write_legacy_log(rng, steps)
+    batch = decode_batch([(e["probs"], e["chosen"], e["context"], e["round_num"]) for e in log])
+    for entry, batch_bits in zip(log, batch):
+        bits = differential_based_decoder(
+            entry["probs"], entry["chosen"], context_for_key=entry["context"], round_num=entry["round_num"]
+        )
+        red_green = sample_behavior_red_green(
+            entry["probs"], context_for_key=entry["context"], round_num=entry["round_num"]
+        )
+        if bits != entry["bits"] or batch_bits != entry["bits"] or red_green != entry["red_green"]:
+            failures += 1
+            print(f"[FAIL] log round={entry['round_num']}: recorded={entry['bits']!r} decoded={bits!r} batch={batch_bits!r}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = check_raw(rng, args.trials) + check_logs(rng, args.steps)
+    print(f"[INFO] {args.trials} raw trials, {args.steps} logged steps, {failures} mismatches")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
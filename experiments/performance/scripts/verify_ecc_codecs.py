@@ -0,0 +1,210 @@
+"""
+Compatibility check: table-driven ECC codecs vs. the original coding_utils.
+
+- parity (8 bits) and Hamming(21,16) must encode identically to the original
+  functions and decode every single-bit error identically (payload, valid,
+  corrected). Out-of-range Hamming syndromes are now reported as invalid.
+- Hamming(n,k) and parity at other lengths, with and without ecc_block_bits,
+  must round-trip and correct any single-bit error per block.
+- Reed-Solomon must correct up to rs_parity_symbols // 2 corrupted bytes.
+- decode_many (decode_messages) must equal decode_message for every batch.
+
+Usage:
+    python experiments/performance/scripts/verify_ecc_codecs.py --trials 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agentmark.core.coding_utils import decode_message, decode_messages, encode_payload, get_codec
+
+
+def legacy_parity(data_bits):
+    return data_bits + ("1" if data_bits.count("1") % 2 else "0")
+
+
+def legacy_hamming_encode(data_bits):
+    encoded = [0] * 22
+    data_positions = [i for i in range(1, 22) if i & (i - 1) != 0]
+    for i, pos in enumerate(data_positions[:16]):
+        encoded[pos] = int(data_bits[i])
+    for p in [1, 2, 4, 8, 16]:
+        parity = 0
+        for i in range(1, 22):
+            if i & p and i != p:
+                parity ^= encoded[i]
+        encoded[p] = parity
+    return "".join(str(encoded[i]) for i in range(1, 22))
+
+
+def legacy_hamming_decode(message_bits):
+    """Original decode_message result for hamming; syndrome > 21 was silently 'valid'."""
+    received = [0] + [int(b) for b in message_bits]
+    syndrome = 0
+    for p in [1, 2, 4, 8, 16]:
+        parity = 0
+        for i in range(1, 22):
+            if i & p:
+                parity ^= received[i]
+        if parity:
+            syndrome += p
+    if 1 <= syndrome <= 21:
+        received[syndrome] ^= 1
+    data_positions = [i for i in range(1, 22) if i & (i - 1) != 0]
+    data = "".join(str(received[pos]) for pos in data_positions[:16])
+    return data, legacy_hamming_encode(data) != message_bits, syndrome <= 21
+
+
+def flips(word, count, rng):
+    bits = list(word)
+    for q in rng.sample(range(len(bits)), count):
+        bits[q] = "1" if bits[q] == "0" else "0"
+    return "".join(bits)
+
+
+def check_legacy(rng: random.Random, trials: int) -> int:
+    failures = 0
+    parity_cfg = {"payload_bit_length": 8, "ecc_method": "parity"}
+    hamming_cfg = {"payload_bit_length": 16, "ecc_method": "hamming"}
+    for trial in range(trials):
+        data8 = "".join(rng.choice("01") for _ in range(8))
+        data16 = "".join(rng.choice("01") for _ in range(16))
+        ok = encode_payload(data8, parity_cfg) == legacy_parity(data8)
+        ok &= encode_payload(data16, hamming_cfg) == legacy_hamming_encode(data16)
+
+        word = legacy_parity(data8)
+        for q in range(9):
+            received = word[:q] + ("1" if word[q] == "0" else "0") + word[q + 1:]
+            result = decode_message(received, parity_cfg)
+            ok &= result["decoded_payload"] == received[:8] and not result["valid"] and not result["corrected"]
+
+        word = legacy_hamming_encode(data16)
+        received_words = [word] + [flips(word, 1, rng) for _ in range(4)] + [flips(word, 2, rng) for _ in range(4)]
+        for received in received_words:
+            data, corrected, in_range = legacy_hamming_decode(received)
+            result = decode_message(received, hamming_cfg)
+            if in_range:
+                ok &= (result["decoded_payload"], result["corrected"], result["valid"]) == (data, corrected, True)
+            else:
+                ok &= not result["valid"]
+        if not ok:
+            failures += 1
+            print(f"[FAIL] legacy trial={trial} data8={data8} data16={data16}")
+    return failures
+
+
+def check_lengths(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        method = rng.choice(["hamming", "parity", "none"])
+        k = rng.choice([1, 4, 11, 26, 32, 57, 64, 120])
+        config = {"payload_bit_length": k, "ecc_method": method}
+        if rng.random() < 0.4:
+            config["ecc_block_bits"] = rng.choice([4, 8, 11])
+        codec = get_codec(config)
+        data = "".join(rng.choice("01") for _ in range(k))
+        word = encode_payload(data, config)
+        ok = len(word) == codec.n and decode_message(word, config)["decoded_payload"] == data
+        if method == "hamming":
+            blocks = getattr(codec, "blocks", [codec])
+            received, pos = list(word), 0
+            for block in blocks:  # one error in every block
+                q = pos + rng.randrange(block.n)
+                received[q] = "1" if received[q] == "0" else "0"
+                pos += block.n
+            result = decode_message("".join(received), config)
+            ok &= result["valid"] and result["corrected"] and result["decoded_payload"] == data
+        if not ok:
+            failures += 1
+            print(f"[FAIL] length trial={trial} config={config}")
+    return failures
+
+
+def check_reed_solomon(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        k = rng.choice([8, 13, 16, 32, 64, 100])
+        nsym = rng.choice([2, 4, 6, 8])
+        config = {"payload_bit_length": k, "ecc_method": rng.choice(["reed_solomon", "rs"]), "rs_parity_symbols": nsym}
+        data = "".join(rng.choice("01") for _ in range(k))
+        word = encode_payload(data, config)
+        received = list(word)
+        byte_starts = list(range(0, k, 8)) + [k + 8 * i for i in range(nsym)]
+        for start in rng.sample(byte_starts, min(len(byte_starts), rng.randrange(0, nsym // 2 + 1))):
+            end = min(start + 8, k) if start < k else start + 8
+            q = rng.randrange(start, end)
+            received[q] = "1" if received[q] == "0" else "0"
+        result = decode_message("".join(received), config)
+        ok = result["valid"] and result["decoded_payload"] == data
+        ok &= result["corrected"] == (received != list(word))
+        if not ok:
+            failures += 1
+            print(f"[FAIL] reed_solomon trial={trial} k={k} nsym={nsym} result={result}")
+    return failures
+
+
+def check_decode_many(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        method = rng.choice(["hamming", "parity", "none", "reed_solomon"])
+        k = rng.choice([8, 16, 24])
+        config = {"payload_bit_length": k, "ecc_method": method}
+        if method != "reed_solomon" and rng.random() < 0.3:
+            config["ecc_block_bits"] = 4
+        n = get_codec(config).n
+        messages = [flips(encode_payload("".join(rng.choice("01") for _ in range(k)), config), rng.randrange(0, 3), rng)
+                    for _ in range(rng.randrange(1, 30))]
+        if decode_messages(messages, config) != [decode_message(m, config) for m in messages] or any(len(m) != n for m in messages):
+            failures += 1
+            print(f"[FAIL] decode_many trial={trial} config={config}")
+    return failures
+
+
+def benchmark(rng: random.Random, count: int) -> None:
+    config = {"payload_bit_length": 16, "ecc_method": "hamming"}
+    messages = [flips(legacy_hamming_encode("".join(rng.choice("01") for _ in range(16))), rng.randrange(0, 2), rng)
+                for _ in range(count)]
+    timings = {}
+    start = time.perf_counter()
+    for m in messages:
+        legacy_hamming_decode(m)
+    timings["legacy"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for m in messages:
+        decode_message(m, config)
+    timings["decode_message"] = time.perf_counter() - start
+    start = time.perf_counter()
+    decode_messages(messages, config)
+    timings["decode_messages"] = time.perf_counter() - start
+    print("[INFO] hamming(21,16) decode of " + f"{count} messages: "
+          + ", ".join(f"{name}={seconds * 1e6 / count:.2f}us/msg" for name, seconds in timings.items()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--bench", type=int, default=20000, help="Messages in the decode benchmark (0 disables)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = check_legacy(rng, args.trials) + check_lengths(rng, args.trials)
+    failures += check_reed_solomon(rng, args.trials) + check_decode_many(rng, max(1, args.trials // 3))
+    print(f"[INFO] {args.trials} trials, {failures} mismatches")
+    if args.bench:
+        benchmark(rng, args.bench)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
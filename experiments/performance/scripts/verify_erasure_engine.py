@@ -0,0 +1,271 @@
+"""
+Check for the step-erasure Monte-Carlo engine (experiments/rlnc_trajectory/scripts/erasure_engine.py).
+
+- Serial reference: every cell record equals the trial the scripts computed
+  before the engine (the serial loops of rlnc_step_erasure_eval.py and
+  step_erasure_codec_compare.py, kept below), for iid / burst / trunc erasure
+  in episode and global scope and for the rlnc, noec and repetition codecs.
+  The summaries are aggregates of these trials in the same order, so they
+  are unchanged.
+- Worker count: the same sweep on 1 and on --workers processes gives the same
+  records.
+- Resume: a sweep interrupted after a few chunks is finished by a second run
+  on the same journal, which only runs the missing cells (a torn last line is
+  ignored) and returns the records of an uninterrupted run. A journal written
+  for another sweep is discarded.
+
+Usage:
+    python experiments/performance/scripts/verify_erasure_engine.py
+    python experiments/performance/scripts/verify_erasure_engine.py --episodes 12 --trials 8 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+from _common import ROOT, expect
+
+sys.path.insert(0, str(ROOT / "experiments" / "rlnc_trajectory" / "scripts"))
+
+from agentmark.core.rlnc_codec import DeterministicRLNC, StreamingRLNCDecoder
+from erasure_engine import ErasureSimulation, ResultSink, decode_noec, decode_repetition
+
+P_LIST = [0.0, 0.2, 0.5, 0.7]
+
+
+@dataclass(frozen=True)
+class Step:
+    step_id: int
+    indices: Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class Episode:
+    query_id: str
+    steps: Tuple[Step, ...]
+
+
+def make_episodes(rng: random.Random, count: int) -> List[Episode]:
+    """Watermarked trajectories: consecutive coded-bit indices, some steps without packets."""
+    episodes, next_index = [], 0
+    for e in range(count):
+        steps = []
+        for s in range(rng.randint(4, 18)):
+            n = rng.choice([0, 1, 2, 3, 4])
+            steps.append(Step(s, tuple(range(next_index, next_index + n))))
+            next_index += n
+        episodes.append(Episode(f"q{e:03d}", tuple(steps)))
+    return episodes
+
+
+# --- the serial loops the scripts ran before the engine -------------------------------------
+
+def legacy_erase(steps, p, mode, burst_len, keep_ratio, rng):
+    if mode == "iid":
+        return [s for s in steps if rng.random() >= p]
+    if mode == "burst":
+        n = len(steps)
+        if n == 0:
+            return []
+        target_drop = int(round(n * p))
+        if target_drop <= 0:
+            return list(steps)
+        drop = set()
+        while len(drop) < target_drop and len(drop) < n:
+            start = rng.randrange(0, n)
+            for i in range(start, min(n, start + burst_len)):
+                drop.add(i)
+                if len(drop) >= target_drop:
+                    break
+        return [s for i, s in enumerate(steps) if i not in drop]
+    return list(steps[:int(len(steps) * keep_ratio)])
+
+
+def legacy_rlnc(indices, encoder):
+    decoder = StreamingRLNCDecoder(encoder)
+    decoder.add_packets(indices, [int(encoder.get_bit(i)) for i in indices])
+    return decoder.rank, decoder.payload()
+
+
+def legacy_eval_trials(episodes, payload, key, p, trials, seed, mode, scope, burst_len=8, keep_ratio=0.5):
+    """rlnc_step_erasure_eval.run_trials_for_p: (query_id, success, steps, packets, rank, packets/step)."""
+    encoder = DeterministicRLNC(payload, stream_key=key)
+    out = []
+
+    def trial(query_id, kept):
+        indices = [i for s in kept for i in s.indices]
+        rank, decoded = legacy_rlnc(indices, encoder)
+        pps = (len(indices) / len(kept)) if kept else 0.0
+        out.append((query_id, decoded == payload, len(kept), len(indices), rank, pps))
+
+    if scope == "episode":
+        for ep_idx, ep in enumerate(episodes):
+            for r in range(trials):
+                rng = random.Random(seed + (ep_idx + 1) * 100000 + r * 1000 + int(p * 1000))
+                trial(ep.query_id, legacy_erase(ep.steps, p, mode, burst_len, keep_ratio, rng))
+    else:
+        for r in range(trials):
+            rng = random.Random(seed + r * 1000 + int(p * 1000))
+            kept_all = []
+            for ep_idx, ep in enumerate(episodes):
+                rng_ep = random.Random(rng.randint(0, 2**31 - 1) + ep_idx * 17)
+                kept_all.extend(legacy_erase(ep.steps, p, mode, burst_len, keep_ratio, rng_ep))
+            trial("(global)", kept_all)
+    return out
+
+
+def legacy_compare_trials(episodes, payload, key, codec, p, trials, seed):
+    """step_erasure_codec_compare main loop: (success, steps, packets, rank or None) per trial."""
+    out = []
+    for r in range(trials):
+        rng_master = random.Random(seed + r * 1000 + int(p * 1000))
+        kept_all = []
+        for ep_idx, ep in enumerate(episodes):
+            rng_ep = random.Random(rng_master.randint(0, 2**31 - 1) + ep_idx * 17)
+            kept_all.extend(s for s in ep.steps if rng_ep.random() >= p)
+        indices = [i for s in kept_all for i in s.indices]
+        rank = None
+        if codec == "rlnc":
+            rank, decoded = legacy_rlnc(indices, DeterministicRLNC(payload, stream_key=key))
+        else:
+            bits = [int(payload[i % len(payload)]) for i in indices]
+            decode = decode_noec if codec == "noec" else decode_repetition
+            decoded = decode(payload, indices, bits)
+        out.append((decoded == payload, len(kept_all), len(indices), rank))
+    return out
+
+
+# --- checks ---------------------------------------------------------------------------------
+
+def check_serial_reference(episodes, payload, key, trials, seed) -> int:
+    failures, cells = 0, 0
+    for mode in ("iid", "burst", "trunc"):
+        for scope in ("episode", "global"):
+            sim = ErasureSimulation(episodes, payload, stream_key=key, mode=mode, scope=scope, seed=seed)
+            records = sim.run(P_LIST, trials)
+            for p in P_LIST:
+                got = [
+                    (r["query_id"], r["success"], r["received_steps"], r["received_packets"], r["rank"], r["packets_per_step"])
+                    for r in records if r["p"] == p
+                ]
+                expected = legacy_eval_trials(episodes, payload, key, p, trials, seed, mode, scope)
+                cells += len(got)
+                failures += expect(got == expected, f"{mode}/{scope} p={p}: engine trials differ from the serial loop")
+
+    codecs = ("rlnc", "noec", "repetition")
+    sim = ErasureSimulation(episodes, payload, stream_key=key, mode="iid", scope="global", seed=seed)
+    records = sim.run(P_LIST, trials, codecs=codecs)
+    for codec in codecs:
+        for p in P_LIST:
+            got = [
+                (r["success"], r["received_steps"], r["received_packets"], r["rank"])
+                for r in records if r["codec"] == codec and r["p"] == p
+            ]
+            cells += len(got)
+            failures += expect(
+                got == legacy_compare_trials(episodes, payload, key, codec, p, trials, seed),
+                f"compare {codec} p={p}: engine trials differ from the serial loop",
+            )
+    successes = sum(r["success"] for r in records)
+    print(f"[INFO] serial reference: {cells} cells compared ({successes}/{len(records)} codec-compare cells decode)")
+    return failures
+
+
+def check_workers(episodes, payload, key, trials, seed, workers) -> int:
+    sim = ErasureSimulation(episodes, payload, stream_key=key, mode="burst", scope="episode", seed=seed)
+    serial = sim.run(P_LIST, trials, codecs=("rlnc", "repetition"), workers=1)
+    pooled = sim.run(P_LIST, trials, codecs=("rlnc", "repetition"), workers=workers, chunk_size=3)
+    print(f"[INFO] workers: {len(serial)} cells on 1 and on {workers} processes")
+    return expect(serial == pooled, f"records differ between 1 and {workers} workers")
+
+
+class InterruptedSink(ResultSink):
+    """Journal that fails after `chunks` writes, like a sweep killed mid-run."""
+
+    def __init__(self, path, chunks: int):
+        super().__init__(path)
+        self.chunks = chunks
+
+    def write(self, records) -> None:
+        if self.chunks == 0:
+            raise KeyboardInterrupt("simulated interruption")
+        self.chunks -= 1
+        super().write(records)
+
+
+class CountingSimulation(ErasureSimulation):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ran = 0
+
+    def run_cell(self, cell):
+        self.ran += 1
+        return super().run_cell(cell)
+
+
+def check_resume(episodes, payload, key, trials, seed, tmp: Path) -> int:
+    failures = 0
+    sim = CountingSimulation(episodes, payload, stream_key=key, mode="iid", scope="episode", seed=seed)
+    full = sim.run(P_LIST, trials)
+    total = len(full)
+
+    journal = tmp / "trials.jsonl"
+    try:
+        sim.run(P_LIST, trials, sink=InterruptedSink(journal, chunks=3), chunk_size=5)
+        failures += expect(False, "interrupted sweep did not stop")
+    except KeyboardInterrupt:
+        pass
+    with journal.open("a", encoding="utf-8") as f:
+        f.write('{"codec": "rlnc", "p": 0.')  # torn line of the interrupted write
+    recorded = len(journal.read_text(encoding="utf-8").splitlines()) - 2  # minus manifest and torn line
+
+    sim.ran = 0
+    resumed = sim.run(P_LIST, trials, sink=ResultSink(journal), chunk_size=5)
+    failures += expect(recorded == 15, f"interrupted run journaled {recorded} cells, expected 15")
+    failures += expect(sim.ran == total - recorded, f"resume ran {sim.ran} cells, expected {total - recorded}")
+    failures += expect(resumed == full, "resumed sweep differs from an uninterrupted one")
+    lines = journal.read_text(encoding="utf-8").splitlines()
+    failures += expect(len(lines) == total + 1, f"journal has {len(lines) - 1} records, expected {total}")
+
+    sim.ran = 0
+    again = sim.run(P_LIST, trials, sink=ResultSink(journal))
+    failures += expect(sim.ran == 0 and again == full, f"finished sweep re-ran {sim.ran} cells")
+
+    other = CountingSimulation(episodes, payload, stream_key=key, mode="iid", scope="episode", seed=seed + 1)
+    other.run(P_LIST, trials, sink=ResultSink(journal))
+    failures += expect(other.ran == total, f"journal of another sweep was resumed ({other.ran}/{total} cells run)")
+    print(f"[INFO] resume: {recorded}/{total} cells journaled before the interruption, {total - recorded} run on resume")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=8)
+    parser.add_argument("--trials", type=int, default=6)
+    parser.add_argument("--payload_bits", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    episodes = make_episodes(rng, args.episodes)
+    payload = "".join(rng.choice("01") for _ in range(args.payload_bits))
+    key = rng.randrange(2**31)
+
+    failures = check_serial_reference(episodes, payload, key, args.trials, args.seed)
+    failures += check_workers(episodes, payload, key, args.trials, args.seed, args.workers)
+    with tempfile.TemporaryDirectory() as tmp:
+        failures += check_resume(episodes, payload, key, args.trials, args.seed, Path(tmp))
+    print(f"[INFO] erasure engine checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
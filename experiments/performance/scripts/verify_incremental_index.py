@@ -0,0 +1,235 @@
+"""
+Check incremental re-indexing of the ToolBench tool corpus (dashboard
+retriever), on a generated tool tree.
+
+The retriever gets a deterministic hash-based encoder that counts the texts
+it encodes; encoding is what a full re-index spends its minutes on. For each
+change it checks what was parsed, encoded and tombstoned:
+- rebuilding from scratch encodes every distinct API text once;
+- a refresh with nothing changed opens no tool file;
+- touching a file (new mtime, same bytes) encodes nothing;
+- editing one API of a file encodes exactly that API's text;
+- deleted files are tombstoned, and new files/categories are appended;
+- compaction happens once tombstones pass COMPACT_RATIO;
+- a legacy retriever_cache.pt without manifest is adopted without encoding;
+- without a model, changed files stay pending and are picked up later.
+After every step the live corpus and the retrieval results must match a
+from-scratch build of the same tree, for exact and IVF/int8 indexes. Parallel
+parsing must give the same documents as parsing in-process.
+
+Usage:
+    python experiments/performance/scripts/verify_incremental_index.py
+    python experiments/performance/scripts/verify_incremental_index.py --files 3000 --apis 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _common import expect
+
+import numpy as np
+
+from dashboard.server.retriever import INDEX_DIR_NAME, LEGACY_CACHE_NAME, ToolBenchRetriever
+from dashboard.server.tool_corpus import COMPACT_RATIO, parse_tool_files, scan_tool_files
+
+DIM = 32
+
+
+class HashEncoder:
+    """Stands in for SentenceTransformer: unit vectors seeded by the text."""
+
+    def __init__(self) -> None:
+        self.encoded = 0
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.encoded += len(texts)
+        out = np.stack([self._vector(t) for t in texts]).astype(np.float32)
+        return out[0] if single else out
+
+    @staticmethod
+    def _vector(text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        v = np.random.default_rng(seed).standard_normal(DIM)
+        return v / np.linalg.norm(v)
+
+
+def write_tool(path: Path, tool: str, apis: int, rng: random.Random, version: int = 0) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "tool_name": tool,
+        "api_list": [
+            {"name": f"{tool}_api{i}", "description": f"{tool} endpoint {i} v{version} {rng.random():.6f}",
+             "method": "GET", "required_parameters": []}
+            for i in range(apis)
+        ],
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def make_tree(root: Path, files: int, apis: int, rng: random.Random) -> list:
+    paths = []
+    for i in range(files):
+        path = root / f"cat{i % 13}" / f"tool{i}.json"
+        write_tool(path, f"tool{i}", apis, rng)
+        paths.append(path)
+    return paths
+
+
+def retriever_for(root: Path, **kwargs) -> ToolBenchRetriever:
+    r = ToolBenchRetriever(str(root), device="cpu", **kwargs)
+    r.model = HashEncoder()
+    return r
+
+
+def live_corpus(r: ToolBenchRetriever) -> dict:
+    return {r.documents[int(row)]["text"]: r.documents[int(row)] for row in r.index.live_rows()}
+
+
+def matches_fresh_build(r: ToolBenchRetriever, root: Path, queries: list, label: str, **kwargs) -> int:
+    """Live corpus and top-k of the incremental index vs a from-scratch build of a copy of the tree."""
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = Path(tmp) / "tools"
+        shutil.copytree(root, copy, ignore=shutil.ignore_patterns(INDEX_DIR_NAME, LEGACY_CACHE_NAME))
+        fresh = retriever_for(copy, **kwargs)
+        fresh.index_tools()
+        failures = expect(live_corpus(r) == live_corpus(fresh), f"{label}: live corpus differs from a fresh build")
+        for q in queries:
+            got = [(a["tool_name"], a["api_name"]) for a in r.retrieve(q, top_k=5)]
+            want = [(a["tool_name"], a["api_name"]) for a in fresh.retrieve(q, top_k=5)]
+            failures += expect(got == want, f"{label}: top-5 for {q!r} {got} != {want}")
+        fresh._close_documents()
+    return failures
+
+
+def run_flow(base: Path, args, rng: random.Random, **kwargs) -> int:
+    label = "/".join(str(v) for v in kwargs.values()) or "exact/float32"
+    root = base / label.replace("/", "_") / "tools"
+    paths = make_tree(root, args.files, args.apis, rng)
+    queries = [f"tool{rng.randrange(args.files)} endpoint {rng.randrange(args.apis)}" for _ in range(8)]
+    failures = 0
+
+    r = retriever_for(root, **kwargs)
+    start = time.perf_counter()
+    r.index_tools()
+    full_s = time.perf_counter() - start
+    failures += expect(r.model.encoded == args.files * args.apis, f"{label}: full build encoded {r.model.encoded}")
+    failures += expect(len(r.documents) == args.files * args.apis, f"{label}: corpus size {len(r.documents)}")
+
+    r = retriever_for(root, **kwargs)
+    start = time.perf_counter()
+    r.index_tools()
+    noop_s = time.perf_counter() - start
+    stats = r.update_index()
+    failures += expect((stats["parsed"], r.model.encoded) == (0, 0), f"{label}: no-op refresh {stats}")
+
+    os.utime(paths[0], ns=(time.time_ns(), time.time_ns() + 10**9))
+    stats = r.update_index()
+    failures += expect((stats["parsed"], stats["touched"], stats["encoded"]) == (1, 1, 0), f"{label}: touch {stats}")
+
+    data = json.loads(paths[1].read_text(encoding="utf-8"))
+    data["api_list"][0]["description"] = "edited description"
+    paths[1].write_text(json.dumps(data), encoding="utf-8")
+    start = time.perf_counter()
+    stats = r.update_index()
+    edit_s = time.perf_counter() - start
+    ok = (stats["changed"], stats["encoded"], stats["reused"], stats["tombstoned"]) == (1, 1, args.apis - 1, args.apis)
+    failures += expect(ok, f"{label}: single edit {stats}")
+
+    paths[2].unlink()
+    write_tool(root / "new_category" / "fresh.json", "fresh", args.apis, rng)
+    stats = r.update_index()
+    ok = (stats["removed"], stats["changed"], stats["encoded"]) == (1, 1, args.apis)
+    failures += expect(ok, f"{label}: delete + add {stats}")
+    failures += matches_fresh_build(r, root, queries, f"{label} after edits", **kwargs)
+
+    # without a model, a changed file keeps serving its old rows until one is available
+    r.model, r.load_model = None, lambda: None
+    write_tool(paths[3], "tool3", args.apis, rng, version=1)
+    stats = r.update_index()
+    failures += expect(stats["changed"] == 0 and any(d["tool_name"] == "tool3" for d in live_corpus(r).values()),
+                       f"{label}: pending file without model {stats}")
+    r = retriever_for(root, **kwargs)
+    r.index_tools()
+    failures += expect(r.model.encoded == args.apis, f"{label}: pending file encoded {r.model.encoded}")
+
+    # rewrite enough files to pass the compaction threshold (appended rows count towards the total)
+    for path in paths[4 : 4 + max(1, int(args.files * 2 * COMPACT_RATIO))]:
+        write_tool(path, path.stem, args.apis, rng, version=2)
+    r.update_index()
+    failures += expect(r.index.deleted_count == 0 and len(r.index) == len(live_corpus(r)),
+                       f"{label}: not compacted ({r.index.deleted_count} tombstones of {len(r.index)})")
+    failures += matches_fresh_build(r, root, queries, f"{label} after compaction", **kwargs)
+
+    print(f"[INFO] {label}: {args.files} files x {args.apis} APIs; full build {full_s:.2f}s "
+          f"({args.files * args.apis} encoded), no-op refresh {noop_s:.3f}s, one-file edit {edit_s:.3f}s (1 encoded)")
+    r._close_documents()
+    return failures
+
+
+def check_legacy_cache(base: Path, args, rng: random.Random) -> int:
+    try:
+        import torch
+    except ImportError:
+        print("[INFO] torch not installed; legacy cache check skipped")
+        return 0
+    root = base / "legacy" / "tools"
+    make_tree(root, args.files // 4, args.apis, rng)
+    r = retriever_for(root)
+    r.index_tools()
+    documents = [r.documents[i] for i in range(len(r.documents))]
+    torch.save({"documents": documents, "embeddings": torch.from_numpy(np.array(r.index.vectors()))}, root / LEGACY_CACHE_NAME)
+    r._close_documents()
+    shutil.rmtree(root / INDEX_DIR_NAME)
+
+    r = retriever_for(root)
+    r.index_tools()
+    failures = expect(r.model.encoded == 0, f"legacy cache adoption encoded {r.model.encoded}")
+    failures += expect(len(r.documents) == len(documents) and r.index.deleted_count == 0, "legacy cache adoption")
+    r._close_documents()
+    return failures
+
+
+def check_parallel_parse(base: Path, args, rng: random.Random) -> int:
+    root = base / "parallel" / "tools"
+    make_tree(root, max(args.files, 600), args.apis, rng)
+    (root / "cat0" / "broken.json").write_text("{not json", encoding="utf-8")
+    files = sorted(scan_tool_files(root).values())
+    serial = parse_tool_files(root, files, workers=1)
+    parallel = parse_tool_files(root, files, workers=2)
+    return expect(serial == parallel and sum(1 for p in serial if p.error) == 1, "parallel parse differs from serial")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--apis", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=22)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        failures += run_flow(base, args, rng)
+        failures += run_flow(base, args, rng, index_kind="ivf", dtype="int8", nprobe=10**6)
+        failures += check_legacy_cache(base, args, rng)
+        failures += check_parallel_parse(base, args, rng)
+    print(f"[INFO] incremental index checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Check the dashboard retriever's query-embedding cache and retrieve_many().
+
+sentence-transformers is not needed: the retriever gets a deterministic
+hash-based encoder that counts encoder calls and texts. The index is a
+synthetic exact index of --corpus rows. Checks:
+- retrieve_many() returns what retrieve() returns for each query.
+- A batch of queries costs one encoder call for its distinct cache misses;
+  repeating the batch costs none.
+- Whitespace/NFKC variants share a cache entry. Case variants share one
+  only when the model's tokenizer lowercases.
+- The cache evicts least-recently-used entries, and size 0 disables it.
+- retrieve_tools() (the service helper the /api handlers await) keeps the
+  event loop responsive while a slow encode runs; calling retrieve() inline
+  would stall it.
+
+It also times a loop of single-query searches against one batched search.
+
+Usage:
+    python experiments/performance/scripts/verify_query_cache.py
+    python experiments/performance/scripts/verify_query_cache.py --corpus 50000 --queries 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import sys
+import time
+
+from _common import ROOT, expect
+
+import numpy as np
+
+from dashboard.server.retriever import ToolBenchRetriever
+from dashboard.server.services import retriever_service
+from dashboard.server.vector_index import build_index
+
+
+class HashEncoder:
+    """Stands in for SentenceTransformer: unit vectors seeded by the text."""
+
+    def __init__(self, dim: int, lowercase: bool = False, delay: float = 0.0) -> None:
+        self.dim = dim
+        self.calls = 0
+        self.texts = 0
+        self.delay = delay
+        self.tokenizer = type("Tokenizer", (), {"do_lower_case": lowercase})()
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.calls += 1
+        self.texts += len(texts)
+        if self.delay:
+            time.sleep(self.delay)  # a CPU encode, which releases the GIL inside torch
+        if self.tokenizer.do_lower_case:
+            texts = [t.lower() for t in texts]
+        out = np.stack([self._vector(t) for t in texts]).astype(np.float32)
+        return out[0] if single else out
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        v = np.random.default_rng(seed).standard_normal(self.dim)
+        return v / np.linalg.norm(v)
+
+
+def make_retriever(corpus: np.ndarray, documents: list, **kwargs) -> ToolBenchRetriever:
+    encoder_kwargs = {k: kwargs.pop(k) for k in ("lowercase", "delay") if k in kwargs}
+    r = ToolBenchRetriever(str(ROOT), device="cpu", **kwargs)
+    r.model = HashEncoder(corpus.shape[1], **encoder_kwargs)
+    r.index = build_index(corpus, "exact", "float32")
+    r.documents = documents
+    return r
+
+
+def names(results):
+    return [[(a["tool_name"], a["api_name"]) for a in apis] for apis in results]
+
+
+def check_cache(corpus: np.ndarray, documents: list, n_queries: int) -> int:
+    failures = 0
+    queries = [f"find tool number {i} for weather" for i in range(n_queries)]
+    batch = queries + [f"  find tool number {i}   for\tweather " for i in range(0, n_queries, 4)]
+
+    single = make_retriever(corpus, documents, query_cache_size=0)
+    expected = names([single.retrieve(q, top_k=5) for q in batch])
+    r = make_retriever(corpus, documents)
+    got = names(r.retrieve_many(batch, top_k=5))
+    failures += expect(got == expected, "retrieve_many differs from retrieve")
+    failures += expect((r.model.calls, r.model.texts) == (1, n_queries), f"batch encode {r.model.calls} calls / {r.model.texts} texts")
+    r.retrieve_many(batch, top_k=5)
+    failures += expect(r.model.calls == 1, "repeated batch re-encoded")
+    failures += expect(r.query_cache_hits == len(batch), f"hits {r.query_cache_hits}")
+
+    # NFKC: fullwidth characters fold to ASCII; case only folds for an uncased tokenizer
+    r.retrieve("ｆｉｎｄ tool number 0 for weather")
+    failures += expect(r.model.calls == 1, "NFKC variant missed the cache")
+    r.retrieve("FIND tool number 0 for weather")
+    failures += expect(r.model.calls == 2, "case variant hit the cache of a cased model")
+    uncased = make_retriever(corpus, documents, lowercase=True)
+    uncased.retrieve("Find Tool number 0"), uncased.retrieve("find tool NUMBER 0")
+    failures += expect(uncased.model.calls == 1, "case variant missed the cache of an uncased model")
+
+    lru = make_retriever(corpus, documents, query_cache_size=3)
+    for q in ("a", "b", "c", "a", "d"):  # "b" is the least recently used when "d" arrives
+        lru.retrieve(q)
+    calls = lru.model.calls
+    lru.retrieve("a"), lru.retrieve("c"), lru.retrieve("d")
+    failures += expect(lru.model.calls == calls, "recent entries evicted")
+    lru.retrieve("b")
+    failures += expect(lru.model.calls == calls + 1 and len(lru._query_cache) == 3, "LRU eviction order/size")
+
+    off = make_retriever(corpus, documents, query_cache_size=0)
+    off.retrieve("a"), off.retrieve("a")
+    failures += expect(off.model.calls == 2 and not off._query_cache, "size 0 still caches")
+    return failures
+
+
+async def max_loop_gap(work, tick: float = 0.005) -> float:
+    """Largest gap between ticks of a ticker coroutine while `work` runs."""
+    gaps, last = [], time.perf_counter()
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal last
+        while not done.is_set():
+            await asyncio.sleep(tick)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(tick)
+    await work()
+    done.set()
+    await task
+    return max(gaps)
+
+
+def check_event_loop(corpus: np.ndarray, documents: list, delay: float) -> int:
+    r = make_retriever(corpus, documents, delay=delay)
+    retriever_service.retriever = r
+
+    async def inline():
+        r.retrieve("inline query")
+
+    async def offloaded():
+        await asyncio.gather(*(retriever_service.retrieve_tools(f"offloaded query {i}") for i in range(4)))
+
+    inline_gap = asyncio.run(max_loop_gap(inline))
+    offloaded_gap = asyncio.run(max_loop_gap(offloaded))
+    retriever_service.retriever = None
+    print(f"[INFO] event loop max stall with a {delay * 1e3:.0f} ms encode: inline {inline_gap * 1e3:.0f} ms, "
+          f"retrieve_tools {offloaded_gap * 1e3:.0f} ms")
+    return expect(offloaded_gap < delay / 2, f"retrieve_tools stalled the loop {offloaded_gap * 1e3:.0f} ms")
+
+
+def report_batched_search(corpus: np.ndarray, documents: list, n_queries: int) -> None:
+    r = make_retriever(corpus, documents, query_cache_size=0)
+    queries = r.encode_queries([f"query {i}" for i in range(n_queries)])
+    start = time.perf_counter()
+    for q in queries:
+        r.index.search(q, 5)
+    loop_s = time.perf_counter() - start
+    start = time.perf_counter()
+    r.index.search(queries, 5)
+    batch_s = time.perf_counter() - start
+    print(f"[INFO] {n_queries} queries over {len(corpus)} x {corpus.shape[1]}: one search per query "
+          f"{loop_s * 1e3:.1f} ms, one batched search {batch_s * 1e3:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("--encode_delay", type=float, default=0.2, help="Seconds per simulated encoder call")
+    parser.add_argument("--seed", type=int, default=23)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    corpus = rng.standard_normal((args.corpus, args.dim)).astype(np.float32)
+    documents = [
+        {"text": f"doc {i}", "category_name": f"c{i % 49}", "tool_name": f"t{i // 3}", "api_name": f"a{i}",
+         "api_description": f"does thing {i}", "raw_data": {"name": f"a{i}"}}
+        for i in range(args.corpus)
+    ]
+    failures = check_cache(corpus, documents, args.queries)
+    failures += check_event_loop(corpus, documents, args.encode_delay)
+    report_batched_search(corpus, documents, args.queries)
+    print(f"[INFO] query cache checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
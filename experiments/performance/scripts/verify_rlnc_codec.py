@@ -0,0 +1,239 @@
+"""
+Compatibility check: packed RLNC codec vs. the original list-based codec.
+
+- "mt" rows, get_bit/get_stream and decode (full rank, rank deficient,
+  inconsistent) must equal the original implementation bit for bit.
+- "hash" mode must round-trip: encode a payload, drop packets, decode it.
+- StreamingRLNCDecoder must agree with the batch decoder on rank, payload and
+  consistency, packet by packet.
+- CoefficientRowCache (LRU slots and memory-mapped tables) must return the same
+  rows as uncached generation.
+- gf2_rank_batch must match the streaming decoder's rank and consistency for
+  every system of a batch (key sweeps and random right-hand sides).
+
+Usage:
+    python experiments/performance/scripts/verify_rlnc_codec.py --trials 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agentmark.core.rlnc_codec import (
+    CoefficientRowCache,
+    DeterministicRLNC,
+    StreamingRLNCDecoder,
+    coeff_rows_for_keys,
+    gf2_rank_batch,
+    precompute_coeff_table,
+)
+
+
+class LegacyRLNC:
+    """The codec as originally shipped (per-bit randint, int-array elimination)."""
+
+    def __init__(self, payload_bits_str, stream_key=42):
+        self.payload = [int(b) for b in payload_bits_str]
+        self.n = len(self.payload)
+        self.stream_key = stream_key
+
+    def get_bit(self, index):
+        coded_val = 0
+        for b_val, c_val in zip(self.payload, self._generate_coeffs(index)):
+            coded_val ^= (b_val & c_val)
+        return str(coded_val)
+
+    def _generate_coeffs(self, index):
+        rd = random.Random(f"{self.stream_key}_{index}")
+        return [rd.randint(0, 1) for _ in range(self.n)]
+
+    def decode(self, received_indices, received_bits):
+        if len(received_indices) < self.n:
+            return None
+        matrix = np.array([self._generate_coeffs(i) for i in received_indices], dtype=int)
+        vector = np.array([int(v) for v in received_bits], dtype=int)
+        rows, cols = matrix.shape
+        augmented = np.hstack((matrix, vector.reshape(-1, 1)))
+        pivot_row = 0
+        pivot_cols = []
+        for col in range(cols):
+            if pivot_row >= rows:
+                break
+            candidates = [r for r in range(pivot_row, rows) if augmented[r, col] == 1]
+            if not candidates:
+                continue
+            curr = candidates[0]
+            augmented[[pivot_row, curr]] = augmented[[curr, pivot_row]]
+            for r in range(rows):
+                if r != pivot_row and augmented[r, col] == 1:
+                    augmented[r] ^= augmented[pivot_row]
+            pivot_cols.append(col)
+            pivot_row += 1
+        if len(pivot_cols) != cols:
+            return None
+        x = np.zeros(cols, dtype=int)
+        for i, p_col in enumerate(pivot_cols):
+            x[p_col] = augmented[i, -1]
+        return "".join(map(str, x))
+
+
+def check_mt(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        n = rng.choice([1, 3, 8, 16, 31, 63, 64, 65, 100, 128])
+        key = rng.choice([42, 7, "abc", rng.randrange(10**6)])
+        payload = "".join(rng.choice("01") for _ in range(n))
+        legacy, packed = LegacyRLNC(payload, stream_key=key), DeterministicRLNC(payload, stream_key=key)
+
+        start = rng.randrange(0, 500)
+        length = rng.randrange(n, 2 * n + 8)
+        expected_stream = "".join(legacy.get_bit(i) for i in range(start, start + length))
+        ok = packed.get_stream(start, length) == expected_stream
+        ok &= packed.get_bit(start) == expected_stream[0]
+        ok &= packed._generate_coeffs(start) == legacy._generate_coeffs(start)
+
+        indices = sorted(rng.sample(range(start, start + length), rng.randrange(max(0, n - 2), length + 1)))
+        bits = [int(expected_stream[i - start]) for i in indices]
+        if bits and rng.random() < 0.3:
+            bits[rng.randrange(len(bits))] ^= 1  # inconsistent system
+        ok &= packed.decode(indices, bits) == legacy.decode(indices, bits)
+        if not ok:
+            failures += 1
+            print(f"[FAIL] mt trial={trial} n={n} key={key!r}")
+    return failures
+
+
+def check_hash(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        n = rng.choice([8, 64, 65, 256, 511, 512, 513, 1024])
+        payload = "".join(rng.choice("01") for _ in range(n))
+        codec = DeterministicRLNC(payload, stream_key=rng.randrange(10**6), coeff_mode="hash")
+        stream = codec.get_stream(0, n + 64)
+        kept = sorted(rng.sample(range(n + 64), n + 24))
+        decoded = codec.decode(kept, [stream[i] for i in kept])
+        if decoded is not None and decoded != payload:
+            failures += 1
+            print(f"[FAIL] hash trial={trial} n={n}: wrong payload")
+        if decoded is None:
+            print(f"[INFO] hash trial={trial} n={n}: rank deficient with 24 spare packets")
+    return failures
+
+
+def batch_rank(codec: DeterministicRLNC, indices) -> int:
+    matrix = np.array([codec._generate_coeffs(i) for i in indices], dtype=np.uint8).reshape(len(indices), codec.n)
+    rank = 0
+    for col in range(codec.n):
+        pivots = np.flatnonzero(matrix[rank:, col]) + rank
+        if not len(pivots):
+            continue
+        matrix[[rank, pivots[0]]] = matrix[[pivots[0], rank]]
+        rows = np.flatnonzero(matrix[:, col])
+        matrix[rows[rows != rank]] ^= matrix[rank]
+        rank += 1
+    return rank
+
+
+def check_streaming(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        n = rng.choice([1, 4, 16, 33, 64, 70])
+        mode = rng.choice(["mt", "hash"])
+        payload = "".join(rng.choice("01") for _ in range(n))
+        codec = DeterministicRLNC(payload, stream_key=trial, coeff_mode=mode)
+        decoder = StreamingRLNCDecoder(DeterministicRLNC("0" * n, stream_key=trial, coeff_mode=mode))
+        indices = [rng.randrange(0, 3 * n + 8) for _ in range(n + 12)]  # duplicates allowed
+        stream = codec.get_stream(0, 3 * n + 8)
+        corrupt = rng.random() < 0.3
+        ok = True
+        for pos, index in enumerate(indices, start=1):
+            bit = int(stream[index]) ^ int(corrupt and pos == len(indices) // 2)
+            decoder.add_packet(index, bit)
+            if pos % 7 == 0 or pos == len(indices):
+                ok &= decoder.rank == batch_rank(codec, indices[:pos])
+        if not corrupt:
+            ok &= decoder.consistent
+            if decoder.is_complete:
+                ok &= decoder.payload() == payload == codec.decode(indices, [stream[i] for i in indices])
+        if not ok:
+            failures += 1
+            print(f"[FAIL] streaming trial={trial} n={n} mode={mode}")
+    return failures
+
+
+def check_row_cache(rng: random.Random, trials: int) -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for trial in range(trials):
+            n = rng.choice([5, 64, 100])
+            mode = rng.choice(["mt", "hash"])
+            cache = CoefficientRowCache(n, mode, capacity=rng.choice([1, 7, 64]))
+            codecs = [DeterministicRLNC("0" * n, stream_key=k, coeff_mode=mode, row_cache=cache) for k in (1, 2)]
+            plain = [DeterministicRLNC("0" * n, stream_key=k, coeff_mode=mode, row_cache=False) for k in (1, 2)]
+            if rng.random() < 0.5:
+                cache.attach_table(precompute_coeff_table(plain[0], 10, 40, Path(tmp) / f"t{trial}.npy"))
+            ok = True
+            for _ in range(20):
+                which = rng.randrange(2)
+                indices = [rng.randrange(0, 60) for _ in range(rng.randrange(0, 12))]
+                ok &= np.array_equal(codecs[which].coeff_rows(indices), plain[which].coeff_rows(indices))
+            stats = cache.stats()
+            ok &= stats["size"] <= stats["capacity"]
+            if not ok:
+                failures += 1
+                print(f"[FAIL] row cache trial={trial} n={n} mode={mode} stats={stats}")
+    return failures
+
+
+def check_rank_batch(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        n = rng.choice([1, 5, 32, 64, 65, 130])
+        m = rng.choice([max(1, n - 3), n, n + 4, 2 * n])
+        mode = rng.choice(["mt", "hash"])
+        keys = [rng.randrange(10**6) for _ in range(rng.randrange(1, 40))]
+        indices = [rng.randrange(0, 4 * n) for _ in range(m)]  # duplicates allowed
+        rows = coeff_rows_for_keys(keys, indices, n, coeff_mode=mode)
+        rhs = np.array([[rng.randrange(2) for _ in range(m)] for _ in keys], dtype=np.uint8)
+        if rng.random() < 0.3:
+            rows[:, rng.randrange(m)] = 0  # forced dependent rows
+        rank, consistent = gf2_rank_batch(rows, n, rhs)
+        ok = True
+        for slot, key in enumerate(keys):
+            decoder = StreamingRLNCDecoder(DeterministicRLNC("0" * n, stream_key=key, coeff_mode=mode, row_cache=False))
+            for row, bit in zip(rows[slot], rhs[slot]):
+                decoder.add_row(row, bit)
+            ok &= int(rank[slot]) == decoder.rank and bool(consistent[slot]) == decoder.consistent
+        if not ok:
+            failures += 1
+            print(f"[FAIL] rank batch trial={trial} n={n} m={m} mode={mode}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = check_mt(rng, args.trials) + check_hash(rng, max(1, args.trials // 10)) + check_streaming(rng, args.trials)
+    failures += check_row_cache(rng, max(1, args.trials // 5))
+    failures += check_rank_batch(rng, max(1, args.trials // 3))
+    print(f"[INFO] {args.trials} trials, {failures} mismatches")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
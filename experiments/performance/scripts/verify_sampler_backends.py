@@ -0,0 +1,154 @@
+"""
+Parity check: NumPy differential engine vs. the torch reference engine.
+
+Randomized distributions (ties, near-ties below the 1e-8 rounding, zeros, tiny
+weights, 1-64 candidates) are pushed through both backends and every
+intermediate is compared exactly:
+- recombination (indices_nonzero, bins, prob_new)
+- float32 normalizer and CDF
+- encoder output (selected action, target list, bits embedded)
+- decoder output (extracted bits)
+- encode_batch / decode_batch against the scalar results, record by record;
+  decode_batch gives None where the scalar decoder cannot decode (unknown
+  action, action outside the selected bin)
+
+Usage:
+    python experiments/performance/scripts/verify_sampler_backends.py --trials 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agentmark.core.watermark_sampler import (
+    decode_batch,
+    differential_based_decoder,
+    differential_based_recombination,
+    differential_based_recombination_np,
+    encode_batch,
+    plan_differential_step,
+    sample_behavior_differential,
+    _differential_cdf_np,
+    _torch_float32_sum,
+)
+
+
+def random_distribution(rng: random.Random) -> dict:
+    n = rng.choice([1, 2, 3, 4, 5, 7, 8, 9, 12, 16, 17, 31, 33, 50, 64])
+    style = rng.choice(["random", "ties", "near_ties", "zeros", "skewed", "uniform"])
+    if style == "uniform":
+        weights = [1.0] * n
+    elif style == "ties":
+        levels = [rng.random() for _ in range(max(1, n // 3))]
+        weights = [rng.choice(levels) for _ in range(n)]
+    elif style == "near_ties":
+        base = rng.random()
+        weights = [base + rng.choice([0.0, 1e-10, -1e-10, 3e-9, 2e-7]) for _ in range(n)]
+    elif style == "zeros":
+        weights = [rng.random() if rng.random() < 0.6 else 0.0 for _ in range(n)]
+        weights[rng.randrange(n)] = rng.random() + 1e-3
+    elif style == "skewed":
+        weights = [rng.random() ** 8 + 1e-4 for _ in range(n)]
+    else:
+        weights = [rng.random() for _ in range(n)]
+    total = sum(weights)
+    return {f"action_{i:02d}": w / total for i, w in enumerate(weights)}
+
+
+def check_recombination(probs: dict) -> None:
+    behaviors = sorted(probs.keys())
+    probs_list = [probs[b] for b in behaviors]
+
+    t_idx, t_bins, t_new = differential_based_recombination(
+        torch.tensor(probs_list, dtype=torch.float32), torch.arange(len(behaviors))
+    )
+    n_idx, n_bins, n_new = differential_based_recombination_np(
+        np.asarray(probs_list, dtype=np.float32), np.arange(len(behaviors))
+    )
+    assert np.array_equal(t_idx.numpy(), n_idx), "indices_nonzero mismatch"
+    assert np.array_equal(t_bins.numpy(), n_bins), "bins mismatch"
+    assert np.array_equal(t_new.numpy(), n_new), "prob_new mismatch"
+
+    t_total = t_new.sum()
+    n_total = _torch_float32_sum(n_new)
+    assert t_total.item() == float(n_total), "normalizer mismatch"
+    if float(n_total) > 0:
+        t_cdf = torch.cumsum(t_new / t_total, dim=0).numpy()
+        assert np.array_equal(t_cdf, _differential_cdf_np(n_new, n_total)), "cdf mismatch"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=2024)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payload = "".join(rng.choice("01") for _ in range(4096))
+    failures = 0
+    encode_records, encode_expected = [], []
+    decode_records, decode_expected = [], []
+
+    for trial in range(args.trials):
+        probs = random_distribution(rng)
+        context = f"verify||task{trial % 97}||step{trial}"
+        round_num = rng.randrange(0, 200)
+        bit_index = rng.randrange(0, 4000)
+
+        try:
+            check_recombination(probs)
+
+            torch_out = sample_behavior_differential(
+                probs, payload, bit_index, context_for_key=context, round_num=round_num, backend="torch"
+            )
+            numpy_out = sample_behavior_differential(
+                probs, payload, bit_index, context_for_key=context, round_num=round_num, backend="numpy"
+            )
+            assert torch_out == numpy_out, f"encoder mismatch: {torch_out} != {numpy_out}"
+            encode_records.append((probs, payload, bit_index, context, round_num))
+            encode_expected.append(torch_out)
+
+            for action in (torch_out[0], rng.choice(sorted(probs))):
+                t_bits = differential_based_decoder(
+                    probs, action, context_for_key=context, round_num=round_num, backend="torch"
+                )
+                n_bits = differential_based_decoder(
+                    probs, action, context_for_key=context, round_num=round_num, backend="numpy"
+                )
+                assert t_bits == n_bits, f"decoder mismatch for {action}: {t_bits!r} != {n_bits!r}"
+                plan = plan_differential_step(probs, context, round_num, "numpy")
+                in_bin = not plan.degenerate and sorted(probs).index(action) in plan.bin_content
+                decode_records.append((probs, action, context, round_num))
+                decode_expected.append(t_bits if in_bin else None)
+            decode_records.append((probs, "not_an_action", context, round_num))
+            decode_expected.append(None)
+        except AssertionError as exc:
+            failures += 1
+            print(f"[FAIL] trial={trial} n={len(probs)}: {exc}")
+
+    for row, (got, expected) in enumerate(zip(encode_batch(encode_records), encode_expected)):
+        if got != expected:
+            failures += 1
+            print(f"[FAIL] encode_batch record={row}: {got} != {expected}")
+    for row, (got, expected) in enumerate(zip(decode_batch(decode_records), decode_expected)):
+        if got != expected:
+            failures += 1
+            print(f"[FAIL] decode_batch record={row}: {got!r} != {expected!r}")
+
+    print(f"[INFO] {args.trials} trials, {failures} mismatches")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Check for the proxy scoring cache.
+
+- Keys are canonical: dict key order does not matter; model, messages,
+  candidates and tools each do.
+- LRU eviction at max_entries, TTL expiry, and the SQLite tier surviving a
+  new cache instance (another worker / a restart).
+- Replaying a cached payload through PromptWatermarkWrapper.process gives the
+  same action, bits and decoded bits as parsing the raw reply, for the same
+  context and round.
+
+Usage:
+    python experiments/performance/scripts/verify_scoring_cache.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _common import expect
+
+from agentmark.proxy.scoring_cache import ScoringCache, scoring_cache_key
+from agentmark.sdk import AgentWatermarker, PromptWatermarkWrapper
+from agentmark.sdk.prompt_adapter import extract_json_payload
+
+
+def check_keys() -> int:
+    messages = [{"role": "system", "content": "x"}, {"role": "user", "content": "hi"}]
+    base = scoring_cache_key("m", messages, ["a", "b"], [{"type": "function", "function": {"name": "a"}}])
+    reordered = scoring_cache_key(
+        "m", [{"content": "x", "role": "system"}, {"content": "hi", "role": "user"}], ["a", "b"],
+        [{"function": {"name": "a"}, "type": "function"}],
+    )
+    failures = expect(base == reordered, "key depends on dict key order")
+    for variant in (
+        scoring_cache_key("m2", messages, ["a", "b"], [{"type": "function", "function": {"name": "a"}}]),
+        scoring_cache_key("m", messages[:1], ["a", "b"], [{"type": "function", "function": {"name": "a"}}]),
+        scoring_cache_key("m", messages, ["b", "a"], [{"type": "function", "function": {"name": "a"}}]),
+        scoring_cache_key("m", messages, ["a", "b"], []),
+    ):
+        failures += expect(variant != base, "distinct inputs share a key")
+    return failures
+
+
+def check_tiers() -> int:
+    failures = 0
+    cache = ScoringCache(max_entries=3, ttl=60)
+    for i in range(5):
+        cache.put(f"k{i}", {"i": i})
+    failures += expect(cache.get("k0") is None and cache.get("k4") == {"i": 4}, "LRU eviction")
+    failures += expect(cache.stats()["evictions"] == 2, "eviction count")
+
+    cache = ScoringCache(max_entries=3, ttl=0.05)
+    cache.put("k", {"v": 1})
+    time.sleep(0.1)
+    failures += expect(cache.get("k") is None and cache.stats()["expired"] == 1, "TTL expiry")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "cache.db")
+        first = ScoringCache(max_entries=2, ttl=60, path=path)
+        first.put("k", {"v": [1, 2]})
+        first.close()
+        second = ScoringCache(max_entries=2, ttl=60, path=path)
+        failures += expect(second.get("k") == {"v": [1, 2]}, "disk tier across instances")
+        failures += expect(second.get("k") == {"v": [1, 2]} and second.stats()["memory_hits"] == 1, "disk hit promoted")
+        failures += expect(abs(second.stats()["hit_rate"] - 1.0) < 1e-9, "hit rate")
+        second.close()
+    return failures
+
+
+def check_replay(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        actions = [f"tool_{i}" for i in range(rng.randrange(2, 7))]
+        raw = json.dumps({"action_weights": {a: rng.random() + 0.01 for a in actions},
+                          "action_args": {actions[0]: {"q": "x"}}})
+        cached_payload = json.loads(json.dumps(extract_json_payload(raw)))  # as stored on disk
+        context, round_num = f"session||step{trial}", trial
+        outputs = []
+        for payload in (None, cached_payload):
+            wm = AgentWatermarker(payload_bits="1011001110001111")
+            wm.restore({"bit_index": trial % 16, "round_num": round_num})
+            result = PromptWatermarkWrapper(wm).process(
+                raw, fallback_actions=actions, context=context, round_num=round_num, payload=payload
+            )
+            decoded = wm.decode(result["probabilities_used"], result["action"], context=context, round_num=round_num)
+            outputs.append((result["action"], result["frontend_data"]["watermark_meta"]["bits_embedded"], decoded))
+        failures += expect(outputs[0] == outputs[1], f"replay trial={trial}: {outputs}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+
+    failures = check_keys() + check_tiers() + check_replay(random.Random(args.seed), args.trials)
+    print(f"[INFO] scoring cache checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
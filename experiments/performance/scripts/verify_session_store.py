@@ -0,0 +1,211 @@
+"""
+Consistency check for the proxy session stores (memory, SQLite WAL, Redis protocol).
+
+Workers hammer a few shared sessions with load / sample / compare-and-advance
+loops (retrying on conflict, like the proxy). Afterwards every session's round
+must equal the number of successful steps and its bit index the sum of the
+bits those steps embedded; no two steps may have used the same round.
+
+- memory: threads in one process
+- sqlite: threads and separate processes on one WAL database, then a reopen
+- redis: threads against fakeredis (skipped if fakeredis is not installed),
+  or a real server with --redis_url
+- bounds (memory, sqlite): beyond max_sessions the least recently advanced
+  sessions are dropped; a session idle past the TTL reads as new and starts
+  again from round 0, and SQLite prunes expired rows
+
+Usage:
+    python experiments/performance/scripts/verify_session_store.py --steps 400
+    python experiments/performance/scripts/verify_session_store.py --redis_url redis://localhost:6379/15
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import random
+import sys
+import tempfile
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agentmark.proxy import session_store
+from agentmark.proxy.session_store import (
+    MemorySessionStore,
+    RedisSessionStore,
+    SessionState,
+    SessionStore,
+    SQLiteSessionStore,
+    session_store_from_url,
+)
+
+SESSIONS = ("alpha", "beta", "gamma")
+
+
+def run_steps(store, steps: int, seed: int):
+    """Returns [(session, round_used, bits)] for each committed step."""
+    rng = random.Random(seed)
+    committed = []
+    for _ in range(steps):
+        key = rng.choice(SESSIONS)
+        while True:
+            state = store.load(key)
+            bits = rng.randrange(0, 3)
+            if store.advance(key, state, bits) is not None:
+                committed.append((key, state.round_num, state.bit_index, bits))
+                break
+    return committed
+
+
+def _process_worker(path: str, steps: int, seed: int, queue) -> None:
+    store = SQLiteSessionStore(path)
+    queue.put(run_steps(store, steps, seed))
+    store.close()
+
+
+def check(name: str, store, committed) -> int:
+    failures = 0
+    per_session = defaultdict(list)
+    for key, round_used, bit_index, bits in committed:
+        per_session[key].append((round_used, bit_index, bits))
+    for key in SESSIONS:
+        steps = sorted(per_session[key])
+        rounds = [r for r, _, _ in steps]
+        state = store.load(key)
+        ok = rounds == list(range(len(steps)))
+        ok &= state == SessionState(len(steps), sum(b for _, _, b in steps))
+        # each step started where the previous one ended
+        ok &= all(steps[i][1] + steps[i][2] == steps[i + 1][1] for i in range(len(steps) - 1))
+        if not ok:
+            failures += 1
+            print(f"[FAIL] {name} session={key} steps={len(steps)} state={state}")
+    print(f"[INFO] {name}: {len(committed)} steps over {len(SESSIONS)} sessions, {failures} failures")
+    return failures
+
+
+def threaded(store, workers: int, steps: int, seed: int):
+    results = [None] * workers
+    threads = [
+        threading.Thread(target=lambda i=i: results.__setitem__(i, run_steps(store, steps, seed + i)))
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [step for chunk in results for step in chunk]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def check_bounds(name: str, store, clock: FakeClock, prune=lambda: None) -> int:
+    """store: max_sessions=8, ttl=60 s, driven by `clock`; `prune` runs the store's periodic cleanup."""
+    failures = 0
+    for i in range(20):
+        clock.now += 1
+        store.advance(f"s{i}", store.load(f"s{i}"), 2)
+    prune()
+    kept = [i for i in range(20) if store.load(f"s{i}") != SessionState()]
+    if kept != list(range(12, 20)):
+        failures += 1
+        print(f"[FAIL] {name}: kept sessions {kept}, expected the 8 most recently advanced")
+
+    clock.now += 30
+    store.advance("s19", store.load("s19"), 1)
+    clock.now += 45  # s12..s18 idle for 75 s, s19 for 45 s
+    ok = store.load("s12") == SessionState() and store.load("s19") == SessionState(2, 3)
+    restarted = store.advance("s12", store.load("s12"), 1)
+    ok &= restarted == SessionState(1, 1) and store.load("s12") == SessionState(1, 1)
+    if not ok:
+        failures += 1
+        print(f"[FAIL] {name}: expiry (s12={store.load('s12')}, s19={store.load('s19')})")
+    print(f"[INFO] {name}: kept {len(kept)}/20 sessions, idle session restarted at {restarted}, {failures} failures")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=400, help="Steps per worker")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--redis_url", default=None, help="Real Redis server (default: fakeredis)")
+    args = parser.parse_args()
+
+    failures = 0
+    store = MemorySessionStore()
+    failures += check("memory/threads", store, threaded(store, args.workers, args.steps, args.seed))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "sessions.db")
+        store = session_store_from_url(f"sqlite:///{path}")
+        committed = threaded(store, args.workers, args.steps, args.seed)
+        ctx = mp.get_context("spawn")
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=_process_worker, args=(path, args.steps, args.seed + 100 + i, queue))
+                 for i in range(args.workers)]
+        for p in procs:
+            p.start()
+        for _ in procs:
+            committed.extend(queue.get())
+        for p in procs:
+            p.join()
+        failures += check("sqlite/threads+processes", store, committed)
+        store.close()
+        failures += check("sqlite/reopen", SQLiteSessionStore(path), committed)
+
+    try:
+        SessionStore()
+        failures += 1
+        print("[FAIL] SessionStore is instantiable; it should be abstract")
+    except TypeError:
+        pass
+
+    clock = FakeClock()
+    real_time, session_store.time = session_store.time, clock
+    try:
+        failures += check_bounds("memory/bounds", MemorySessionStore(max_sessions=8, ttl=60), clock)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteSessionStore(str(Path(tmp) / "bounded.db"), max_sessions=8, ttl=60)
+            failures += check_bounds("sqlite/bounds", store, clock, prune=store.prune)
+            store.prune()
+            rows = store._conn().execute("SELECT COUNT(*) FROM agentmark_sessions").fetchone()[0]
+            if rows != 2:
+                failures += 1
+                print(f"[FAIL] sqlite/bounds: {rows} rows left after pruning, expected 2")
+            store.close()
+    finally:
+        session_store.time = real_time
+
+    if args.redis_url:
+        store = RedisSessionStore(url=args.redis_url, prefix="agentmark:verify:")
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            fakeredis = None
+            print("[INFO] fakeredis not installed; skipping the Redis-protocol backend")
+        store = RedisSessionStore(client=fakeredis.FakeRedis(), prefix="agentmark:verify:") if fakeredis else None
+    if store is not None:
+        for key in SESSIONS:
+            store.reset(key)
+        failures += check("redis/threads", store, threaded(store, args.workers, args.steps, args.seed))
+        for key in SESSIONS:
+            store.reset(key)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Check for the bit-packed, slotted AgentWatermarker state.
+
+- PackedBits reads like the '0'/'1' string it packs: length, indexing and
+  slicing are checked against the string itself.
+- Sampling with the packed payload embeds exactly what the core sampler
+  embeds from the plain string, step by step, for long payloads.
+- The legacy encoders give the same result when reading at bit_index as
+  when given a slice of the stream.
+- snapshot_bytes() is the same size for every payload length. Restoring it
+  mid-stream continues identically, and a snapshot taken with another
+  payload is refused.
+- sample(compact=True) matches sample().compact().
+
+It also reports the payload memory of many sessions (string vs packed).
+
+Usage:
+    python experiments/performance/scripts/verify_watermarker_state.py
+    python experiments/performance/scripts/verify_watermarker_state.py --payload_bits 8192 --sessions 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tracemalloc
+
+from _common import expect
+
+import numpy as np
+
+from agentmark.core.packed_bits import PackedBits
+from agentmark.core.watermark_sampler import (
+    DRBG,
+    differential_based_encoder_np,
+    generate_contextual_key,
+    sample_behavior_differential,
+    uni_cyclic_shift_enc,
+)
+from agentmark.sdk import AgentWatermarker, WatermarkerState
+
+
+def random_bits(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice("01") for _ in range(n))
+
+
+def random_probs(rng: random.Random):
+    actions = [f"tool_{i}" for i in range(rng.randrange(2, 12))]
+    return {a: rng.random() + 1e-3 for a in actions}
+
+
+def check_packed_bits(rng: random.Random, trials: int) -> int:
+    failures = 0
+    for trial in range(trials):
+        bits = random_bits(rng, rng.randrange(0, 200))
+        packed = PackedBits.from_bits(bits)
+        ok = len(packed) == len(bits) and str(packed) == bits
+        ok = ok and PackedBits(packed.to_bytes(), len(bits)) == packed
+        for _ in range(20):
+            a, b = rng.randrange(-8, len(bits) + 8), rng.randrange(-8, len(bits) + 8)
+            ok = ok and packed[a:b] == bits[a:b] and packed[a:b:3] == bits[a:b:3]
+            if bits and -len(bits) <= a < len(bits):
+                ok = ok and packed[a] == bits[a]
+        failures += expect(ok, f"PackedBits mismatch trial={trial} bits={bits[:40]}")
+    try:
+        PackedBits.from_bits("0102")
+        failures += expect(False, "non-binary payload accepted")
+    except ValueError:
+        pass
+    return failures
+
+
+def check_sampling(rng: random.Random, payload_len: int, steps: int) -> int:
+    failures = 0
+    payload = random_bits(rng, payload_len)
+    wm = AgentWatermarker(payload_bits=payload)
+    bit_index = 0
+    for step in range(steps):
+        probs = random_probs(rng)
+        context = f"session||step{step}"
+        res = wm.sample(probs, context=context, round_num=step)
+        norm = {k: v / sum(probs.values()) for k, v in probs.items()}
+        action, _, bits, _ = sample_behavior_differential(
+            norm, payload, bit_index, context_for_key=context, round_num=step
+        )
+        bit_index += bits
+        failures += expect(
+            (res.action, res.bits_embedded, res.bit_index) == (action, bits, bit_index),
+            f"packed sampling differs at step {step}",
+        )
+
+    # legacy encoders: reading at bit_index == slicing the stream
+    for trial in range(200):
+        stream = random_bits(rng, rng.randrange(1, 64))
+        bit_index = rng.randrange(0, len(stream) + 1)
+        n = rng.randrange(1, 20)
+        seed = generate_contextual_key([f"legacy{trial}"])
+        sliced = uni_cyclic_shift_enc(stream[bit_index:], n, DRBG(seed, b"0"))
+        indexed = uni_cyclic_shift_enc(PackedBits.from_bits(stream), n, DRBG(seed, b"0"), bit_index=bit_index)
+        failures += expect(sliced == indexed, f"uni_cyclic_shift_enc bit_index trial={trial}")
+        probs = np.array(sorted(rng.random() for _ in range(n)), dtype=np.float32)
+        a = differential_based_encoder_np(probs, np.arange(n), stream, bit_index, DRBG(seed, b"1"))
+        b = differential_based_encoder_np(probs, np.arange(n), PackedBits.from_bits(stream), bit_index, DRBG(seed, b"1"))
+        failures += expect(a == b, f"encoder_np str vs packed trial={trial}")
+    return failures
+
+
+def check_snapshots(rng: random.Random) -> int:
+    failures = 0
+    sizes = {len(AgentWatermarker(payload_bits=random_bits(rng, n)).snapshot_bytes()) for n in (1, 64, 8192, 65536)}
+    failures += expect(sizes == {WatermarkerState.SNAPSHOT_SIZE}, f"snapshot sizes {sizes}")
+
+    payload = random_bits(rng, 4096)
+    steps = [(random_probs(rng), f"s||{i}") for i in range(40)]
+    straight = AgentWatermarker(payload_bits=payload)
+    expected = [straight.sample(p, context=c).compact() for p, c in steps]
+
+    first = AgentWatermarker(payload_bits=payload)
+    got = [first.sample(p, context=c).compact() for p, c in steps[:17]]
+    blob = first.snapshot_bytes()
+    resumed = AgentWatermarker(payload_bits=PackedBits.from_bits(payload))
+    resumed.restore_bytes(blob)
+    got += [resumed.sample(p, context=c, compact=True) for p, c in steps[17:]]
+    failures += expect(got == expected, "resume from snapshot_bytes diverges")
+    failures += expect(resumed.snapshot() == straight.snapshot(), "position after resume")
+
+    other = AgentWatermarker(payload_bits=payload[:-1] + ("0" if payload[-1] == "1" else "1"))
+    for bad in (blob[:-1], b"XXXX" + blob[4:], None):
+        try:
+            if bad is None:
+                other.restore_bytes(blob)
+            else:
+                resumed.restore_bytes(bad)
+            failures += expect(False, "bad snapshot accepted")
+        except ValueError:
+            pass
+    return failures
+
+
+def report_memory(rng: random.Random, payload_len: int, sessions: int) -> None:
+    payloads = [random_bits(rng, payload_len) for _ in range(sessions)]
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    plain = [(p + " ")[:-1] for p in payloads]  # fresh copies, as each session held its own
+    plain_bytes = tracemalloc.get_traced_memory()[0] - base
+    del plain
+    base = tracemalloc.get_traced_memory()[0]
+    states = [WatermarkerState(PackedBits.from_bits(p)) for p in payloads]
+    packed_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del states
+    print(
+        f"[INFO] {sessions} sessions x {payload_len}-bit payload: str {plain_bytes / 1e6:.2f} MB, "
+        f"packed state {packed_bytes / 1e6:.2f} MB, snapshot {WatermarkerState.SNAPSHOT_SIZE} bytes/session"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=300)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--payload_bits", type=int, default=8192)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = check_packed_bits(rng, args.trials)
+    failures += check_sampling(rng, args.payload_bits, args.steps)
+    failures += check_snapshots(rng)
+    report_memory(rng, args.payload_bits, args.sessions)
+    print(f"[INFO] watermarker state checks: {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ RLNC False Positive Rate (FPR) and Forgery Analysis Script
 - Performs Monte-Carlo simulations to measure the probability of accidental decoding (FPR)
   under "Unwatermarked" (Random bits) and "Wrong Key" conditions.
 - Metrics are reported as a function of 'Overhead' (k = m - n).
+- Wrong-key trials sweep many keys against one packet set; all systems of a batch
+  are eliminated together on a (keys x m x words) bit-packed tensor.
 """
 
 import argparse
@@ -20,7 +22,7 @@ ROOT = Path(__file__).resolve().parents[3]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from agentmark.core.rlnc_codec import DeterministicRLNC
+from agentmark.core.rlnc_codec import DeterministicRLNC, coeff_rows_for_keys, gf2_parity, gf2_rank_batch
 try:
     from agentmark.core.watermark_sampler import differential_based_decoder
 except ImportError:
@@ -108,105 +110,24 @@ def extract_packets_from_dir(pred_dir: Path) -> List[Tuple[int, int]]:
                 
     return all_packets
 
-def solve_consistency(packets: List[Tuple[int, int]], encoder: DeterministicRLNC, payload_len: int) -> bool:
-    """
-    Checks if the system of linear equations defined by 'packets' is consistent.
-    A * x = y
-    
-    For RLNC over GF(2), if rank(A|y) == rank(A), it is consistent.
-    If the system is overdetermined (rows > cols) and consistent, it means likely the key is correct.
-    If inconsistent, the key is wrong (or data is corrupted).
+def generate_fake_packets(available_indices: List[int], m: int) -> List[Tuple[int, int]]:
+    """Unwatermarked data: m real packet indices carrying uniformly random bits."""
+    return [(idx, random.randint(0, 1)) for idx in random.sample(available_indices, m)]
+
+
+def count_consistent(rows: np.ndarray, bits: np.ndarray, n: int, batch_size: int) -> int:
     """
-    if not packets:
-        return False
-        
-    # Unique packets only to avoid singular matrix issues due to duplicates
-    # (Though duplicates don't hurt consistency check, just redundant)
-    unique_packets = list(set(packets))
-    
-    # We need to build the matrix.
-    # Rows = m packets
-    # Cols = n payload bits
-    
-    m = len(unique_packets)
-    n = payload_len
-    
-    # Optimization: If m < n, it's always "consistent" (under-determined) in the sense that solutions exist.
-    # But for "Authentication/Verification", we strictly require m >= n to prove we recovered the payload.
-    # Actually, for FPR, if m < n, we might find *many* solutions. 
-    # The "Acceptance Rule" usually implies: "Unique Solution Exists AND is Consistent".
-    # So we should strictly check: Rank(A) == n AND Consistent.
-    
-    matrix = []
-    vector = []
-    
-    for idx, val in unique_packets:
-        coeffs = encoder._generate_coeffs(idx) # This uses the encoder's internal stream_key
-        matrix.append(coeffs)
-        vector.append(val)
-        
-    A = np.array(matrix, dtype=int)
-    y = np.array(vector, dtype=int)
-    
-    # Gaussian Elimination over GF(2) to check consistency
-    # We can reuse the solver or write a quick rank check.
-    # A fast way is to augment A with y and check rank.
-    
-    # rank(A)
-    # rank(A|y)
-    # Consistent iff rank(A) == rank(A|y)
-    
-    # Note: numpy.linalg.matrix_rank is for real/complex numbers. We need GF(2) rank.
-    # We will use the Gaussian elimination method from rlnc_codec logic.
-    
-    rows, cols = A.shape
-    augmented = np.hstack((A, y.reshape(-1, 1)))
-    
-    # Perform Gaussian Elimination on Augmented Matrix
-    pivot_row = 0
-    pivot_cols = []
-    
-    # Work on a copy to be safe (though we build fresh every time here)
-    mat = augmented.copy()
-    
-    h_rows, h_cols = mat.shape
-    
-    for c in range(h_cols - 1): # Don't pivot on the last column (y vector) yet
-        if pivot_row >= h_rows:
-            break
-            
-        # Find pivot
-        candidates = [r for r in range(pivot_row, h_rows) if mat[r, c] == 1]
-        if not candidates:
-            continue
-            
-        curr = candidates[0]
-        # Swap
-        mat[[pivot_row, curr]] = mat[[curr, pivot_row]]
-        
-        # Eliminate
-        # Vectorized XOR on rows below
-        # Find rows below pivot_row that have 1 in this col
-        # (This is slightly slow in Python loops but okay for logic)
-        for r in range(pivot_row + 1, h_rows):
-            if mat[r, c] == 1:
-                mat[r] ^= mat[pivot_row]
-                
-        pivot_row += 1
-        
-    # After REF (Row Echelon Form):
-    # Check for consistency:
-    # If there is a row where all A-part is 0 but y-part is 1, -> Inconsistent (0 != 1)
-    
-    # The A-part cols are 0 to n-1. The y-part is col n.
-    for r in range(h_rows):
-        # Check if row is all zeros in A part
-        if not np.any(mat[r, :-1]):
-            # If A part is all zero, y must be 0
-            if mat[r, -1] == 1:
-                return False # Inconsistent! 0x = 1
+    Number of consistent systems (rank(A|y) == rank(A)) in a stack of packed systems.
 
-    return True # Consistent
+    For RLNC over GF(2), an overdetermined system (rows > cols) that is consistent
+    means the key likely is correct; an inconsistent one (0x = 1) means a wrong key
+    or corrupted data.
+    """
+    consistent = 0
+    for lo in range(0, len(rows), batch_size):
+        _, ok = gf2_rank_batch(rows[lo:lo + batch_size], n, bits[lo:lo + batch_size])
+        consistent += int(ok.sum())
+    return consistent
 
 
 def main():
@@ -215,9 +136,12 @@ def main():
     parser.add_argument("--pred_dirs", nargs='+', help="List of prediction directories")
     parser.add_argument("--test_n", type=int, help="Payload length N (default: 32)")
     parser.add_argument("--trials", type=int, help="Trials per k (default: 100)")
+    parser.add_argument("--key_trials", type=int, help="Wrong keys tested per k (default: trials)")
+    parser.add_argument("--batch_size", type=int, help="Systems per batched elimination (default: 4096)")
     parser.add_argument("--max_k", type=int, help="Max k (default: 16)")
     parser.add_argument("--step_k", type=int, help="Step k (default: 2)")
     parser.add_argument("--output_dir", type=str, help="Directory to save results")
+    parser.add_argument("--coeff_table", nargs="*", help="Coefficient tables from precompute_rlnc_coeffs.py to memory-map")
     args = parser.parse_args()
     
     # Defaults
@@ -227,6 +151,7 @@ def main():
         "trials": 100,
         "max_k": 16,
         "step_k": 2,
+        "batch_size": 4096,
         "output_dir": "."
     }
     
@@ -245,9 +170,12 @@ def main():
     if args.pred_dirs: config["pred_dirs"] = args.pred_dirs
     if args.test_n: config["test_n"] = args.test_n
     if args.trials: config["trials"] = args.trials
+    if args.key_trials: config["key_trials"] = args.key_trials
+    if args.batch_size: config["batch_size"] = args.batch_size
     if args.max_k: config["max_k"] = args.max_k
     if args.step_k: config["step_k"] = args.step_k
     if args.output_dir: config["output_dir"] = args.output_dir
+    if args.coeff_table: config["coeff_tables"] = args.coeff_table
     
     if not config["pred_dirs"]:
         parser.error("No prediction directories specified (via --config or --pred_dirs)")
@@ -282,39 +210,36 @@ def main():
     print(f"[INFO] Simulating ground truth for N={n}...")
     correct_key = 42
     encoder_correct = DeterministicRLNC("0" * n, stream_key=correct_key)
+    # Both keys share the process-wide row cache for this n; tables are routed by stream_key.
+    for table_path in config.get("coeff_tables") or []:
+        if encoder_correct.row_cache is None:
+            print(f"[WARN] Row cache disabled; ignoring {table_path}")
+            continue
+        meta = encoder_correct.row_cache.attach_table(table_path)
+        print(f"[INFO] Attached coefficient table {table_path} (key={meta['stream_key']!r})")
     
-    # Random hidden payload (we don't need to know it, just need consistent y)
-    # Actually we DO need it to generate y = A x
-    # Let's generate random x
-    x_vec = [random.randint(0, 1) for _ in range(n)]
-    
-    # Generate valid y for all available indices
-    # valid_packets_pool = [(idx, val), ...]
-    valid_packets_pool = []
-    
-    for idx in available_indices:
-        # Generate row
-        coeffs = encoder_correct._generate_coeffs(idx)
-        # y = dot(coeffs, x)
-        val = 0
-        for c, x_bit in zip(coeffs, x_vec):
-            val ^= (c & x_bit)
-        valid_packets_pool.append((idx, val))
-        
-    
+    # Random hidden payload x; valid packets carry y = A x under the correct key
+    x_bits = "".join(str(random.randint(0, 1)) for _ in range(n))
+    encoder_payload = DeterministicRLNC(x_bits, stream_key=correct_key)
+    available_rows = encoder_correct.coeff_rows(available_indices)
+    valid_bits = gf2_parity(available_rows & encoder_payload.payload_words)
+    row_of = {idx: pos for pos, idx in enumerate(available_indices)}
+
     # 4. Analysis Loop
+    key_trials = config.get("key_trials") or config["trials"]
+    batch_size = config["batch_size"]
     results = {
         "n": n,
         "trials": config["trials"],
+        "key_trials": key_trials,
         "data": []
     }
     
     print(f"{'Overhead (k)':<15} | {'m':<10} | {'FPR (Rand Data)':<20} | {'FPR (Wrong Key)':<20}")
     print("-" * 70)
     
-    # Simulation Encoders
+    # Wrong keys: a contiguous sweep starting away from the correct key
     wrong_key = correct_key + 999
-    encoder_wrong = DeterministicRLNC("0"*n, stream_key=wrong_key)
     
     for k in range(0, config["max_k"] + 1, config["step_k"]):
         m = n + k
@@ -322,29 +247,31 @@ def main():
             print(f"[WARN] Skipping k={k} (m={m}), not enough data.")
             break
             
-        consistent_rand_count = 0
+        # Experiment A: Unwatermarked Data (Random y, correct A), one packet set per trial
+        fake_sets = [generate_fake_packets(available_indices, m) for _ in range(config["trials"])]
+        fake_rows = available_rows[[[row_of[idx] for idx, _ in pk] for pk in fake_sets]]
+        fake_bits = np.array([[val for _, val in pk] for pk in fake_sets], dtype=np.uint8).reshape(len(fake_sets), m)
+        consistent_rand_count = count_consistent(fake_rows, fake_bits, n, batch_size)
+
+        # Experiment B: Wrong Key (Valid y, Wrong A): every wrong key against the same packet set
+        sample_pos = random.sample(range(total_available), m)
+        sample_indices = [available_indices[pos] for pos in sample_pos]
+        sample_bits = valid_bits[sample_pos]
         consistent_wrong_key_count = 0
-        
-        for _ in range(config["trials"]):
-            # Experiment A: Unwatermarked Data (Random y)
-            fake_packets = generate_fake_packets(available_indices, m)
-            if solve_consistency(fake_packets, encoder_correct, n):
-                consistent_rand_count += 1
-                
-            # Experiment B: Wrong Key (Valid y, Wrong A)
-            sample_gt = random.sample(valid_packets_pool, m)
-            if solve_consistency(sample_gt, encoder_wrong, n):
-                consistent_wrong_key_count += 1
-                
+        for lo in range(0, key_trials, batch_size):
+            keys = range(wrong_key + lo, wrong_key + min(key_trials, lo + batch_size))
+            key_rows = coeff_rows_for_keys(keys, sample_indices, n, coeff_mode=encoder_correct.coeff_mode)
+            key_bits = np.broadcast_to(sample_bits, (len(keys), m))
+            consistent_wrong_key_count += count_consistent(key_rows, key_bits, n, batch_size)
         
         fpr_rand = consistent_rand_count / config["trials"]
-        fpr_wrong = consistent_wrong_key_count / config["trials"]
+        fpr_wrong = consistent_wrong_key_count / key_trials
 
         # Calculate Stats (Mean, Std)
         import math
         
         sem_rand = math.sqrt(fpr_rand * (1 - fpr_rand) / config["trials"])
-        sem_wrong = math.sqrt(fpr_wrong * (1 - fpr_wrong) / config["trials"])
+        sem_wrong = math.sqrt(fpr_wrong * (1 - fpr_wrong) / key_trials)
 
         print(f"{k:<15} | {m:<10} | {fpr_rand:<.4f} +/- {sem_rand:<.4f} | {fpr_wrong:<.4f} +/- {sem_wrong:<.4f}")
         
@@ -354,7 +281,8 @@ def main():
             "fpr_unwatermarked": fpr_rand,
             "fpr_unwatermarked_sem": sem_rand,
             "fpr_wrong_key": fpr_wrong,
-            "fpr_wrong_key_sem": sem_wrong
+            "fpr_wrong_key_sem": sem_wrong,
+            "wrong_key_consistent": consistent_wrong_key_count,
         })
         
     # Save Results
@@ -365,6 +293,8 @@ def main():
     with open(out_file, 'w') as f:
         json.dump(results, f, indent=2)
     print(f"\n[INFO] Results saved to {out_file.resolve()}")
+    if encoder_correct.row_cache is not None:
+        print(f"[INFO] coefficient row cache: {encoder_correct.row_cache.stats()}")
 
 if __name__ == "__main__":
     main()
@@ -16,7 +16,7 @@ ROOT = Path(__file__).resolve().parents[3]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from agentmark.core.watermark_sampler import differential_based_decoder
+from agentmark.core.watermark_sampler import decode_batch, differential_based_decoder
 
 
 def load_json(path: Path) -> Dict[str, Any]:
@@ -29,15 +29,74 @@ def load_bit_stream(path: Optional[Path]) -> str:
     return ""
 
 
-def decode_trace(trace: List[Dict[str, Any]], full_bit_stream: str = "") -> Dict[str, Any]:
-    """Decode bits step-by-step for a single file's watermark_trace and verify accuracy."""
+def trace_decode_records(trace: List[Dict[str, Any]]) -> List[Optional[tuple]]:
+    """Decoder record (probs, chosen, context, round_num) per trace entry; None if the entry cannot be decoded."""
+    records: List[Optional[tuple]] = []
+    for entry in trace:
+        probs = entry.get("effective_probs") or {}
+        chosen = entry.get("chosen")
+        if not probs or not chosen:
+            records.append(None)
+            continue
+        # Encoder uses (task_idx + step_count) as round_num
+        round_num = entry.get("task_idx", 0) + entry.get("round", 0)
+        records.append((probs, chosen, entry.get("context_for_key"), round_num))
+    return records
+
+
+def decode_records(records: List[Optional[tuple]]) -> List[Any]:
+    """
+    Decode many trace records in one decode_batch call.
+    Records the batch cannot decode (or all of them, if it rejects its input) are decoded one by one
+    with the scalar decoder, so a malformed entry only fails itself; failures are returned as the raised exception.
+    """
+    active = [r for r in records if r is not None]
+    try:
+        batch = decode_batch(active)
+    except Exception:  # noqa: BLE001
+        batch = [None] * len(active)
+
+    decoded = iter(batch)
+    results: List[Any] = []
+    for record in records:
+        if record is None:
+            results.append(None)
+            continue
+        bits = next(decoded)
+        if bits is None:
+            probs, chosen, context, round_num = record
+            try:
+                bits = differential_based_decoder(
+                    probabilities=probs,
+                    selected_behavior=chosen,
+                    context_for_key=context,
+                    round_num=round_num,
+                )
+            except Exception as exc:  # noqa: BLE001
+                bits = exc
+        results.append(bits)
+    return results
+
+
+def decode_trace(
+    trace: List[Dict[str, Any]],
+    full_bit_stream: str = "",
+    decoded: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Decode bits step-by-step for a single file's watermark_trace and verify accuracy.
+    `decoded` may carry decode_records(trace_decode_records(trace)) computed in a larger batch.
+    """
+    if decoded is None:
+        decoded = decode_records(trace_decode_records(trace))
+
     segments = []
     errors = []
     
     total_checked_bits = 0
     matched_bits = 0
     
-    for entry in trace:
+    for entry, bits in zip(trace, decoded):
         # The encoder only embeds when it is NOT Finish and the differential encoding actually consumes bits.
         # If bit_index_before == bit_index_after (or missing), no watermark bits were sent this round:
         # - Cannot perform verification
@@ -65,18 +124,10 @@ def decode_trace(trace: List[Dict[str, Any]], full_bit_stream: str = "") -> Dict
             errors.append(f"round={entry.get('round')} Missing chosen behavior")
             segments.append("")
             continue
-        context = entry.get("context_for_key")
         # Encoder uses (task_idx + step_count) as round_num
         round_num = entry.get("task_idx", 0) + entry.get("round", 0)
-        try:
-            bits = differential_based_decoder(
-                probabilities=probs,
-                selected_behavior=chosen,
-                context_for_key=context,
-                round_num=round_num,
-            )
-        except Exception as exc:  # noqa: BLE001
-            errors.append(f"round={round_num} Decoding failed: {exc}")
+        if isinstance(bits, Exception):
+            errors.append(f"round={round_num} Decoding failed: {bits}")
             segments.append("")
             continue
 
@@ -144,7 +195,8 @@ def decode_trace(trace: List[Dict[str, Any]], full_bit_stream: str = "") -> Dict
 
 
 def decode_predictions(pred_dir: Path, bit_stream: str) -> List[Dict[str, Any]]:
-    results = []
+    results: List[Dict[str, Any]] = []
+    traces = []  # (result slot, file, trace)
     for file in sorted(pred_dir.rglob("*.json")):
         try:
             data = load_json(file)
@@ -157,14 +209,24 @@ def decode_predictions(pred_dir: Path, bit_stream: str) -> List[Dict[str, Any]]:
             results.append({"file": str(file), "warning": "Missing watermark_trace"})
             continue
 
-        decode_res = decode_trace(trace, bit_stream)
-        results.append(
-            {
-                "file": str(file),
-                "query_id": file.stem,
-                **decode_res,
-            }
-        )
+        traces.append((len(results), file, trace))
+        results.append({})
+
+    # Decode every step of every file in one batch, then split back per file.
+    records: List[Optional[tuple]] = []
+    for _, _, trace in traces:
+        records.extend(trace_decode_records(trace))
+    decoded = decode_records(records)
+
+    offset = 0
+    for slot, file, trace in traces:
+        decode_res = decode_trace(trace, bit_stream, decoded[offset:offset + len(trace)])
+        offset += len(trace)
+        results[slot] = {
+            "file": str(file),
+            "query_id": file.stem,
+            **decode_res,
+        }
     return results
 
 
@@ -283,7 +345,7 @@ def main():
     # 5. Reconstruct/Load Bit Stream
     encoder = None
     if rlnc_mode:
-        from agentmark.core.rlnc_codec import DeterministicRLNC
+        from agentmark.core.rlnc_codec import DeterministicRLNC, StreamingRLNCDecoder
         encoder = DeterministicRLNC(rlnc_payload, stream_key=rlnc_key)
         bit_stream = encoder.get_stream(0, 50000) 
         print(f"[INFO] Reconstructed RLNC stream of length {len(bit_stream)} for checking.")
@@ -309,6 +371,7 @@ def main():
     # RLNC Recovery Attempt
     rlnc_status = "N/A"
     recovered_payload = ""
+    rlnc_stream_status = {}
     rlnc_results = []
     
     if rlnc_mode:
@@ -344,16 +407,21 @@ def main():
             all_bits = [p[1] for p in effective_packets]
             
             try:
-                recovered = encoder.decode(all_indices, all_bits)
+                stream_decoder = StreamingRLNCDecoder(encoder)
+                stream_decoder.add_packets(all_indices, all_bits)
+                recovered = stream_decoder.payload()
                 if recovered == rlnc_payload:
                     rlnc_status = "SUCCESS"
                     recovered_payload = recovered
                 else:
                     rlnc_status = "FAILED"
+                rlnc_stream_status = stream_decoder.status()
             except Exception as e:
                 rlnc_status = f"ERROR: {e}"
             
             print(f"[INFO] Global RLNC Recovery: {rlnc_status}")
+            if rlnc_stream_status.get("recovered_at") is not None:
+                print(f"[INFO] Payload recovered at packet {rlnc_stream_status['recovered_at']} / {len(all_indices)}")
             
         elif scope == "episode":
             success_count = 0
@@ -383,8 +451,10 @@ def main():
                 bits_ep = [p[1] for p in effective_ep]
                 
                 status_ep = "FAILED"
+                stream_decoder = StreamingRLNCDecoder(encoder)
                 try:
-                    recovered = encoder.decode(indices_ep, bits_ep)
+                    stream_decoder.add_packets(indices_ep, bits_ep)
+                    recovered = stream_decoder.payload()
                     if recovered == rlnc_payload:
                         status_ep = "SUCCESS"
                         success_count += 1
@@ -394,7 +464,9 @@ def main():
                     "status": status_ep,
                     "packets_total": len(ep_packets),
                     "packets_dedup": len(dedup_ep),
-                    "packets_effective": len(indices_ep)
+                    "packets_effective": len(indices_ep),
+                    "rank": stream_decoder.rank,
+                    "recovered_at_packet": stream_decoder.recovered_at,
                 }
             
             rlnc_status = f"EPISODE_ACCURACY: {success_count}/{len(decoded)}"
@@ -406,6 +478,8 @@ def main():
         "loss_ratio": loss_ratio,
         "scope": scope,
     }
+    if rlnc_stream_status:
+        rlnc_stats_final["stream_decoder"] = rlnc_stream_status
 
     summary = {
         "pred_dir": str(pred_dir),
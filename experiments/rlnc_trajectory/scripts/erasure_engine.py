@@ -0,0 +1,398 @@
+"""
+Monte-Carlo step-erasure simulation engine shared by the RLNC robustness scripts.
+
+A sweep is a grid of cells (codec, p, episode, trial); in global scope one cell covers
+all episodes at once. Each cell draws its losses from a seed derived only from
+(seed, p, episode index, trial), so results do not depend on which worker runs the
+cell or in which order cells finish. The seeds are the ones the scripts always used,
+so a sweep reproduces earlier serial runs exactly.
+
+Cells run in a process pool and every finished chunk is appended to a JSONL journal.
+Re-running the same sweep against the same journal skips the cells already recorded,
+so an interrupted sweep resumes where it stopped. A `.parquet` results path keeps the
+journal next to it (same stem, `.jsonl`) and exports the table when the sweep ends.
+
+Typical usage:
+    sim = ErasureSimulation(episodes, payload, stream_key=key, mode="iid", scope="episode")
+    records = sim.run([0.1, 0.3, 0.5], trials=10, workers=8, sink=ResultSink(out_dir / "trials.jsonl"))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agentmark.core.rlnc_codec import (
+    DEFAULT_RLNC_COEFF_MODE,
+    DeterministicRLNC,
+    StreamingRLNCDecoder,
+    gf2_parity,
+)
+
+ERASURE_MODES = ("iid", "burst", "trunc")
+ERASURE_SCOPES = ("episode", "global")
+ERASURE_CODECS = ("rlnc", "noec", "repetition")
+
+
+def simulate_iid_step_erasure(steps: Sequence, p: float, rng: random.Random) -> List:
+    return [s for s in steps if rng.random() >= p]
+
+
+def simulate_burst_step_erasure(steps: Sequence, p: float, burst_len: int, rng: random.Random) -> List:
+    """Randomly delete continuous segments until reaching the target loss ratio (approximate)."""
+    n = len(steps)
+    if n == 0:
+        return []
+    target_drop = int(round(n * p))
+    if target_drop <= 0:
+        return list(steps)
+    drop = set()
+    while len(drop) < target_drop and len(drop) < n:
+        start = rng.randrange(0, n)
+        for i in range(start, min(n, start + burst_len)):
+            drop.add(i)
+            if len(drop) >= target_drop:
+                break
+    return [s for i, s in enumerate(steps) if i not in drop]
+
+
+def simulate_truncation(steps: Sequence, keep_ratio: float) -> List:
+    n = len(steps)
+    keep_n = int(math.floor(n * keep_ratio))
+    return list(steps[:keep_n])
+
+
+def decode_noec(payload: str, indices: Sequence[int], bits: Sequence[int]) -> Optional[str]:
+    """No error correction: every position observed at least once and without conflict."""
+    k = len(payload)
+    if k == 0:
+        return None
+    seen: Dict[int, int] = {}
+    for idx, b in zip(indices, bits):
+        j = idx % k
+        if j in seen and seen[j] != b:
+            return None
+        seen[j] = b
+    if len(seen) < k:
+        return None
+    return "".join(str(seen[j]) for j in range(k))
+
+
+def decode_repetition(payload: str, indices: Sequence[int], bits: Sequence[int]) -> Optional[str]:
+    """Cyclic repetition with per-position majority voting (tie -> failure)."""
+    k = len(payload)
+    if k == 0:
+        return None
+    votes: Dict[int, List[int]] = {j: [] for j in range(k)}
+    for idx, b in zip(indices, bits):
+        votes[idx % k].append(int(b))
+    out = []
+    for j in range(k):
+        if not votes[j]:
+            return None
+        c1 = sum(votes[j])
+        c0 = len(votes[j]) - c1
+        if c1 == c0:
+            return None
+        out.append("1" if c1 > c0 else "0")
+    return "".join(out)
+
+
+def cell_seed(seed: int, p: float, trial: int, ep_index: Optional[int] = None) -> int:
+    """Seed of one cell; episode scope folds in the episode index, global scope does not."""
+    if ep_index is None:
+        return seed + trial * 1000 + int(p * 1000)
+    return seed + (ep_index + 1) * 100000 + trial * 1000 + int(p * 1000)
+
+
+@dataclass(frozen=True)
+class ErasureCell:
+    codec: str
+    p: float
+    trial: int
+    ep_index: Optional[int] = None  # None: global scope (all episodes)
+
+    @property
+    def key(self) -> Tuple[str, float, int, int]:
+        return (self.codec, self.p, -1 if self.ep_index is None else self.ep_index, self.trial)
+
+
+class ResultSink:
+    """
+    Append-only JSONL journal of cell records, optionally exported to Parquet.
+
+    The first line holds the sweep manifest; a journal written for a different
+    sweep is discarded rather than resumed.
+    """
+
+    def __init__(self, path, resume: bool = True):
+        self.path = Path(path)
+        self.journal = self.path.with_suffix(".jsonl") if self.path.suffix == ".parquet" else self.path
+        self.resume = resume
+
+    def open(self, manifest: Dict) -> List[Dict]:
+        """Start the journal; returns the records already recorded for this manifest."""
+        records: List[Dict] = []
+        if self.resume and self.journal.exists():
+            with self.journal.open("r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            try:
+                header = json.loads(lines[0]) if lines else {}
+            except json.JSONDecodeError:
+                header = {}
+            if header.get("manifest") == manifest:
+                for line in lines[1:]:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # torn last line from an interrupted run
+            else:
+                print(f"[WARN] {self.journal} was written for a different sweep; starting over")
+        self.journal.parent.mkdir(parents=True, exist_ok=True)
+        with self.journal.open("w", encoding="utf-8") as f:
+            f.write(json.dumps({"manifest": manifest}, ensure_ascii=False) + "\n")
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return records
+
+    def write(self, records: Sequence[Dict]) -> None:
+        with self.journal.open("a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self, records: Sequence[Dict]) -> None:
+        if self.path.suffix != ".parquet":
+            return
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("Parquet results need pandas (and pyarrow); use a .jsonl path instead") from e
+        pd.DataFrame.from_records(list(records)).to_parquet(self.path, index=False)
+
+
+class ErasureSimulation:
+    """
+    Step-erasure Monte-Carlo over a fixed set of watermarked episodes.
+
+    Episodes are any objects with `query_id` and `steps`, each step exposing
+    `indices` (the coded-bit indices it carried); they are copied to plain tuples
+    so the simulation pickles cheaply into worker processes.
+    """
+
+    def __init__(
+        self,
+        episodes: Sequence,
+        payload: str,
+        stream_key=0,
+        coeff_mode: str = DEFAULT_RLNC_COEFF_MODE,
+        coeff_tables: Sequence[str] = (),
+        mode: str = "iid",
+        scope: str = "episode",
+        burst_len: int = 8,
+        trunc_keep_ratio: float = 0.5,
+        seed: int = 42,
+    ):
+        if mode not in ERASURE_MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if scope not in ERASURE_SCOPES:
+            raise ValueError(f"Unknown scope: {scope}")
+        self.query_ids = tuple(ep.query_id for ep in episodes)
+        self.episodes = tuple(tuple(tuple(int(i) for i in s.indices) for s in ep.steps) for ep in episodes)
+        self.payload = payload
+        self.stream_key = stream_key
+        self.coeff_mode = coeff_mode
+        self.coeff_tables = tuple(str(p) for p in coeff_tables)
+        self.mode = mode
+        self.scope = scope
+        self.burst_len = burst_len
+        self.trunc_keep_ratio = trunc_keep_ratio
+        self.seed = seed
+        self._encoder = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_encoder"] = None  # rebuilt per process (its row cache holds a lock)
+        return state
+
+    def manifest(self) -> Dict:
+        """Everything a recorded cell depends on besides its own key."""
+        episodes = hashlib.sha256(json.dumps([self.query_ids, self.episodes]).encode("utf-8")).hexdigest()
+        payload = hashlib.sha256(f"{self.payload}|{self.stream_key!r}|{self.coeff_mode}".encode("utf-8")).hexdigest()
+        return {
+            "mode": self.mode,
+            "scope": self.scope,
+            "burst_len": self.burst_len,
+            "trunc_keep_ratio": self.trunc_keep_ratio,
+            "seed": self.seed,
+            "episodes": episodes,
+            "payload": payload,
+        }
+
+    def encoder(self) -> DeterministicRLNC:
+        if self._encoder is None:
+            self._encoder = DeterministicRLNC(self.payload, stream_key=self.stream_key, coeff_mode=self.coeff_mode)
+            if self._encoder.row_cache is not None:
+                for path in self.coeff_tables:
+                    self._encoder.row_cache.attach_table(path)
+        return self._encoder
+
+    def cells(self, p_list: Sequence[float], trials: int, codecs: Sequence[str] = ("rlnc",)) -> List[ErasureCell]:
+        """Grid in report order: codec, p, episode, trial."""
+        for codec in codecs:
+            if codec not in ERASURE_CODECS:
+                raise ValueError(f"unknown codec: {codec}")
+        if self.scope == "global":
+            return [ErasureCell(c, p, r) for c in codecs for p in p_list for r in range(trials)]
+        return [
+            ErasureCell(c, p, r, ep_idx)
+            for c in codecs
+            for p in p_list
+            for ep_idx in range(len(self.episodes))
+            for r in range(trials)
+        ]
+
+    def _erase(self, steps, p: float, rng: random.Random):
+        if self.mode == "iid":
+            return simulate_iid_step_erasure(steps, p, rng)
+        if self.mode == "burst":
+            return simulate_burst_step_erasure(steps, p, self.burst_len, rng)
+        return simulate_truncation(steps, self.trunc_keep_ratio)
+
+    def _decode(self, codec: str, indices: List[int]) -> Tuple[Optional[int], Optional[str]]:
+        if codec == "rlnc":
+            encoder = self.encoder()
+            decoder = StreamingRLNCDecoder(encoder)
+            if indices:
+                rows = encoder.coeff_rows(indices)
+                for row, bit in zip(rows, gf2_parity(rows & encoder.payload_words)):
+                    decoder.add_row(row, bit)
+                    if decoder.is_complete:
+                        break  # later packets cannot change rank or payload
+            return decoder.rank, decoder.payload()
+        k = len(self.payload)
+        bits = [int(self.payload[i % k]) for i in indices]
+        if codec == "noec":
+            return None, decode_noec(self.payload, indices, bits)
+        return None, decode_repetition(self.payload, indices, bits)
+
+    def run_cell(self, cell: ErasureCell) -> Dict:
+        if cell.ep_index is None:
+            # Global scope: the payload is shared across episodes, so the adversary erases steps of one
+            # long trajectory and the surviving packets of all episodes jointly recover it.
+            seed = cell_seed(self.seed, cell.p, cell.trial)
+            rng = random.Random(seed)
+            kept: List[Tuple[int, ...]] = []
+            for ep_idx, steps in enumerate(self.episodes):
+                # Each episode gets an independent but reproducible rng stream
+                rng_ep = random.Random(rng.randint(0, 2**31 - 1) + ep_idx * 17)
+                kept.extend(self._erase(steps, cell.p, rng_ep))
+            query_id = "(global)"
+        else:
+            seed = cell_seed(self.seed, cell.p, cell.trial, cell.ep_index)
+            kept = self._erase(self.episodes[cell.ep_index], cell.p, random.Random(seed))
+            query_id = self.query_ids[cell.ep_index]
+
+        indices = [i for step in kept for i in step]
+        rank, decoded = self._decode(cell.codec, indices)
+        return {
+            "codec": cell.codec,
+            "p": cell.p,
+            "ep_index": cell.ep_index,
+            "query_id": query_id,
+            "trial": cell.trial,
+            "seed": seed,
+            "success": decoded == self.payload,
+            "received_steps": len(kept),
+            "received_packets": len(indices),
+            "rank": rank,
+            "packets_per_step": (len(indices) / len(kept)) if kept else 0.0,
+        }
+
+    def run(
+        self,
+        p_list: Sequence[float],
+        trials: int,
+        codecs: Sequence[str] = ("rlnc",),
+        workers: Optional[int] = 1,
+        sink: Optional[ResultSink] = None,
+        chunk_size: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Run every cell of the grid not already in the sink's journal.
+
+        Args:
+            workers: Process count; 1 runs in this process, None/0 uses all cores.
+            chunk_size: Cells per task (default: ~8 tasks per worker, at most 256 cells).
+
+        Returns:
+            list[dict]: One record per cell, in the order of `cells()`.
+        """
+        cells = self.cells(p_list, trials, codecs)
+        done: Dict[Tuple, Dict] = {}
+        if sink is not None:
+            for record in sink.open(self.manifest()):
+                cell = ErasureCell(record["codec"], record["p"], record["trial"], record["ep_index"])
+                done[cell.key] = record
+            if done:
+                print(f"[INFO] Resuming erasure sweep: {len(done)}/{len(cells)} cells already in {sink.journal}")
+        todo = [c for c in cells if c.key not in done]
+
+        workers = workers or os.cpu_count() or 1
+        if not chunk_size:
+            chunk_size = max(1, min(256, math.ceil(len(todo) / (workers * 8))))
+        chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+
+        finished = len(done)
+        report_every = max(1, len(cells) // 10)
+        next_report = finished + report_every
+
+        def collect(records: List[Dict]) -> None:
+            nonlocal finished, next_report
+            if sink is not None:
+                sink.write(records)
+            for record in records:
+                done[ErasureCell(record["codec"], record["p"], record["trial"], record["ep_index"]).key] = record
+            finished += len(records)
+            if finished >= next_report or finished == len(cells):
+                print(f"[INFO] erasure cells {finished}/{len(cells)}")
+                next_report = finished + report_every
+
+        if workers == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                collect([self.run_cell(c) for c in chunk])
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as pool:
+                futures = [pool.submit(_run_cells, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    collect(future.result())
+
+        records = [done[c.key] for c in cells]
+        if sink is not None:
+            sink.close(records)
+        return records
+
+
+_WORKER_SIMULATION: Optional[ErasureSimulation] = None
+
+
+def _init_worker(simulation: ErasureSimulation) -> None:
+    global _WORKER_SIMULATION
+    _WORKER_SIMULATION = simulation
+
+
+def _run_cells(cells: Sequence[ErasureCell]) -> List[Dict]:
+    return [_WORKER_SIMULATION.run_cell(c) for c in cells]
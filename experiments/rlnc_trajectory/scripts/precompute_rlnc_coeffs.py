@@ -0,0 +1,62 @@
+"""
+Precompute RLNC coefficient rows into a memory-mapped .npy table.
+
+Erasure sweeps and FPR analyses regenerate the same rows for every trial and
+process. A table written once here can be attached by several processes
+(`--coeff_table` in rlnc_step_erasure_eval.py / analyze_fpr.py); they share it
+through the page cache instead of each regenerating rows.
+
+Usage:
+    python experiments/rlnc_trajectory/scripts/precompute_rlnc_coeffs.py \
+        --rlnc_meta output/toolbench_predictions/run/rlnc_meta.json --stop 50000 \
+        --output output/rlnc_tables/run_coeffs.npy
+    python experiments/rlnc_trajectory/scripts/precompute_rlnc_coeffs.py \
+        --payload_len 32 --stream_key 1041 --stop 20000 --output output/rlnc_tables/k1041.npy
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from agentmark.core.rlnc_codec import RLNC_COEFF_MODES, DeterministicRLNC, precompute_coeff_table
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rlnc_meta", default=None, help="rlnc_meta.json providing payload length and stream_key")
+    ap.add_argument("--payload_len", type=int, default=None, help="Payload length n (without --rlnc_meta)")
+    ap.add_argument("--stream_key", default=None, help="Stream key (without --rlnc_meta; digits are read as int)")
+    ap.add_argument("--coeff_mode", choices=RLNC_COEFF_MODES, default=None)
+    ap.add_argument("--start", type=int, default=0)
+    ap.add_argument("--stop", type=int, required=True, help="Exclusive end index")
+    ap.add_argument("--output", required=True, help="Output .npy path (a .json sidecar is written next to it)")
+    args = ap.parse_args()
+
+    meta = json.loads(Path(args.rlnc_meta).read_text(encoding="utf-8")) if args.rlnc_meta else {}
+    n = args.payload_len if args.payload_len is not None else len(meta.get("payload", ""))
+    stream_key = args.stream_key if args.stream_key is not None else meta.get("stream_key", 42)
+    if isinstance(stream_key, str) and stream_key.lstrip("-").isdigit():
+        stream_key = int(stream_key)
+    coeff_mode = args.coeff_mode or meta.get("coeff_mode", "mt")
+    if n <= 0:
+        ap.error("Payload length unknown: pass --rlnc_meta or --payload_len")
+
+    codec = DeterministicRLNC("0" * n, stream_key=stream_key, coeff_mode=coeff_mode, row_cache=False)
+    t0 = time.perf_counter()
+    path = precompute_coeff_table(codec, args.start, args.stop, args.output)
+    print(
+        f"[OK] {args.stop - args.start} rows (n={n}, key={stream_key!r}, mode={coeff_mode}) "
+        f"-> {path} in {time.perf_counter() - t0:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
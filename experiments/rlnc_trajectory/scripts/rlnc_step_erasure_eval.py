@@ -16,6 +16,8 @@ RLNC Settings:
 Packet Loss Simulation (Unit: step):
 - i.i.d step erasure: Each step is deleted with probability p (p from a specified list), repeated R times with different seeds.
 - Optional: burst erasure / truncation (see arguments)
+- Trials run on a process pool (erasure_engine.py); per-trial records are journaled to
+  erasure_trials.jsonl, and re-running the same sweep resumes from that journal.
 
 Output:
 - Summary CSV table: One row per p (success_rate, avg_received_steps, avg_received_packets, avg_rank, avg_rank_margin)
@@ -29,7 +31,6 @@ import csv
 import json
 import math
 import os
-import random
 import sys
 from dataclasses import dataclass
 from pathlib import Path
@@ -41,7 +42,9 @@ ROOT = Path(__file__).resolve().parents[3]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from agentmark.core.rlnc_codec import DeterministicRLNC
+from agentmark.core.rlnc_codec import DeterministicRLNC, StreamingRLNCDecoder
+
+from erasure_engine import ErasureSimulation, ResultSink
 
 
 @dataclass(frozen=True)
@@ -159,67 +162,21 @@ def attach_bits_from_encoder(episode: Episode, encoder: DeterministicRLNC) -> Ep
     return Episode(query_id=episode.query_id, steps=tuple(new_steps))
 
 
-def rank_gf2_from_indices(indices: Sequence[int], encoder: DeterministicRLNC) -> int:
-    """Construct coefficient matrix and calculate GF(2) rank."""
-    if not indices:
-        return 0
-    # Each row is a length k 0/1 coefficient vector
-    matrix = np.array([encoder._generate_coeffs(i) for i in indices], dtype=np.uint8)  # noqa: SLF001
-    # Gaussian elimination over GF(2) to calculate rank
-    rows, cols = matrix.shape
-    rank = 0
-    col = 0
-    for r in range(rows):
-        # Find pivot column
-        while col < cols and not matrix[r:, col].any():
-            col += 1
-        if col >= cols:
-            break
-        # Find pivot row
-        pivot = r + int(np.argmax(matrix[r:, col]))
-        if matrix[pivot, col] == 0:
+def attach_coeff_tables(encoder: DeterministicRLNC, paths: Sequence[str]) -> None:
+    """Serve precomputed coefficient rows from memory-mapped tables."""
+    for path in paths:
+        if encoder.row_cache is None:
+            print(f"[WARN] Row cache disabled (AGENTMARK_RLNC_ROW_CACHE_SIZE=0); ignoring {path}")
             continue
-        if pivot != r:
-            matrix[[r, pivot]] = matrix[[pivot, r]]
-        # Elimination
-        for rr in range(rows):
-            if rr != r and matrix[rr, col]:
-                matrix[rr] ^= matrix[r]
-        rank += 1
-        col += 1
-    return rank
-
-
-def simulate_iid_step_erasure(steps: Sequence[StepPacket], p: float, rng: random.Random) -> List[StepPacket]:
-    kept = []
-    for s in steps:
-        if rng.random() >= p:
-            kept.append(s)
-    return kept
-
-
-def simulate_burst_step_erasure(steps: Sequence[StepPacket], p: float, burst_len: int, rng: random.Random) -> List[StepPacket]:
-    """Randomly delete continuous segments until reaching the target loss ratio (approximate)."""
-    n = len(steps)
-    if n == 0:
-        return []
-    target_drop = int(round(n * p))
-    if target_drop <= 0:
-        return list(steps)
-    drop = set()
-    while len(drop) < target_drop and len(drop) < n:
-        start = rng.randrange(0, n)
-        for i in range(start, min(n, start + burst_len)):
-            drop.add(i)
-            if len(drop) >= target_drop:
-                break
-    return [s for i, s in enumerate(steps) if i not in drop]
-
-
-def simulate_truncation(steps: Sequence[StepPacket], keep_ratio: float) -> List[StepPacket]:
-    n = len(steps)
-    keep_n = int(math.floor(n * keep_ratio))
-    return list(steps[:keep_n])
+        meta = encoder.row_cache.attach_table(path)
+        print(f"[INFO] Attached coefficient table {path} (key={meta['stream_key']!r}, [{meta['start']}, {meta['stop']}))")
+
+
+def rank_gf2_from_indices(indices: Sequence[int], encoder: DeterministicRLNC) -> int:
+    """GF(2) rank of the coefficient rows for the given indices."""
+    decoder = StreamingRLNCDecoder(encoder)
+    decoder.add_packets(indices, [0] * len(indices))
+    return decoder.rank
 
 
 def collect_packets(steps: Sequence[StepPacket]) -> Tuple[List[int], List[int]]:
@@ -255,91 +212,21 @@ class TrialResult:
     packets_per_step: float
 
 
-def run_trials_for_p(
-    episodes: Sequence[Episode],
-    encoder: DeterministicRLNC,
-    p: float,
-    R: int,
-    seed_base: int,
-    mode: str,
-    burst_len: int,
-    trunc_keep_ratio: float,
-    scope: str,
-) -> Tuple[List[TrialResult], Dict[str, int]]:
-    """Return results for all trials and failure counts per episode when p=0.5 (empty dict for other p)."""
-    results: List[TrialResult] = []
-    fail_counter: Dict[str, int] = {}
-    if scope == "episode":
-        for ep_idx, ep in enumerate(episodes):
-            for r in range(R):
-                rng = random.Random(seed_base + (ep_idx + 1) * 100000 + r * 1000 + int(p * 1000))
-                if mode == "iid":
-                    kept_steps = simulate_iid_step_erasure(ep.steps, p, rng)
-                elif mode == "burst":
-                    kept_steps = simulate_burst_step_erasure(ep.steps, p, burst_len, rng)
-                elif mode == "trunc":
-                    kept_steps = simulate_truncation(ep.steps, trunc_keep_ratio)
-                else:
-                    raise ValueError(f"Unknown mode: {mode}")
-
-                indices, bits = collect_packets(kept_steps)
-                rank = rank_gf2_from_indices(indices, encoder)
-                decoded = encoder.decode(indices, bits) if rank >= encoder.n else None  # noqa: SLF001
-                success = decoded == "".join(map(str, encoder.payload))  # noqa: SLF001
-                pps = (len(indices) / len(kept_steps)) if kept_steps else 0.0
-                results.append(
-                    TrialResult(
-                        query_id=ep.query_id,
-                        success=bool(success),
-                        received_steps=len(kept_steps),
-                        received_packets=len(indices),
-                        rank=rank,
-                        packets_per_step=pps,
-                    )
-                )
-                if abs(p - 0.5) < 1e-9:
-                    if not success:
-                        fail_counter[ep.query_id] = fail_counter.get(ep.query_id, 0) + 1
-    elif scope == "global":
-        # In ToolBench implementation, payload/m is often "globally shared"; a threat model more consistent
-        # with this is to treat steps from all episodes as part of one long trajectory: the adversary
-        # randomly deletes some steps (erasure), and the remaining packets are collectively used to recover the same m.
-        for r in range(R):
-            rng = random.Random(seed_base + r * 1000 + int(p * 1000))
-            kept_all: List[StepPacket] = []
-            for ep_idx, ep in enumerate(episodes):
-                # Give each episode an independent but reproducible rng stream
-                rng_ep = random.Random(rng.randint(0, 2**31 - 1) + ep_idx * 17)
-                if mode == "iid":
-                    kept_steps = simulate_iid_step_erasure(ep.steps, p, rng_ep)
-                elif mode == "burst":
-                    kept_steps = simulate_burst_step_erasure(ep.steps, p, burst_len, rng_ep)
-                elif mode == "trunc":
-                    kept_steps = simulate_truncation(ep.steps, trunc_keep_ratio)
-                else:
-                    raise ValueError(f"Unknown mode: {mode}")
-                kept_all.extend(kept_steps)
-
-            indices, bits = collect_packets(kept_all)
-            rank = rank_gf2_from_indices(indices, encoder)
-            decoded = encoder.decode(indices, bits) if rank >= encoder.n else None  # noqa: SLF001
-            success = decoded == "".join(map(str, encoder.payload))  # noqa: SLF001
-            pps = (len(indices) / len(kept_all)) if kept_all else 0.0
-            results.append(
-                TrialResult(
-                    query_id="(global)",
-                    success=bool(success),
-                    received_steps=len(kept_all),
-                    received_packets=len(indices),
-                    rank=rank,
-                    packets_per_step=pps,
-                )
+def trial_results_from_records(records: Sequence[Dict]) -> Dict[float, List[TrialResult]]:
+    """Group erasure-engine cell records by p."""
+    by_p: Dict[float, List[TrialResult]] = {}
+    for rec in records:
+        by_p.setdefault(rec["p"], []).append(
+            TrialResult(
+                query_id=rec["query_id"],
+                success=bool(rec["success"]),
+                received_steps=rec["received_steps"],
+                received_packets=rec["received_packets"],
+                rank=rec["rank"],
+                packets_per_step=rec["packets_per_step"],
             )
-        # In global scope, the concept of "failure count per episode" doesn't apply; return empty
-        fail_counter = {}
-    else:
-        raise ValueError(f"Unknown scope: {scope}")
-    return results, fail_counter
+        )
+    return by_p
 
 
 def main() -> None:
@@ -372,6 +259,19 @@ def main() -> None:
         default="2,3",
         help="Conditional success rate threshold multipliers",
     )
+    ap.add_argument(
+        "--coeff_table",
+        nargs="*",
+        default=None,
+        help="Coefficient tables from precompute_rlnc_coeffs.py to memory-map",
+    )
+    ap.add_argument("--workers", type=int, default=None, help="Simulation processes (0 = all cores, 1 = in-process)")
+    ap.add_argument(
+        "--results",
+        default=None,
+        help="Per-trial results journal (.jsonl, or .parquet to also export a table); default <output_dir>/erasure_trials.jsonl",
+    )
+    ap.add_argument("--no_resume", action="store_true", help="Ignore trials already recorded in the results journal")
     args = ap.parse_args()
 
     # Load Config
@@ -417,6 +317,8 @@ def main() -> None:
     
     encoder = DeterministicRLNC(m, stream_key=K)
     k = encoder.n  # noqa: SLF001
+    coeff_tables = args.coeff_table or eval_cfg.get("coeff_tables") or []
+    attach_coeff_tables(encoder, coeff_tables)
 
     # 3. Determine Output Dir
     out_dir = Path(args.output_dir) if args.output_dir else (Path(eval_cfg.get("output_dir")) if eval_cfg.get("output_dir") else (pred_roots[0] / "robustness_eval"))
@@ -445,9 +347,11 @@ def main() -> None:
     # Filtering: Must be decodable without loss (rank >= k and packet count >= min_packets)
     eligible: List[Episode] = []
     ineligible: List[Tuple[str, int, int]] = []
+    no_loss_rank: Dict[str, int] = {}
     for ep in episodes:
         indices, bits = collect_packets(ep.steps)
         rank = rank_gf2_from_indices(indices, encoder)
+        no_loss_rank[ep.query_id] = rank
         if len(indices) < args.min_packets or rank < k:
             ineligible.append((ep.query_id, len(indices), rank))
         else:
@@ -463,7 +367,7 @@ def main() -> None:
         eligible_set = {e.query_id for e in eligible}
         for ep in episodes:
             indices, _ = collect_packets(ep.steps)
-            rank = rank_gf2_from_indices(indices, encoder)
+            rank = no_loss_rank[ep.query_id]
             pps = (len(indices) / ep.total_steps) if ep.total_steps else 0.0
             wri.writerow([ep.query_id, ep.total_steps, len(indices), f"{pps:.6f}", rank, ep.query_id in eligible_set])
 
@@ -520,20 +424,37 @@ def main() -> None:
     conditional_rows: List[Dict[str, object]] = []
     bucket_rows: List[Dict[str, object]] = []
 
+    # Trial sweep: one engine run covers every p (plus p=0.5 for the per-episode fragility table)
+    sweep_p = list(p_list)
+    p05 = next((p for p in p_list if abs(p - 0.5) < 1e-9), 0.5)
+    if args.scope == "episode" and p05 not in sweep_p:
+        sweep_p.append(p05)
+    sim = ErasureSimulation(
+        eligible,
+        m,
+        stream_key=K,
+        coeff_tables=coeff_tables,
+        mode=mode,
+        scope=scope,
+        burst_len=args.burst_len,
+        trunc_keep_ratio=args.trunc_keep_ratio,
+        seed=args.seed,
+    )
+    results_path = args.results or robust_params.get("results") or (out_dir / "erasure_trials.jsonl")
+    records = sim.run(
+        sweep_p,
+        trials,
+        workers=args.workers if args.workers is not None else robust_params.get("workers", 0),
+        sink=ResultSink(results_path, resume=not args.no_resume),
+    )
+    results_by_p = trial_results_from_records(records)
+
     for p in p_list:
-        trial_results, fail_counter = run_trials_for_p(
-            episodes=eligible,
-            encoder=encoder,
-            p=p,
-            R=trials,
-            seed_base=args.seed,
-            mode=mode,
-            burst_len=args.burst_len,
-            trunc_keep_ratio=args.trunc_keep_ratio,
-            scope=scope,
-        )
-        if abs(p - 0.5) < 1e-9:
-            p05_failures = fail_counter
+        trial_results = results_by_p.get(p, [])
+        if abs(p - 0.5) < 1e-9 and scope == "episode":
+            for t in trial_results:
+                if not t.success:
+                    p05_failures[t.query_id] = p05_failures.get(t.query_id, 0) + 1
 
         total = len(trial_results)
         success = sum(1 for t in trial_results if t.success)
@@ -657,30 +578,15 @@ def main() -> None:
 
     # Extra: Export p=0.5 per-episode statistics in episode scope (used to explain which episodes are more fragile)
     if args.scope == "episode":
-        p05 = 0.5
         stats = {ep.query_id: {"success": 0, "trials": 0, "steps": [], "packets": [], "rank": [], "pps": []} for ep in eligible}
-        for ep_idx, ep in enumerate(eligible):
-            for r_i in range(trials):
-                rng = random.Random(args.seed + (ep_idx + 1) * 100000 + r_i * 1000 + int(p05 * 1000))
-                if args.mode == "iid":
-                    kept = simulate_iid_step_erasure(ep.steps, p05, rng)
-                elif args.mode == "burst":
-                    kept = simulate_burst_step_erasure(ep.steps, p05, args.burst_len, rng)
-                elif args.mode == "trunc":
-                    kept = simulate_truncation(ep.steps, args.trunc_keep_ratio)
-                else:
-                    raise ValueError(f"Unknown mode: {args.mode}")
-                indices, bits = collect_packets(kept)
-                rank = rank_gf2_from_indices(indices, encoder)
-                decoded = encoder.decode(indices, bits) if rank >= encoder.n else None  # noqa: SLF001
-                ok = decoded == "".join(map(str, encoder.payload))  # noqa: SLF001
-                s = stats[ep.query_id]
-                s["trials"] += 1
-                s["success"] += int(bool(ok))
-                s["steps"].append(len(kept))
-                s["packets"].append(len(indices))
-                s["rank"].append(rank)
-                s["pps"].append((len(indices) / len(kept)) if kept else 0.0)
+        for t in results_by_p.get(p05, []):
+            s = stats[t.query_id]
+            s["trials"] += 1
+            s["success"] += int(t.success)
+            s["steps"].append(t.received_steps)
+            s["packets"].append(t.received_packets)
+            s["rank"].append(t.rank)
+            s["pps"].append(t.packets_per_step)
 
         ep_stats_csv = out_dir / "episode_p05_stats.csv"
         with ep_stats_csv.open("w", newline="", encoding="utf-8") as f:
@@ -728,6 +634,9 @@ def main() -> None:
     print(f"[OK] summary -> {csv_path}")
     print(f"[OK] p=0.5 failures -> {p05_path}")
     print(f"[OK] episode overview -> {overview_csv}")
+    print(f"[OK] trial records -> {results_path}")
+    if encoder.row_cache is not None:
+        print(f"[INFO] coefficient row cache: {encoder.row_cache.stats()}")
 
 
 if __name__ == "__main__":
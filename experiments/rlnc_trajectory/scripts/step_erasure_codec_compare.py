@@ -23,19 +23,17 @@ import argparse
 import csv
 import json
 import math
-import random
 import sys
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
-import numpy as np
 
 ROOT = Path(__file__).resolve().parents[3]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from agentmark.core.rlnc_codec import DeterministicRLNC
+from erasure_engine import ErasureSimulation, ResultSink
 
 
 @dataclass(frozen=True)
@@ -104,17 +102,6 @@ def extract_episode(file: Path) -> Episode:
     return Episode(query_id=file.stem, steps=tuple(steps))
 
 
-def simulate_iid_step_erasure(steps: Sequence[StepIndices], p: float, rng: random.Random) -> List[StepIndices]:
-    return [s for s in steps if rng.random() >= p]
-
-
-def collect_indices(steps: Sequence[StepIndices]) -> List[int]:
-    out: List[int] = []
-    for s in steps:
-        out.extend(list(s.indices))
-    return out
-
-
 def wilson_95ci(success: int, total: int) -> Tuple[float, float]:
     if total <= 0:
         return 0.0, 0.0
@@ -128,76 +115,6 @@ def wilson_95ci(success: int, total: int) -> Tuple[float, float]:
     return lo, hi
 
 
-def decode_noec(payload: str, indices: Sequence[int], bits: Sequence[int]) -> Optional[str]:
-    k = len(payload)
-    if k == 0:
-        return None
-    seen: Dict[int, int] = {}
-    for idx, b in zip(indices, bits):
-        j = idx % k
-        if j in seen and seen[j] != b:
-            return None
-        seen[j] = b
-    if len(seen) < k:
-        return None
-    return "".join(str(seen[j]) for j in range(k))
-
-
-def decode_repetition(payload: str, indices: Sequence[int], bits: Sequence[int]) -> Optional[str]:
-    k = len(payload)
-    if k == 0:
-        return None
-    votes: Dict[int, List[int]] = {j: [] for j in range(k)}
-    for idx, b in zip(indices, bits):
-        votes[idx % k].append(int(b))
-    out = []
-    for j in range(k):
-        if not votes[j]:
-            return None
-        c1 = sum(votes[j])
-        c0 = len(votes[j]) - c1
-        if c1 == c0:
-            return None
-        out.append("1" if c1 > c0 else "0")
-    return "".join(out)
-
-
-def build_bits(codec: str, payload: str, key: int, indices: Sequence[int]) -> Tuple[List[int], Optional[DeterministicRLNC]]:
-    if codec == "rlnc":
-        enc = DeterministicRLNC(payload, stream_key=key)
-        return [int(enc.get_bit(i)) for i in indices], enc
-    if codec in ("noec", "repetition"):
-        k = len(payload)
-        return [int(payload[i % k]) for i in indices], None
-    raise ValueError(f"unknown codec: {codec}")
-
-
-def rlnc_rank(indices: Sequence[int], enc: DeterministicRLNC) -> int:
-    if not indices:
-        return 0
-    # Construct matrix directly using coefficient generator of RLNC and calculate GF(2) rank
-    mat = np.array([enc._generate_coeffs(i) for i in indices], dtype=np.uint8)  # noqa: SLF001
-    rows, cols = mat.shape
-    rank = 0
-    col = 0
-    for r in range(rows):
-        while col < cols and not mat[r:, col].any():
-            col += 1
-        if col >= cols:
-            break
-        pivot = r + int(np.argmax(mat[r:, col]))
-        if mat[pivot, col] == 0:
-            continue
-        if pivot != r:
-            mat[[r, pivot]] = mat[[pivot, r]]
-        for rr in range(rows):
-            if rr != r and mat[rr, col]:
-                mat[rr] ^= mat[r]
-        rank += 1
-        col += 1
-    return rank
-
-
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--pred_roots", nargs="+", required=True, help="One or more watermark prediction root directories (to merge trajectories)")
@@ -206,6 +123,9 @@ def main() -> None:
     ap.add_argument("--trials", type=int, default=30)
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--codecs", default="rlnc,noec,repetition", help="Comma-separated: rlnc,noec,repetition")
+    ap.add_argument("--workers", type=int, default=0, help="Simulation processes (0 = all cores, 1 = in-process)")
+    ap.add_argument("--results", default=None, help="Per-trial results journal (.jsonl or .parquet); default <output_dir>/compare_trials.jsonl")
+    ap.add_argument("--no_resume", action="store_true", help="Ignore trials already recorded in the results journal")
     args = ap.parse_args()
 
     pred_roots = [Path(p) for p in args.pred_roots]
@@ -236,45 +156,24 @@ def main() -> None:
     codecs = [c.strip() for c in args.codecs.split(",") if c.strip()]
     k = len(payload)
 
+    # Same erasure pattern for every codec: cell seeds depend only on (seed, p, trial)
+    sim = ErasureSimulation(episodes, payload, stream_key=key, mode="iid", scope="global", seed=args.seed)
+    records = sim.run(
+        p_list,
+        args.trials,
+        codecs=codecs,
+        workers=args.workers,
+        sink=ResultSink(args.results or (out_dir / "compare_trials.jsonl"), resume=not args.no_resume),
+    )
+
     rows: List[Dict[str, object]] = []
     for codec in codecs:
         for p in p_list:
-            successes = 0
-            total = 0
-            recv_steps_sum = 0
-            recv_packets_sum = 0
+            trial_records = [r for r in records if r["codec"] == codec and r["p"] == p]
+            total = len(trial_records)
+            successes = sum(1 for r in trial_records if r["success"])
             # record rank (RLNC only) for explanation
-            rank_sum = 0.0
-
-            for r in range(args.trials):
-                rng_master = random.Random(args.seed + r * 1000 + int(p * 1000))
-                kept_all: List[StepIndices] = []
-                for ep_idx, ep in enumerate(episodes):
-                    rng_ep = random.Random(rng_master.randint(0, 2**31 - 1) + ep_idx * 17)
-                    kept_all.extend(simulate_iid_step_erasure(ep.steps, p, rng_ep))
-                indices = collect_indices(kept_all)
-                bits, enc = build_bits(codec, payload, key, indices)
-
-                if codec == "rlnc":
-                    assert enc is not None
-                    rank = rlnc_rank(indices, enc)
-                    decoded = enc.decode(indices, bits) if rank >= k else None
-                    ok = decoded == payload
-                    rank_sum += rank
-                elif codec == "noec":
-                    decoded = decode_noec(payload, indices, bits)
-                    ok = decoded == payload
-                elif codec == "repetition":
-                    decoded = decode_repetition(payload, indices, bits)
-                    ok = decoded == payload
-                else:
-                    raise ValueError(codec)
-
-                successes += int(bool(ok))
-                total += 1
-                recv_steps_sum += len(kept_all)
-                recv_packets_sum += len(indices)
-
+            rank_sum = float(sum(r["rank"] for r in trial_records)) if codec == "rlnc" else 0.0
             lo, hi = wilson_95ci(successes, total)
             rows.append(
                 {
@@ -283,8 +182,8 @@ def main() -> None:
                     "decode_success_rate": successes / total if total else 0.0,
                     "ci95_low": lo,
                     "ci95_high": hi,
-                    "avg_received_steps": recv_steps_sum / total if total else 0.0,
-                    "avg_received_packets": recv_packets_sum / total if total else 0.0,
+                    "avg_received_steps": sum(r["received_steps"] for r in trial_records) / total if total else 0.0,
+                    "avg_received_packets": sum(r["received_packets"] for r in trial_records) / total if total else 0.0,
                     "avg_rank": (rank_sum / total) if (total and codec == "rlnc") else "",
                     "k": k,
                     "trials": total,
@@ -12,7 +12,7 @@ from tqdm import tqdm
 # Import log parser and decoder utilities
 from agentmark.core.log_parser import parse_log_files, validate_round_data
 from agentmark.core.watermark_sampler import differential_based_decoder
-from agentmark.core.coding_utils import decode_message
+from agentmark.core.coding_utils import decode_messages, get_codec
 
 # Absolute path to this script directory
 SCRIPT_DIR = Path(__file__).parent.absolute()
@@ -65,12 +65,7 @@ def main():
     print(f"  Embedding strategy: {embedding_strategy}")
     
     # Compute expected encoded length
-    if watermark_config['ecc_method'] == 'parity':
-        expected_encoded_length = watermark_config['payload_bit_length'] + 1
-    elif watermark_config['ecc_method'] == 'hamming':
-        expected_encoded_length = 21  # Hamming(21,16) requires a 16-bit payload
-    else:
-        expected_encoded_length = watermark_config['payload_bit_length']
+    expected_encoded_length = get_codec(watermark_config).n
     
     print(f"  Expected encoded length: {expected_encoded_length} bits/message")
 
@@ -203,14 +198,12 @@ def main():
         num_messages = len(extracted_bit_stream) // expected_encoded_length
         print(f"  Expected message count: {num_messages}")
         
-        for i in range(num_messages):
-            start_idx = i * expected_encoded_length
-            end_idx = start_idx + expected_encoded_length
-            encoded_message = extracted_bit_stream[start_idx:end_idx]
-            
-            # Call ECC decoding
-            result = decode_message(encoded_message, watermark_config)
-            
+        encoded_messages = [
+            extracted_bit_stream[i * expected_encoded_length:(i + 1) * expected_encoded_length]
+            for i in range(num_messages)
+        ]
+        # Call ECC decoding (one batch for all complete messages)
+        for i, result in enumerate(decode_messages(encoded_messages, watermark_config)):
             decoded_payloads.append(result['decoded_payload'])
             validation_results.append(result)
             